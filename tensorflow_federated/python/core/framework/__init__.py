@@ -20,6 +20,9 @@ from __future__ import print_function
 
 import six
 
+from tensorflow_federated.python.core.impl.compilation_cache import CompilationCache
+from tensorflow_federated.python.core.impl.compilation_cache import get_default_compilation_cache
+from tensorflow_federated.python.core.impl.compilation_cache import set_default_compilation_cache
 from tensorflow_federated.python.core.impl.computation_building_block_utils import is_called_intrinsic
 from tensorflow_federated.python.core.impl.computation_building_blocks import Block
 from tensorflow_federated.python.core.impl.computation_building_blocks import Call
@@ -72,6 +75,7 @@ if six.PY3:
   # pylint: disable=g-import-not-at-top
   try:
     from tensorflow_federated.python.core.impl.concurrent_executor import ConcurrentExecutor
+    from tensorflow_federated.python.core.impl.concurrent_executor import EventLoopPool
     from tensorflow_federated.python.core.impl.eager_executor import EagerExecutor
     from tensorflow_federated.python.core.impl.executor_base import Executor
     from tensorflow_federated.python.core.impl.executor_service import ExecutorService
@@ -81,6 +85,8 @@ if six.PY3:
     from tensorflow_federated.python.core.impl.lambda_executor import LambdaExecutor
     from tensorflow_federated.python.core.impl.remote_executor import RemoteExecutor
     from tensorflow_federated.python.core.impl.set_default_executor import set_default_executor
+    from tensorflow_federated.python.core.impl.tracing_executor import ExecutionTracer
+    from tensorflow_federated.python.core.impl.tracing_executor import TracingExecutor
     from tensorflow_federated.python.core.impl.transforming_executor import TransformingExecutor
   except ModuleNotFoundError:
     pass
@@ -94,6 +100,8 @@ _allowed_symbols = [
     "ComputationBuildingBlock",
     "ConcurrentExecutor",
     "EagerExecutor",
+    "EventLoopPool",
+    "ExecutionTracer",
     "Executor",
     "ExecutorService",
     "ExecutorValue",
@@ -111,6 +119,7 @@ _allowed_symbols = [
     "RemoteExecutor",
     "Selection",
     "TFParser",
+    "TracingExecutor",
     "TransformingExecutor",
     "Tuple",
     "are_equivalent_types",
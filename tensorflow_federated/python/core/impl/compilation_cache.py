@@ -0,0 +1,260 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A content-addressed cache of the results of the compiler pipeline."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+
+from absl import logging
+from google.protobuf import message
+import six
+import tensorflow as tf
+
+from tensorflow_federated.proto.v0 import computation_pb2 as pb
+from tensorflow_federated.python.common_libs import py_typecheck
+
+# The version of the compiler output, which participates in the cache keys. It
+# must be incremented whenever a change to the compiler pipeline (or to any of
+# the intrinsic bodies it inlines) changes the computations it produces, so
+# that results cached on disk by an older version are not picked up.
+COMPILER_VERSION = 1
+
+
+class CompilationCache(object):
+  """A bounded LRU cache of compiled computations, optionally backed by disk.
+
+  The cache is content-addressed: the compiled form of a computation is keyed
+  by the fingerprint of the serialized input computation, combined with the
+  version of the compiler and of TensorFlow. Structurally identical inputs thus
+  share an entry regardless of where they come from, and if a `cache_dir` is
+  given, compiled computations persist across processes, so that warm starts
+  do not need to run the compiler pipeline at all.
+
+  This class is thread-safe. A single instance is shared by default among all
+  instances of `CompilerPipeline` that are not given a cache explicitly (see
+  `get_default_compilation_cache()`).
+  """
+
+  def __init__(self, max_size=100, cache_dir=None):
+    """Creates a new cache.
+
+    Args:
+      max_size: The maximum number of compiled computations to hold in memory
+        before evicting the least recently used ones.
+      cache_dir: An optional path to a local directory to persist the compiled
+        computations in. The directory is created if it does not exist.
+
+    Raises:
+      ValueError: If `max_size` is not positive.
+    """
+    py_typecheck.check_type(max_size, int)
+    if max_size < 1:
+      raise ValueError('The cache size must be positive, found {}.'.format(
+          str(max_size)))
+    if cache_dir is not None:
+      py_typecheck.check_type(cache_dir, six.string_types)
+      if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    self._max_size = max_size
+    self._cache_dir = cache_dir
+    self._lock = threading.Lock()
+    self._entries = collections.OrderedDict()
+    self._hits = 0
+    self._disk_hits = 0
+    self._misses = 0
+
+  @property
+  def max_size(self):
+    return self._max_size
+
+  @property
+  def cache_dir(self):
+    return self._cache_dir
+
+  @property
+  def hits(self):
+    """The number of lookups served from memory."""
+    return self._hits
+
+  @property
+  def disk_hits(self):
+    """The number of lookups served from the `cache_dir`."""
+    return self._disk_hits
+
+  @property
+  def misses(self):
+    """The number of lookups that required running the compiler."""
+    return self._misses
+
+  @property
+  def hit_rate(self):
+    """The fraction of lookups served from memory or disk, or `None`."""
+    lookups = self._hits + self._disk_hits + self._misses
+    if not lookups:
+      return None
+    return (self._hits + self._disk_hits) / lookups
+
+  def __len__(self):
+    with self._lock:
+      return len(self._entries)
+
+  def __str__(self):
+    return ('CompilationCache(entries={}, hits={}, disk_hits={}, misses={}, '
+            'hit_rate={})'.format(
+                len(self), self._hits, self._disk_hits, self._misses,
+                self.hit_rate))
+
+  def clear(self):
+    """Drops all entries held in memory and resets the counters.
+
+    Entries persisted in the `cache_dir` are left intact.
+    """
+    with self._lock:
+      self._entries.clear()
+      self._hits = 0
+      self._disk_hits = 0
+      self._misses = 0
+
+  def get_or_compile(self, comp, compile_fn, variant=None):
+    """Returns the compiled form of `comp`, compiling it on a cache miss.
+
+    Args:
+      comp: An instance of `pb.Computation` to compile.
+      compile_fn: A one-argument callable that accepts `comp`, and returns its
+        compiled form as an instance of `pb.Computation`.
+      variant: An optional string that identifies the configuration of the
+        compiler (e.g., the optimization level), if the output of `compile_fn`
+        depends on it, so that the results for different configurations are
+        cached separately.
+
+    Returns:
+      An instance of `pb.Computation` that represents the compiled form.
+
+    Raises:
+      TypeError: If arguments are of the wrong types.
+    """
+    py_typecheck.check_type(comp, pb.Computation)
+    py_typecheck.check_callable(compile_fn)
+    if variant is not None:
+      py_typecheck.check_type(variant, six.string_types)
+    key = _make_key(comp, variant)
+    with self._lock:
+      compiled = self._entries.pop(key, None)
+      if compiled is not None:
+        self._entries[key] = compiled
+        self._hits += 1
+        return compiled
+    compiled = self._read_from_disk(key)
+    if compiled is not None:
+      with self._lock:
+        self._disk_hits += 1
+    else:
+      # The compilation happens outside of the lock, so that compiling large
+      # computations does not block concurrent lookups.
+      compiled = compile_fn(comp)
+      py_typecheck.check_type(compiled, pb.Computation)
+      self._write_to_disk(key, compiled)
+      with self._lock:
+        self._misses += 1
+    with self._lock:
+      self._entries[key] = compiled
+      while len(self._entries) > self._max_size:
+        self._entries.popitem(last=False)
+    return compiled
+
+  def _path_for_key(self, key):
+    return os.path.join(self._cache_dir, '{}.pb'.format(key))
+
+  def _read_from_disk(self, key):
+    if self._cache_dir is None:
+      return None
+    path = self._path_for_key(key)
+    if not os.path.exists(path):
+      return None
+    try:
+      with open(path, 'rb') as f:
+        serialized = f.read()
+    except (IOError, OSError) as e:
+      logging.warning('Failed to read the compilation cache entry %s: %s', path,
+                      e)
+      return None
+    try:
+      return pb.Computation.FromString(serialized)
+    except message.DecodeError:
+      # A corrupted entry is treated as a miss, and overwritten.
+      return None
+
+  def _write_to_disk(self, key, compiled):
+    if self._cache_dir is None:
+      return
+    # The entry is written to a temporary file first, and then renamed, so that
+    # concurrent readers (possibly in other processes) never observe a
+    # partially written entry.
+    temp_path = None
+    try:
+      fd, temp_path = tempfile.mkstemp(dir=self._cache_dir, suffix='.tmp')
+      with os.fdopen(fd, 'wb') as f:
+        f.write(compiled.SerializeToString())
+      os.rename(temp_path, self._path_for_key(key))
+    except (IOError, OSError) as e:
+      # The disk cache is optional, so the compiled computation is still
+      # returned (and cached in memory) if it cannot be written, e.g., because
+      # the disk is full or read-only.
+      logging.warning('Failed to write to the compilation cache in %s: %s',
+                      self._cache_dir, e)
+      if temp_path is not None and os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def _make_key(comp, variant=None):
+  """Returns the key under which the compiled form of `comp` is cached."""
+  hasher = hashlib.sha256()
+  for part in [
+      str(COMPILER_VERSION).encode('utf-8'),
+      tf.__version__.encode('utf-8'),
+      (variant or '').encode('utf-8'),
+      comp.SerializeToString(deterministic=True)
+  ]:
+    hasher.update(str(len(part)).encode('utf-8'))
+    hasher.update(b':')
+    hasher.update(part)
+  return hasher.hexdigest()
+
+
+_DEFAULT_CACHE = CompilationCache()
+
+
+def get_default_compilation_cache():
+  """Returns the `CompilationCache` used by default by compiler pipelines."""
+  return _DEFAULT_CACHE
+
+
+def set_default_compilation_cache(cache):
+  """Sets the `CompilationCache` used by default by compiler pipelines.
+
+  Args:
+    cache: An instance of `CompilationCache`, e.g., one that is backed by a
+      directory on the local disk.
+  """
+  global _DEFAULT_CACHE
+  py_typecheck.check_type(cache, CompilationCache)
+  _DEFAULT_CACHE = cache
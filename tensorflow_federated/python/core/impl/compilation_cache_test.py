@@ -0,0 +1,154 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for compilation_cache.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from absl.testing import absltest
+import tensorflow as tf
+
+from tensorflow_federated.python.core.impl import compilation_cache
+from tensorflow_federated.python.core.impl import computation_building_blocks
+
+
+def _make_reference(name):
+  return computation_building_blocks.Reference(name, tf.int32).proto
+
+
+class CountingCompiler(object):
+  """A fake compiler that renames references, and counts its invocations."""
+
+  def __init__(self):
+    self.num_calls = 0
+
+  def __call__(self, comp):
+    self.num_calls += 1
+    return _make_reference(comp.reference.name + '_compiled')
+
+
+class CompilationCacheTest(absltest.TestCase):
+
+  def _make_temp_dir(self):
+    temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, temp_dir)
+    return temp_dir
+
+  def test_compiles_once_in_memory(self):
+    cache = compilation_cache.CompilationCache()
+    compiler = CountingCompiler()
+    for _ in range(3):
+      compiled = cache.get_or_compile(_make_reference('x'), compiler)
+      self.assertEqual(compiled.reference.name, 'x_compiled')
+    self.assertEqual(compiler.num_calls, 1)
+    self.assertEqual(cache.misses, 1)
+    self.assertEqual(cache.hits, 2)
+    self.assertEqual(cache.disk_hits, 0)
+    self.assertAlmostEqual(cache.hit_rate, 2.0 / 3.0)
+    self.assertLen(cache, 1)
+
+  def test_distinguishes_distinct_computations(self):
+    cache = compilation_cache.CompilationCache()
+    compiler = CountingCompiler()
+    self.assertEqual(
+        cache.get_or_compile(_make_reference('x'), compiler).reference.name,
+        'x_compiled')
+    self.assertEqual(
+        cache.get_or_compile(_make_reference('y'), compiler).reference.name,
+        'y_compiled')
+    self.assertEqual(compiler.num_calls, 2)
+    self.assertLen(cache, 2)
+
+  def test_evicts_least_recently_used(self):
+    cache = compilation_cache.CompilationCache(max_size=2)
+    compiler = CountingCompiler()
+    for name in ['x', 'y', 'x', 'z', 'x', 'y']:
+      cache.get_or_compile(_make_reference(name), compiler)
+    # The second 'y' is a miss, since 'y' is evicted when 'z' is added.
+    self.assertEqual(compiler.num_calls, 4)
+    self.assertLen(cache, 2)
+
+  def test_persists_on_disk_across_instances(self):
+    cache_dir = os.path.join(self._make_temp_dir(), 'cache')
+    compiler = CountingCompiler()
+    first_cache = compilation_cache.CompilationCache(cache_dir=cache_dir)
+    first_cache.get_or_compile(_make_reference('x'), compiler)
+    self.assertTrue(os.path.isdir(cache_dir))
+    second_cache = compilation_cache.CompilationCache(cache_dir=cache_dir)
+    compiled = second_cache.get_or_compile(_make_reference('x'), compiler)
+    self.assertEqual(compiled.reference.name, 'x_compiled')
+    self.assertEqual(compiler.num_calls, 1)
+    self.assertEqual(second_cache.disk_hits, 1)
+    self.assertEqual(second_cache.misses, 0)
+    self.assertEqual([f for f in os.listdir(cache_dir) if f.endswith('.tmp')],
+                     [])
+
+  def test_recompiles_corrupted_entry_on_disk(self):
+    cache_dir = self._make_temp_dir()
+    compiler = CountingCompiler()
+    compilation_cache.CompilationCache(cache_dir=cache_dir).get_or_compile(
+        _make_reference('x'), compiler)
+    for filename in os.listdir(cache_dir):
+      with open(os.path.join(cache_dir, filename), 'wb') as f:
+        f.write(b'\xff\xff\xff')
+    cache = compilation_cache.CompilationCache(cache_dir=cache_dir)
+    compiled = cache.get_or_compile(_make_reference('x'), compiler)
+    self.assertEqual(compiled.reference.name, 'x_compiled')
+    self.assertEqual(compiler.num_calls, 2)
+    self.assertEqual(cache.misses, 1)
+
+  def test_compiles_when_disk_cache_fails(self):
+    cache_dir = self._make_temp_dir()
+    comp = _make_reference('x')
+    # A directory in place of the entry can be neither read nor replaced.
+    key = compilation_cache._make_key(comp)  # pylint: disable=protected-access
+    os.mkdir(os.path.join(cache_dir, '{}.pb'.format(key)))
+    compiler = CountingCompiler()
+    cache = compilation_cache.CompilationCache(cache_dir=cache_dir)
+    compiled = cache.get_or_compile(comp, compiler)
+    self.assertEqual(compiled.reference.name, 'x_compiled')
+    self.assertEqual(cache.misses, 1)
+    self.assertIs(cache.get_or_compile(_make_reference('x'), compiler),
+                  compiled)
+    self.assertEqual(compiler.num_calls, 1)
+    self.assertEqual([f for f in os.listdir(cache_dir) if f.endswith('.tmp')],
+                     [])
+
+  def test_clear_resets_counters(self):
+    cache = compilation_cache.CompilationCache()
+    compiler = CountingCompiler()
+    cache.get_or_compile(_make_reference('x'), compiler)
+    cache.clear()
+    self.assertEmpty(cache)
+    self.assertEqual(cache.misses, 0)
+    self.assertIsNone(cache.hit_rate)
+
+  def test_fails_with_nonpositive_max_size(self):
+    with self.assertRaises(ValueError):
+      compilation_cache.CompilationCache(max_size=0)
+
+  def test_fails_with_non_computation(self):
+    cache = compilation_cache.CompilationCache()
+    with self.assertRaises(TypeError):
+      cache.get_or_compile('x', CountingCompiler())
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,363 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Optimization passes for the compiler pipeline, and a manager to run them."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import time
+
+from absl import logging
+import six
+
+from tensorflow_federated.python.common_libs import anonymous_tuple
+from tensorflow_federated.python.common_libs import py_typecheck
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.impl import compiled_computation_transforms
+from tensorflow_federated.python.core.impl import computation_building_blocks
+from tensorflow_federated.python.core.impl import transformation_utils
+from tensorflow_federated.python.core.impl import transformations
+from tensorflow_federated.python.core.impl import tree_analysis
+
+# The highest supported optimization level.
+MAX_OPTIMIZATION_LEVEL = 2
+
+
+class CompilerPass(object):
+  """A named transformation of a computation, for use with `PassManager`."""
+
+  def __init__(self, name, fn):
+    """Constructs a pass.
+
+    Args:
+      name: The name of the pass, for use in reports.
+      fn: A one-argument callable that accepts an instance of
+        `computation_building_blocks.ComputationBuildingBlock`, and returns a
+        tuple of a possibly transformed building block, and a Boolean that
+        indicates whether it was transformed, following the conventions of the
+        functions in `transformations.py`.
+    """
+    py_typecheck.check_type(name, six.string_types)
+    py_typecheck.check_callable(fn)
+    self._name = name
+    self._fn = fn
+    self._rewrite_engine = None
+
+  @property
+  def name(self):
+    return self._name
+
+  def __call__(self, comp):
+    return self._fn(comp)
+
+  @classmethod
+  def from_transform_spec(cls, name, spec):
+    """Constructs a pass that applies `spec` to the entire tree postorder.
+
+    Args:
+      name: The name of the pass.
+      spec: An instance of `transformation_utils.TransformSpec`.
+
+    Returns:
+      An instance of `CompilerPass`.
+    """
+    py_typecheck.check_type(spec, transformation_utils.TransformSpec)
+    return cls(
+        name,
+        lambda comp: transformation_utils.transform_postorder(
+            comp, spec.transform))
+
+  @classmethod
+  def from_transform_specs(cls, name, specs):
+    """Constructs a pass that applies all of `specs` in a single sweep.
+
+    The specs are applied with a `transformation_utils.RewriteEngine`, whose
+    per-spec hit counts are included in the report of the `PassManager`.
+
+    Args:
+      name: The name of the pass.
+      specs: A list of `transformation_utils.TransformSpec`s, in the order of
+        priority.
+
+    Returns:
+      An instance of `CompilerPass`.
+    """
+    engine = transformation_utils.RewriteEngine(specs)
+    compiler_pass = cls(name, engine.rewrite)
+    compiler_pass._rewrite_engine = engine
+    return compiler_pass
+
+  @property
+  def rule_hits(self):
+    """A list of pairs of rule names and hit counts, or `None`.
+
+    Only available for passes constructed with `from_transform_specs`.
+    """
+    if self._rewrite_engine is None:
+      return None
+    return [(type(spec).__name__, hits) for spec, hits in zip(
+        self._rewrite_engine.specs, self._rewrite_engine.hit_counts)]
+
+
+class PassStats(object):
+  """Statistics collected by `PassManager` for a single pass."""
+
+  def __init__(self, name):
+    self.name = name
+    self.runs = 0
+    self.hits = 0
+    self.total_time = 0.0
+    self.node_delta = 0
+    # Pairs of rule names and hit counts, for passes that have rules.
+    self.rule_hits = []
+
+  def __repr__(self):
+    return ('PassStats(name={!r}, runs={}, hits={}, total_time={:.6f}, '
+            'node_delta={}, rule_hits={!r})'.format(self.name, self.runs,
+                                                    self.hits, self.total_time,
+                                                    self.node_delta,
+                                                    self.rule_hits))
+
+
+class PassManager(object):
+  """Runs a sequence of `CompilerPass`es to a fixed point.
+
+  The passes are run in order, and the sequence is repeated for as long as any
+  of the passes modifies the computation, up to `max_iterations` times. For
+  each pass, the manager records the number of times it has been run, the
+  number of runs in which it modified the computation, the time spent in it,
+  and the total change in the number of building blocks it has caused. The
+  statistics describe the most recent `run`, and are logged at the end of it.
+
+  This class is thread-safe. Concurrent calls to `run` are serialized, so that
+  the statistics of one run are not mixed with those of another.
+  """
+
+  def __init__(self, passes, max_iterations=10):
+    """Constructs a pass manager.
+
+    Args:
+      passes: A list of `CompilerPass`es to run.
+      max_iterations: The maximum number of times to run the sequence of passes
+        when looking for a fixed point.
+
+    Raises:
+      ValueError: If `max_iterations` is not positive.
+    """
+    py_typecheck.check_type(passes, list)
+    for p in passes:
+      py_typecheck.check_type(p, CompilerPass)
+    py_typecheck.check_type(max_iterations, int)
+    if max_iterations < 1:
+      raise ValueError(
+          'The maximum number of iterations must be positive, found {}.'.format(
+              str(max_iterations)))
+    self._passes = passes
+    self._max_iterations = max_iterations
+    self._lock = threading.Lock()
+    self._stats = [PassStats(p.name) for p in passes]
+    self._iterations = 0
+
+  @property
+  def passes(self):
+    return list(self._passes)
+
+  @property
+  def stats(self):
+    """A list of `PassStats` of the last `run`, one per pass, in order."""
+    return list(self._stats)
+
+  @property
+  def iterations(self):
+    """The number of iterations over the passes run by the last `run`."""
+    return self._iterations
+
+  def run(self, comp):
+    """Runs the passes on `comp` until a fixed point is reached.
+
+    Args:
+      comp: An instance of
+        `computation_building_blocks.ComputationBuildingBlock` to transform.
+
+    Returns:
+      A tuple of the transformed computation, and a Boolean that indicates
+      whether any of the passes has modified it.
+    """
+    py_typecheck.check_type(
+        comp, computation_building_blocks.ComputationBuildingBlock)
+    with self._lock:
+      self._stats = [PassStats(p.name) for p in self._passes]
+      self._iterations = 0
+      # The rule hit counts of the passes are cumulative, so the counts of this
+      # run are the differences from the counts before it.
+      initial_rule_hits = [p.rule_hits or [] for p in self._passes]
+      modified = False
+      node_count = tree_analysis.count(comp)
+      while self._iterations < self._max_iterations:
+        self._iterations += 1
+        modified_in_iteration = False
+        for p, stats in zip(self._passes, self._stats):
+          start = time.time()
+          comp, pass_modified = p(comp)
+          stats.total_time += time.time() - start
+          stats.runs += 1
+          if pass_modified:
+            stats.hits += 1
+            new_node_count = tree_analysis.count(comp)
+            stats.node_delta += new_node_count - node_count
+            node_count = new_node_count
+            modified_in_iteration = True
+        if not modified_in_iteration:
+          break
+        modified = True
+      for p, stats, initial in zip(self._passes, self._stats,
+                                   initial_rule_hits):
+        stats.rule_hits = [
+            (name, hits - initial_hits)
+            for (name, hits), (_, initial_hits) in zip(p.rule_hits or [],
+                                                       initial)
+        ]
+      logging.info('Ran %d iteration(s) of the optimization passes:\n%s',
+                   self._iterations, self.format_stats())
+    return comp, modified
+
+  def format_stats(self):
+    """Returns a human-readable table of the statistics of the last `run`."""
+    lines = [
+        '{:<40} {:>6} {:>6} {:>12} {:>10}'.format('pass', 'runs', 'hits',
+                                                  'time (ms)', 'node delta')
+    ]
+    for stats in self._stats:
+      lines.append('{:<40} {:>6} {:>6} {:>12.3f} {:>10}'.format(
+          stats.name, stats.runs, stats.hits, stats.total_time * 1000.0,
+          stats.node_delta))
+      for rule_name, rule_hits in stats.rule_hits:
+        lines.append('  {:<38} {:>6} {:>6}'.format(rule_name, '', rule_hits))
+    return '\n'.join(lines)
+
+
+def _is_tensor_or_tuple_type(type_spec):
+  """Returns whether `type_spec` is made only of tensors and named tuples."""
+  if type_spec is None:
+    return True
+  return all(
+      isinstance(t, computation_types.TensorType)
+      for t in anonymous_tuple.flatten(type_spec))
+
+
+def _is_fusable_graph(comp):
+  """Returns whether `comp` is a graph that the fusion passes can handle."""
+  return (isinstance(comp, computation_building_blocks.CompiledComputation) and
+          _is_tensor_or_tuple_type(comp.type_signature.parameter) and
+          _is_tensor_or_tuple_type(comp.type_signature.result))
+
+
+class _FuseCalledGraphs(
+    compiled_computation_transforms.CalledCompositionOfTensorFlowBlocks):
+  """Fuses a graph called on the result of another graph into one graph."""
+
+  def should_transform(self, comp):
+    return (super(_FuseCalledGraphs, self).should_transform(comp) and
+            _is_fusable_graph(comp.function) and
+            _is_fusable_graph(comp.argument.function) and
+            comp.function.type_signature.parameter ==
+            comp.argument.function.type_signature.result)
+
+
+class _FuseSelectionFromCalledGraph(
+    compiled_computation_transforms.SelectionFromCalledTensorFlowBlock):
+  """Pushes a selection from the result of a called graph into the graph."""
+
+  def should_transform(self, comp):
+    return (super(_FuseSelectionFromCalledGraph, self).should_transform(comp)
+            and _is_fusable_graph(comp.source.function))
+
+
+class _FuseTupleOfCalledGraphs(
+    compiled_computation_transforms.TupleCalledGraphs):
+  """Concatenates a nonempty tuple of called graphs into one called graph."""
+
+  def should_transform(self, comp):
+    return (super(_FuseTupleOfCalledGraphs, self).should_transform(comp) and
+            len(comp) > 1 and all(_is_fusable_graph(x.function) for x in comp))
+
+
+class _FuseLambdaWrappingGraph(
+    compiled_computation_transforms.LambdaWrappingGraph):
+  """Replaces a lambda that only calls a graph on its parameter by the graph."""
+
+  def should_transform(self, comp):
+    if not super(_FuseLambdaWrappingGraph, self).should_transform(comp):
+      return False
+    graph_type = comp.result.function.type_signature
+    return comp.parameter_type == graph_type.parameter
+
+
+def create_passes(optimization_level):
+  """Returns the list of `CompilerPass`es for `optimization_level`.
+
+  The optimization levels are cumulative, as follows:
+
+  * Level 0 performs no optimizations.
+
+  * Level 1 simplifies the structure of the computation by merging chained
+    blocks, replacing selections from tuples with the selected elements, and
+    removing mapped or applied identity functions.
+
+  * Level 2 additionally fuses TensorFlow computations that are called on the
+    results of other TensorFlow computations, selected from, or grouped into
+    tuples, into single TensorFlow computations, which reduces the number of
+    calls that the executors need to make, and graphs they need to import.
+    Only computations with tensor (or nested tuple of tensor) parameters and
+    results are fused.
+
+  Args:
+    optimization_level: An integer between 0 and `MAX_OPTIMIZATION_LEVEL`.
+
+  Returns:
+    A list of `CompilerPass`es.
+
+  Raises:
+    ValueError: If the `optimization_level` is out of range.
+  """
+  py_typecheck.check_type(optimization_level, int)
+  if optimization_level < 0 or optimization_level > MAX_OPTIMIZATION_LEVEL:
+    raise ValueError(
+        'The optimization level must be between 0 and {}, found {}.'.format(
+            MAX_OPTIMIZATION_LEVEL, optimization_level))
+  passes = []
+  if optimization_level >= 1:
+    passes.extend([
+        CompilerPass('merge_chained_blocks',
+                     transformations.merge_chained_blocks),
+        CompilerPass('replace_selection_from_tuple_with_element',
+                     transformations.replace_selection_from_tuple_with_element),
+        CompilerPass('remove_mapped_or_applied_identity',
+                     transformations.remove_mapped_or_applied_identity),
+    ])
+  if optimization_level >= 2:
+    # The fusion rules feed each other (e.g., fusing a tuple of called graphs
+    # exposes a selection from a called graph), so they are applied together
+    # in a single sweep, rather than as separate passes over the entire tree.
+    passes.append(
+        CompilerPass.from_transform_specs('fuse_tensorflow_blocks', [
+            _FuseSelectionFromCalledGraph(),
+            _FuseCalledGraphs(),
+            _FuseTupleOfCalledGraphs(),
+            _FuseLambdaWrappingGraph(),
+        ]))
+  return passes
@@ -0,0 +1,189 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for compiler_passes.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import absltest
+import tensorflow as tf
+
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.impl import compiler_passes
+from tensorflow_federated.python.core.impl import computation_building_blocks
+from tensorflow_federated.python.core.impl import context_stack_impl
+from tensorflow_federated.python.core.impl import tensorflow_serialization
+from tensorflow_federated.python.core.impl import tree_analysis
+
+
+def _create_compiled_computation(py_fn, arg_type):
+  proto, _ = tensorflow_serialization.serialize_py_fn_as_tf_computation(
+      py_fn, arg_type, context_stack_impl.context_stack)
+  return computation_building_blocks.CompiledComputation(proto)
+
+
+def _rename_reference(old_name, new_name):
+  """Returns a pass function that renames references named `old_name`."""
+
+  def _fn(comp):
+    if (isinstance(comp, computation_building_blocks.Reference) and
+        comp.name == old_name):
+      return computation_building_blocks.Reference(new_name,
+                                                   comp.type_signature), True
+    return comp, False
+
+  return _fn
+
+
+class PassManagerTest(absltest.TestCase):
+
+  def test_runs_passes_to_fixed_point(self):
+    manager = compiler_passes.PassManager([
+        compiler_passes.CompilerPass('b_to_c', _rename_reference('b', 'c')),
+        compiler_passes.CompilerPass('a_to_b', _rename_reference('a', 'b')),
+    ])
+    comp, modified = manager.run(
+        computation_building_blocks.Reference('a', tf.int32))
+    self.assertTrue(modified)
+    self.assertEqual(comp.name, 'c')
+    # 'a' -> 'b' in the first iteration, 'b' -> 'c' in the second, and no
+    # changes in the third.
+    self.assertEqual(manager.iterations, 3)
+    b_to_c_stats, a_to_b_stats = manager.stats
+    self.assertEqual(b_to_c_stats.name, 'b_to_c')
+    self.assertEqual(b_to_c_stats.runs, 3)
+    self.assertEqual(b_to_c_stats.hits, 1)
+    self.assertEqual(a_to_b_stats.runs, 3)
+    self.assertEqual(a_to_b_stats.hits, 1)
+    self.assertEqual(a_to_b_stats.node_delta, 0)
+    self.assertIn('a_to_b', manager.format_stats())
+
+  def test_resets_stats_in_each_run(self):
+    manager = compiler_passes.PassManager(
+        [compiler_passes.CompilerPass('a_to_b', _rename_reference('a', 'b'))])
+    manager.run(computation_building_blocks.Reference('a', tf.int32))
+    manager.run(computation_building_blocks.Reference('a', tf.int32))
+    a_to_b_stats, = manager.stats
+    self.assertEqual(a_to_b_stats.runs, 2)
+    self.assertEqual(a_to_b_stats.hits, 1)
+
+  def test_reports_unmodified_computation(self):
+    manager = compiler_passes.PassManager(
+        [compiler_passes.CompilerPass('a_to_b', _rename_reference('a', 'b'))])
+    comp = computation_building_blocks.Reference('x', tf.int32)
+    transformed_comp, modified = manager.run(comp)
+    self.assertFalse(modified)
+    self.assertIs(transformed_comp, comp)
+    self.assertEqual(manager.iterations, 1)
+
+  def test_stops_after_max_iterations(self):
+    manager = compiler_passes.PassManager([
+        compiler_passes.CompilerPass('a_to_b', _rename_reference('a', 'b')),
+        compiler_passes.CompilerPass('b_to_a', _rename_reference('b', 'a')),
+    ],
+                                          max_iterations=4)
+    _, modified = manager.run(
+        computation_building_blocks.Reference('a', tf.int32))
+    self.assertTrue(modified)
+    self.assertEqual(manager.iterations, 4)
+
+  def test_fails_with_nonpositive_max_iterations(self):
+    with self.assertRaises(ValueError):
+      compiler_passes.PassManager([], max_iterations=0)
+
+
+class CreatePassesTest(absltest.TestCase):
+
+  def test_level_zero_has_no_passes(self):
+    self.assertEmpty(compiler_passes.create_passes(0))
+
+  def test_levels_are_cumulative(self):
+    level_1_names = [p.name for p in compiler_passes.create_passes(1)]
+    level_2_names = [p.name for p in compiler_passes.create_passes(2)]
+    self.assertNotEmpty(level_1_names)
+    self.assertEqual(level_2_names[:len(level_1_names)], level_1_names)
+    self.assertGreater(len(level_2_names), len(level_1_names))
+
+  def test_fails_with_out_of_range_level(self):
+    with self.assertRaises(ValueError):
+      compiler_passes.create_passes(-1)
+    with self.assertRaises(ValueError):
+      compiler_passes.create_passes(compiler_passes.MAX_OPTIMIZATION_LEVEL + 1)
+
+  def test_fuses_chain_of_called_graphs(self):
+    add_one = _create_compiled_computation(lambda x: x + 1, tf.int32)
+    double = _create_compiled_computation(lambda x: x * 2, tf.int32)
+    arg = computation_building_blocks.Reference('arg', tf.int32)
+    comp = computation_building_blocks.Lambda(
+        'arg', tf.int32,
+        computation_building_blocks.Call(
+            double,
+            computation_building_blocks.Call(
+                add_one, computation_building_blocks.Call(double, arg))))
+    manager = compiler_passes.PassManager(compiler_passes.create_passes(2))
+    transformed_comp, modified = manager.run(comp)
+    self.assertTrue(modified)
+    # The lambda wrapping a single called graph reduces to the graph itself.
+    self.assertIsInstance(transformed_comp,
+                          computation_building_blocks.CompiledComputation)
+    self.assertEqual(
+        str(transformed_comp.type_signature), str(comp.type_signature))
+    fuse_pass = manager.passes[-1]
+    self.assertEqual(fuse_pass.name, 'fuse_tensorflow_blocks')
+    rule_hits = dict(fuse_pass.rule_hits)
+    self.assertEqual(rule_hits['_FuseCalledGraphs'], 2)
+    self.assertEqual(rule_hits['_FuseLambdaWrappingGraph'], 1)
+    self.assertEqual(dict(manager.stats[-1].rule_hits), rule_hits)
+    self.assertIn('_FuseCalledGraphs', manager.format_stats())
+    self.assertLess(sum(s.node_delta for s in manager.stats), 0)
+
+  def test_fuses_tuple_of_called_graphs(self):
+    add_one = _create_compiled_computation(lambda x: x + 1, tf.int32)
+    double = _create_compiled_computation(lambda x: x * 2, tf.int32)
+    arg = computation_building_blocks.Reference('arg', tf.int32)
+    comp = computation_building_blocks.Tuple([
+        ('a', computation_building_blocks.Call(add_one, arg)),
+        ('b', computation_building_blocks.Call(double, arg)),
+    ])
+    transformed_comp, modified = compiler_passes.PassManager(
+        compiler_passes.create_passes(2)).run(comp)
+    self.assertTrue(modified)
+    self.assertIsInstance(transformed_comp, computation_building_blocks.Call)
+    self.assertEqual(
+        tree_analysis.count_types(
+            transformed_comp, computation_building_blocks.CompiledComputation),
+        1)
+    self.assertEqual(
+        str(transformed_comp.type_signature), str(comp.type_signature))
+
+  def test_does_not_fuse_graphs_over_sequences(self):
+    reduce_sum = _create_compiled_computation(
+        lambda ds: ds.reduce(tf.constant(0, tf.int64), lambda x, y: x + y),
+        computation_types.SequenceType(tf.int64))
+    add_one = _create_compiled_computation(lambda x: x + 1, tf.int64)
+    comp = computation_building_blocks.Call(
+        add_one,
+        computation_building_blocks.Call(
+            reduce_sum,
+            computation_building_blocks.Reference(
+                'ds', computation_types.SequenceType(tf.int64))))
+    _, modified = compiler_passes.PassManager(
+        compiler_passes.create_passes(2)).run(comp)
+    self.assertFalse(modified)
+
+
+if __name__ == '__main__':
+  absltest.main()
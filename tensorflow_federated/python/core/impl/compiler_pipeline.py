@@ -21,6 +21,8 @@ from __future__ import print_function
 from tensorflow_federated.proto.v0 import computation_pb2 as pb
 from tensorflow_federated.python.common_libs import py_typecheck
 from tensorflow_federated.python.core.api import computation_base
+from tensorflow_federated.python.core.impl import compilation_cache
+from tensorflow_federated.python.core.impl import compiler_passes
 from tensorflow_federated.python.core.impl import computation_building_blocks
 from tensorflow_federated.python.core.impl import computation_impl
 from tensorflow_federated.python.core.impl import context_stack_base
@@ -36,16 +38,63 @@ class CompilerPipeline(object):
 
   1. Replacing occurrences of a subset of intrinsics with their definitions in
      terms of other intrinsics, as defined in `intrinsic_bodies.py`.
+
+  2. Replacing called lambdas with blocks.
+
+  3. Running the optimization passes for the configured optimization level (see
+     `compiler_passes.create_passes()`) to a fixed point. There are none by
+     default, and callers opt into them, e.g. into the fusion of TensorFlow
+     computations, by choosing a higher level. The time spent in each of the
+     passes, and the changes in the size of the computation, are logged for
+     each compiled computation.
+
+  The results are memoized in a `compilation_cache.CompilationCache`, keyed by
+  the content of the computation to compile, so each distinct computation only
+  goes through the pipeline once (or not at all in a warm process, if the cache
+  persists the results on disk).
   """
 
-  def __init__(self, context_stack):
+  def __init__(self, context_stack, cache=None, optimization_level=0):
     """Constructs this pipeline with the given dictionary of intrinsic bodies.
 
     Args:
       context_stack: The context stack to use.
+      cache: An optional instance of `compilation_cache.CompilationCache` to
+        memoize the compiled computations in. If `None` (the default), the
+        cache returned by `get_default_compilation_cache()` is used.
+      optimization_level: An integer between 0 (no optimizations, the
+        default, which preserves the structure of the compiled computations)
+        and `compiler_passes.MAX_OPTIMIZATION_LEVEL` (which includes the fusion
+        of TensorFlow computations), as defined in
+        `compiler_passes.create_passes()`.
+
+    Raises:
+      ValueError: If the `optimization_level` is out of range.
     """
     py_typecheck.check_type(context_stack, context_stack_base.ContextStack)
+    if cache is not None:
+      py_typecheck.check_type(cache, compilation_cache.CompilationCache)
     self._context_stack = context_stack
+    self._cache = cache
+    self._optimization_level = optimization_level
+    self._pass_manager = compiler_passes.PassManager(
+        compiler_passes.create_passes(optimization_level))
+
+  @property
+  def optimization_level(self):
+    return self._optimization_level
+
+  @property
+  def pass_manager(self):
+    """The `compiler_passes.PassManager` that runs the optimization passes."""
+    return self._pass_manager
+
+  @property
+  def cache(self):
+    """The `compilation_cache.CompilationCache` used by this pipeline."""
+    if self._cache is not None:
+      return self._cache
+    return compilation_cache.get_default_compilation_cache()
 
   def compile(self, computation_to_compile):
     """Compiles `computation_to_compile`.
@@ -68,6 +117,14 @@ class CompilerPipeline(object):
     # design of the backend API.
 
     py_typecheck.check_type(computation_proto, pb.Computation)
+    compiled_proto = self.cache.get_or_compile(
+        computation_proto,
+        self._compile_proto,
+        variant='O{}'.format(self._optimization_level))
+    return computation_impl.ComputationImpl(compiled_proto, self._context_stack)
+
+  def _compile_proto(self, computation_proto):
+    """Runs the pipeline on `computation_proto`, and returns the result."""
     comp = computation_building_blocks.ComputationBuildingBlock.from_proto(
         computation_proto)
 
@@ -79,11 +136,13 @@ class CompilerPipeline(object):
 
     # Replaces called lambdas with LET constructs with a single local symbol.
     comp, _ = transformations.replace_called_lambda_with_block(comp)
+
     # TODO(b/113123410): Add more transformations to simplify and optimize the
     # structure, e.g., such as:
     # * removing unnecessary lambdas,
     # * flatteting the structure,
-    # * merging TensorFlow blocks where appropriate,
     # * ...and so on.
+    if self._pass_manager.passes:
+      comp, _ = self._pass_manager.run(comp)
 
-    return computation_impl.ComputationImpl(comp.proto, self._context_stack)
+    return comp.proto
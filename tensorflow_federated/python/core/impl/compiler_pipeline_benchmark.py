@@ -0,0 +1,199 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark for compiling a federated averaging computation."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from six.moves import range
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import test
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.api import computations
+from tensorflow_federated.python.core.api import intrinsics
+from tensorflow_federated.python.core.api import placements
+from tensorflow_federated.python.core.impl import compilation_cache
+from tensorflow_federated.python.core.impl import compiler_pipeline
+from tensorflow_federated.python.core.impl import computation_building_blocks
+from tensorflow_federated.python.core.impl import computation_impl
+from tensorflow_federated.python.core.impl import context_stack_impl
+
+NUM_ITERS = 10
+
+# pylint: disable=protected-access
+
+
+def build_federated_averaging_computation():
+  """Returns a computation with the structure of a federated averaging round."""
+  model_type = computation_types.NamedTupleType([
+      ('weights', computation_types.TensorType(tf.float32, [784, 10])),
+      ('bias', computation_types.TensorType(tf.float32, [10]))
+  ])
+  batch_type = computation_types.NamedTupleType([
+      ('x', computation_types.TensorType(tf.float32, [None, 784])),
+      ('y', computation_types.TensorType(tf.int32, [None]))
+  ])
+  local_data_type = computation_types.SequenceType(batch_type)
+
+  @computations.tf_computation(model_type, batch_type, tf.float32)
+  def batch_train(model, batch, learning_rate):
+    predicted_y = tf.nn.softmax(tf.matmul(batch.x, model.weights) + model.bias)
+    error = predicted_y - tf.one_hot(batch.y, 10)
+    return collections.OrderedDict([
+        ('weights', model.weights -
+         learning_rate * tf.matmul(batch.x, error, transpose_a=True)),
+        ('bias', model.bias - learning_rate * tf.reduce_sum(error, axis=0)),
+    ])
+
+  @computations.federated_computation(model_type, tf.float32,
+                                      local_data_type)
+  def local_train(initial_model, learning_rate, all_batches):
+
+    @computations.federated_computation(model_type, batch_type)
+    def batch_fn(model, batch):
+      return batch_train(model, batch, learning_rate)
+
+    return intrinsics.sequence_reduce(all_batches, initial_model, batch_fn)
+
+  @computations.federated_computation(
+      computation_types.FederatedType(model_type, placements.SERVER),
+      computation_types.FederatedType(tf.float32, placements.SERVER),
+      computation_types.FederatedType(local_data_type, placements.CLIENTS))
+  def federated_train(model, learning_rate, data):
+    return intrinsics.federated_mean(
+        intrinsics.federated_map(local_train, [
+            intrinsics.federated_broadcast(model),
+            intrinsics.federated_broadcast(learning_rate), data
+        ]))
+
+  return federated_train
+
+
+def _get_building_blocks(comp):
+  """Returns the building blocks in `comp`, parents before their children."""
+  result = []
+  stack = [comp]
+  while stack:
+    comp = stack.pop()
+    result.append(comp)
+    stack.extend(reversed(comp._children()))
+  return result
+
+
+def _clear_memoized_protos(comps):
+  for comp in comps:
+    comp._cached_proto = None
+    comp._cached_type_proto = None
+
+
+class CompilerPipelineBenchmark(tf.test.Benchmark):
+  """Measures the time spent compiling and serializing computations."""
+
+  def _report(self, name, times):
+    self.report_benchmark(
+        name=name,
+        wall_time=np.mean(times),
+        iters=len(times),
+        extras={'std_dev': np.std(times)})
+
+  def benchmark_compile_federated_averaging(self):
+    comp = build_federated_averaging_computation()
+    cache_dir = tempfile.mkdtemp()
+    cold_times = []
+    memory_times = []
+    disk_times = []
+    for _ in range(NUM_ITERS):
+      shutil.rmtree(cache_dir)
+      cache = compilation_cache.CompilationCache(cache_dir=cache_dir)
+      pipeline = compiler_pipeline.CompilerPipeline(
+          context_stack_impl.context_stack, cache=cache)
+      start = time.time()
+      pipeline.compile(comp)
+      cold_times.append(time.time() - start)
+      start = time.time()
+      pipeline.compile(comp)
+      memory_times.append(time.time() - start)
+      # A new cache on the same directory simulates a warm process start.
+      pipeline = compiler_pipeline.CompilerPipeline(
+          context_stack_impl.context_stack,
+          cache=compilation_cache.CompilationCache(cache_dir=cache_dir))
+      start = time.time()
+      pipeline.compile(comp)
+      disk_times.append(time.time() - start)
+    shutil.rmtree(cache_dir)
+    self._report('Compile time, cold, federated averaging', cold_times)
+    self._report('Compile time, cached in memory, federated averaging',
+                 memory_times)
+    self._report('Compile time, cached on disk, federated averaging',
+                 disk_times)
+
+  def benchmark_serialize_federated_averaging(self):
+    """Compares serializing every subtree with and without memoization.
+
+    The compiler serializes building blocks at every level of the tree, e.g.,
+    to check or cache them. Building blocks used to re-serialize their entire
+    subtree on every access to `proto`, which is emulated by clearing the
+    memoized protos of the subtree before each access.
+    """
+    comp_proto = computation_impl.ComputationImpl.get_proto(
+        build_federated_averaging_computation())
+    uncached_times = []
+    memoized_times = []
+    hash_times = []
+    for _ in range(NUM_ITERS):
+      building_block = (
+          computation_building_blocks.ComputationBuildingBlock.from_proto(
+              comp_proto))
+      subtrees = [(comp, _get_building_blocks(comp))
+                  for comp in _get_building_blocks(building_block)]
+      elapsed = 0.0
+      for comp, subtree in subtrees:
+        _clear_memoized_protos(subtree)
+        start = time.time()
+        _ = comp.proto
+        elapsed += time.time() - start
+      uncached_times.append(elapsed)
+
+      building_block = (
+          computation_building_blocks.ComputationBuildingBlock.from_proto(
+              comp_proto))
+      comps = _get_building_blocks(building_block)
+      start = time.time()
+      for comp in comps:
+        _ = comp.proto
+      memoized_times.append(time.time() - start)
+
+      start = time.time()
+      _ = building_block.structural_hash
+      hash_times.append(time.time() - start)
+    self._report(
+        'Serialization time of every subtree, uncached, federated averaging',
+        uncached_times)
+    self._report(
+        'Serialization time of every subtree, memoized, federated averaging',
+        memoized_times)
+    self._report('Structural hash time, federated averaging', hash_times)
+
+
+if __name__ == '__main__':
+  test.main()
@@ -25,12 +25,23 @@ from tensorflow_federated.python.core.api import computation_types
 from tensorflow_federated.python.core.api import computations
 from tensorflow_federated.python.core.api import intrinsics
 from tensorflow_federated.python.core.api import placements
+from tensorflow_federated.python.core.impl import compilation_cache
+from tensorflow_federated.python.core.impl import compiler_passes
 from tensorflow_federated.python.core.impl import compiler_pipeline
 from tensorflow_federated.python.core.impl import computation_building_blocks
 from tensorflow_federated.python.core.impl import computation_impl
 from tensorflow_federated.python.core.impl import context_stack_impl
 from tensorflow_federated.python.core.impl import intrinsic_defs
 from tensorflow_federated.python.core.impl import transformation_utils
+from tensorflow_federated.python.core.impl import tree_analysis
+
+
+def _count_compiled_computations_and_calls(comp):
+  return tree_analysis.count_types(
+      computation_building_blocks.ComputationBuildingBlock.from_proto(
+          computation_impl.ComputationImpl.get_proto(comp)),
+      (computation_building_blocks.CompiledComputation,
+       computation_building_blocks.Call))
 
 
 class CompilerPipelineTest(absltest.TestCase):
@@ -67,6 +78,98 @@ class CompilerPipelineTest(absltest.TestCase):
 
     # TODO(b/113123410): Expand the test with more structural invariants.
 
+  def test_compile_computation_is_cached(self):
+
+    @computations.federated_computation(
+        computation_types.FederatedType(tf.int32, placements.CLIENTS))
+    def foo(x):
+      return intrinsics.federated_sum(x)
+
+    cache = compilation_cache.CompilationCache()
+    pipeline = compiler_pipeline.CompilerPipeline(
+        context_stack_impl.context_stack, cache=cache)
+    self.assertIs(pipeline.cache, cache)
+    first = pipeline.compile(foo)
+    second = pipeline.compile(foo)
+    self.assertEqual(cache.misses, 1)
+    self.assertEqual(cache.hits, 1)
+    self.assertEqual(
+        computation_impl.ComputationImpl.get_proto(first),
+        computation_impl.ComputationImpl.get_proto(second))
+
+  def test_compile_computation_with_optimizations(self):
+
+    @computations.tf_computation(tf.int32)
+    def add_one(x):
+      return x + 1
+
+    @computations.federated_computation(
+        computation_types.FederatedType(tf.int32, placements.CLIENTS))
+    def foo(x):
+      return intrinsics.federated_map(add_one,
+                                      intrinsics.federated_map(add_one, x))
+
+    cache = compilation_cache.CompilationCache()
+    unoptimized = compiler_pipeline.CompilerPipeline(
+        context_stack_impl.context_stack, cache=cache,
+        optimization_level=0).compile(foo)
+    pipeline = compiler_pipeline.CompilerPipeline(
+        context_stack_impl.context_stack, cache=cache, optimization_level=2)
+    optimized = pipeline.compile(foo)
+    # The two optimization levels are cached separately.
+    self.assertEqual(cache.misses, 2)
+    self.assertEqual(str(optimized.type_signature),
+                     str(unoptimized.type_signature))
+    self.assertTrue(any(s.runs for s in pipeline.pass_manager.stats))
+    # The two graphs mapped in sequence are fused into one.
+    self.assertLess(
+        _count_compiled_computations_and_calls(optimized),
+        _count_compiled_computations_and_calls(unoptimized))
+
+  def test_compile_computation_does_not_optimize_by_default(self):
+    pipeline = compiler_pipeline.CompilerPipeline(
+        context_stack_impl.context_stack)
+    self.assertEqual(pipeline.optimization_level, 0)
+    self.assertEmpty(pipeline.pass_manager.stats)
+
+  def test_compile_computation_resets_pass_stats(self):
+
+    @computations.tf_computation(tf.int32)
+    def add_one(x):
+      return x + 1
+
+    @computations.federated_computation(
+        computation_types.FederatedType(tf.int32, placements.CLIENTS))
+    def foo(x):
+      return intrinsics.federated_map(add_one, x)
+
+    @computations.federated_computation(
+        computation_types.FederatedType(tf.int32, placements.CLIENTS))
+    def bar(x):
+      return intrinsics.federated_map(add_one,
+                                      intrinsics.federated_map(add_one, x))
+
+    def _compile_and_get_stats(pipeline, comp):
+      pipeline.compile(comp)
+      return [(s.runs, s.hits, s.node_delta, s.rule_hits)
+              for s in pipeline.pass_manager.stats]
+
+    def _make_pipeline():
+      return compiler_pipeline.CompilerPipeline(
+          context_stack_impl.context_stack,
+          cache=compilation_cache.CompilationCache(),
+          optimization_level=compiler_passes.MAX_OPTIMIZATION_LEVEL)
+
+    expected_stats = _compile_and_get_stats(_make_pipeline(), bar)
+    pipeline = _make_pipeline()
+    _compile_and_get_stats(pipeline, foo)
+    self.assertEqual(_compile_and_get_stats(pipeline, bar), expected_stats)
+
+  def test_constructor_fails_with_invalid_optimization_level(self):
+    with self.assertRaises(ValueError):
+      compiler_pipeline.CompilerPipeline(
+          context_stack_impl.context_stack, optimization_level=-1)
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -20,6 +20,7 @@ from __future__ import print_function
 
 import abc
 import enum  # pylint: disable=g-bad-import-order
+import hashlib
 import zlib
 
 import six
@@ -44,6 +45,68 @@ def _check_computation_oneof(computation_proto, expected_computation_oneof):
         expected_computation_oneof, computation_oneof))
 
 
+def _get_child_protos(computation_proto):
+  """Returns the list of computations that `computation_proto` is made of."""
+  computation_oneof = computation_proto.WhichOneof('computation')
+  if computation_oneof == 'selection':
+    return [computation_proto.selection.source]
+  elif computation_oneof == 'tuple':
+    return [e.value for e in computation_proto.tuple.element]
+  elif computation_oneof == 'call':
+    arg_proto = computation_proto.call.argument
+    if arg_proto.WhichOneof('computation') is not None:
+      return [computation_proto.call.function, arg_proto]
+    return [computation_proto.call.function]
+  elif computation_oneof == 'lambda':
+    return [getattr(computation_proto, 'lambda').result]
+  elif computation_oneof == 'block':
+    return [loc.value for loc in computation_proto.block.local
+           ] + [computation_proto.block.result]
+  else:
+    return []
+
+
+def _ignoring_children(deserializer):
+  """Adapts a deserializer of a computation that has no children."""
+
+  def _deserializer(computation_proto, children):
+    del children  # Unused.
+    return deserializer(computation_proto)
+
+  return _deserializer
+
+
+def _postorder_uncached(comp, cache_attr):
+  """Returns the building blocks in `comp` with `cache_attr` unset, postorder.
+
+  The building blocks are found with an explicit stack rather than Python
+  recursion. Subtrees whose root has `cache_attr` set are not descended into,
+  and building blocks shared by several parents are only returned once.
+
+  Args:
+    comp: The `ComputationBuildingBlock` to traverse.
+    cache_attr: The name of the attribute that holds the cached value, or
+      `None` if it has not been computed yet.
+
+  Returns:
+    A list of `ComputationBuildingBlock`s, each after all of its children.
+  """
+  result = []
+  visited_ids = set()
+  stack = [(comp, False)]
+  while stack:
+    comp, children_visited = stack.pop()
+    if children_visited:
+      result.append(comp)
+    elif (id(comp) not in visited_ids and
+          getattr(comp, cache_attr) is None):
+      visited_ids.add(id(comp))
+      stack.append((comp, True))
+      children = comp._children()  # pylint: disable=protected-access
+      stack.extend((child, False) for child in reversed(children))
+  return result
+
+
 @six.add_metaclass(abc.ABCMeta)
 class ComputationBuildingBlock(typed_object.TypedObject):
   """The abstract base class for abstractions in the TFF's internal language.
@@ -55,6 +118,11 @@ class ComputationBuildingBlock(typed_object.TypedObject):
   pipeline to mold into the needs of a particular execution backend. The only
   abstraction that does not have a dedicated Python equivalent is a section
   of TensorFlow code (it's represented by `tff.framework.CompiledComputation`).
+
+  Building blocks are immutable; transformations construct new building blocks
+  rather than modify existing ones. This allows the serialized form of each
+  building block (`proto`), and its `structural_hash`, to be computed at most
+  once and cached for the lifetime of the object.
   """
 
   _deserializer_dict = None  # Defined at the end of this file.
@@ -76,10 +144,33 @@ class ComputationBuildingBlock(typed_object.TypedObject):
       ValueError: if deserialization failed due to the argument being invalid.
     """
     py_typecheck.check_type(computation_proto, pb.Computation)
+    # The computation is deserialized bottom-up with an explicit stack rather
+    # than recursively, so that deep computations do not exceed the recursion
+    # limit. Each entry on the stack holds a computation, and the number of its
+    # children if these have already been deserialized (onto `results`), or
+    # `None` otherwise.
+    stack = [(computation_proto, None)]
+    results = []
+    while stack:
+      proto, num_children = stack.pop()
+      if num_children is None:
+        child_protos = _get_child_protos(proto)
+        stack.append((proto, len(child_protos)))
+        stack.extend((child, None) for child in reversed(child_protos))
+        continue
+      first_child = len(results) - num_children
+      children = results[first_child:]
+      del results[first_child:]
+      results.append(cls._deserialize_with_children(proto, children))
+    return results[0]
+
+  @classmethod
+  def _deserialize_with_children(cls, computation_proto, children):
+    """Deserializes `computation_proto`, given its deserialized `children`."""
     computation_oneof = computation_proto.WhichOneof('computation')
     deserializer = cls._deserializer_dict.get(computation_oneof)
     if deserializer is not None:
-      deserialized = deserializer(computation_proto)
+      deserialized = deserializer(computation_proto, children)
       type_spec = type_serialization.deserialize_type(computation_proto.type)
       if not type_utils.are_equivalent_types(deserialized.type_signature,
                                              type_spec):
@@ -103,6 +194,9 @@ class ComputationBuildingBlock(typed_object.TypedObject):
     type_signature = computation_types.to_type(type_spec)
     type_utils.check_well_formed(type_signature)
     self._type_signature = type_signature
+    self._cached_type_proto = None
+    self._cached_proto = None
+    self._cached_structural_hash = None
 
   @property
   def type_signature(self):
@@ -120,13 +214,94 @@ class ComputationBuildingBlock(typed_object.TypedObject):
     """Returns the structural string representation of this building block."""
     return _structural_representation(self)
 
-  @abc.abstractproperty
+  @property
   def proto(self):
-    """Returns a serialized form of this object as a pb.Computation instance."""
+    """Returns a serialized form of this object as a pb.Computation instance.
+
+    The returned instance is cached, and shared by all callers, so it must not
+    be modified. Only the building block on which `proto` is accessed caches
+    it, and its children are not serialized separately.
+    """
+    if self._cached_proto is None:
+      computation_proto = pb.Computation()
+      # The message is built top-down with an explicit stack, and the children
+      # are serialized directly into the fields of their parents, so that
+      # neither Python recursion nor copies of submessages are involved.
+      stack = [(self, computation_proto)]
+      while stack:
+        comp, target = stack.pop()
+        target.type.CopyFrom(comp._type_proto)
+        children = comp._fill_proto(target)
+        stack.extend(reversed(children))
+      self._cached_proto = computation_proto
+    return self._cached_proto
+
+  @property
+  def structural_hash(self):
+    """Returns a hex digest of the structure of this building block.
+
+    The digest is derived from the type signature, and from the content of this
+    building block and its children, so structurally identical building blocks
+    have the same digest (which is also stable across processes). It is
+    computed in time linear in the size of this building block alone, since
+    the digests of the children are cached.
+    """
+    if self._cached_structural_hash is None:
+      # As in `proto`, the digests of the children are computed first.
+      for comp in _postorder_uncached(self, '_cached_structural_hash'):
+        comp._cached_structural_hash = comp._compute_structural_hash()
+    return self._cached_structural_hash
+
+  def _compute_structural_hash(self):
+    """Returns `structural_hash`, assuming the children have theirs cached."""
+    hasher = hashlib.sha256()
+    components = [
+        type(self).__name__,
+        self._type_proto.SerializeToString(deterministic=True)
+    ] + self._structural_hash_components()
+    for component in components:
+      if isinstance(component, six.text_type):
+        component = component.encode('utf-8')
+      # Length prefixes make the encoding of the components unambiguous.
+      hasher.update(six.b('{}:'.format(len(component))))
+      hasher.update(component)
+    return hasher.hexdigest()
+
+  @property
+  def _type_proto(self):
+    """Returns the cached serialized form of the type signature."""
+    if self._cached_type_proto is None:
+      self._cached_type_proto = type_serialization.serialize_type(
+          self.type_signature)
+    return self._cached_type_proto
+
+  def _children(self):
+    """Returns the list of building blocks this building block is made of."""
+    return []
+
+  @abc.abstractmethod
+  def _fill_proto(self, computation_proto):
+    """Fills in the serialized form of this object for `proto`.
+
+    The type of `computation_proto` is already set, and its children are left
+    for the caller to fill in.
+
+    Args:
+      computation_proto: An empty `pb.Computation`, other than its type.
+
+    Returns:
+      A list of pairs of the children of this building block, and the empty
+      `pb.Computation` submessages of `computation_proto` to fill in for them.
+    """
     raise NotImplementedError
 
-  # TODO(b/113112885): Add memoization after identifying a suitable externally
-  # available standard library that works in Python 2/3.
+  @abc.abstractmethod
+  def _structural_hash_components(self):
+    """Returns a list of strings and bytes to derive `structural_hash` from.
+
+    The type signature need not be included, as it is accounted for already.
+    """
+    raise NotImplementedError
 
   @abc.abstractmethod
   def __repr__(self):
@@ -179,11 +354,12 @@ class Reference(ComputationBuildingBlock):
     self._name = name
     self._context = context
 
-  @property
-  def proto(self):
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        reference=pb.Reference(name=self._name))
+  def _fill_proto(self, computation_proto):
+    computation_proto.reference.name = self._name
+    return []
+
+  def _structural_hash_components(self):
+    return [self._name]
 
   @property
   def name(self):
@@ -210,8 +386,11 @@ class Selection(ComputationBuildingBlock):
   @classmethod
   def from_proto(cls, computation_proto):
     _check_computation_oneof(computation_proto, 'selection')
-    selection = ComputationBuildingBlock.from_proto(
-        computation_proto.selection.source)
+    return ComputationBuildingBlock.from_proto(computation_proto)
+
+  @classmethod
+  def _from_proto_and_children(cls, computation_proto, children):
+    selection = children[0]
     selection_oneof = computation_proto.selection.WhichOneof('selection')
     if selection_oneof == 'name':
       return cls(selection, name=str(computation_proto.selection.name))
@@ -276,15 +455,23 @@ class Selection(ComputationBuildingBlock):
             'valid range 0..{} determined by the source type '
             'signature.'.format(index, str(len(elements) - 1)))
 
-  @property
-  def proto(self):
+  def _children(self):
+    return [self._source]
+
+  def _fill_proto(self, computation_proto):
+    selection = computation_proto.selection
+    if self._name is not None:
+      selection.name = self._name
+    else:
+      selection.index = self._index
+    return [(self._source, selection.source)]
+
+  def _structural_hash_components(self):
     if self._name is not None:
-      selection = pb.Selection(source=self._source.proto, name=self._name)
+      selection = 'name={}'.format(self._name)
     else:
-      selection = pb.Selection(source=self._source.proto, index=self._index)
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        selection=selection)
+      selection = 'index={}'.format(self._index)
+    return [self._source.structural_hash, selection]
 
   @property
   def source(self):
@@ -322,9 +509,12 @@ class Tuple(ComputationBuildingBlock, anonymous_tuple.AnonymousTuple):
   @classmethod
   def from_proto(cls, computation_proto):
     _check_computation_oneof(computation_proto, 'tuple')
-    return cls([(str(e.name) if e.name else None,
-                 ComputationBuildingBlock.from_proto(e.value))
-                for e in computation_proto.tuple.element])
+    return ComputationBuildingBlock.from_proto(computation_proto)
+
+  @classmethod
+  def _from_proto_and_children(cls, computation_proto, children):
+    return cls([(str(e.name) if e.name else None, v)
+                for e, v in zip(computation_proto.tuple.element, children)])
 
   def __init__(self, elements):
     """Constructs a tuple from the given list of elements.
@@ -363,18 +553,25 @@ class Tuple(ComputationBuildingBlock, anonymous_tuple.AnonymousTuple):
         ]))
     anonymous_tuple.AnonymousTuple.__init__(self, elements)
 
-  @property
-  def proto(self):
-    elements = []
+  def _children(self):
+    return [v for _, v in anonymous_tuple.to_elements(self)]
+
+  def _fill_proto(self, computation_proto):
+    # Empty tuples are set as well.
+    computation_proto.tuple.SetInParent()
+    children = []
     for k, v in anonymous_tuple.to_elements(self):
+      element = computation_proto.tuple.element.add()
       if k is not None:
-        element = pb.Tuple.Element(name=k, value=v.proto)
-      else:
-        element = pb.Tuple.Element(value=v.proto)
-      elements.append(element)
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        tuple=pb.Tuple(element=elements))
+        element.name = k
+      children.append((v, element.value))
+    return children
+
+  def _structural_hash_components(self):
+    components = []
+    for k, v in anonymous_tuple.to_elements(self):
+      components.extend([k if k is not None else '', v.structural_hash])
+    return components
 
   def __repr__(self):
     return 'Tuple([{}])'.format(', '.join(
@@ -398,13 +595,13 @@ class Call(ComputationBuildingBlock):
   @classmethod
   def from_proto(cls, computation_proto):
     _check_computation_oneof(computation_proto, 'call')
-    fn = ComputationBuildingBlock.from_proto(computation_proto.call.function)
-    arg_proto = computation_proto.call.argument
-    if arg_proto.WhichOneof('computation') is not None:
-      arg = ComputationBuildingBlock.from_proto(arg_proto)
-    else:
-      arg = None
-    return cls(fn, arg)
+    return ComputationBuildingBlock.from_proto(computation_proto)
+
+  @classmethod
+  def _from_proto_and_children(cls, computation_proto, children):
+    del computation_proto  # Unused.
+    arg = children[1] if len(children) > 1 else None
+    return cls(children[0], arg)
 
   def __init__(self, fn, arg=None):
     """Creates a call to 'fn' with argument 'arg'.
@@ -446,15 +643,23 @@ class Call(ComputationBuildingBlock):
     self._function = fn
     self._argument = arg
 
-  @property
-  def proto(self):
+  def _children(self):
     if self._argument is not None:
-      call = pb.Call(
-          function=self._function.proto, argument=self._argument.proto)
-    else:
-      call = pb.Call(function=self._function.proto)
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature), call=call)
+      return [self._function, self._argument]
+    return [self._function]
+
+  def _fill_proto(self, computation_proto):
+    call = computation_proto.call
+    children = [(self._function, call.function)]
+    if self._argument is not None:
+      children.append((self._argument, call.argument))
+    return children
+
+  def _structural_hash_components(self):
+    return [
+        self._function.structural_hash,
+        self._argument.structural_hash if self._argument is not None else ''
+    ]
 
   @property
   def function(self):
@@ -483,12 +688,15 @@ class Lambda(ComputationBuildingBlock):
   @classmethod
   def from_proto(cls, computation_proto):
     _check_computation_oneof(computation_proto, 'lambda')
+    return ComputationBuildingBlock.from_proto(computation_proto)
+
+  @classmethod
+  def _from_proto_and_children(cls, computation_proto, children):
     the_lambda = getattr(computation_proto, 'lambda')
     return cls(
         str(the_lambda.parameter_name),
         type_serialization.deserialize_type(
-            computation_proto.type.function.parameter),
-        ComputationBuildingBlock.from_proto(the_lambda.result))
+            computation_proto.type.function.parameter), children[0])
 
   def __init__(self, parameter_name, parameter_type, result):
     """Creates a lambda expression.
@@ -517,16 +725,16 @@ class Lambda(ComputationBuildingBlock):
     self._parameter_type = parameter_type
     self._result = result
 
-  @property
-  def proto(self):
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        **{
-            'lambda':
-                pb.Lambda(
-                    parameter_name=self._parameter_name,
-                    result=self._result.proto)
-        })
+  def _children(self):
+    return [self._result]
+
+  def _fill_proto(self, computation_proto):
+    lambda_proto = getattr(computation_proto, 'lambda')
+    lambda_proto.parameter_name = self._parameter_name
+    return [(self._result, lambda_proto.result)]
+
+  def _structural_hash_components(self):
+    return [self._parameter_name, self._result.structural_hash]
 
   @property
   def parameter_name(self):
@@ -590,10 +798,13 @@ class Block(ComputationBuildingBlock):
   @classmethod
   def from_proto(cls, computation_proto):
     _check_computation_oneof(computation_proto, 'block')
-    return cls([(str(loc.name), ComputationBuildingBlock.from_proto(loc.value))
-                for loc in computation_proto.block.local],
-               ComputationBuildingBlock.from_proto(
-                   computation_proto.block.result))
+    return ComputationBuildingBlock.from_proto(computation_proto)
+
+  @classmethod
+  def _from_proto_and_children(cls, computation_proto, children):
+    return cls([(str(loc.name), v)
+                for loc, v in zip(computation_proto.block.local, children)],
+               children[-1])
 
   def __init__(self, local_symbols, result):
     """Creates a block of TFF code.
@@ -627,18 +838,25 @@ class Block(ComputationBuildingBlock):
     self._locals = updated_locals
     self._result = result
 
-  @property
-  def proto(self):
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        block=pb.Block(
-            **{
-                'local': [
-                    pb.Block.Local(name=k, value=v.proto)
-                    for k, v in self._locals
-                ],
-                'result': self._result.proto
-            }))
+  def _children(self):
+    return [v for _, v in self._locals] + [self._result]
+
+  def _fill_proto(self, computation_proto):
+    block = computation_proto.block
+    children = []
+    for k, v in self._locals:
+      local = block.local.add()
+      local.name = k
+      children.append((v, local.value))
+    children.append((self._result, block.result))
+    return children
+
+  def _structural_hash_components(self):
+    components = []
+    for k, v in self._locals:
+      components.extend([k, v.structural_hash])
+    components.append(self._result.structural_hash)
+    return components
 
   @property
   def locals(self):
@@ -699,11 +917,12 @@ class Intrinsic(ComputationBuildingBlock):
     super(Intrinsic, self).__init__(type_spec)
     self._uri = uri
 
-  @property
-  def proto(self):
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        intrinsic=pb.Intrinsic(uri=self._uri))
+  def _fill_proto(self, computation_proto):
+    computation_proto.intrinsic.uri = self._uri
+    return []
+
+  def _structural_hash_components(self):
+    return [self._uri]
 
   @property
   def uri(self):
@@ -749,11 +968,12 @@ class Data(ComputationBuildingBlock):
     super(Data, self).__init__(type_spec)
     self._uri = uri
 
-  @property
-  def proto(self):
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        data=pb.Data(uri=self._uri))
+  def _fill_proto(self, computation_proto):
+    computation_proto.data.uri = self._uri
+    return []
+
+  def _structural_hash_components(self):
+    return [self._uri]
 
   @property
   def uri(self):
@@ -797,9 +1017,12 @@ class CompiledComputation(ComputationBuildingBlock):
       self._name = '{:x}'.format(
           zlib.adler32(six.b(repr(self._proto))) & 0xFFFFFFFF)
 
-  @property
-  def proto(self):
-    return self._proto
+  def _fill_proto(self, computation_proto):
+    computation_proto.CopyFrom(self._proto)
+    return []
+
+  def _structural_hash_components(self):
+    return [self._proto.SerializeToString(deterministic=True)]
 
   @property
   def name(self):
@@ -839,11 +1062,12 @@ class Placement(ComputationBuildingBlock):
     super(Placement, self).__init__(computation_types.PlacementType())
     self._literal = literal
 
-  @property
-  def proto(self):
-    return pb.Computation(
-        type=type_serialization.serialize_type(self.type_signature),
-        placement=pb.Placement(uri=self._literal.uri))
+  def _fill_proto(self, computation_proto):
+    computation_proto.placement.uri = self._literal.uri
+    return []
+
+  def _structural_hash_components(self):
+    return [self._literal.uri]
 
   @property
   def uri(self):
@@ -1345,15 +1569,15 @@ def _structural_representation(comp):
 
 # pylint: disable=protected-access
 ComputationBuildingBlock._deserializer_dict = {
-    'reference': Reference.from_proto,
-    'selection': Selection.from_proto,
-    'tuple': Tuple.from_proto,
-    'call': Call.from_proto,
-    'lambda': Lambda.from_proto,
-    'block': Block.from_proto,
-    'intrinsic': Intrinsic.from_proto,
-    'data': Data.from_proto,
-    'placement': Placement.from_proto,
-    'tensorflow': CompiledComputation,
+    'reference': _ignoring_children(Reference.from_proto),
+    'selection': Selection._from_proto_and_children,
+    'tuple': Tuple._from_proto_and_children,
+    'call': Call._from_proto_and_children,
+    'lambda': Lambda._from_proto_and_children,
+    'block': Block._from_proto_and_children,
+    'intrinsic': _ignoring_children(Intrinsic.from_proto),
+    'data': _ignoring_children(Data.from_proto),
+    'placement': _ignoring_children(Placement.from_proto),
+    'tensorflow': _ignoring_children(CompiledComputation),
 }
 # pylint: enable=protected-access
@@ -343,6 +343,51 @@ class ComputationBuildingBlocksTest(absltest.TestCase):
     self.assertEqual(target.compact_representation(),
                      target2.compact_representation())
     self.assertEqual(str(proto), str(proto2))
+    self.assertEqual(target.structural_hash, target2.structural_hash)
+
+  def test_proto_is_cached(self):
+    x = computation_building_blocks.Reference('x', tf.int32)
+    y = computation_building_blocks.Lambda('x', tf.int32, x)
+    self.assertIs(y.proto, y.proto)
+    self.assertIs(y.structural_hash, y.structural_hash)
+
+  def test_proto_is_only_cached_on_root(self):
+    x = computation_building_blocks.Reference('x', tf.int32)
+    y = computation_building_blocks.Lambda('x', tf.int32, x)
+    self.assertEqual(y.proto.WhichOneof('computation'), 'lambda')
+    self.assertIsNone(x._cached_proto)  # pylint: disable=protected-access
+
+  def test_proto_of_empty_tuple(self):
+    x = computation_building_blocks.Tuple([])
+    self.assertEqual(x.proto.WhichOneof('computation'), 'tuple')
+
+  def test_proto_round_trip_of_deep_computation(self):
+    data = computation_building_blocks.Data('a', tf.int32)
+    comp = computation_test_utils.create_deep_computation(data, 10000)
+    deserialized = (
+        computation_building_blocks.ComputationBuildingBlock.from_proto(
+            comp.proto))
+    self.assertEqual(deserialized.structural_hash, comp.structural_hash)
+
+  def test_structural_hash_of_identical_structures_is_equal(self):
+
+    def _make_comp(param_name, index):
+      ref = computation_building_blocks.Reference(param_name,
+                                                  [tf.int32, tf.bool])
+      sel = computation_building_blocks.Selection(ref, index=index)
+      return computation_building_blocks.Lambda(
+          param_name, ref.type_signature,
+          computation_building_blocks.Tuple([('a', sel), (None, ref)]))
+
+    x = _make_comp('x', 0)
+    self.assertEqual(x.structural_hash, _make_comp('x', 0).structural_hash)
+    self.assertNotEqual(x.structural_hash, _make_comp('y', 0).structural_hash)
+    self.assertNotEqual(x.structural_hash, _make_comp('x', 1).structural_hash)
+
+  def test_structural_hash_depends_on_type(self):
+    x = computation_building_blocks.Reference('x', tf.int32)
+    y = computation_building_blocks.Reference('x', tf.float32)
+    self.assertNotEqual(x.structural_hash, y.structural_hash)
 
 
 class RepresentationTest(absltest.TestCase):
@@ -290,3 +290,53 @@ def create_nested_syntax_tree():
   called_lambda = computation_building_blocks.Call(dummy_lambda, dummy_arg)
 
   return called_lambda
+
+
+def create_deep_computation(comp, depth):
+  r"""Returns `comp` nested in `depth` identity blocks and identity calls.
+
+  The blocks and calls alternate, starting with a block around `comp`:
+
+            ...
+             |
+            Call
+           /    \
+  Lambda(x)      Block
+  |             /     \
+  Ref(x)  [x=comp]     Ref(x)
+
+  Computations like this one, whose depth grows linearly with their size, are
+  useful for testing that traversals do not exceed the recursion limit.
+
+  Args:
+    comp: The computation to nest.
+    depth: The number of blocks and calls to nest `comp` in.
+  """
+  for level in range(depth):
+    if level % 2:
+      fn = create_identity_function('x', comp.type_signature)
+      comp = computation_building_blocks.Call(fn, comp)
+    else:
+      comp = create_identity_block('x', comp)
+  return comp
+
+
+def create_block_with_chained_locals(comp, num_locals):
+  r"""Returns a block with `num_locals` locals, each referring to the previous.
+
+  Block
+  |
+  [x0=comp, x1=Ref(x0), x2=Ref(x1), ...], Ref(x{num_locals - 1})
+
+  Args:
+    comp: The computation to bind to the first local.
+    num_locals: The number of locals, at least 1.
+  """
+  local_symbols = [('x0', comp)]
+  for index in range(1, num_locals):
+    local_symbols.append(('x{}'.format(index),
+                          computation_building_blocks.Reference(
+                              'x{}'.format(index - 1), comp.type_signature)))
+  result = computation_building_blocks.Reference(
+      'x{}'.format(num_locals - 1), comp.type_signature)
+  return computation_building_blocks.Block(local_symbols, result)
@@ -16,49 +16,145 @@
 
 import asyncio
 import functools
+import os
 import threading
 
 from tensorflow_federated.python.common_libs import py_typecheck
 from tensorflow_federated.python.core.impl import executor_base
 
 
+def _run_loop(loop):
+  loop.run_forever()
+  loop.close()
+
+
+class EventLoopPool(object):
+  """A bounded pool of event loops, each running in its own worker thread.
+
+  A single pool can be shared by any number of instances of
+  `ConcurrentExecutor`, which dispatch the coroutines they are delegated to the
+  event loops in the pool in a round-robin fashion. The number of threads thus
+  stays constant regardless of how many executors are constructed (e.g., one
+  per client), while the work of the executors can still proceed in parallel
+  on up to `max_workers` threads.
+
+  NOTE: This component is only available in Python 3.
+  """
+
+  def __init__(self, max_workers=None):
+    """Creates a pool of event loops, and starts the worker threads.
+
+    Args:
+      max_workers: The number of worker threads (and event loops) in the pool,
+        which bounds the number of coroutines that can be executing at the same
+        time. Defaults to the number of processors on the machine.
+
+    Raises:
+      TypeError: If `max_workers` is not an integer.
+      ValueError: If `max_workers` is not positive.
+    """
+    if max_workers is None:
+      max_workers = os.cpu_count() or 1
+    py_typecheck.check_type(max_workers, int)
+    if max_workers < 1:
+      raise ValueError(
+          'The number of workers must be positive, found {}.'.format(
+              str(max_workers)))
+    self._lock = threading.Lock()
+    self._next_index = 0
+    self._event_loops = []
+    self._threads = []
+    for _ in range(max_workers):
+      loop = asyncio.new_event_loop()
+      thread = threading.Thread(
+          target=functools.partial(_run_loop, loop), daemon=True)
+      thread.start()
+      self._event_loops.append(loop)
+      self._threads.append(thread)
+
+  def __del__(self):
+    # The constructor may have failed before creating the lock.
+    if getattr(self, '_lock', None) is not None:
+      self.shutdown()
+
+  @property
+  def max_workers(self):
+    return len(self._threads)
+
+  def run_coroutine(self, coro):
+    """Schedules `coro` on one of the event loops in this pool.
+
+    Args:
+      coro: The coroutine to run.
+
+    Returns:
+      An `asyncio.Future` bound to the caller's event loop that will hold the
+      result of the coroutine.
+
+    Raises:
+      RuntimeError: If the pool has already been shut down.
+    """
+    with self._lock:
+      if not self._event_loops:
+        raise RuntimeError('The event loop pool has been shut down.')
+      loop = self._event_loops[self._next_index]
+      self._next_index = (self._next_index + 1) % len(self._event_loops)
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+  def shutdown(self):
+    """Stops all event loops in this pool, and waits for the threads to exit."""
+    with self._lock:
+      event_loops = self._event_loops
+      threads = self._threads
+      self._event_loops = []
+      self._threads = []
+    for loop in event_loops:
+      loop.call_soon_threadsafe(loop.stop)
+    current_thread = threading.current_thread()
+    for thread in threads:
+      if thread is not current_thread:
+        thread.join()
+
+
 class ConcurrentExecutor(executor_base.Executor):
   """The concurrent executor delegates work to a separate thread.
 
   This executor only handles threading. It delegates all execution to an
   underlying pool of target executors.
 
+  By default, each instance of this executor runs the delegated work in its own
+  dedicated thread. Multiple instances can instead share an `EventLoopPool` to
+  bound the total number of threads.
+
   NOTE: This component is only available in Python 3.
   """
 
-  # TODO(b/134543154): Upgrade this to a threadpool with multiple workers,
-  # possibly one that could be shared among multiple of these executors.
-
-  def __init__(self, target_executor):
+  def __init__(self, target_executor, event_loop_pool=None):
     """Creates a concurrent executor backed by a target executor.
 
     Args:
       target_executor: The executor that does all the work.
+      event_loop_pool: An optional instance of `EventLoopPool` to run the work
+        on, which may be shared with other instances of this executor. If not
+        specified, this executor creates (and owns) a single-threaded pool.
     """
     py_typecheck.check_type(target_executor, executor_base.Executor)
     self._target_executor = target_executor
-    self._event_loop = asyncio.new_event_loop()
-
-    def run_loop(loop):
-      loop.run_forever()
-      loop.close()
-
-    self._thread = threading.Thread(
-        target=functools.partial(run_loop, self._event_loop))
-    self._thread.start()
+    if event_loop_pool is not None:
+      py_typecheck.check_type(event_loop_pool, EventLoopPool)
+      self._event_loop_pool = event_loop_pool
+      self._owns_event_loop_pool = False
+    else:
+      self._event_loop_pool = EventLoopPool(max_workers=1)
+      self._owns_event_loop_pool = True
 
   def __del__(self):
-    self._event_loop.call_soon_threadsafe(self._event_loop.stop)
-    self._thread.join()
+    # The constructor may have failed before deciding on the pool.
+    if getattr(self, '_owns_event_loop_pool', False):
+      self._event_loop_pool.shutdown()
 
   def _delegate(self, coro):
-    return asyncio.wrap_future(
-        asyncio.run_coroutine_threadsafe(coro, self._event_loop))
+    return self._event_loop_pool.run_coroutine(coro)
 
   async def create_value(self, value, type_spec=None):
     return await self._delegate(
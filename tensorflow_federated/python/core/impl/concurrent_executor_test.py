@@ -16,6 +16,7 @@
 
 import asyncio
 import collections
+import threading
 import time
 
 from absl.testing import absltest
@@ -75,6 +76,89 @@ class ConcurrentExecutorTest(absltest.TestCase):
         break
     self.assertNotEqual(o1, o2)
 
+  def test_shared_event_loop_pool_bounds_thread_count(self):
+
+    @computations.tf_computation(tf.int32)
+    def add_one(x):
+      return tf.add(x, 1)
+
+    num_threads_before = threading.active_count()
+    pool = concurrent_executor.EventLoopPool(max_workers=2)
+    self.assertEqual(pool.max_workers, 2)
+    target_ex = eager_executor.EagerExecutor()
+    executors = [
+        concurrent_executor.ConcurrentExecutor(target_ex, pool)
+        for _ in range(50)
+    ]
+    self.assertLessEqual(threading.active_count(), num_threads_before + 2)
+
+    async def compute(ex, x):
+      return await ex.create_call(await ex.create_value(add_one), await
+                                  ex.create_value(x, tf.int32))
+
+    results = asyncio.get_event_loop().run_until_complete(
+        asyncio.gather(*[compute(ex, n) for n, ex in enumerate(executors)]))
+    self.assertEqual([r.internal_representation.numpy() for r in results],
+                     list(range(1, 51)))
+    del executors
+    pool.shutdown()
+    self.assertLessEqual(threading.active_count(), num_threads_before)
+
+  def test_event_loop_pool_runs_coroutines_concurrently(self):
+
+    class BlockingExecutor(executor_base.Executor):
+
+      def __init__(self):
+        self.barrier = threading.Barrier(3, timeout=10)
+
+      async def create_value(self, value, type_spec=None):
+        del type_spec
+        self.barrier.wait()
+        return value
+
+      async def create_call(self, comp, arg=None):
+        raise NotImplementedError
+
+      async def create_tuple(self, elements):
+        raise NotImplementedError
+
+      async def create_selection(self, source, index=None, name=None):
+        raise NotImplementedError
+
+    pool = concurrent_executor.EventLoopPool(max_workers=3)
+    ex = concurrent_executor.ConcurrentExecutor(BlockingExecutor(), pool)
+    results = asyncio.get_event_loop().run_until_complete(
+        asyncio.gather(*[ex.create_value(n) for n in range(3)]))
+    self.assertEqual(list(results), [0, 1, 2])
+    pool.shutdown()
+
+  def test_event_loop_pool_fails_after_shutdown(self):
+    pool = concurrent_executor.EventLoopPool(max_workers=1)
+    pool.shutdown()
+
+    async def noop():
+      return None
+
+    coro = noop()
+    with self.assertRaises(RuntimeError):
+      pool.run_coroutine(coro)
+    coro.close()
+
+  def test_event_loop_pool_fails_with_zero_workers(self):
+    with self.assertRaises(ValueError):
+      concurrent_executor.EventLoopPool(max_workers=0)
+
+  def test_deletes_partially_constructed_instances(self):
+    # As after a constructor that raised, e.g., on invalid arguments.
+    pool = concurrent_executor.EventLoopPool.__new__(
+        concurrent_executor.EventLoopPool)
+    pool.__del__()
+    executor = concurrent_executor.ConcurrentExecutor.__new__(
+        concurrent_executor.ConcurrentExecutor)
+    executor.__del__()
+    with self.assertRaises(TypeError):
+      concurrent_executor.ConcurrentExecutor(None)
+
   def test_with_eager_executor(self):
 
     @computations.tf_computation(tf.int32)
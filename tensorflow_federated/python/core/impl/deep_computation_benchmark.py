@@ -0,0 +1,128 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Stress benchmark for traversing very deep computations."""
+
+import asyncio
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import anonymous_tuple
+from tensorflow_federated.python.common_libs import test
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.api import computations
+from tensorflow_federated.python.core.impl import computation_building_blocks
+from tensorflow_federated.python.core.impl import computation_test_utils
+from tensorflow_federated.python.core.impl import eager_executor
+from tensorflow_federated.python.core.impl import lambda_executor
+from tensorflow_federated.python.core.impl import transformation_utils
+
+NUM_ITERS = 5
+
+# The largest depth is well beyond the default recursion limit of 1000.
+DEPTHS = [1000, 10000]
+
+
+def _create_deep_computation(depth):
+  data = computation_building_blocks.Data('a', tf.int32)
+  return computation_test_utils.create_deep_computation(data, depth)
+
+
+class DeepComputationBenchmark(tf.test.Benchmark):
+  """Measures the time spent traversing computations of increasing depth."""
+
+  def _report(self, name, times):
+    self.report_benchmark(
+        name=name,
+        wall_time=np.mean(times),
+        iters=len(times),
+        extras={'std_dev': np.std(times)})
+
+  def _benchmark(self, name, fn, depth):
+    times = []
+    for _ in range(NUM_ITERS):
+      comp = _create_deep_computation(depth)
+      start = time.time()
+      fn(comp)
+      times.append(time.time() - start)
+    self._report('{}, depth {}'.format(name, depth), times)
+
+  def benchmark_transform_postorder(self):
+    for depth in DEPTHS:
+      self._benchmark(
+          'transform_postorder',
+          lambda comp: transformation_utils.transform_postorder(
+              comp, lambda x: (x, False)), depth)
+
+  def benchmark_transform_postorder_with_symbol_bindings(self):
+    for depth in DEPTHS:
+      self._benchmark('transform_postorder_with_symbol_bindings',
+                      transformation_utils.get_count_of_references_to_variables,
+                      depth)
+
+  def benchmark_serialization(self):
+    for depth in DEPTHS:
+      self._benchmark('proto', lambda comp: comp.proto, depth)
+      self._benchmark('structural_hash', lambda comp: comp.structural_hash,
+                      depth)
+      self._benchmark(
+          'from_proto',
+          lambda comp: computation_building_blocks.ComputationBuildingBlock.
+          from_proto(comp.proto), depth)
+
+  def benchmark_lambda_executor(self):
+
+    @computations.tf_computation(tf.int32)
+    def add_one(x):
+      return x + 1
+
+    f_type = computation_types.FunctionType(tf.int32, tf.int32)
+    arg = computation_building_blocks.Reference(
+        'arg', computation_types.NamedTupleType([('f', f_type),
+                                                 ('x', tf.int32)]))
+    loop = asyncio.get_event_loop()
+
+    async def _evaluate(comp):
+      ex = lambda_executor.LambdaExecutor(eager_executor.EagerExecutor())
+      fn = await ex.create_value(comp.proto, comp.type_signature)
+      fn_arg = await ex.create_tuple(
+          anonymous_tuple.AnonymousTuple([
+              ('f', await ex.create_value(add_one)),
+              ('x', await ex.create_value(10, tf.int32)),
+          ]))
+      return await (await ex.create_call(fn, fn_arg)).compute()
+
+    for num_locals in DEPTHS:
+      comp = computation_building_blocks.Lambda(
+          arg.name, arg.type_signature,
+          computation_building_blocks.Call(
+              computation_building_blocks.Selection(arg, name='f'),
+              computation_test_utils.create_block_with_chained_locals(
+                  computation_building_blocks.Selection(arg, name='x'),
+                  num_locals)))
+      times = []
+      for _ in range(NUM_ITERS):
+        start = time.time()
+        loop.run_until_complete(_evaluate(comp))
+        times.append(time.time() - start)
+      self._report(
+          'LambdaExecutor, block with {} chained locals'.format(num_locals),
+          times)
+
+
+if __name__ == '__main__':
+  tf.compat.v1.enable_v2_behavior()
+  test.main()
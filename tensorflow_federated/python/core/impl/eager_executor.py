@@ -14,6 +14,10 @@
 # limitations under the License.
 """A simple executor that operates synchronously in eager TensorFlow mode."""
 
+import collections
+import hashlib
+import threading
+
 import numpy as np
 import tensorflow as tf
 
@@ -164,6 +168,108 @@ def embed_tensorflow_computation(comp, type_spec=None, device=None):
     return lambda: fn_to_return(None)
 
 
+class EmbeddedComputationCache(object):
+  """A bounded LRU cache of TensorFlow computations embedded in eager mode.
+
+  Embedding a computation with `embed_tensorflow_computation()` requires that
+  the serialized `GraphDef` be unpacked, imported, and wrapped into a function,
+  which is expensive relative to invoking the resulting function. Since the
+  same computation (e.g., the client update logic) tends to be embedded once
+  per client per round, the embedded functions are cached here, keyed by the
+  fingerprint of the serialized computation, its type, and the target device.
+
+  This class is thread-safe. A single instance is shared by default among all
+  instances of `EagerExecutor` in the process (see `get_computation_cache()`).
+  """
+
+  def __init__(self, max_size=100):
+    """Creates a new cache.
+
+    Args:
+      max_size: The maximum number of embedded computations to hold before
+        evicting the least recently used ones.
+
+    Raises:
+      ValueError: If `max_size` is not positive.
+    """
+    py_typecheck.check_type(max_size, int)
+    if max_size < 1:
+      raise ValueError('The cache size must be positive, found {}.'.format(
+          str(max_size)))
+    self._max_size = max_size
+    self._lock = threading.Lock()
+    self._functions = collections.OrderedDict()
+    self._hits = 0
+    self._misses = 0
+
+  @property
+  def max_size(self):
+    return self._max_size
+
+  @property
+  def hits(self):
+    return self._hits
+
+  @property
+  def misses(self):
+    return self._misses
+
+  def __len__(self):
+    with self._lock:
+      return len(self._functions)
+
+  def clear(self):
+    """Drops all cached functions and resets the hit and miss counters."""
+    with self._lock:
+      self._functions.clear()
+      self._hits = 0
+      self._misses = 0
+
+  def get_or_embed(self, comp, type_spec=None, device=None):
+    """Returns a cached embedding of `comp`, embedding it on a cache miss.
+
+    Args:
+      comp: An instance of `pb.Computation`.
+      type_spec: An optional `tff.Type` instance or something convertible to it.
+      device: An optional device name.
+
+    Returns:
+      The callable constructed by `embed_tensorflow_computation()`.
+
+    Raises:
+      TypeError: If arguments are of the wrong types.
+    """
+    py_typecheck.check_type(comp, pb.Computation)
+    type_spec = computation_types.to_type(type_spec)
+    key = (hashlib.sha256(comp.SerializeToString(deterministic=True)).digest(),
+           str(type_spec) if type_spec is not None else None, device)
+    with self._lock:
+      fn = self._functions.get(key)
+      if fn is not None:
+        self._functions.move_to_end(key)
+        self._hits += 1
+        return fn
+      self._misses += 1
+    # The embedding happens outside of the lock, so that slow imports of large
+    # graphs do not block concurrent lookups. Two threads that miss on the same
+    # key at the same time will each embed the computation, which is harmless.
+    fn = embed_tensorflow_computation(comp, type_spec, device)
+    with self._lock:
+      self._functions[key] = fn
+      self._functions.move_to_end(key)
+      while len(self._functions) > self._max_size:
+        self._functions.popitem(last=False)
+    return fn
+
+
+_COMPUTATION_CACHE = EmbeddedComputationCache()
+
+
+def get_computation_cache():
+  """Returns the `EmbeddedComputationCache` shared by all eager executors."""
+  return _COMPUTATION_CACHE
+
+
 def to_representation_for_type(value, type_spec=None, device=None):
   """Verifies or converts the `value` to an eager objct matching `type_spec`.
 
@@ -177,6 +283,9 @@ def to_representation_for_type(value, type_spec=None, device=None):
 
   TensorFlow computations are represented here as zero- or one-argument Python
   callables that accept their entire argument bundle as a single Python object.
+  These callables are memoized in the process-wide cache returned by
+  `get_computation_cache()`, so that embedding the same computation repeatedly
+  (e.g., once per client in every round) only pays the import cost once.
 
   Args:
     value: The raw representation of a value to compare against `type_spec` and
@@ -193,19 +302,22 @@ def to_representation_for_type(value, type_spec=None, device=None):
   """
   if device is not None:
     py_typecheck.check_type(device, str)
+  type_spec = type_utils.reconcile_value_with_type_spec(value, type_spec)
+  if isinstance(value, computation_base.Computation):
+    return to_representation_for_type(
+        computation_impl.ComputationImpl.get_proto(value), type_spec, device)
+  if isinstance(value, pb.Computation):
+    # The device is passed explicitly here (rather than via the device scope
+    # below) so that it participates in the cache key.
+    return _COMPUTATION_CACHE.get_or_embed(value, type_spec, device)
+  if device is not None:
     with tf.device(device):
       return to_representation_for_type(value, type_spec=type_spec, device=None)
-  type_spec = type_utils.reconcile_value_with_type_spec(value, type_spec)
   if isinstance(value, EagerValue):
     return value.internal_representation
   if isinstance(value, executor_value_base.ExecutorValue):
     raise TypeError(
         'Cannot accept a value embedded within a non-eager executor.')
-  if isinstance(value, computation_base.Computation):
-    return to_representation_for_type(
-        computation_impl.ComputationImpl.get_proto(value), type_spec, device)
-  if isinstance(value, pb.Computation):
-    return embed_tensorflow_computation(value, type_spec, device)
   if isinstance(type_spec, computation_types.TensorType):
     if not isinstance(value, tf.Tensor):
       if isinstance(value, np.ndarray):
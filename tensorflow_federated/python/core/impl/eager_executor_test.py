@@ -163,6 +163,81 @@ class EagerExecutorTest(parameterized.TestCase):
     self.assertAlmostEqual(results[0].numpy(), 1.1)
     self.assertAlmostEqual(results[1].numpy(), 1.2)
 
+  def test_computation_cache_hits_on_repeated_embedding(self):
+
+    @computations.tf_computation(tf.int32)
+    def comp(x):
+      return x + 1
+
+    comp_proto = computation_impl.ComputationImpl.get_proto(comp)
+    cache = eager_executor.EmbeddedComputationCache()
+    fn1 = cache.get_or_embed(comp_proto, comp.type_signature)
+    fn2 = cache.get_or_embed(comp_proto, comp.type_signature)
+    self.assertIs(fn1, fn2)
+    self.assertEqual(cache.misses, 1)
+    self.assertEqual(cache.hits, 1)
+    self.assertLen(cache, 1)
+    self.assertEqual(fn2(10).numpy(), 11)
+
+  def test_computation_cache_keys_on_device(self):
+
+    @computations.tf_computation(tf.int32)
+    def comp(x):
+      return x + 1
+
+    comp_proto = computation_impl.ComputationImpl.get_proto(comp)
+    cache = eager_executor.EmbeddedComputationCache()
+    fn1 = cache.get_or_embed(comp_proto, comp.type_signature)
+    fn2 = cache.get_or_embed(comp_proto, comp.type_signature, '/CPU:0')
+    self.assertIsNot(fn1, fn2)
+    self.assertEqual(cache.misses, 2)
+    self.assertEqual(cache.hits, 0)
+
+  def test_computation_cache_evicts_least_recently_used(self):
+
+    def _make_comp_proto(n):
+
+      @computations.tf_computation(tf.int32)
+      def comp(x):
+        return x + n
+
+      return computation_impl.ComputationImpl.get_proto(comp)
+
+    comp_protos = [_make_comp_proto(n) for n in range(3)]
+    cache = eager_executor.EmbeddedComputationCache(max_size=2)
+    cache.get_or_embed(comp_protos[0])
+    cache.get_or_embed(comp_protos[1])
+    cache.get_or_embed(comp_protos[0])
+    cache.get_or_embed(comp_protos[2])
+    self.assertLen(cache, 2)
+    self.assertEqual(cache.hits, 1)
+    cache.get_or_embed(comp_protos[0])
+    self.assertEqual(cache.hits, 2)
+    cache.get_or_embed(comp_protos[1])
+    self.assertEqual(cache.misses, 4)
+
+  def test_computation_cache_fails_with_nonpositive_size(self):
+    with self.assertRaises(ValueError):
+      eager_executor.EmbeddedComputationCache(max_size=0)
+
+  def test_executor_create_value_reuses_cached_computation(self):
+
+    @computations.tf_computation(tf.int32)
+    def comp(x):
+      return x * 3
+
+    cache = eager_executor.get_computation_cache()
+    cache.clear()
+    loop = asyncio.get_event_loop()
+    for _ in range(5):
+      ex = eager_executor.EagerExecutor()
+      fn = loop.run_until_complete(ex.create_value(comp))
+      arg = loop.run_until_complete(ex.create_value(10, tf.int32))
+      result = loop.run_until_complete(ex.create_call(fn, arg))
+      self.assertEqual(result.internal_representation.numpy(), 30)
+    self.assertEqual(cache.misses, 1)
+    self.assertEqual(cache.hits, 4)
+
   def test_to_representation_for_type_with_int(self):
     v = eager_executor.to_representation_for_type(10, tf.int32)
     self.assertIsInstance(v, tf.Tensor)
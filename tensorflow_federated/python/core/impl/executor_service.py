@@ -15,8 +15,10 @@
 """A service wrapper around an executor that makes it accessible over gRPC."""
 
 import asyncio
+import collections
 import functools
 import threading
+import time
 import traceback
 import uuid
 
@@ -35,20 +37,72 @@ from tensorflow_federated.python.core.impl import executor_value_base
 class ExecutorService(executor_pb2_grpc.ExecutorServicer):
   """A wrapper around a target executor that makes it into a gRPC service.
 
+  Values remain held by the service until the client disposes of them with a
+  call to `Dispose`, or, if `value_ttl` is specified, until they have not been
+  referenced by any request for longer than `value_ttl` seconds.
+
+  The service also keeps the `max_cached_computations` most recently used
+  computations it has received, indexed by their digests, so that clients can
+  refer to computations they have sent before by digest in `CreateValue`,
+  rather than sending them over the wire again.
+
   NOTE: This component is only available in Python 3.
   """
 
-  def __init__(self, executor, *args, **kwargs):
+  def __init__(self,
+               executor,
+               *args,
+               value_ttl=None,
+               stream_chunk_size=executor_service_utils.DEFAULT_CHUNK_SIZE,
+               max_cached_computations=100,
+               **kwargs):
+    """Creates a service that wraps `executor`.
+
+    Args:
+      executor: The target executor, an instance of `executor_base.Executor`.
+      *args: Positional arguments for the base class.
+      value_ttl: An optional number of seconds after which values that have not
+        been created or referenced by any request are evicted, even if they have
+        not been explicitly disposed of by the client.
+      stream_chunk_size: The maximum number of bytes of tensor content in each
+        chunk sent by `ComputeStream`.
+      max_cached_computations: The maximum number of computations to keep
+        for reference by digest, before evicting the least recently used ones.
+      **kwargs: Keyword arguments for the base class.
+    """
     py_typecheck.check_type(executor, executor_base.Executor)
+    if value_ttl is not None:
+      py_typecheck.check_type(value_ttl, (int, float))
+      if value_ttl <= 0:
+        raise ValueError('The value TTL must be positive, found {}.'.format(
+            str(value_ttl)))
+    py_typecheck.check_type(stream_chunk_size, int)
+    if stream_chunk_size < 1:
+      raise ValueError('The chunk size must be positive, found {}.'.format(
+          str(stream_chunk_size)))
+    py_typecheck.check_type(max_cached_computations, int)
+    if max_cached_computations < 1:
+      raise ValueError(
+          'The number of cached computations must be positive, found {}.'
+          .format(str(max_cached_computations)))
     super(ExecutorService, self).__init__(*args, **kwargs)
     self._executor = executor
+    self._value_ttl = value_ttl
+    self._stream_chunk_size = stream_chunk_size
     self._lock = threading.Lock()
 
     # The keys in this dictionary are value ids (the same as what we return
-    # in the gRPC responses), and the values are `concurrent.futures.Future`
-    # instances (this may, and probably will change as we flesh out the rest
-    # of this implementation).
+    # in the gRPC responses), and the values are `_ValueRecord` instances that
+    # hold the `concurrent.futures.Future` of the embedded value.
     self._values = {}
+    self._live_value_bytes = 0
+    self._last_eviction_time = time.time()
+
+    # The keys in this dictionary are computation digests, and the values are
+    # the deserialized computations, along with their types, in the order from
+    # the least to the most recently used.
+    self._computations = collections.OrderedDict()
+    self._max_cached_computations = max_cached_computations
 
     def run_loop(loop):
       loop.run_forever()
@@ -63,6 +117,201 @@ class ExecutorService(executor_pb2_grpc.ExecutorServicer):
     self._event_loop.call_soon_threadsafe(self._event_loop.stop)
     self._thread.join()
 
+  @property
+  def live_value_count(self):
+    """The number of values currently held by the service."""
+    with self._lock:
+      return len(self._values)
+
+  @property
+  def live_value_bytes(self):
+    """The serialized size of the values currently held by the service.
+
+    Only the values received from clients via `CreateValue` are accounted for,
+    since the sizes of the results of calls and other derived values are not
+    known until they are computed.
+    """
+    with self._lock:
+      return self._live_value_bytes
+
+  @property
+  def cached_computation_count(self):
+    """The number of computations held for reference by digest."""
+    with self._lock:
+      return len(self._computations)
+
+  def _add_value(self, future_val, size=0, value_id=None):
+    """Registers `future_val` under a value id, and returns the id.
+
+    Args:
+      future_val: The `concurrent.futures.Future` of the value.
+      size: The number of bytes to account for this value.
+      value_id: An optional id assigned by the client. If `None`, a new unique
+        id is generated.
+
+    Returns:
+      The string id of the value.
+
+    Raises:
+      ValueError: If a value with id `value_id` already exists.
+    """
+    if value_id is None:
+      value_id = str(uuid.uuid4())
+    with self._lock:
+      if value_id in self._values:
+        raise ValueError(
+            'A value with id "{}" already exists.'.format(value_id))
+      self._values[value_id] = _ValueRecord(future_val, size, time.time())
+      self._live_value_bytes += size
+    self._maybe_evict_expired_values()
+    return value_id
+
+  def _get_value(self, value_id):
+    """Returns the future of the value with id `value_id`.
+
+    Args:
+      value_id: The string id of the value.
+
+    Returns:
+      The `concurrent.futures.Future` of the value.
+
+    Raises:
+      ValueError: If there is no such value (e.g., it has been disposed of).
+    """
+    with self._lock:
+      record = self._values.get(value_id)
+      if record is None:
+        raise ValueError('There is no value with id "{}".'.format(value_id))
+      record.last_access_time = time.time()
+      return record.future
+
+  def _remove_values(self, value_ids):
+    with self._lock:
+      for value_id in value_ids:
+        record = self._values.pop(value_id, None)
+        if record is not None:
+          self._live_value_bytes -= record.size
+
+  def _maybe_evict_expired_values(self):
+    """Evicts values that have not been referenced for over `value_ttl`."""
+    if self._value_ttl is None:
+      return
+    now = time.time()
+    with self._lock:
+      # Sweeping is linear in the number of live values, so it is done at most
+      # a few times per TTL period.
+      if now - self._last_eviction_time < self._value_ttl / 4.0:
+        return
+      self._last_eviction_time = now
+      expired_ids = [
+          k for k, v in self._values.items()
+          if now - v.last_access_time > self._value_ttl
+      ]
+    if expired_ids:
+      logging.debug('Evicting %d expired values.', len(expired_ids))
+      self._remove_values(expired_ids)
+
+  def _cache_computation(self, comp, comp_type):
+    """Adds `comp` to the computations held for reference by digest."""
+    digest = executor_service_utils.get_computation_digest(comp)
+    with self._lock:
+      self._computations.pop(digest, None)
+      self._computations[digest] = (comp, comp_type)
+      while len(self._computations) > self._max_cached_computations:
+        self._computations.popitem(last=False)
+
+  def _get_cached_computation(self, digest):
+    """Returns the computation with `digest` along with its type.
+
+    Args:
+      digest: The string digest of the computation.
+
+    Returns:
+      A tuple `(comp, comp_type)`.
+
+    Raises:
+      _ComputationNotFoundError: If the service does not hold the computation.
+    """
+    with self._lock:
+      entry = self._computations.pop(digest, None)
+      if entry is None:
+        raise _ComputationNotFoundError(
+            'There is no computation with digest "{}".'.format(digest))
+      self._computations[digest] = entry
+      return entry
+
+  def _create_value(self, request, value_id=None):
+    """Implements `CreateValue`, returning the id of the created value."""
+    py_typecheck.check_type(request, executor_pb2.CreateValueRequest)
+    which_value = request.value.WhichOneof('value')
+    if which_value == 'computation_digest':
+      value, value_type = self._get_cached_computation(
+          str(request.value.computation_digest))
+    else:
+      value, value_type = (
+          executor_service_utils.deserialize_value(request.value))
+      if which_value == 'computation':
+        self._cache_computation(value, value_type)
+    future_val = asyncio.run_coroutine_threadsafe(
+        self._executor.create_value(value, value_type), self._event_loop)
+    return self._add_value(future_val, request.value.ByteSize(), value_id)
+
+  def _create_call(self, request, value_id=None):
+    """Implements `CreateCall`, returning the id of the created value."""
+    py_typecheck.check_type(request, executor_pb2.CreateCallRequest)
+    function_id = str(request.function_ref.id)
+    argument_id = str(request.argument_ref.id)
+    function_val = self._get_value(function_id)
+    argument_val = self._get_value(argument_id) if argument_id else None
+    function = function_val.result()
+    argument = argument_val.result() if argument_val is not None else None
+    result_val = asyncio.run_coroutine_threadsafe(
+        self._executor.create_call(function, argument), self._event_loop)
+    return self._add_value(result_val, value_id=value_id)
+
+  def _create_tuple(self, request, value_id=None):
+    """Implements `CreateTuple`, returning the id of the created value."""
+    py_typecheck.check_type(request, executor_pb2.CreateTupleRequest)
+    element_vals = [self._get_value(e.value_ref.id) for e in request.element]
+    elements = []
+    for idx, elem in enumerate(request.element):
+      elements.append(
+          (str(elem.name) if elem.name else None, element_vals[idx].result()))
+    anon_tuple = anonymous_tuple.AnonymousTuple(elements)
+    result_val = asyncio.run_coroutine_threadsafe(
+        self._executor.create_tuple(anon_tuple), self._event_loop)
+    return self._add_value(result_val, value_id=value_id)
+
+  def _create_selection(self, request, value_id=None):
+    """Implements `CreateSelection`, returning the id of the created value."""
+    py_typecheck.check_type(request, executor_pb2.CreateSelectionRequest)
+    source_val = self._get_value(request.source_ref.id)
+    source = source_val.result()
+    which_selection = request.WhichOneof('selection')
+    if which_selection == 'name':
+      coro = self._executor.create_selection(source, name=request.name)
+    else:
+      coro = self._executor.create_selection(source, index=request.index)
+    result_val = asyncio.run_coroutine_threadsafe(coro, self._event_loop)
+    return self._add_value(result_val, value_id=value_id)
+
+  def _compute_value(self, request):
+    """Computes the value in `request`, and returns it along with its type."""
+    py_typecheck.check_type(request, executor_pb2.ComputeRequest)
+    value_id = str(request.value_ref.id)
+    future_val = self._get_value(value_id)
+    val = future_val.result()
+    py_typecheck.check_type(val, executor_value_base.ExecutorValue)
+    result = asyncio.run_coroutine_threadsafe(val.compute(), self._event_loop)
+    return result.result(), val.type_signature
+
+  def _compute(self, request):
+    """Implements `Compute`, returning the computed `executor_pb2.Value`."""
+    result_val, val_type = self._compute_value(request)
+    value_proto, _ = executor_service_utils.serialize_value(
+        result_val, val_type)
+    return value_proto
+
   def CreateValue(self, request, context):
     """Creates a value embedded in the executor.
 
@@ -73,17 +322,16 @@ class ExecutorService(executor_pb2_grpc.ExecutorServicer):
     Returns:
       An instance of `executor_pb2.CreateValueResponse`.
     """
-    py_typecheck.check_type(request, executor_pb2.CreateValueRequest)
     try:
-      value, value_type = (
-          executor_service_utils.deserialize_value(request.value))
-      value_id = str(uuid.uuid4())
-      future_val = asyncio.run_coroutine_threadsafe(
-          self._executor.create_value(value, value_type), self._event_loop)
-      with self._lock:
-        self._values[value_id] = future_val
+      value_id = self._create_value(request)
       return executor_pb2.CreateValueResponse(
           value_ref=executor_pb2.ValueRef(id=value_id))
+    except _ComputationNotFoundError as err:
+      # This is an expected outcome of referring to a computation by digest,
+      # upon which the client sends the full computation.
+      context.set_code(grpc.StatusCode.NOT_FOUND)
+      context.set_details(str(err))
+      return executor_pb2.CreateValueResponse()
     except (ValueError, TypeError) as err:
       logging.error(traceback.format_exc())
       context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
@@ -100,20 +348,8 @@ class ExecutorService(executor_pb2_grpc.ExecutorServicer):
     Returns:
       An instance of `executor_pb2.CreateCallResponse`.
     """
-    py_typecheck.check_type(request, executor_pb2.CreateCallRequest)
     try:
-      function_id = str(request.function_ref.id)
-      argument_id = str(request.argument_ref.id)
-      with self._lock:
-        function_val = self._values[function_id]
-        argument_val = self._values[argument_id] if argument_id else None
-      function = function_val.result()
-      argument = argument_val.result() if argument_val is not None else None
-      result_val = asyncio.run_coroutine_threadsafe(
-          self._executor.create_call(function, argument), self._event_loop)
-      result_id = str(uuid.uuid4())
-      with self._lock:
-        self._values[result_id] = result_val
+      result_id = self._create_call(request)
       return executor_pb2.CreateCallResponse(
           value_ref=executor_pb2.ValueRef(id=result_id))
     except (ValueError, TypeError) as err:
@@ -132,20 +368,8 @@ class ExecutorService(executor_pb2_grpc.ExecutorServicer):
     Returns:
       An instance of `executor_pb2.CreateTupleResponse`.
     """
-    py_typecheck.check_type(request, executor_pb2.CreateTupleRequest)
     try:
-      with self._lock:
-        element_vals = [self._values[e.value_ref.id] for e in request.element]
-      elements = []
-      for idx, elem in enumerate(request.element):
-        elements.append(
-            (str(elem.name) if elem.name else None, element_vals[idx].result()))
-      anon_tuple = anonymous_tuple.AnonymousTuple(elements)
-      result_val = asyncio.run_coroutine_threadsafe(
-          self._executor.create_tuple(anon_tuple), self._event_loop)
-      result_id = str(uuid.uuid4())
-      with self._lock:
-        self._values[result_id] = result_val
+      result_id = self._create_tuple(request)
       return executor_pb2.CreateTupleResponse(
           value_ref=executor_pb2.ValueRef(id=result_id))
     except (ValueError, TypeError) as err:
@@ -164,20 +388,8 @@ class ExecutorService(executor_pb2_grpc.ExecutorServicer):
     Returns:
       An instance of `executor_pb2.CreateSelectionResponse`.
     """
-    py_typecheck.check_type(request, executor_pb2.CreateSelectionRequest)
     try:
-      with self._lock:
-        source_val = self._values[request.source_ref.id]
-      source = source_val.result()
-      which_selection = request.WhichOneof('selection')
-      if which_selection == 'name':
-        coro = self._executor.create_selection(source, name=request.name)
-      else:
-        coro = self._executor.create_selection(source, index=request.index)
-      result_val = asyncio.run_coroutine_threadsafe(coro, self._event_loop)
-      result_id = str(uuid.uuid4())
-      with self._lock:
-        self._values[result_id] = result_val
+      result_id = self._create_selection(request)
       return executor_pb2.CreateSelectionResponse(
           value_ref=executor_pb2.ValueRef(id=result_id))
     except (ValueError, TypeError) as err:
@@ -196,21 +408,134 @@ class ExecutorService(executor_pb2_grpc.ExecutorServicer):
     Returns:
       An instance of `executor_pb2.ComputeResponse`.
     """
-    py_typecheck.check_type(request, executor_pb2.ComputeRequest)
     try:
-      value_id = str(request.value_ref.id)
-      with self._lock:
-        future_val = self._values[value_id]
-      val = future_val.result()
-      py_typecheck.check_type(val, executor_value_base.ExecutorValue)
-      result = asyncio.run_coroutine_threadsafe(val.compute(), self._event_loop)
-      result_val = result.result()
-      val_type = val.type_signature
-      value_proto, _ = executor_service_utils.serialize_value(
-          result_val, val_type)
-      return executor_pb2.ComputeResponse(value=value_proto)
+      return executor_pb2.ComputeResponse(value=self._compute(request))
     except (ValueError, TypeError) as err:
       logging.error(traceback.format_exc())
       context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
       context.set_details(str(err))
       return executor_pb2.ComputeResponse()
+
+  def ComputeStream(self, request, context):
+    """Computes a value embedded in the executor, and streams it back in chunks.
+
+    Args:
+      request: An instance of `executor_pb2.ComputeRequest`.
+      context: An instance of `grpc.ServicerContext`.
+
+    Yields:
+      Instances of `executor_pb2.ComputeStreamResponse`.
+    """
+    try:
+      result_val, val_type = self._compute_value(request)
+      for chunk in executor_service_utils.serialize_value_to_chunks(
+          result_val, val_type, self._stream_chunk_size):
+        yield chunk
+    except (ValueError, TypeError) as err:
+      logging.error(traceback.format_exc())
+      context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+      context.set_details(str(err))
+
+  def Dispose(self, request, context):
+    """Disposes of values embedded in the executor.
+
+    Disposing of values that do not exist (e.g., because they have already
+    been disposed of, or evicted) is not an error.
+
+    Args:
+      request: An instance of `executor_pb2.DisposeRequest`.
+      context: An instance of `grpc.ServicerContext`.
+
+    Returns:
+      An instance of `executor_pb2.DisposeResponse`.
+    """
+    py_typecheck.check_type(request, executor_pb2.DisposeRequest)
+    self._remove_values([str(v.id) for v in request.value_ref])
+    return executor_pb2.DisposeResponse()
+
+  def Execute(self, request, context):
+    """Executes a batch of operations in the executor.
+
+    The operations are executed in order. If any of them fails, the remaining
+    operations are skipped, and an error is reported for the entire batch (the
+    values created by the operations that preceded the failing one are kept).
+    The index of the failed operation is reported in the trailing metadata,
+    under `executor_service_utils.FAILED_OPERATION_INDEX_METADATA_KEY`.
+
+    Args:
+      request: An instance of `executor_pb2.ExecuteRequest`.
+      context: An instance of `grpc.ServicerContext`.
+
+    Returns:
+      An instance of `executor_pb2.ExecuteResponse`.
+    """
+    py_typecheck.check_type(request, executor_pb2.ExecuteRequest)
+    results = []
+    for idx, op in enumerate(request.operation):
+      try:
+        value_id = str(op.result_ref.id) if op.result_ref.id else None
+        which_op = op.WhichOneof('operation')
+        if which_op == 'create_value':
+          value_id = self._create_value(op.create_value, value_id)
+        elif which_op == 'create_call':
+          value_id = self._create_call(op.create_call, value_id)
+        elif which_op == 'create_tuple':
+          value_id = self._create_tuple(op.create_tuple, value_id)
+        elif which_op == 'create_selection':
+          value_id = self._create_selection(op.create_selection, value_id)
+        elif which_op == 'compute':
+          results.append(
+              executor_pb2.ExecuteResponse.Result(
+                  value=self._compute(op.compute)))
+          continue
+        elif which_op == 'dispose':
+          self._remove_values([str(v.id) for v in op.dispose.value_ref])
+          results.append(executor_pb2.ExecuteResponse.Result())
+          continue
+        else:
+          raise ValueError('Unrecognized operation "{}".'.format(which_op))
+        results.append(
+            executor_pb2.ExecuteResponse.Result(
+                value_ref=executor_pb2.ValueRef(id=value_id)))
+      except _ComputationNotFoundError as err:
+        _set_failed_operation(context, grpc.StatusCode.NOT_FOUND, idx, err)
+        return executor_pb2.ExecuteResponse()
+      except (ValueError, TypeError) as err:
+        logging.error(traceback.format_exc())
+        _set_failed_operation(context, grpc.StatusCode.INVALID_ARGUMENT, idx,
+                              err)
+        return executor_pb2.ExecuteResponse()
+    return executor_pb2.ExecuteResponse(result=results)
+
+
+def _set_failed_operation(context, code, idx, err):
+  """Reports the failure of the operation at `idx` of an `Execute` RPC.
+
+  Besides the status, the index of the operation is reported in the trailing
+  metadata, so that clients can tell which operations have taken effect.
+
+  Args:
+    context: An instance of `grpc.ServicerContext`.
+    code: The `grpc.StatusCode` to report.
+    idx: The index of the failed operation.
+    err: The exception raised by the operation.
+  """
+  context.set_code(code)
+  context.set_details('Operation {} failed: {}'.format(idx, str(err)))
+  context.set_trailing_metadata(
+      ((executor_service_utils.FAILED_OPERATION_INDEX_METADATA_KEY, str(idx)),))
+
+
+class _ComputationNotFoundError(Exception):
+  """Raised when a computation referred to by digest is not held."""
+
+
+class _ValueRecord(object):
+  """A value held by the service, along with its bookkeeping information."""
+
+  __slots__ = ['future', 'size', 'last_access_time']
+
+  def __init__(self, future, size, last_access_time):
+    self.future = future
+    self.size = size
+    self.last_access_time = last_access_time
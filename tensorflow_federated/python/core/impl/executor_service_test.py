@@ -14,11 +14,14 @@
 # limitations under the License.
 """Tests for executor_service.py."""
 
+import collections
 import threading
+import time
 
 from absl.testing import absltest
 import grpc
 from grpc.framework.foundation import logging_pool
+import numpy as np
 import portpicker
 import tensorflow as tf
 
@@ -36,12 +39,12 @@ from tensorflow_federated.python.core.impl import executor_value_base
 class TestEnv(object):
   """A test environment that consists of a single client and backend service."""
 
-  def __init__(self, executor):
+  def __init__(self, executor, **kwargs):
     port = portpicker.pick_unused_port()
     server_pool = logging_pool.pool(max_workers=1)
     self._server = grpc.server(server_pool)
     self._server.add_insecure_port('[::]:{}'.format(port))
-    self._service = executor_service.ExecutorService(executor)
+    self._service = executor_service.ExecutorService(executor, **kwargs)
     executor_pb2_grpc.add_ExecutorServicer_to_server(self._service,
                                                      self._server)
     self._server.start()
@@ -64,6 +67,17 @@ class TestEnv(object):
   def stub(self):
     return self._stub
 
+  @property
+  def service(self):
+    return self._service
+
+  def create_value(self, value, type_spec=None):
+    value_proto, _ = executor_service_utils.serialize_value(value, type_spec)
+    response = self._stub.CreateValue(
+        executor_pb2.CreateValueRequest(value=value_proto))
+    py_typecheck.check_type(response, executor_pb2.CreateValueResponse)
+    return response.value_ref
+
   def get_value(self, value_id):
     response = self._stub.Compute(
         executor_pb2.ComputeRequest(
@@ -224,6 +238,151 @@ class ExecutorServiceTest(absltest.TestCase):
 
     del env
 
+  def test_executor_service_compute_stream(self):
+    env = TestEnv(eager_executor.EagerExecutor(), stream_chunk_size=256)
+    x = np.arange(1000, dtype=np.float32)
+    value_ref = env.create_value(
+        collections.OrderedDict([('a', x), ('b', 10)]),
+        [('a', (tf.float32, [1000])), ('b', tf.int32)])
+    chunks = list(
+        env.stub.ComputeStream(
+            executor_pb2.ComputeRequest(value_ref=value_ref)))
+    for chunk in chunks:
+      self.assertLessEqual(chunk.ByteSize(), 512)
+    value, type_spec = executor_service_utils.deserialize_value_from_chunks(
+        chunks)
+    self.assertEqual(str(type_spec), '<a=float32[1000],b=int32>')
+    self.assertTrue(np.array_equal(value.a, x))
+    self.assertEqual(value.b, 10)
+    del env
+
+  def test_executor_service_create_computation_value_by_digest(self):
+    env = TestEnv(eager_executor.EagerExecutor(), max_cached_computations=1)
+
+    @computations.tf_computation(tf.int32)
+    def add_one(x):
+      return tf.add(x, 1)
+
+    @computations.tf_computation(tf.int32)
+    def add_two(x):
+      return tf.add(x, 2)
+
+    comp_proto, _ = executor_service_utils.serialize_value(add_one)
+    digest_request = executor_pb2.CreateValueRequest(
+        value=executor_pb2.Value(
+            computation_digest=executor_service_utils.get_computation_digest(
+                comp_proto.computation)))
+    with self.assertRaises(grpc.RpcError) as context:
+      env.stub.CreateValue(digest_request)
+    self.assertEqual(context.exception.code(), grpc.StatusCode.NOT_FOUND)
+
+    env.create_value(add_one)
+    self.assertEqual(env.service.cached_computation_count, 1)
+    comp_ref = env.stub.CreateValue(digest_request).value_ref
+    arg_ref = env.create_value(10, tf.int32)
+    response = env.stub.CreateCall(
+        executor_pb2.CreateCallRequest(
+            function_ref=comp_ref, argument_ref=arg_ref))
+    self.assertEqual(env.get_value(response.value_ref.id), 11)
+
+    # Only the most recently used computation is kept.
+    env.create_value(add_two)
+    self.assertEqual(env.service.cached_computation_count, 1)
+    with self.assertRaises(grpc.RpcError) as context:
+      env.stub.CreateValue(digest_request)
+    self.assertEqual(context.exception.code(), grpc.StatusCode.NOT_FOUND)
+    del env
+
+  def test_executor_service_execute_batch(self):
+    env = TestEnv(eager_executor.EagerExecutor())
+
+    @computations.tf_computation(tf.int32)
+    def comp(x):
+      return tf.add(x, 1)
+
+    comp_proto, _ = executor_service_utils.serialize_value(comp)
+    arg_proto, _ = executor_service_utils.serialize_value(10, tf.int32)
+    operation = executor_pb2.ExecuteRequest.Operation
+    response = env.stub.Execute(
+        executor_pb2.ExecuteRequest(operation=[
+            operation(
+                result_ref=executor_pb2.ValueRef(id='comp'),
+                create_value=executor_pb2.CreateValueRequest(
+                    value=comp_proto)),
+            operation(
+                result_ref=executor_pb2.ValueRef(id='arg'),
+                create_value=executor_pb2.CreateValueRequest(value=arg_proto)),
+            operation(
+                create_call=executor_pb2.CreateCallRequest(
+                    function_ref=executor_pb2.ValueRef(id='comp'),
+                    argument_ref=executor_pb2.ValueRef(id='arg'))),
+            operation(
+                compute=executor_pb2.ComputeRequest(
+                    value_ref=executor_pb2.ValueRef(id='arg'))),
+            operation(
+                dispose=executor_pb2.DisposeRequest(
+                    value_ref=[executor_pb2.ValueRef(id='arg')])),
+        ]))
+    self.assertIsInstance(response, executor_pb2.ExecuteResponse)
+    self.assertLen(response.result, 5)
+    self.assertEqual(response.result[0].value_ref.id, 'comp')
+    self.assertEqual(response.result[1].value_ref.id, 'arg')
+    result_id = response.result[2].value_ref.id
+    self.assertNotEmpty(result_id)
+    value, _ = executor_service_utils.deserialize_value(
+        response.result[3].value)
+    self.assertEqual(value, 10)
+    self.assertEqual(env.get_value(result_id), 11)
+    self.assertEqual(env.service.live_value_count, 2)
+    del env
+
+  def test_executor_service_execute_fails_with_duplicate_id(self):
+    env = TestEnv(eager_executor.EagerExecutor())
+    arg_proto, _ = executor_service_utils.serialize_value(10, tf.int32)
+    operation = executor_pb2.ExecuteRequest.Operation(
+        result_ref=executor_pb2.ValueRef(id='arg'),
+        create_value=executor_pb2.CreateValueRequest(value=arg_proto))
+    with self.assertRaises(grpc.RpcError) as context:
+      env.stub.Execute(
+          executor_pb2.ExecuteRequest(operation=[operation, operation]))
+    self.assertEqual(context.exception.code(),
+                     grpc.StatusCode.INVALID_ARGUMENT)
+    self.assertIn(
+        (executor_service_utils.FAILED_OPERATION_INDEX_METADATA_KEY, '1'),
+        context.exception.trailing_metadata())
+    del env
+
+  def test_executor_service_dispose(self):
+    env = TestEnv(eager_executor.EagerExecutor())
+    refs = [env.create_value(x, tf.int32) for x in range(3)]
+    self.assertEqual(env.service.live_value_count, 3)
+    self.assertGreater(env.service.live_value_bytes, 0)
+    response = env.stub.Dispose(executor_pb2.DisposeRequest(value_ref=refs[:2]))
+    self.assertIsInstance(response, executor_pb2.DisposeResponse)
+    self.assertEqual(env.service.live_value_count, 1)
+    self.assertEqual(env.get_value(refs[2].id), 2)
+    with self.assertRaises(grpc.RpcError) as context:
+      env.get_value(refs[0].id)
+    self.assertEqual(context.exception.code(),
+                     grpc.StatusCode.INVALID_ARGUMENT)
+    env.stub.Dispose(executor_pb2.DisposeRequest(value_ref=refs))
+    self.assertEqual(env.service.live_value_count, 0)
+    self.assertEqual(env.service.live_value_bytes, 0)
+    del env
+
+  def test_executor_service_evicts_values_after_ttl(self):
+    env = TestEnv(eager_executor.EagerExecutor(), value_ttl=0.5)
+    old_ref = env.create_value(10, tf.int32)
+    kept_ref = env.create_value(20, tf.int32)
+    for _ in range(4):
+      time.sleep(0.2)
+      self.assertEqual(env.get_value(kept_ref.id), 20)
+    env.create_value(30, tf.int32)
+    self.assertEqual(env.service.live_value_count, 2)
+    with self.assertRaises(grpc.RpcError):
+      env.get_value(old_ref.id)
+    del env
+
 
 if __name__ == '__main__':
   tf.compat.v1.enable_v2_behavior()
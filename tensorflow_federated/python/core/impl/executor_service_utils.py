@@ -14,6 +14,8 @@
 # limitations under the License.
 """A set of utility methods for `executor_service.py` and its clients."""
 
+import hashlib
+
 import numpy as np
 import tensorflow as tf
 
@@ -27,14 +29,98 @@ from tensorflow_federated.python.core.impl import computation_impl
 from tensorflow_federated.python.core.impl import type_serialization
 from tensorflow_federated.python.core.impl import type_utils
 
+# The default maximum number of bytes of tensor content in a single chunk of a
+# value streamed by `serialize_value_to_chunks`.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# The key of the trailing metadata entry in which the executor service reports
+# the index of the operation of an `Execute` RPC that has failed.
+FAILED_OPERATION_INDEX_METADATA_KEY = 'tff-failed-operation-index'
+
+
+def _supports_raw_encoding(dtype):
+  """Returns `True` iff tensors of `dtype` can use the `RawTensor` encoding."""
+  if not dtype.is_numpy_compatible or dtype == tf.string:
+    return False
+  return np.dtype(dtype.as_numpy_dtype).kind in 'biufc'
+
+
+def _to_raw_encodable_array(value, type_spec):
+  """Converts `value` to an array suitable for the `RawTensor` encoding.
+
+  Args:
+    value: The value to convert.
+    type_spec: An optional `tff.TensorType` of `value`.
+
+  Returns:
+    A tuple `(array, type_spec)` with `value` as a Numpy array, and its type, or
+    `None` if `value` is not a Numpy array or scalar of a supported dtype.
+
+  Raises:
+    TypeError: If `value` is not assignable to `type_spec`.
+  """
+  if not isinstance(value, (np.ndarray, np.generic)):
+    return None
+  if type_spec is not None:
+    dtype = type_spec.dtype
+  else:
+    try:
+      dtype = tf.as_dtype(value.dtype)
+    except TypeError:
+      return None
+  if not _supports_raw_encoding(dtype):
+    return None
+  array = np.asarray(value).astype(dtype.as_numpy_dtype, copy=False)
+  value_type = computation_types.TensorType(
+      dtype=dtype, shape=tf.TensorShape(array.shape))
+  if type_spec is not None:
+    type_utils.check_assignable_from(type_spec, value_type)
+  else:
+    type_spec = value_type
+  return array, type_spec
+
+
+def _serialize_raw_tensor(value, dtype):
+  """Serializes Numpy array `value` of `dtype` as `executor_pb2.Value`."""
+  np_dtype = np.dtype(dtype.as_numpy_dtype).newbyteorder('<')
+  # `tobytes()` is the only copy made here; `astype()` with `copy=False` is a
+  # no-op on little-endian hosts where the dtype already matches.
+  content = value.astype(np_dtype, copy=False).tobytes()
+  return executor_pb2.Value(
+      raw_tensor=executor_pb2.Value.RawTensor(
+          dtype=dtype.as_datatype_enum, dims=value.shape, content=content))
 
-def serialize_tensor_value(value, type_spec=None):
+
+def _deserialize_raw_tensor(raw_tensor):
+  """Deserializes `executor_pb2.Value.RawTensor` into a read-only array."""
+  dtype = tf.DType(raw_tensor.dtype)
+  if not _supports_raw_encoding(dtype):
+    raise ValueError(
+        'Unsupported dtype in a raw tensor value: {}.'.format(dtype))
+  np_dtype = np.dtype(dtype.as_numpy_dtype).newbyteorder('<')
+  dims = list(raw_tensor.dims)
+  tensor_value = np.frombuffer(raw_tensor.content, dtype=np_dtype)
+  if tensor_value.size != np.prod(dims, dtype=np.int64):
+    raise ValueError(
+        'The raw tensor content has {} elements, but the shape {} requires '
+        '{}.'.format(tensor_value.size, dims, np.prod(dims, dtype=np.int64)))
+  value_type = computation_types.TensorType(
+      dtype=dtype, shape=tf.TensorShape(dims))
+  return tensor_value.reshape(dims), value_type
+
+
+def serialize_tensor_value(value, type_spec=None, use_raw_encoding=True):
   """Serializes a tensor value into `executor_pb2.Value`.
 
+  Numpy arrays and scalars of numeric and boolean dtypes are serialized in the
+  compact `RawTensor` encoding, unless `use_raw_encoding` is `False`. All other
+  values are serialized as a `tensorflow.TensorProto`.
+
   Args:
     value: A Numpy array or other object understood by `tf.make_tensor_proto`.
     type_spec: An optional type spec, a `tff.TensorType` or something
       convertible to it.
+    use_raw_encoding: Whether to use the `RawTensor` encoding where possible.
 
   Returns:
     A tuple `(value_proto, ret_type_spec)` in which `value_proto` is an instance
@@ -55,6 +141,12 @@ def serialize_tensor_value(value, type_spec=None):
   if type_spec is not None:
     type_spec = computation_types.to_type(type_spec)
     py_typecheck.check_type(type_spec, computation_types.TensorType)
+  if use_raw_encoding:
+    raw_value = _to_raw_encodable_array(value, type_spec)
+    if raw_value is not None:
+      array, type_spec = raw_value
+      return _serialize_raw_tensor(array, type_spec.dtype), type_spec
+  if type_spec is not None:
     if isinstance(value, np.ndarray):
       tensor_proto = tf.make_tensor_proto(
           value, dtype=type_spec.dtype, verify_shape=False)
@@ -88,7 +180,8 @@ def deserialize_tensor_value(value_proto):
   Returns:
     A tuple `(value, type_spec)`, where `value` is a Numpy array that represents
     the deserialized value, and `type_spec` is an instance of `tff.TensorType`
-    that represents its type.
+    that represents its type. Arrays decoded from the `RawTensor` encoding are
+    read-only views of the buffer in `value_proto`.
 
   Raises:
     TypeError: If the arguments are of the wrong types.
@@ -96,6 +189,8 @@ def deserialize_tensor_value(value_proto):
   """
   py_typecheck.check_type(value_proto, executor_pb2.Value)
   which_value = value_proto.WhichOneof('value')
+  if which_value == 'raw_tensor':
+    return _deserialize_raw_tensor(value_proto.raw_tensor)
   if which_value != 'tensor':
     raise ValueError('Not a tensor value: {}'.format(which_value))
 
@@ -180,7 +275,7 @@ def deserialize_value(value_proto):
   """
   py_typecheck.check_type(value_proto, executor_pb2.Value)
   which_value = value_proto.WhichOneof('value')
-  if which_value == 'tensor':
+  if which_value in ('tensor', 'raw_tensor'):
     return deserialize_tensor_value(value_proto)
   elif which_value == 'computation':
     return (value_proto.computation,
@@ -198,3 +293,157 @@ def deserialize_value(value_proto):
   else:
     raise ValueError(
         'Unable to deserialize a value of type {}.'.format(which_value))
+
+
+def get_computation_digest(comp):
+  """Returns the digest that identifies `comp` in the executor service.
+
+  Args:
+    comp: An instance of `computation_pb2.Computation`.
+
+  Returns:
+    A string with the hex SHA-256 digest of the deterministic serialization of
+    `comp`.
+
+  Raises:
+    TypeError: If the argument is of the wrong type.
+  """
+  py_typecheck.check_type(comp, computation_pb2.Computation)
+  return hashlib.sha256(comp.SerializeToString(deterministic=True)).hexdigest()
+
+
+def serialize_value_to_chunks(value,
+                              type_spec=None,
+                              chunk_size=DEFAULT_CHUNK_SIZE):
+  """Serializes a value into a stream of `ComputeStreamResponse` chunks.
+
+  The chunks are generated lazily, and the content of each tensor is sliced
+  directly out of its buffer, so at most `chunk_size` bytes of serialized
+  tensor content are held in memory at a time.
+
+  Args:
+    value: A value to be serialized.
+    type_spec: Optional type spec, a `tff.Type` or something convertible to it.
+    chunk_size: The maximum number of bytes of tensor content in each chunk.
+
+  Yields:
+    Instances of `executor_pb2.ComputeStreamResponse`.
+
+  Raises:
+    TypeError: If the arguments are of the wrong types.
+    ValueError: If the value is malformed.
+  """
+  py_typecheck.check_type(chunk_size, int)
+  if chunk_size < 1:
+    raise ValueError('The chunk size must be positive, found {}.'.format(
+        str(chunk_size)))
+  type_spec = computation_types.to_type(type_spec)
+  if isinstance(type_spec, computation_types.NamedTupleType):
+    type_elements = anonymous_tuple.to_elements(type_spec)
+    val_elements = anonymous_tuple.to_elements(
+        anonymous_tuple.from_container(value))
+    yield executor_pb2.ComputeStreamResponse(
+        tuple_header=executor_pb2.ComputeStreamResponse.TupleHeader(
+            name=[e_name if e_name else '' for e_name, _ in type_elements]))
+    for (_, e_type), (_, e_val) in zip(type_elements, val_elements):
+      for chunk in serialize_value_to_chunks(e_val, e_type, chunk_size):
+        yield chunk
+    return
+  if isinstance(value, tf.Tensor):
+    value = value.numpy()
+  raw_value = None
+  if type_spec is None or isinstance(type_spec, computation_types.TensorType):
+    raw_value = _to_raw_encodable_array(value, type_spec)
+  if raw_value is None:
+    value_proto, _ = serialize_value(value, type_spec)
+    yield executor_pb2.ComputeStreamResponse(value=value_proto)
+    return
+  array, type_spec = raw_value
+  np_dtype = np.dtype(type_spec.dtype.as_numpy_dtype).newbyteorder('<')
+  array = np.ascontiguousarray(array.astype(np_dtype, copy=False))
+  yield executor_pb2.ComputeStreamResponse(
+      tensor_header=executor_pb2.ComputeStreamResponse.TensorHeader(
+          dtype=type_spec.dtype.as_datatype_enum, dims=array.shape))
+  content = array.reshape([-1]).view(np.uint8)
+  for offset in range(0, content.size, chunk_size):
+    yield executor_pb2.ComputeStreamResponse(
+        tensor_content=content[offset:offset + chunk_size].tobytes())
+
+
+def deserialize_value_from_chunks(chunks):
+  """Deserializes a value from a stream of `ComputeStreamResponse` chunks.
+
+  The chunks are consumed incrementally as they arrive, and the content of each
+  tensor is copied straight into a preallocated array, so the serialized form
+  of the value is never held in memory in its entirety.
+
+  Args:
+    chunks: An iterable of `executor_pb2.ComputeStreamResponse`, such as the
+      response iterator returned by the `ComputeStream` RPC.
+
+  Returns:
+    A tuple `(value, type_spec)`, as returned by `deserialize_value`.
+
+  Raises:
+    TypeError: If the arguments are of the wrong types.
+    ValueError: If the stream of chunks is malformed.
+  """
+  chunk_iter = iter(chunks)
+  value, type_spec = _deserialize_value_from_chunk_iterator(chunk_iter)
+  if next(chunk_iter, None) is not None:
+    raise ValueError('Found unexpected chunks past the end of the value.')
+  return value, type_spec
+
+
+def _next_chunk(chunk_iter):
+  chunk = next(chunk_iter, None)
+  if chunk is None:
+    raise ValueError('The stream of chunks ended before the end of the value.')
+  py_typecheck.check_type(chunk, executor_pb2.ComputeStreamResponse)
+  return chunk
+
+
+def _deserialize_value_from_chunk_iterator(chunk_iter):
+  """Deserializes the next value from `chunk_iter`."""
+  chunk = _next_chunk(chunk_iter)
+  which_chunk = chunk.WhichOneof('chunk')
+  if which_chunk == 'value':
+    return deserialize_value(chunk.value)
+  elif which_chunk == 'tuple_header':
+    val_elems = []
+    type_elems = []
+    for e_name in chunk.tuple_header.name:
+      name = str(e_name) if e_name else None
+      e_val, e_type = _deserialize_value_from_chunk_iterator(chunk_iter)
+      val_elems.append((name, e_val))
+      type_elems.append((name, e_type) if name else e_type)
+    return (anonymous_tuple.AnonymousTuple(val_elems),
+            computation_types.NamedTupleType(type_elems))
+  elif which_chunk == 'tensor_header':
+    dtype = tf.DType(chunk.tensor_header.dtype)
+    if not _supports_raw_encoding(dtype):
+      raise ValueError(
+          'Unsupported dtype in a tensor header: {}.'.format(dtype))
+    dims = list(chunk.tensor_header.dims)
+    np_dtype = np.dtype(dtype.as_numpy_dtype).newbyteorder('<')
+    tensor_value = np.empty(dims, dtype=np_dtype)
+    content = tensor_value.reshape([-1]).view(np.uint8)
+    offset = 0
+    while offset < content.size:
+      content_chunk = _next_chunk(chunk_iter)
+      if content_chunk.WhichOneof('chunk') != 'tensor_content':
+        raise ValueError('Expected {} more bytes of tensor content.'.format(
+            content.size - offset))
+      chunk_bytes = content_chunk.tensor_content
+      if offset + len(chunk_bytes) > content.size:
+        raise ValueError(
+            'The tensor content exceeds the {} bytes required by its '
+            'shape.'.format(content.size))
+      content[offset:offset + len(chunk_bytes)] = np.frombuffer(
+          chunk_bytes, dtype=np.uint8)
+      offset += len(chunk_bytes)
+    value_type = computation_types.TensorType(
+        dtype=dtype, shape=tf.TensorShape(dims))
+    return tensor_value, value_type
+  else:
+    raise ValueError('Unexpected chunk of type {}.'.format(which_chunk))
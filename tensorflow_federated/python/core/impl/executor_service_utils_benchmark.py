@@ -0,0 +1,77 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark for tensor serialization in executor_service_utils."""
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import test
+from tensorflow_federated.python.core.impl import executor_service_utils
+
+# Model sizes, in number of float32 parameters.
+MODEL_SIZES = [1000000, 10000000, 100000000]
+NUM_ITERS = 5
+
+
+def make_model_weights(num_params):
+  """Returns a list of float32 weights with `num_params` elements in total."""
+  num_rows = num_params // 1000
+  return [
+      np.random.random_sample([num_rows, 1000]).astype(np.float32),
+      np.random.random_sample([num_params - num_rows * 1000]).astype(
+          np.float32)
+  ]
+
+
+class ExecutorServiceUtilsBenchmark(tf.test.Benchmark):
+  """Measures the throughput of serializing model weights for transport."""
+
+  def _benchmark_round_trip(self, num_params, use_raw_encoding):
+    weights = make_model_weights(num_params)
+    num_megabytes = sum(w.nbytes for w in weights) / float(1 << 20)
+    round_trip_times = []
+    for _ in range(NUM_ITERS):
+      start = time.time()
+      for w in weights:
+        value_proto, _ = executor_service_utils.serialize_tensor_value(
+            w, use_raw_encoding=use_raw_encoding)
+        # Mimic the transport, which serializes the proto for the wire.
+        wire_bytes = value_proto.SerializeToString()
+        value_proto.ParseFromString(wire_bytes)
+        executor_service_utils.deserialize_tensor_value(value_proto)
+      round_trip_times.append(time.time() - start)
+    self.report_benchmark(
+        name='Tensor round trip, {} parameters, {} encoding'.format(
+            num_params, 'raw' if use_raw_encoding else 'TensorProto'),
+        wall_time=np.mean(round_trip_times),
+        iters=NUM_ITERS,
+        extras={
+            'megabytes_per_second': num_megabytes / np.mean(round_trip_times),
+            'std_dev': np.std(round_trip_times)
+        })
+
+  def benchmark_raw_encoding(self):
+    for num_params in MODEL_SIZES:
+      self._benchmark_round_trip(num_params, use_raw_encoding=True)
+
+  def benchmark_tensor_proto_encoding(self):
+    for num_params in MODEL_SIZES:
+      self._benchmark_round_trip(num_params, use_raw_encoding=False)
+
+
+if __name__ == '__main__':
+  test.main()
@@ -73,6 +73,55 @@ class ExecutorServiceUtilsTest(absltest.TestCase):
     with self.assertRaises(TypeError):
       executor_service_utils.serialize_tensor_value(x, tf.int32)
 
+  def test_serialize_tensor_value_uses_raw_encoding_for_arrays(self):
+    x = np.arange(6, dtype=np.float32).reshape([2, 3])
+    value_proto, value_type = executor_service_utils.serialize_tensor_value(x)
+    self.assertEqual(value_proto.WhichOneof('value'), 'raw_tensor')
+    self.assertEqual(str(value_type), 'float32[2,3]')
+    self.assertEqual(value_proto.raw_tensor.content, x.astype('<f4').tobytes())
+    y, type_spec = executor_service_utils.deserialize_tensor_value(value_proto)
+    self.assertEqual(str(type_spec), 'float32[2,3]')
+    self.assertTrue(np.array_equal(x, y))
+    self.assertFalse(y.flags.writeable)
+
+  def test_serialize_deserialize_raw_tensor_value_with_various_dtypes(self):
+    for dtype in [
+        np.bool_, np.int8, np.uint16, np.int32, np.int64, np.float16,
+        np.float64, np.complex64
+    ]:
+      x = np.array([[1, 0], [0, 1]], dtype=dtype)
+      value_proto, _ = executor_service_utils.serialize_tensor_value(x)
+      self.assertEqual(value_proto.WhichOneof('value'), 'raw_tensor')
+      y, type_spec = executor_service_utils.deserialize_value(value_proto)
+      self.assertEqual(type_spec.dtype, tf.as_dtype(dtype))
+      self.assertEqual(y.dtype, np.dtype(dtype))
+      self.assertTrue(np.array_equal(x, y))
+
+  def test_serialize_tensor_value_without_raw_encoding(self):
+    x = np.array([10, 20, 30], dtype=np.int32)
+    value_proto, value_type = executor_service_utils.serialize_tensor_value(
+        x, use_raw_encoding=False)
+    self.assertEqual(value_proto.WhichOneof('value'), 'tensor')
+    self.assertEqual(str(value_type), 'int32[3]')
+    y, type_spec = executor_service_utils.deserialize_tensor_value(value_proto)
+    self.assertEqual(str(type_spec), 'int32[3]')
+    self.assertTrue(np.array_equal(x, y))
+
+  def test_serialize_deserialize_string_tensor_value(self):
+    x = np.array([b'a', b'bc'])
+    value_proto, value_type = executor_service_utils.serialize_tensor_value(x)
+    self.assertEqual(value_proto.WhichOneof('value'), 'tensor')
+    self.assertEqual(str(value_type), 'string[2]')
+    y, _ = executor_service_utils.deserialize_tensor_value(value_proto)
+    self.assertTrue(np.array_equal(x, y))
+
+  def test_deserialize_raw_tensor_value_with_bad_content_size(self):
+    value_proto = executor_pb2.Value(
+        raw_tensor=executor_pb2.Value.RawTensor(
+            dtype=tf.int32.as_datatype_enum, dims=[3], content=b'\x00' * 8))
+    with self.assertRaises(ValueError):
+      executor_service_utils.deserialize_tensor_value(value_proto)
+
   def test_serialize_deserialize_computation_value(self):
 
     @computations.tf_computation
@@ -86,6 +135,29 @@ class ExecutorServiceUtilsTest(absltest.TestCase):
     self.assertIsInstance(comp, computation_pb2.Computation)
     self.assertEqual(str(type_spec), '( -> int32)')
 
+  def test_get_computation_digest(self):
+
+    @computations.tf_computation
+    def comp1():
+      return tf.constant(10)
+
+    @computations.tf_computation
+    def comp2():
+      return tf.constant(20)
+
+    value_proto1, _ = executor_service_utils.serialize_value(comp1)
+    value_proto2, _ = executor_service_utils.serialize_value(comp2)
+    digest1 = executor_service_utils.get_computation_digest(
+        value_proto1.computation)
+    digest2 = executor_service_utils.get_computation_digest(
+        value_proto2.computation)
+    self.assertLen(digest1, 64)
+    self.assertNotEqual(digest1, digest2)
+    copy = computation_pb2.Computation.FromString(
+        value_proto1.computation.SerializeToString())
+    self.assertEqual(
+        executor_service_utils.get_computation_digest(copy), digest1)
+
   def test_serialize_deserialize_nested_tuple_value_with_names(self):
     x = collections.OrderedDict([('a', 10), ('b', [20, 30]),
                                  ('c', collections.OrderedDict([('d', 40)]))])
@@ -110,6 +182,54 @@ class ExecutorServiceUtilsTest(absltest.TestCase):
     self.assertEqual(str(type_spec), str(x_type))
     self.assertCountEqual(y, (10, 20))
 
+  def test_serialize_deserialize_value_in_chunks(self):
+    x = collections.OrderedDict([
+        ('a', np.arange(1000, dtype=np.float32).reshape([10, 100])),
+        ('b', [np.int64(5), np.array([b'x', b'y'])]),
+        ('c', np.zeros([0, 3], dtype=np.int32)),
+    ])
+    x_type = computation_types.to_type(
+        collections.OrderedDict([('a', (tf.float32, [10, 100])),
+                                 ('b', [tf.int64, (tf.string, [2])]),
+                                 ('c', (tf.int32, [0, 3]))]))
+    chunks = list(
+        executor_service_utils.serialize_value_to_chunks(
+            x, x_type, chunk_size=256))
+    self.assertEqual([c.WhichOneof('chunk') for c in chunks[:3]],
+                     ['tuple_header', 'tensor_header', 'tensor_content'])
+    content_chunks = [
+        c for c in chunks if c.WhichOneof('chunk') == 'tensor_content'
+    ]
+    # 16 chunks for the content of 'a', and one for the int64 scalar.
+    self.assertLen(content_chunks, 17)
+    for c in content_chunks:
+      self.assertLessEqual(len(c.tensor_content), 256)
+    y, type_spec = executor_service_utils.deserialize_value_from_chunks(
+        iter(chunks))
+    self.assertEqual(str(type_spec), str(x_type))
+    self.assertTrue(np.array_equal(y.a, x['a']))
+    self.assertEqual(y.b[0], 5)
+    self.assertTrue(np.array_equal(y.b[1], x['b'][1]))
+    self.assertEqual(y.c.shape, (0, 3))
+
+  def test_deserialize_value_from_truncated_chunks(self):
+    x = np.arange(100, dtype=np.int32)
+    chunks = list(
+        executor_service_utils.serialize_value_to_chunks(
+            x, chunk_size=100))
+    with self.assertRaises(ValueError):
+      executor_service_utils.deserialize_value_from_chunks(chunks[:-1])
+
+  def test_deserialize_value_from_chunks_with_trailing_chunks(self):
+    x = np.arange(100, dtype=np.int32)
+    chunks = list(executor_service_utils.serialize_value_to_chunks(x))
+    with self.assertRaises(ValueError):
+      executor_service_utils.deserialize_value_from_chunks(chunks + chunks)
+
+  def test_serialize_value_to_chunks_fails_with_bad_chunk_size(self):
+    with self.assertRaises(ValueError):
+      list(executor_service_utils.serialize_value_to_chunks(10, tf.int32, 0))
+
 
 if __name__ == '__main__':
   tf.compat.v1.enable_v2_behavior()
@@ -20,18 +20,27 @@ from tensorflow_federated.python.core.impl import eager_executor
 from tensorflow_federated.python.core.impl import federated_executor
 from tensorflow_federated.python.core.impl import lambda_executor
 from tensorflow_federated.python.core.impl import placement_literals
+from tensorflow_federated.python.core.impl import tracing_executor
 
 
-def create_local_executor(num_clients):
+def create_local_executor(num_clients, max_workers=None, tracer=None):
   """Constructs an executor to execute computations on the local machine.
 
   The initial temporary implementation requires that the number of clients be
   specified in advance. This limitation will be removed in the near future.
 
+  All the concurrent executors in the constructed stack share a single pool of
+  worker threads, so the number of threads does not grow with `num_clients`.
+
   NOTE: This function is only available in Python 3.
 
   Args:
     num_clients: The number of clients.
+    max_workers: The optional number of worker threads to run the computations
+      on. Defaults to the number of processors on the machine.
+    tracer: An optional instance of `tracing_executor.ExecutionTracer`. If
+      specified, each layer of the constructed stack is wrapped in a
+      `tracing_executor.TracingExecutor` that records its spans in `tracer`.
 
   Returns:
     An instance of `tff.framework.Executor` for single-machine use only.
@@ -40,14 +49,35 @@ def create_local_executor(num_clients):
   # needs to go away once we flesh out all the remaining bits ad pieces.
 
   py_typecheck.check_type(num_clients, int)
-  bottom_ex = lambda_executor.LambdaExecutor(eager_executor.EagerExecutor())
+  if tracer is not None:
+    py_typecheck.check_type(tracer, tracing_executor.ExecutionTracer)
+
+  def _trace(ex, layer, placement=None, client_index=None):
+    if tracer is None:
+      return ex
+    return tracing_executor.TracingExecutor(ex, tracer, layer, placement,
+                                            client_index)
+
+  bottom_ex = lambda_executor.LambdaExecutor(
+      _trace(eager_executor.EagerExecutor(), 'eager'))
+  event_loop_pool = concurrent_executor.EventLoopPool(max_workers)
 
-  def _make(n):
-    return [concurrent_executor.ConcurrentExecutor(bottom_ex) for _ in range(n)]
+  def _make(n, placement=None):
+    executors = []
+    for index in range(n):
+      client_index = index if placement is placement_literals.CLIENTS else None
+      executors.append(
+          _trace(
+              concurrent_executor.ConcurrentExecutor(bottom_ex,
+                                                     event_loop_pool),
+              'concurrent', placement, client_index))
+    return executors
 
-  return lambda_executor.LambdaExecutor(
-      federated_executor.FederatedExecutor({
-          None: _make(1),
-          placement_literals.SERVER: _make(1),
-          placement_literals.CLIENTS: _make(num_clients)
-      }))
+  federated_ex = federated_executor.FederatedExecutor({
+      None: _make(1),
+      placement_literals.SERVER: _make(1, placement_literals.SERVER),
+      placement_literals.CLIENTS: _make(num_clients, placement_literals.CLIENTS)
+  })
+  return _trace(
+      lambda_executor.LambdaExecutor(_trace(federated_ex, 'federated')),
+      'lambda')
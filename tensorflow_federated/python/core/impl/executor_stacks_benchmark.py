@@ -0,0 +1,359 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark for the scaling of the executor stacks.
+
+Each benchmark sweeps the number of clients, the number of model parameters,
+and the executor stack the computation runs on, and reports the latency
+percentiles, the peak resident set size, and the peak number of threads of the
+process for every configuration. The results are reported through
+`tf.test.Benchmark.report_benchmark`, and thus written in machine-readable form
+to the files prefixed with `TEST_REPORT_FILE_PREFIX`, if this environment
+variable is set.
+"""
+
+import collections
+import contextlib
+import os
+import resource
+import threading
+import time
+
+import grpc
+from grpc.framework.foundation import logging_pool
+import numpy as np
+import portpicker
+import tensorflow as tf
+
+from tensorflow_federated.proto.v0 import executor_pb2_grpc
+from tensorflow_federated.python.common_libs import test
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.api import computations
+from tensorflow_federated.python.core.api import intrinsics
+from tensorflow_federated.python.core.impl import executor_service
+from tensorflow_federated.python.core.impl import executor_stacks
+from tensorflow_federated.python.core.impl import remote_executor
+from tensorflow_federated.python.core.impl import set_default_executor
+from tensorflow_federated.python.core.impl import type_constructors
+
+CLIENT_COUNTS = [10, 100, 1000, 10000]
+
+# Model sizes, in number of float32 parameters.
+MODEL_SIZES = [10, 10000, 1000000]
+
+# Configurations whose clients would hold more than this number of parameters
+# in total are skipped, so that the sweep fits in the memory of one machine.
+MAX_TOTAL_PARAMS = 100000000
+
+# The reference executor is not meant to scale, and is only run with at most
+# this many clients, as a baseline.
+MAX_REFERENCE_CLIENTS = 100
+
+STACKS = ['reference', 'local', 'local_concurrent', 'remote']
+
+NUM_ITERS = 10
+
+NUM_LOCAL_STEPS = 5
+
+
+@contextlib.contextmanager
+def _executor_context(stack, num_clients):
+  """Installs the executor `stack` for `num_clients` as the default one."""
+  server = None
+  channel = None
+  if stack == 'reference':
+    executor = None
+  elif stack == 'local':
+    executor = executor_stacks.create_local_executor(num_clients, max_workers=1)
+  elif stack == 'local_concurrent':
+    executor = executor_stacks.create_local_executor(num_clients)
+  elif stack == 'remote':
+    port = portpicker.pick_unused_port()
+    server = grpc.server(logging_pool.pool(max_workers=1))
+    server.add_insecure_port('[::]:{}'.format(port))
+    service = executor_service.ExecutorService(
+        executor_stacks.create_local_executor(num_clients))
+    executor_pb2_grpc.add_ExecutorServicer_to_server(service, server)
+    server.start()
+    channel = grpc.insecure_channel('localhost:{}'.format(port))
+    executor = remote_executor.RemoteExecutor(channel)
+  else:
+    raise ValueError('Unknown executor stack {}.'.format(stack))
+  set_default_executor.set_default_executor(executor)
+  try:
+    yield
+  finally:
+    set_default_executor.set_default_executor()
+    if channel is not None:
+      try:
+        channel.close()
+      except AttributeError:
+        del channel
+    if server is not None:
+      server.stop(None)
+
+
+def _get_rss_bytes():
+  """Returns the current resident set size of the process, if available."""
+  try:
+    with open('/proc/self/statm') as f:
+      return int(f.read().split()[1]) * resource.getpagesize()
+  except (IOError, OSError):
+    # Only the high-water mark over the lifetime of the process is portable.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _get_thread_count():
+  """Returns the number of threads of the process, including native ones."""
+  try:
+    return len(os.listdir('/proc/self/task'))
+  except (IOError, OSError):
+    return threading.active_count()
+
+
+class _ResourceMonitor(object):
+  """Samples the peak memory and thread usage of the process in a thread."""
+
+  def __init__(self, interval=0.01):
+    self._interval = interval
+    self._stopped = threading.Event()
+    self._thread = threading.Thread(target=self._run)
+    self._thread.daemon = True
+    self.peak_rss_bytes = 0
+    self.peak_thread_count = 0
+
+  def _sample(self):
+    self.peak_rss_bytes = max(self.peak_rss_bytes, _get_rss_bytes())
+    # The thread of the monitor itself is not counted.
+    self.peak_thread_count = max(self.peak_thread_count,
+                                 _get_thread_count() - 1)
+
+  def _run(self):
+    while not self._stopped.wait(self._interval):
+      self._sample()
+
+  def __enter__(self):
+    self._thread.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self._stopped.set()
+    self._thread.join()
+    self._sample()
+
+
+def _model_type(num_params):
+  return computation_types.TensorType(tf.float32, [num_params])
+
+
+def _data_type(num_params):
+  return computation_types.NamedTupleType([('x', _model_type(num_params)),
+                                           ('y', tf.float32)])
+
+
+def _model(num_params):
+  return np.random.random_sample([num_params]).astype(np.float32)
+
+
+def _client_data(num_params):
+  return collections.OrderedDict([('x', _model(num_params)),
+                                  ('y', np.float32(1.0))])
+
+
+def _client_models_args(num_params):
+  """Returns a function of the number of clients that makes the arguments."""
+  return lambda num_clients: [[_model(num_params)] * num_clients]
+
+
+def _build_add(num_params):
+
+  @computations.tf_computation(_model_type(num_params),
+                               _model_type(num_params))
+  def add(x, y):
+    return x + y
+
+  return add
+
+
+def _build_local_train(num_params):
+  """Returns a few steps of gradient descent on a linear regression loss."""
+
+  @computations.tf_computation(_model_type(num_params), _data_type(num_params))
+  def local_train(model, data):
+    for _ in range(NUM_LOCAL_STEPS):
+      error = tf.reduce_sum(model * data.x) - data.y
+      model = model - 0.01 * 2.0 * error * data.x
+    return model
+
+  return local_train
+
+
+def _build_federated_broadcast(num_params):
+
+  @computations.federated_computation(
+      type_constructors.at_server(_model_type(num_params)))
+  def comp(x):
+    return intrinsics.federated_broadcast(x)
+
+  return comp, lambda num_clients: [_model(num_params)]
+
+
+def _build_federated_map(num_params):
+
+  @computations.tf_computation(_model_type(num_params))
+  def add_one(x):
+    return x + 1.0
+
+  @computations.federated_computation(
+      type_constructors.at_clients(_model_type(num_params)))
+  def comp(x):
+    return intrinsics.federated_map(add_one, x)
+
+  return comp, _client_models_args(num_params)
+
+
+def _build_federated_sum(num_params):
+
+  @computations.federated_computation(
+      type_constructors.at_clients(_model_type(num_params)))
+  def comp(x):
+    return intrinsics.federated_sum(x)
+
+  return comp, _client_models_args(num_params)
+
+
+def _build_federated_mean(num_params):
+
+  @computations.federated_computation(
+      type_constructors.at_clients(_model_type(num_params)))
+  def comp(x):
+    return intrinsics.federated_mean(x)
+
+  return comp, _client_models_args(num_params)
+
+
+def _build_federated_aggregate(num_params):
+
+  @computations.tf_computation
+  def zeros():
+    return tf.zeros([num_params], dtype=tf.float32)
+
+  add = _build_add(num_params)
+
+  @computations.tf_computation(_model_type(num_params))
+  def report(x):
+    return tf.identity(x)
+
+  @computations.federated_computation(
+      type_constructors.at_clients(_model_type(num_params)))
+  def comp(x):
+    return intrinsics.federated_aggregate(x, zeros(), add, add, report)
+
+  return comp, _client_models_args(num_params)
+
+
+def _build_federated_zip(num_params):
+
+  @computations.federated_computation(
+      type_constructors.at_clients(_model_type(num_params)))
+  def comp(x):
+    return intrinsics.federated_zip([x, x])
+
+  return comp, _client_models_args(num_params)
+
+
+def _build_federated_averaging_round(num_params):
+  """Returns a round of federated averaging of a linear regression model."""
+  local_train = _build_local_train(num_params)
+
+  @computations.federated_computation(
+      type_constructors.at_server(_model_type(num_params)),
+      type_constructors.at_clients(_data_type(num_params)))
+  def comp(model, data):
+    return intrinsics.federated_mean(
+        intrinsics.federated_map(
+            local_train, [intrinsics.federated_broadcast(model), data]))
+
+  def make_args(num_clients):
+    return [_model(num_params), [_client_data(num_params)] * num_clients]
+
+  return comp, make_args
+
+
+class ExecutorStacksBenchmark(tf.test.Benchmark):
+  """Measures how the executor stacks scale with clients and model sizes."""
+
+  def _run_config(self, name, comp, args, stack, num_clients, num_params):
+    with _executor_context(stack, num_clients):
+      # The first invocation also includes tracing and compilation.
+      comp(*args)
+      times = []
+      with _ResourceMonitor() as monitor:
+        for _ in range(NUM_ITERS):
+          start = time.time()
+          comp(*args)
+          times.append(time.time() - start)
+    p50, p90, p99 = np.percentile(times, [50, 90, 99])
+    self.report_benchmark(
+        name='{}, {} stack, {} clients, {} parameters'.format(
+            name, stack, num_clients, num_params),
+        wall_time=np.mean(times),
+        iters=NUM_ITERS,
+        extras={
+            'p50_latency': p50,
+            'p90_latency': p90,
+            'p99_latency': p99,
+            'std_dev': np.std(times),
+            'peak_rss_megabytes': monitor.peak_rss_bytes / float(1 << 20),
+            'peak_thread_count': monitor.peak_thread_count,
+        })
+
+  def _benchmark(self, name, build_fn):
+    """Runs the computation from `build_fn` in every configuration."""
+    for num_params in MODEL_SIZES:
+      comp, make_args = build_fn(num_params)
+      for num_clients in CLIENT_COUNTS:
+        if num_clients * num_params > MAX_TOTAL_PARAMS:
+          continue
+        args = make_args(num_clients)
+        for stack in STACKS:
+          if stack == 'reference' and num_clients > MAX_REFERENCE_CLIENTS:
+            continue
+          self._run_config(name, comp, args, stack, num_clients, num_params)
+
+  def benchmark_federated_broadcast(self):
+    self._benchmark('federated_broadcast', _build_federated_broadcast)
+
+  def benchmark_federated_map(self):
+    self._benchmark('federated_map', _build_federated_map)
+
+  def benchmark_federated_sum(self):
+    self._benchmark('federated_sum', _build_federated_sum)
+
+  def benchmark_federated_mean(self):
+    self._benchmark('federated_mean', _build_federated_mean)
+
+  def benchmark_federated_aggregate(self):
+    self._benchmark('federated_aggregate', _build_federated_aggregate)
+
+  def benchmark_federated_zip(self):
+    self._benchmark('federated_zip', _build_federated_zip)
+
+  def benchmark_federated_averaging_round(self):
+    self._benchmark('federated_averaging_round',
+                    _build_federated_averaging_round)
+
+
+if __name__ == '__main__':
+  test.main()
@@ -14,6 +14,8 @@
 # limitations under the License.
 """Tests for executor_stacks.py."""
 
+import threading
+
 from absl.testing import absltest
 import numpy as np
 import tensorflow as tf
@@ -68,6 +70,12 @@ class ExecutorStacksTest(absltest.TestCase):
     self.assertAlmostEqual(result, 8.333, places=3)
     set_default_executor.set_default_executor()
 
+  def test_thread_count_does_not_grow_with_num_clients(self):
+    num_threads_before = threading.active_count()
+    executor = executor_stacks.create_local_executor(100, max_workers=4)
+    self.assertLessEqual(threading.active_count(), num_threads_before + 4)
+    del executor
+
   def test_with_mnist_training_example(self):
     executor_test_utils.test_mnist_training(
         self, executor_stacks.create_local_executor(1))
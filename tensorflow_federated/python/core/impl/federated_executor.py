@@ -15,24 +15,151 @@
 """An executor that handles federated types and federated operators."""
 
 import asyncio
+import collections
 
+from absl import logging
 import tensorflow as tf
 
 from tensorflow_federated.proto.v0 import computation_pb2 as pb
 from tensorflow_federated.python.common_libs import anonymous_tuple
 from tensorflow_federated.python.common_libs import py_typecheck
+from tensorflow_federated.python.common_libs import serialization_utils
 from tensorflow_federated.python.core.api import computation_types
 from tensorflow_federated.python.core.impl import computation_constructing_utils
 from tensorflow_federated.python.core.impl import computation_impl
 from tensorflow_federated.python.core.impl import executor_base
+from tensorflow_federated.python.core.impl import executor_service_utils
 from tensorflow_federated.python.core.impl import executor_value_base
+from tensorflow_federated.python.core.impl import graph_utils
 from tensorflow_federated.python.core.impl import intrinsic_defs
 from tensorflow_federated.python.core.impl import intrinsic_utils
 from tensorflow_federated.python.core.impl import placement_literals
+from tensorflow_federated.python.core.impl import tensorflow_deserialization
 from tensorflow_federated.python.core.impl import type_constructors
 from tensorflow_federated.python.core.impl import type_serialization
 from tensorflow_federated.python.core.impl import type_utils
 
+# The maximum number of mapped computations for which the federated executor
+# keeps the batched versions (see `batch_federated_map`).
+_MAX_BATCHED_FNS = 100
+
+
+def _to_shareable_value(value, type_spec):
+  """Converts a computed `value` into a form that children can share.
+
+  When executing eagerly, Numpy arrays and Python constants in `value` are
+  converted into eager tensors, so that the conversion does not need to be
+  repeated in each child executor the value is embedded in. Tuples are
+  converted element-wise, and all other values are returned unchanged.
+
+  Args:
+    value: A computed value, as returned by `ExecutorValue.compute()`.
+    type_spec: The TFF type of `value`.
+
+  Returns:
+    The converted value.
+  """
+  if not tf.executing_eagerly():
+    return value
+  if isinstance(type_spec, computation_types.TensorType):
+    if tf.is_tensor(value):
+      return value
+    return tf.convert_to_tensor(value, dtype=type_spec.dtype)
+  if (isinstance(type_spec, computation_types.NamedTupleType) and
+      isinstance(value, anonymous_tuple.AnonymousTuple)):
+    return anonymous_tuple.AnonymousTuple([
+        (k, _to_shareable_value(v, t)) for (k, v), (_, t) in zip(
+            anonymous_tuple.to_elements(value),
+            anonymous_tuple.to_elements(type_spec))
+    ])
+  return value
+
+
+def _get_reason_not_batchable(fn, fn_type):
+  """Returns why `fn` cannot be mapped with `tf.vectorized_map`, or `None`.
+
+  Args:
+    fn: An instance of `pb.Computation` to be mapped over client values.
+    fn_type: The type signature of `fn`.
+
+  Returns:
+    A string describing the reason why `fn` cannot be batched, or `None` if
+    there is no reason known upfront (vectorization may still fail).
+  """
+  if fn.WhichOneof('computation') != 'tensorflow':
+    return 'it is not a TensorFlow computation'
+  if fn_type.parameter is None:
+    return 'it has no parameter'
+  if fn.tensorflow.initialize_op:
+    return 'it declares variables'
+  for kind, spec in [('parameter', fn_type.parameter),
+                     ('result', fn_type.result)]:
+    for elem_type in anonymous_tuple.flatten(spec):
+      if not isinstance(elem_type, computation_types.TensorType):
+        return 'its {} contains a non-tensor {}'.format(kind, str(elem_type))
+      if not elem_type.shape.is_fully_defined():
+        return 'its {} contains a tensor {} of undefined shape'.format(
+            kind, str(elem_type))
+  return None
+
+
+def _make_batched_computation(fn, fn_type, num_clients):
+  """Builds a computation that maps `fn` over `num_clients` arguments at once.
+
+  The computation accepts a tuple with the arguments of all the clients, stacks
+  them along a new leading axis, invokes `fn` once with `tf.vectorized_map`, and
+  returns a tuple with the result of each client.
+
+  Args:
+    fn: An instance of `pb.Computation` for which `_get_reason_not_batchable`
+      returns `None`.
+    fn_type: The type signature of `fn`.
+    num_clients: The number of clients to map `fn` over.
+
+  Returns:
+    A tuple `(comp, comp_type)` of the batched `pb.Computation` and its type.
+
+  Raises:
+    ValueError, TypeError, NotImplementedError: If `fn` cannot be vectorized.
+  """
+  param_type = fn_type.parameter
+  result_type = fn_type.result
+  with tf.Graph().as_default() as graph:
+    arg, parameter_binding = graph_utils.stamp_parameter_in_graph(
+        'arg', computation_types.NamedTupleType([param_type] * num_clients),
+        graph)
+    stacked_args = [
+        tf.stack(list(x))
+        for x in zip(*[anonymous_tuple.flatten(a) for a in arg])
+    ]
+
+    def _call_one(flat_arg):
+      one_arg = anonymous_tuple.pack_sequence_as(param_type, list(flat_arg))
+      _, result = (
+          tensorflow_deserialization.deserialize_and_call_tf_computation(
+              fn, one_arg, graph))
+      return anonymous_tuple.flatten(result)
+
+    batched_results = tf.vectorized_map(_call_one, stacked_args)
+    results = anonymous_tuple.AnonymousTuple([
+        (None,
+         anonymous_tuple.pack_sequence_as(result_type,
+                                          [r[idx] for r in batched_results]))
+        for idx in range(num_clients)
+    ])
+    results_type, result_binding = graph_utils.capture_result_from_graph(
+        results, graph)
+  comp_type = computation_types.FunctionType(
+      computation_types.NamedTupleType([param_type] * num_clients),
+      results_type)
+  comp = pb.Computation(
+      type=type_serialization.serialize_type(comp_type),
+      tensorflow=pb.TensorFlow(
+          graph_def=serialization_utils.pack_graph_def(graph.as_graph_def()),
+          parameter=parameter_binding,
+          result=result_binding))
+  return comp, comp_type
+
 
 class FederatedExecutorValue(executor_value_base.ExecutorValue):
   """Represents a value embedded in the federated executor."""
@@ -136,6 +263,9 @@ class FederatedExecutor(executor_base.Executor):
   The initial implementation of the executor only supports the two basic types
   of placements (SERVER and CLIENTS), and does not have a built-in concept of
   intermediate aggregation, partitioning placements, clustering clients, etc.
+  The one exception is `federated_aggregate`, which can optionally be executed
+  as a tree of `merge` calls spread across the client executors (see the
+  `aggregation_fan_in` constructor argument).
 
   The initial implementation also does not attempt at performing optimizations
   in case when the constituents of this executor are either located on the same
@@ -151,7 +281,10 @@ class FederatedExecutor(executor_base.Executor):
   # TODO(b/134543154): Implement the commonly used aggregation intrinsics so we
   # can begin to use this executor in integration tests.
 
-  def __init__(self, target_executors):
+  def __init__(self,
+               target_executors,
+               aggregation_fan_in=None,
+               batch_federated_map=False):
     """Creates a federated executor backed by a collection of target executors.
 
     Args:
@@ -162,11 +295,47 @@ class FederatedExecutor(executor_base.Executor):
         there only is a single participant associated with that placement, as
         would typically be the case with `tff.SERVER`) or lists of target
         executors.
+      aggregation_fan_in: An optional integer greater than 1. If specified,
+        `federated_aggregate` runs `accumulate` in the executors of the
+        individual clients, and combines the partial results with `merge` in a
+        tree in which each node merges up to `aggregation_fan_in` partials, so
+        that the depth of the aggregation is logarithmic in the number of
+        clients. Only the final result is moved to the server, where `report`
+        is applied. If `None` (the default), all client values are instead
+        folded sequentially with `accumulate` at the server.
+      batch_federated_map: Whether to try to run each `federated_map` of a
+        TensorFlow computation as a single vectorized call, rather than as a
+        separate call in the executor of each client. The arguments of all the
+        clients are stacked along a new leading axis, the computation is
+        invoked once with `tf.vectorized_map` in the executor of the first
+        client, and the results are split back and embedded in the executors
+        of the individual clients. This only pays off if all the client
+        executors live in this process (since the arguments and results pass
+        through it), and it only applies to computations with fully defined
+        tensor (or nested tuple of tensor) parameters and results that do not
+        declare any variables. Computations that cannot be batched are
+        reported in the log, and mapped one client at a time instead.
 
     Raises:
       ValueError: If the value is unrecognized (e.g., a nonexistent intrinsic).
     """
     py_typecheck.check_type(target_executors, dict)
+    if aggregation_fan_in is not None:
+      py_typecheck.check_type(aggregation_fan_in, int)
+      if aggregation_fan_in < 2:
+        raise ValueError(
+            'The aggregation fan-in must be at least 2, found {}.'.format(
+                str(aggregation_fan_in)))
+    self._aggregation_fan_in = aggregation_fan_in
+    py_typecheck.check_type(batch_federated_map, bool)
+    self._batch_federated_map = batch_federated_map
+    # The batched versions of the most recently mapped computations, keyed by
+    # the digest of the mapped `pb.Computation` and the number of clients, so
+    # that the equal computations delivered anew in each round are found. The
+    # batched version is `None` for the computations that have failed to
+    # batch, so that the failure is reported, and vectorization attempted,
+    # only once for each.
+    self._batched_fns = collections.OrderedDict()
     self._target_executors = {}
     for k, v in target_executors.items():
       if k is not None:
@@ -393,14 +562,38 @@ class FederatedExecutor(executor_base.Executor):
 
   async def _place(self, arg, placement):
     py_typecheck.check_type(placement, placement_literals.PlacementLiteral)
-    children = self._target_executors[placement]
-    val = await arg.internal_representation.compute()
     return FederatedExecutorValue(
-        await asyncio.gather(
-            *[c.create_value(val, arg.type_signature) for c in children]),
+        await self._broadcast(arg.internal_representation,
+                              self._target_executors[placement]),
         computation_types.FederatedType(
             arg.type_signature, placement, all_equal=True))
 
+  async def _broadcast(self, value, children):
+    """Embeds the same computed `value` in each of the `children`.
+
+    The value is computed only once, and when executing eagerly, any parts of
+    it that come back as Numpy arrays or Python constants are converted into
+    eager tensors up front, also only once. Since eager tensors are immutable,
+    all the children that live in this process share the very same tensors
+    (the eager executor embeds them without making a copy), so the memory
+    footprint does not grow with the number of children. Serialization only
+    happens in children that cross a process boundary (e.g., remote
+    executors).
+
+    Args:
+      value: An instance of `executor_value_base.ExecutorValue` embedded in one
+        of the child executors.
+      children: The list of child executors to embed the value in.
+
+    Returns:
+      A list of values embedded in the `children`, in the same order.
+    """
+    py_typecheck.check_type(value, executor_value_base.ExecutorValue)
+    type_spec = value.type_signature
+    val = _to_shareable_value(await value.compute(), type_spec)
+    return await asyncio.gather(
+        *[c.create_value(val, type_spec) for c in children])
+
   async def _map(self, arg, all_equal=None):
     py_typecheck.check_type(arg.internal_representation,
                             anonymous_tuple.AnonymousTuple)
@@ -422,6 +615,13 @@ class FederatedExecutor(executor_base.Executor):
     for v in val:
       py_typecheck.check_type(v, executor_value_base.ExecutorValue)
     children = self._target_executors[val_type.placement]
+    if self._batch_federated_map and not all_equal:
+      results = await self._map_batched(fn, fn_type, val, children)
+      if results is not None:
+        return FederatedExecutorValue(
+            results,
+            computation_types.FederatedType(
+                fn_type.result, val_type.placement, all_equal=all_equal))
     fns = await asyncio.gather(*[c.create_value(fn, fn_type) for c in children])
     results = await asyncio.gather(*[
         c.create_call(f, v) for c, (f, v) in zip(children, list(zip(fns, val)))
@@ -431,6 +631,66 @@ class FederatedExecutor(executor_base.Executor):
         computation_types.FederatedType(
             fn_type.result, val_type.placement, all_equal=all_equal))
 
+  async def _map_batched(self, fn, fn_type, vals, children):
+    """Attempts to map `fn` over `vals` with a single vectorized call.
+
+    The batched computation is invoked in the first of the `children`, and the
+    values of all the clients are moved there.
+
+    Args:
+      fn: An instance of `pb.Computation` to map.
+      fn_type: The type signature of `fn`.
+      vals: The list of client values to map `fn` over, embedded in the
+        respective `children`.
+      children: The list of client executors.
+
+    Returns:
+      The list of results embedded in the `children`, or `None` if `fn` cannot
+      be batched, in which case the caller should fall back to mapping it one
+      client at a time.
+    """
+    if len(children) < 2:
+      return None
+    batched_fn, batched_fn_type = self._get_batched_fn(fn, fn_type,
+                                                       len(children))
+    if batched_fn is None:
+      return None
+    args = await asyncio.gather(*[v.compute() for v in vals])
+    child = children[0]
+    arg = await child.create_value(
+        anonymous_tuple.AnonymousTuple([(None, a) for a in args]),
+        batched_fn_type.parameter)
+    batched_fn = await child.create_value(batched_fn, batched_fn_type)
+    results = await (await child.create_call(batched_fn, arg)).compute()
+    return await asyncio.gather(*[
+        c.create_value(results[idx], fn_type.result)
+        for idx, c in enumerate(children)
+    ])
+
+  def _get_batched_fn(self, fn, fn_type, num_clients):
+    """Returns the batched version of `fn` and its type, or `(None, None)`."""
+    key = (executor_service_utils.get_computation_digest(fn), num_clients)
+    if key in self._batched_fns:
+      self._batched_fns.move_to_end(key)
+      return self._batched_fns[key]
+    reason = _get_reason_not_batchable(fn, fn_type)
+    batched = (None, None)
+    if reason is None:
+      try:
+        batched = _make_batched_computation(fn, fn_type, num_clients)
+      except (ValueError, TypeError, NotImplementedError,
+              tf.errors.OpError) as e:
+        reason = 'vectorization failed with {}: {}'.format(
+            type(e).__name__, str(e))
+    if reason is not None:
+      logging.warning(
+          'Mapping %s one client at a time, since it cannot be batched: %s.',
+          str(fn_type), reason)
+    self._batched_fns[key] = batched
+    while len(self._batched_fns) > _MAX_BATCHED_FNS:
+      self._batched_fns.popitem(last=False)
+    return batched
+
   async def _zip(self, arg, placement, all_equal):
     py_typecheck.check_type(arg.type_signature,
                             computation_types.NamedTupleType)
@@ -481,12 +741,10 @@ class FederatedExecutor(executor_base.Executor):
     if len(arg.internal_representation) != 1:
       raise ValueError(
           'Cannot broadcast a with a non-singleton representation.')
-    val = await arg.internal_representation[0].compute()
     return FederatedExecutorValue(
-        await asyncio.gather(*[
-            c.create_value(val, arg.type_signature.member)
-            for c in self._target_executors[placement_literals.CLIENTS]
-        ]),
+        await self._broadcast(
+            arg.internal_representation[0],
+            self._target_executors[placement_literals.CLIENTS]),
         type_constructors.at_clients(arg.type_signature.member, all_equal=True))
 
   async def _compute_intrinsic_federated_zip_at_server(self, arg):
@@ -561,23 +819,23 @@ class FederatedExecutor(executor_base.Executor):
     py_typecheck.check_type(report_type, computation_types.FunctionType)
     type_utils.check_equivalent_types(report_type.parameter, zero_type)
 
-    # NOTE: This is a simple initial implementation that simply forwards this
-    # to `federated_reduce()`. The more complete implementation would be able
-    # to take advantage of the parallelism afforded by `merge` to reduce the
-    # cost from liner (with respect to the number of clients) to sub-linear.
-
-    # TODO(b/134543154): Expand this implementation to take advantage of the
-    # parallelism afforded by `merge`.
-
     val = arg.internal_representation[0]
     zero = arg.internal_representation[1]
     accumulate = arg.internal_representation[2]
-    pre_report = await self._compute_intrinsic_federated_reduce(
-        FederatedExecutorValue(
-            anonymous_tuple.AnonymousTuple([(None, val), (None, zero),
-                                            (None, accumulate)]),
-            computation_types.NamedTupleType(
-                [val_type, zero_type, accumulate_type])))
+    if self._aggregation_fan_in is not None:
+      pre_report = await self._aggregate_in_tree(
+          val, val_type, zero, zero_type, accumulate, accumulate_type,
+          arg.internal_representation[3], merge_type)
+    else:
+      # NOTE: Without a configured fan-in, this simply forwards to
+      # `federated_reduce()`, the cost of which is linear with respect to the
+      # number of clients.
+      pre_report = await self._compute_intrinsic_federated_reduce(
+          FederatedExecutorValue(
+              anonymous_tuple.AnonymousTuple([(None, val), (None, zero),
+                                              (None, accumulate)]),
+              computation_types.NamedTupleType(
+                  [val_type, zero_type, accumulate_type])))
 
     py_typecheck.check_type(pre_report.type_signature,
                             computation_types.FederatedType)
@@ -593,6 +851,81 @@ class FederatedExecutor(executor_base.Executor):
             computation_types.NamedTupleType(
                 [report_type, pre_report.type_signature])))
 
+  async def _aggregate_in_tree(self, val, val_type, zero, zero_type, accumulate,
+                               accumulate_type, merge, merge_type):
+    """Aggregates `val` with a tree of `merge` calls across target executors.
+
+    Each member constituent of `val` is first combined with `zero` using
+    `accumulate` in the executor it is embedded in. The resulting partials are
+    then merged in groups of up to `self._aggregation_fan_in`, with all groups
+    at a given level of the tree processed concurrently, and each group merged
+    in the executor that holds its first partial. The final result is moved to
+    the server.
+
+    Args:
+      val: A list of values embedded in the executors for `val_type.placement`.
+      val_type: An instance of `tff.FederatedType` of `val`.
+      zero: The zero of the aggregation, embedded in a target executor.
+      zero_type: The type of `zero`.
+      accumulate: The `accumulate` operator as an instance of `pb.Computation`.
+      accumulate_type: The type of `accumulate`.
+      merge: The `merge` operator as an instance of `pb.Computation`.
+      merge_type: The type of `merge`.
+
+    Returns:
+      An instance of `FederatedExecutorValue` with the merged result placed at
+      the server, to which `report` remains to be applied.
+    """
+    py_typecheck.check_type(val, list)
+    children = self._target_executors[val_type.placement]
+    if len(val) != len(children):
+      raise RuntimeError('Expected {} items, found {}.'.format(
+          len(children), len(val)))
+    server = self._target_executors[placement_literals.SERVER][0]
+    zero_val = await zero.compute()
+
+    async def _accumulate(child, item):
+      fn, initial = tuple(await asyncio.gather(
+          child.create_value(accumulate, accumulate_type),
+          child.create_value(zero_val, zero_type)))
+      return child, await child.create_call(
+          fn, await child.create_tuple(
+              anonymous_tuple.AnonymousTuple([(None, initial), (None, item)])))
+
+    async def _move(source, target, item):
+      if source is target:
+        return item
+      return await target.create_value(await item.compute(), zero_type)
+
+    async def _merge(group):
+      target = group[0][0]
+      fn = await target.create_value(merge, merge_type)
+      items = await asyncio.gather(*[_move(s, target, v) for s, v in group])
+      result = items[0]
+      for item in items[1:]:
+        result = await target.create_call(
+            fn, await target.create_tuple(
+                anonymous_tuple.AnonymousTuple([(None, result), (None, item)])))
+      return target, result
+
+    partials = await asyncio.gather(
+        *[_accumulate(c, v) for c, v in zip(children, val)])
+    fan_in = self._aggregation_fan_in
+    while len(partials) > 1:
+      partials = await asyncio.gather(*[
+          _merge(partials[idx:idx + fan_in])
+          for idx in range(0, len(partials), fan_in)
+      ])
+    if partials:
+      result = await _move(partials[0][0], server, partials[0][1])
+    else:
+      result = await server.create_value(zero_val, zero_type)
+    return FederatedExecutorValue([result],
+                                  computation_types.FederatedType(
+                                      zero_type,
+                                      placement_literals.SERVER,
+                                      all_equal=True))
+
   async def _compute_intrinsic_federated_sum(self, arg):
     py_typecheck.check_type(arg.type_signature, computation_types.FederatedType)
     zero, plus = tuple(await asyncio.gather(*[
@@ -15,9 +15,11 @@
 """Tests for federated_executor.py."""
 
 import asyncio
+import collections
 
 from absl.testing import absltest
 from absl.testing import parameterized
+import numpy as np
 import tensorflow as tf
 
 from tensorflow_federated.proto.v0 import computation_pb2 as pb
@@ -30,7 +32,9 @@ from tensorflow_federated.python.core.impl import computation_building_blocks
 from tensorflow_federated.python.core.impl import computation_constructing_utils
 from tensorflow_federated.python.core.impl import computation_impl
 from tensorflow_federated.python.core.impl import eager_executor
+from tensorflow_federated.python.core.impl import executor_base
 from tensorflow_federated.python.core.impl import executor_test_utils
+from tensorflow_federated.python.core.impl import executor_value_base
 from tensorflow_federated.python.core.impl import federated_executor
 from tensorflow_federated.python.core.impl import intrinsic_defs
 from tensorflow_federated.python.core.impl import lambda_executor
@@ -38,15 +42,135 @@ from tensorflow_federated.python.core.impl import type_constructors
 from tensorflow_federated.python.core.impl import type_serialization
 
 
-def _make_test_executor(num_clients=1, use_lambda_executor=False):
+def _make_test_executor(num_clients=1,
+                        use_lambda_executor=False,
+                        aggregation_fan_in=None):
   bottom_ex = eager_executor.EagerExecutor()
   if use_lambda_executor:
     bottom_ex = lambda_executor.LambdaExecutor(bottom_ex)
-  return federated_executor.FederatedExecutor({
-      placements.SERVER: bottom_ex,
-      placements.CLIENTS: [bottom_ex for _ in range(num_clients)],
-      None: bottom_ex
-  })
+  return federated_executor.FederatedExecutor(
+      {
+          placements.SERVER: bottom_ex,
+          placements.CLIENTS: [bottom_ex for _ in range(num_clients)],
+          None: bottom_ex
+      },
+      aggregation_fan_in=aggregation_fan_in)
+
+
+def _make_test_executor_with_distinct_children(num_clients, aggregation_fan_in):
+  return federated_executor.FederatedExecutor(
+      {
+          placements.SERVER: eager_executor.EagerExecutor(),
+          placements.CLIENTS: [
+              eager_executor.EagerExecutor() for _ in range(num_clients)
+          ],
+          None: eager_executor.EagerExecutor()
+      },
+      aggregation_fan_in=aggregation_fan_in)
+
+
+def _make_test_executor_with_batched_map(num_clients):
+  return federated_executor.FederatedExecutor(
+      {
+          placements.SERVER: eager_executor.EagerExecutor(),
+          placements.CLIENTS: [
+              eager_executor.EagerExecutor() for _ in range(num_clients)
+          ],
+          None: eager_executor.EagerExecutor()
+      },
+      batch_federated_map=True)
+
+
+async def _federated_map(ex, fn, client_values, copy_fn=False):
+  """Maps `fn` over the list of `client_values` embedded in `ex`.
+
+  Args:
+    ex: The executor.
+    fn: The computation to map.
+    client_values: The list of the values of the clients.
+    copy_fn: Whether to embed a new copy of the serialized `fn`, as delivered
+      in each round of a simulation, rather than `fn` itself.
+
+  Returns:
+    The federated value of the result.
+  """
+  fn_type = fn.type_signature
+  arg_type = type_constructors.at_clients(fn_type.parameter)
+  if copy_fn:
+    fn_proto = pb.Computation()
+    fn_proto.CopyFrom(computation_impl.ComputationImpl.get_proto(fn))
+    fn_val = await ex.create_value(fn_proto, fn_type)
+  else:
+    fn_val = await ex.create_value(fn)
+  arg_val = await ex.create_value(client_values, arg_type)
+  map_val = await ex.create_value(
+      intrinsic_defs.FEDERATED_MAP,
+      computation_types.FunctionType(
+          [fn_type, arg_type], type_constructors.at_clients(fn_type.result)))
+  return await ex.create_call(
+      map_val, await ex.create_tuple(
+          anonymous_tuple.AnonymousTuple([(None, fn_val), (None, arg_val)])))
+
+
+class HostExecutorValue(executor_value_base.ExecutorValue):
+  """A value that computes to a Numpy array, like a remote value does."""
+
+  def __init__(self, value, type_spec):
+    self._value = value
+    self._type_signature = type_spec
+    self.num_computes = 0
+
+  @property
+  def type_signature(self):
+    return self._type_signature
+
+  async def compute(self):
+    self.num_computes += 1
+    return self._value
+
+
+class CallCountingExecutor(executor_base.Executor):
+  """An eager executor that counts the calls it is asked to make."""
+
+  def __init__(self):
+    self._target = eager_executor.EagerExecutor()
+    self.num_calls = 0
+
+  async def create_value(self, value, type_spec=None):
+    return await self._target.create_value(value, type_spec)
+
+  async def create_call(self, comp, arg=None):
+    self.num_calls += 1
+    return await self._target.create_call(comp, arg)
+
+  async def create_tuple(self, elements):
+    return await self._target.create_tuple(elements)
+
+  async def create_selection(self, source, index=None, name=None):
+    return await self._target.create_selection(source, index, name)
+
+
+class HostExecutor(executor_base.Executor):
+  """Embeds values that compute to Numpy arrays, like a remote executor does."""
+
+  def __init__(self):
+    self.values = []
+
+  async def create_value(self, value, type_spec=None):
+    if tf.is_tensor(value):
+      value = value.numpy()
+    val = HostExecutorValue(value, type_spec)
+    self.values.append(val)
+    return val
+
+  async def create_call(self, comp, arg=None):
+    raise NotImplementedError
+
+  async def create_tuple(self, elements):
+    raise NotImplementedError
+
+  async def create_selection(self, source, index=None, name=None):
+    raise NotImplementedError
 
 
 class FederatedExecutorTest(parameterized.TestCase):
@@ -275,6 +399,91 @@ class FederatedExecutorTest(parameterized.TestCase):
       self.assertIsInstance(v, eager_executor.EagerValue)
       self.assertEqual(v.internal_representation.numpy(), 11)
 
+  @parameterized.named_parameters(('unbatched', False), ('batched', True))
+  def test_federated_map_with_tuples(self, batch_federated_map):
+    loop = asyncio.get_event_loop()
+    clients = [CallCountingExecutor() for _ in range(4)]
+    ex = federated_executor.FederatedExecutor(
+        {
+            placements.SERVER: eager_executor.EagerExecutor(),
+            placements.CLIENTS: clients,
+            None: eager_executor.EagerExecutor()
+        },
+        batch_federated_map=batch_federated_map)
+
+    @computations.tf_computation([('a', tf.float32), ('b', (tf.int32, [2]))])
+    def scale(a, b):
+      return a * tf.cast(b, tf.float32)
+
+    val = loop.run_until_complete(
+        _federated_map(ex, scale, [
+            collections.OrderedDict([('a', float(x)), ('b', [x, x + 1])])
+            for x in range(4)
+        ]))
+    self.assertEqual(str(val.type_signature), '{float32[2]}@CLIENTS')
+    self.assertLen(val.internal_representation, 4)
+    for x, v in enumerate(val.internal_representation):
+      self.assertIsInstance(v, eager_executor.EagerValue)
+      self.assertEqual(
+          list(v.internal_representation.numpy()), [x * x, x * (x + 1)])
+    # The batched map invokes a single vectorized call in the first client.
+    expected_num_calls = [1, 0, 0, 0] if batch_federated_map else [1] * 4
+    self.assertEqual([c.num_calls for c in clients], expected_num_calls)
+
+  def test_batched_federated_map_batches_equal_computations_once(self):
+    loop = asyncio.get_event_loop()
+    ex = _make_test_executor_with_batched_map(3)
+
+    @computations.tf_computation(tf.int32)
+    def add_variable(x):
+      v = tf.Variable(10, dtype=tf.int32)
+      return x + v
+
+    with self.assertLogs(level='WARNING') as logs:
+      for _ in range(3):
+        val = loop.run_until_complete(
+            _federated_map(ex, add_variable, [1, 2, 3], copy_fn=True))
+    # Vectorization is attempted, and the failure reported, only once.
+    self.assertLen(logs.output, 1)
+    results = val.internal_representation
+    self.assertEqual([v.internal_representation.numpy() for v in results],
+                     [11, 12, 13])
+
+  def test_batched_federated_map_falls_back_for_undefined_shapes(self):
+    loop = asyncio.get_event_loop()
+    ex = _make_test_executor_with_batched_map(3)
+
+    @computations.tf_computation(computation_types.TensorType(tf.int32, [None]))
+    def total(x):
+      return tf.reduce_sum(x)
+
+    with self.assertLogs(level='WARNING') as logs:
+      val = loop.run_until_complete(
+          _federated_map(ex, total, [
+              np.array(x, dtype=np.int32) for x in [[1], [2, 3], [4, 5, 6]]
+          ]))
+    self.assertIn('undefined shape', ''.join(logs.output))
+    results = val.internal_representation
+    self.assertEqual([v.internal_representation.numpy() for v in results],
+                     [1, 5, 15])
+
+  def test_batched_federated_map_falls_back_for_variables(self):
+    loop = asyncio.get_event_loop()
+    ex = _make_test_executor_with_batched_map(3)
+
+    @computations.tf_computation(tf.int32)
+    def add_variable(x):
+      v = tf.Variable(10, dtype=tf.int32)
+      return x + v
+
+    with self.assertLogs(level='WARNING') as logs:
+      val = loop.run_until_complete(
+          _federated_map(ex, add_variable, [1, 2, 3]))
+    self.assertIn('declares variables', ''.join(logs.output))
+    results = val.internal_representation
+    self.assertEqual([v.internal_representation.numpy() for v in results],
+                     [11, 12, 13])
+
   def test_federated_broadcast(self):
     loop = asyncio.get_event_loop()
     ex = _make_test_executor(3)
@@ -293,6 +502,39 @@ class FederatedExecutorTest(parameterized.TestCase):
       self.assertIsInstance(v, eager_executor.EagerValue)
       self.assertEqual(v.internal_representation.numpy(), 10)
 
+  def test_federated_broadcast_shares_value_among_clients(self):
+    loop = asyncio.get_event_loop()
+    server_ex = HostExecutor()
+    ex = federated_executor.FederatedExecutor({
+        placements.SERVER: server_ex,
+        placements.CLIENTS: [
+            eager_executor.EagerExecutor() for _ in range(10)
+        ],
+        None: eager_executor.EagerExecutor()
+    })
+
+    @computations.tf_computation
+    def make_weights():
+      return tf.ones([100, 100], dtype=tf.float32)
+
+    @computations.federated_computation
+    def comp():
+      return intrinsics.federated_broadcast(
+          intrinsics.federated_value(make_weights(), placements.SERVER))
+
+    val = loop.run_until_complete(ex.create_value(comp))
+    self.assertEqual(str(val.type_signature), 'float32[100,100]@CLIENTS')
+    self.assertLen(val.internal_representation, 10)
+    # The server value computes to a Numpy array, which is converted into a
+    # single eager tensor that all the clients share.
+    self.assertLen(server_ex.values, 1)
+    self.assertEqual(server_ex.values[0].num_computes, 1)
+    tensors = [v.internal_representation for v in val.internal_representation]
+    for t in tensors:
+      self.assertIsInstance(t, tf.Tensor)
+      self.assertIs(t, tensors[0])
+    self.assertEqual(tensors[0].numpy().sum(), 10000.0)
+
   def test_federated_zip(self):
     loop = asyncio.get_event_loop()
     ex = _make_test_executor(3)
@@ -371,6 +613,42 @@ class FederatedExecutorTest(parameterized.TestCase):
     result = loop.run_until_complete(val.compute())
     self.assertEqual(result.numpy(), 31)
 
+  @parameterized.parameters((1, 2), (3, 2), (7, 2), (10, 3), (10, 16))
+  def test_federated_aggregate_in_tree(self, num_clients, fan_in):
+    loop = asyncio.get_event_loop()
+
+    @computations.tf_computation(tf.int32, tf.int32)
+    def add_numbers(x, y):
+      return x + y
+
+    @computations.tf_computation(tf.int32)
+    def add_one_because_why_not(x):
+      return x + 1
+
+    @computations.federated_computation(type_constructors.at_clients(tf.int32))
+    def comp(x):
+      return intrinsics.federated_aggregate(x, 0, add_numbers, add_numbers,
+                                            add_one_because_why_not)
+
+    for fed_ex in [
+        _make_test_executor(num_clients, aggregation_fan_in=fan_in),
+        _make_test_executor_with_distinct_children(num_clients, fan_in)
+    ]:
+      ex = lambda_executor.LambdaExecutor(fed_ex)
+      fn = loop.run_until_complete(ex.create_value(comp))
+      arg = loop.run_until_complete(
+          ex.create_value(
+              list(range(num_clients)),
+              type_constructors.at_clients(tf.int32)))
+      val = loop.run_until_complete(ex.create_call(fn, arg))
+      self.assertEqual(str(val.type_signature), 'int32@SERVER')
+      result = loop.run_until_complete(val.compute())
+      self.assertEqual(result.numpy(), sum(range(num_clients)) + 1)
+
+  def test_executor_constructor_fails_with_invalid_aggregation_fan_in(self):
+    with self.assertRaises(ValueError):
+      _make_test_executor(aggregation_fan_in=1)
+
   def test_federated_sum_with_integers(self):
     loop = asyncio.get_event_loop()
     ex = _make_test_executor(3)
@@ -1001,7 +1001,7 @@ def make_data_set_from_elements(graph, elements, element_type):
     return _work()
 
 
-def fetch_value_in_session(sess, value):
+def fetch_value_in_session(sess, value, feed_dict=None):
   """Fetches `value` in `session`.
 
   Args:
@@ -1009,6 +1009,7 @@ def fetch_value_in_session(sess, value):
     value: A Python object of a form analogous to that constructed by the
       function `assemble_result_from_graph`, made of tensors and anononymous
       tuples, or a `tf.data.Dataset`.
+    feed_dict: An optional dictionary of values to feed in `session.run()`.
 
   Returns:
     A Python object with structure similar to `value`, but with tensors
@@ -1029,7 +1030,7 @@ def fetch_value_in_session(sess, value):
     elements = []
     while True:
       try:
-        elements.append(sess.run(next_element))
+        elements.append(sess.run(next_element, feed_dict=feed_dict))
       except tf.errors.OutOfRangeError:
         break
     return elements
@@ -1039,7 +1040,7 @@ def fetch_value_in_session(sess, value):
     flat_tensors = []
     for idx, v in enumerate(flattened_value):
       if isinstance(v, DATASET_REPRESENTATION_TYPES):
-        dataset_tensors = fetch_value_in_session(sess, v)
+        dataset_tensors = fetch_value_in_session(sess, v, feed_dict)
         if not dataset_tensors:
           # An empty list has been returned; we must pack the shape information
           # back in or the result won't typecheck.
@@ -1054,7 +1055,7 @@ def fetch_value_in_session(sess, value):
         flat_tensors.append(v)
       else:
         raise ValueError('Unsupported value type {}.'.format(str(v)))
-    flat_computed_tensors = sess.run(flat_tensors)
+    flat_computed_tensors = sess.run(flat_tensors, feed_dict=feed_dict)
     flattened_results = _interleave_dataset_results_and_tensors(
         dataset_results, flat_computed_tensors)
 
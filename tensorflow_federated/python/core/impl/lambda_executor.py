@@ -62,14 +62,16 @@ class LambdaExecutorScope(object):
       ValueError: If the name cannot be resolved.
     """
     py_typecheck.check_type(name, str)
-    value = self._symbols.get(str(name))
-    if value is not None:
-      return value
-    elif self._parent is not None:
-      return self._parent.resolve_reference(name)
-    else:
-      raise ValueError(
-          'The name \'{}\' is not defined in this scope.'.format(name))
+    # Each local in a block introduces a nested scope, so the chain of parents
+    # can be long, and is walked iteratively.
+    scope = self
+    while scope is not None:
+      value = scope._symbols.get(str(name))  # pylint: disable=protected-access
+      if value is not None:
+        return value
+      scope = scope._parent  # pylint: disable=protected-access
+    raise ValueError(
+        'The name \'{}\' is not defined in this scope.'.format(name))
 
 
 class LambdaExecutorValue(executor_value_base.ExecutorValue):
@@ -250,41 +252,48 @@ class LambdaExecutor(executor_base.Executor):
         raise ValueError('Either index or name must be present for selection.')
 
   async def create_call(self, comp, arg=None):
-    py_typecheck.check_type(comp, LambdaExecutorValue)
-    py_typecheck.check_type(comp.type_signature, computation_types.FunctionType)
-    param_type = comp.type_signature.parameter
-    if param_type is not None:
-      py_typecheck.check_type(arg, LambdaExecutorValue)
-      if not type_utils.is_assignable_from(param_type, arg.type_signature):
-        arg_type = type_utils.get_argument_type(arg.type_signature)
-        type_utils.check_assignable_from(param_type, arg_type)
-        return await self.create_call(comp, await self.create_call(arg))
-    else:
-      py_typecheck.check_none(arg)
-    comp_repr = comp.internal_representation
-    if isinstance(comp_repr, executor_value_base.ExecutorValue):
-      delegated_arg = await self._delegate(arg) if arg is not None else None
-      return LambdaExecutorValue(await self._target_executor.create_call(
-          comp_repr, delegated_arg))
-    elif callable(comp_repr):
-      return await comp_repr(arg)
-    else:
-      # An anonymous tuple could not possibly have a functional type signature,
-      # so this is the only case left to handle.
-      py_typecheck.check_type(comp_repr, pb.Computation)
-      eval_result = await self._evaluate(comp_repr, comp.scope)
-      py_typecheck.check_type(eval_result, LambdaExecutorValue)
-      if arg is not None:
-        py_typecheck.check_type(eval_result.type_signature,
-                                computation_types.FunctionType)
-        type_utils.check_assignable_from(eval_result.type_signature.parameter,
-                                         arg.type_signature)
-        return await self.create_call(eval_result, arg)
-      elif isinstance(eval_result.type_signature,
-                      computation_types.FunctionType):
-        return await self.create_call(eval_result, arg=None)
+    # Calls in tail positions (e.g., of the values of chained references, or of
+    # the results of evaluating unprocessed computations) are handled by the
+    # loop, rather than recursively, so that long chains do not lead to deeply
+    # nested coroutines.
+    while True:
+      py_typecheck.check_type(comp, LambdaExecutorValue)
+      py_typecheck.check_type(comp.type_signature,
+                              computation_types.FunctionType)
+      param_type = comp.type_signature.parameter
+      if param_type is not None:
+        py_typecheck.check_type(arg, LambdaExecutorValue)
+        if not type_utils.is_assignable_from(param_type, arg.type_signature):
+          arg_type = type_utils.get_argument_type(arg.type_signature)
+          type_utils.check_assignable_from(param_type, arg_type)
+          arg = await self.create_call(arg)
+          continue
+      else:
+        py_typecheck.check_none(arg)
+      comp_repr = comp.internal_representation
+      if isinstance(comp_repr, executor_value_base.ExecutorValue):
+        delegated_arg = await self._delegate(arg) if arg is not None else None
+        return LambdaExecutorValue(await self._target_executor.create_call(
+            comp_repr, delegated_arg))
+      elif callable(comp_repr):
+        return await comp_repr(arg)
       else:
-        return eval_result
+        # An anonymous tuple could not possibly have a functional type
+        # signature, so this is the only case left to handle.
+        py_typecheck.check_type(comp_repr, pb.Computation)
+        eval_result = await self._evaluate(comp_repr, comp.scope)
+        py_typecheck.check_type(eval_result, LambdaExecutorValue)
+        if arg is not None:
+          py_typecheck.check_type(eval_result.type_signature,
+                                  computation_types.FunctionType)
+          type_utils.check_assignable_from(
+              eval_result.type_signature.parameter, arg.type_signature)
+          comp = eval_result
+        elif isinstance(eval_result.type_signature,
+                        computation_types.FunctionType):
+          comp = eval_result
+        else:
+          return eval_result
 
   async def _delegate(self, value):
     """Delegates the entirety of `value` to the target executor.
@@ -346,6 +355,14 @@ class LambdaExecutor(executor_base.Executor):
     py_typecheck.check_type(comp, pb.Computation)
     if scope is not None:
       py_typecheck.check_type(scope, LambdaExecutorScope)
+    # The locals of (possibly nested) blocks are bound lazily, and the result
+    # evaluated in the same call, so that long chains of blocks do not lead to
+    # deeply nested calls of this method.
+    while comp.WhichOneof('computation') == 'block':
+      for loc in comp.block.local:
+        value = LambdaExecutorValue(loc.value, scope)
+        scope = LambdaExecutorScope({loc.name: value}, scope)
+      comp = comp.block.result
     which_computation = comp.WhichOneof('computation')
     if which_computation in ['tensorflow', 'intrinsic', 'data', 'placement']:
       return LambdaExecutorValue(await self._target_executor.create_value(
@@ -400,11 +417,6 @@ class LambdaExecutor(executor_base.Executor):
       values = await asyncio.gather(*values)
       return await self.create_tuple(
           anonymous_tuple.AnonymousTuple(list(zip(names, values))))
-    elif which_computation == 'block':
-      for loc in comp.block.local:
-        value = LambdaExecutorValue(loc.value, scope)
-        scope = LambdaExecutorScope({loc.name: value}, scope)
-      return await self._evaluate(comp.block.result, scope)
     else:
       raise NotImplementedError(
           'Unsupported computation type "{}".'.format(which_computation))
@@ -423,6 +435,11 @@ def _check_no_unbound_references(comp):
     ValueError: If `comp` has unbound references.
   """
   py_typecheck.check_type(comp, pb.Computation)
+  if comp.WhichOneof('computation') in ('tensorflow', 'intrinsic', 'data',
+                                        'placement'):
+    # These kinds of computations cannot contain references, so there is no
+    # need to parse them.
+    return
   blk = computation_building_blocks.ComputationBuildingBlock.from_proto(comp)
   unbound_map = transformations.get_map_of_unbound_references(blk)
   unbound_refs = unbound_map[blk]
@@ -24,6 +24,7 @@ from tensorflow_federated.python.core.api import computation_types
 from tensorflow_federated.python.core.api import computations
 from tensorflow_federated.python.core.api import intrinsics
 from tensorflow_federated.python.core.impl import computation_building_blocks
+from tensorflow_federated.python.core.impl import computation_test_utils
 from tensorflow_federated.python.core.impl import eager_executor
 from tensorflow_federated.python.core.impl import executor_test_utils
 from tensorflow_federated.python.core.impl import federated_executor
@@ -200,6 +201,33 @@ class LambdaExecutorTest(absltest.TestCase):
     result = loop.run_until_complete(v5.compute())
     self.assertEqual(result.numpy(), 12)
 
+  def test_with_block_with_many_chained_locals(self):
+    ex = lambda_executor.LambdaExecutor(eager_executor.EagerExecutor())
+    loop = asyncio.get_event_loop()
+
+    f_type = computation_types.FunctionType(tf.int32, tf.int32)
+    a = computation_building_blocks.Reference(
+        'a', computation_types.NamedTupleType([('f', f_type), ('x', tf.int32)]))
+    ret = computation_building_blocks.Call(
+        computation_building_blocks.Selection(a, name='f'),
+        computation_test_utils.create_block_with_chained_locals(
+            computation_building_blocks.Selection(a, name='x'), 10000))
+    comp = computation_building_blocks.Lambda(a.name, a.type_signature, ret)
+
+    @computations.tf_computation(tf.int32)
+    def add_one(x):
+      return x + 1
+
+    v1 = loop.run_until_complete(
+        ex.create_value(comp.proto, comp.type_signature))
+    v2 = loop.run_until_complete(ex.create_value(add_one))
+    v3 = loop.run_until_complete(ex.create_value(10, tf.int32))
+    v4 = loop.run_until_complete(
+        ex.create_tuple(anonymous_tuple.AnonymousTuple([('f', v2), ('x', v3)])))
+    v5 = loop.run_until_complete(ex.create_call(v1, v4))
+    result = loop.run_until_complete(v5.compute())
+    self.assertEqual(result.numpy(), 11)
+
   def test_with_federated_apply(self):
     eager_ex = eager_executor.EagerExecutor()
     federated_ex = federated_executor.FederatedExecutor({
@@ -26,6 +26,7 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import threading
 
 import numpy as np
 import six
@@ -318,9 +319,135 @@ def capture_computed_value_from_graph(value, type_spec):
   return ComputedValue(to_representation_for_type(value, type_spec), type_spec)
 
 
+def _is_tensor_or_tuple_type(type_spec):
+  """Returns `True` iff `type_spec` is made only of tensors and tuples."""
+  return type_utils.type_tree_contains_only(
+      type_spec,
+      (computation_types.TensorType, computation_types.NamedTupleType))
+
+
+def _stamp_placeholders_for_type(type_spec):
+  """Returns a structure of placeholders that matches `type_spec`."""
+  if isinstance(type_spec, computation_types.TensorType):
+    return tf.compat.v1.placeholder(type_spec.dtype, type_spec.shape)
+  else:
+    py_typecheck.check_type(type_spec, computation_types.NamedTupleType)
+    return anonymous_tuple.AnonymousTuple([
+        (k, _stamp_placeholders_for_type(v))
+        for k, v in anonymous_tuple.to_elements(type_spec)
+    ])
+
+
+class _ImportedTensorFlowComputation(object):
+  """A TensorFlow computation imported into a graph, with a live session.
+
+  The parameter of the computation is stamped into the graph as placeholders,
+  so the graph can be constructed once, and then run with different arguments.
+  """
+
+  def __init__(self, comp):
+    """Imports `comp` into a new graph, and opens a session to run it in.
+
+    Args:
+      comp: An instance of `computation_building_blocks.CompiledComputation`
+        with embedded TensorFlow code, the parameter and result of which are
+        made only of tensors and tuples.
+    """
+    self._parameter_type = comp.type_signature.parameter
+    self._result_type = comp.type_signature.result
+    with tf.Graph().as_default() as graph:
+      if self._parameter_type is not None:
+        stamped_arg = _stamp_placeholders_for_type(self._parameter_type)
+        self._placeholders = anonymous_tuple.flatten(stamped_arg)
+      else:
+        stamped_arg = None
+        self._placeholders = []
+      self._init_op, self._result = (
+          tensorflow_deserialization.deserialize_and_call_tf_computation(
+              comp.proto, stamped_arg, graph))
+    # Running the computation must not modify the graph.
+    graph.finalize()
+    self._session = tf.compat.v1.Session(graph=graph)
+
+  def close(self):
+    self._session.close()
+
+  def run(self, arg):
+    """Runs the computation with argument `arg`.
+
+    Args:
+      arg: An instance of `ComputedValue` that represents the argument, or
+        `None` if the compuation expects no argument.
+
+    Returns:
+      An instance of `ComputedValue` with the result.
+    """
+    if self._parameter_type is None:
+      if arg is not None:
+        raise TypeError(
+            'The computation declared no parameters; encountered an '
+            'unexpected argument {}.'.format(str(arg)))
+      feed_dict = None
+    else:
+      if arg is None:
+        raise TypeError(
+            'The computation declared a parameter of type {}, but the argument '
+            'was not supplied.'.format(str(self._parameter_type)))
+      type_utils.check_assignable_from(self._parameter_type,
+                                       arg.type_signature)
+      arg_value = to_representation_for_type(arg.value, arg.type_signature)
+      feed_dict = dict(
+          zip(self._placeholders, anonymous_tuple.flatten(arg_value)))
+    # The variables (if any) are re-initialized on every run, so that state
+    # does not carry over between runs, just as if the graph was new.
+    if self._init_op:
+      self._session.run(self._init_op, feed_dict=feed_dict)
+    result_val = graph_utils.fetch_value_in_session(self._session,
+                                                    self._result, feed_dict)
+    return capture_computed_value_from_graph(result_val, self._result_type)
+
+
+class _ImportedTensorFlowComputationCache(object):
+  """A bounded LRU cache of `_ImportedTensorFlowComputation`s.
+
+  The computations are keyed by their structural hash, so that structurally
+  identical computations share an entry, even if they are represented by
+  distinct `CompiledComputation` instances (e.g., across invocations).
+  """
+
+  def __init__(self, max_size):
+    self._max_size = max_size
+    self._lock = threading.Lock()
+    self._entries = collections.OrderedDict()
+
+  def get_or_import(self, comp):
+    """Returns the cached `_ImportedTensorFlowComputation` for `comp`."""
+    key = comp.structural_hash
+    with self._lock:
+      imported = self._entries.pop(key, None)
+      if imported is not None:
+        self._entries[key] = imported
+        return imported
+    imported = _ImportedTensorFlowComputation(comp)
+    with self._lock:
+      self._entries[key] = imported
+      while len(self._entries) > self._max_size:
+        _, evicted = self._entries.popitem(last=False)
+        evicted.close()
+    return imported
+
+
+_IMPORTED_COMPUTATION_CACHE = _ImportedTensorFlowComputationCache(max_size=100)
+
+
 def run_tensorflow(comp, arg):
   """Runs a compiled TensorFlow computation `comp` with argument `arg`.
 
+  Computations with parameters and results made only of tensors and tuples are
+  imported into a graph only once, and run in a long-lived session, with the
+  argument fed into placeholders. Other computations (e.g., ones that consume
+  or produce sequences) are stamped into a new graph on every call.
+
   Args:
     comp: An instance of `computation_building_blocks.CompiledComputation` with
       embedded TensorFlow code.
@@ -333,6 +460,10 @@ def run_tensorflow(comp, arg):
   py_typecheck.check_type(comp, computation_building_blocks.CompiledComputation)
   if arg is not None:
     py_typecheck.check_type(arg, ComputedValue)
+  parameter_type = comp.type_signature.parameter
+  if ((parameter_type is None or _is_tensor_or_tuple_type(parameter_type)) and
+      _is_tensor_or_tuple_type(comp.type_signature.result)):
+    return _IMPORTED_COMPUTATION_CACHE.get_or_import(comp).run(arg)
   with tf.Graph().as_default() as graph:
     stamped_arg = stamp_computed_value_into_graph(arg, graph)
     init_op, result = (
@@ -982,8 +1113,14 @@ class ReferenceExecutor(context_base.Context):
 
   def _generic_zero(self, type_spec):
     if isinstance(type_spec, computation_types.TensorType):
-      # TODO(b/113116813): Replace this with something more efficient, probably
-      # calling some helper method from Numpy.
+      if (type_spec.dtype.is_numpy_compatible and
+          type_spec.dtype != tf.string and type_spec.shape.is_fully_defined()):
+        zeros_val = np.zeros(
+            type_spec.shape.as_list(), dtype=type_spec.dtype.as_numpy_dtype)
+        if zeros_val.ndim == 0:
+          # Scalars are represented as Numpy scalars, not 0-d arrays.
+          zeros_val = zeros_val[()]
+        return ComputedValue(zeros_val, type_spec)
       with tf.Graph().as_default() as graph:
         zeros = tf.constant(0, type_spec.dtype, type_spec.shape)
         with tf.compat.v1.Session(graph=graph) as sess:
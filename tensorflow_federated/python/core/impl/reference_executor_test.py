@@ -757,6 +757,31 @@ class ReferenceExecutorTest(test.TestCase):
         str(bar.type_signature), '({int32}@CLIENTS -> {int32}@CLIENTS)')
     self.assertEqual(bar([1, 10, 3, 7, 2]), [2, 11, 4, 8, 3])
 
+  def test_federated_map_with_many_clients(self):
+
+    @computations.tf_computation(tf.int32)
+    def foo(x):
+      return x * 2
+
+    @computations.federated_computation(
+        computation_types.FederatedType(tf.int32, placements.CLIENTS))
+    def bar(x):
+      return intrinsics.federated_sum(intrinsics.federated_map(foo, x))
+
+    self.assertEqual(bar(list(range(500))), 2 * sum(range(500)))
+
+  def test_tf_computation_with_variable_is_reinitialized_on_every_call(self):
+
+    @computations.tf_computation(tf.int32)
+    def foo(x):
+      v = tf.Variable(10)
+      with tf.control_dependencies([v.assign_add(x)]):
+        return tf.identity(v.read_value())
+
+    self.assertEqual(foo(1), 11)
+    self.assertEqual(foo(1), 11)
+    self.assertEqual(foo(5), 15)
+
   def test_federated_map_all_equal_with_int(self):
 
     @computations.tf_computation(tf.int32)
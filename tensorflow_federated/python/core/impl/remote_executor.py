@@ -14,6 +14,15 @@
 # limitations under the License.
 """A local proxy for a remote executor service hosted on a separate machine."""
 
+import asyncio
+import collections
+from concurrent import futures
+import functools
+import re
+import threading
+import uuid
+
+from absl import logging
 import grpc
 
 from tensorflow_federated.proto.v0 import executor_pb2
@@ -45,6 +54,9 @@ class RemoteValue(executor_value_base.ExecutorValue):
     self._type_signature = type_spec
     self._executor = executor
 
+  def __del__(self):
+    self._executor._dispose(self._value_ref)  # pylint: disable=protected-access
+
   @property
   def type_signature(self):
     return self._type_signature
@@ -60,27 +72,472 @@ class RemoteValue(executor_value_base.ExecutorValue):
 class RemoteExecutor(executor_base.Executor):
   """The remote executor is a local proxy for a remote executor instance.
 
+  The gRPC client in use is blocking, so all the RPCs are issued from a pool of
+  dedicated I/O threads owned by this executor, and awaited asynchronously.
+  This way, RPCs never block the event loop, and multiple RPCs (including
+  long-running calls to `Compute`) can be in flight at the same time. Computed
+  values are fetched with the streaming `ComputeStream` RPC, so their size is
+  not limited by the maximum size of a gRPC message.
+
+  Values held by the remote service are disposed of once the corresponding
+  instances of `RemoteValue` are garbage collected. Disposals are sent to the
+  service in batches of `dispose_batch_size`.
+
+  If `max_batch_size` is specified, instead of issuing a separate RPC for every
+  call to `create_value()`, `create_call()`, etc., the executor assigns the ids
+  of the created values itself, and queues up the operations. The operations
+  queued up during a single iteration of the event loop (or up to
+  `max_batch_size` of them, whichever comes first) are then sent to the service
+  in a single `Execute` RPC, with the results of any `compute()` calls returned
+  in the reply (and thus subject to the gRPC message size limit). A batch is
+  only held back until the batches that create the values it uses have
+  completed (and, for disposals, also the batches that use the disposed of
+  values), so independent batches, e.g., ones that compute different values,
+  are executed concurrently. Note that in this mode, any errors reported by
+  the service only surface upon `compute()`.
+
+  If `send_computation_digests` is `True`, computations are first referred to
+  by their digests, and only sent in full if the service does not already hold
+  them, so that computations invoked repeatedly (e.g., once per round) cross
+  the wire only once. Without batching, the digest is sent first, and the full
+  computation only upon a `NOT_FOUND` error. With batching, the full
+  computation is sent until a batch that contains it has succeeded, and the
+  digest afterwards. If the service has evicted the computation in the
+  meantime, the failed batch is resent once from the operation that referred
+  to it, with the full computations. Services that do not support digests
+  reject them with `INVALID_ARGUMENT`, in which case computations are sent in
+  full from then on.
+
   NOTE: This component is only available in Python 3.
   """
 
-  # TODO(b/134543154): Switch to using an asynchronous gRPC client so we don't
-  # have to block on all those calls.
-
-  def __init__(self, channel):
+  def __init__(self,
+               channel,
+               max_in_flight=16,
+               rpc_timeout=None,
+               dispose_batch_size=20,
+               max_batch_size=None,
+               send_computation_digests=False):
     """Creates a remote executor.
 
     Args:
       channel: An instance of `grpc.Channel` to use for communication with the
         remote executor service.
+      max_in_flight: The maximum number of RPCs that may be in flight at the
+        same time; any additional RPCs are queued until others complete.
+      rpc_timeout: An optional deadline for each individual RPC, in seconds. If
+        an RPC does not complete within this time, it fails with a
+        `grpc.RpcError` with the `DEADLINE_EXCEEDED` status code.
+      dispose_batch_size: The number of garbage collected values to accumulate
+        before asking the remote service to dispose of them in a single RPC.
+      max_batch_size: An optional maximum number of operations to send to the
+        service in a single `Execute` RPC. If `None`, operations are not
+        batched, and each one is issued as a separate RPC.
+      send_computation_digests: Whether to refer to computations by digest,
+        and only send them in full if the service does not hold them.
+
+    Raises:
+      TypeError: If the arguments are of the wrong types.
+      ValueError: If `max_in_flight`, `dispose_batch_size`, or `max_batch_size`
+        is not positive.
     """
     py_typecheck.check_type(channel, grpc.Channel)
+    py_typecheck.check_type(max_in_flight, int)
+    if max_in_flight < 1:
+      raise ValueError(
+          'The number of RPCs in flight must be positive, found {}.'.format(
+              str(max_in_flight)))
+    if rpc_timeout is not None:
+      py_typecheck.check_type(rpc_timeout, (int, float))
+    py_typecheck.check_type(dispose_batch_size, int)
+    if dispose_batch_size < 1:
+      raise ValueError(
+          'The dispose batch size must be positive, found {}.'.format(
+              str(dispose_batch_size)))
+    if max_batch_size is not None:
+      py_typecheck.check_type(max_batch_size, int)
+      if max_batch_size < 1:
+        raise ValueError('The batch size must be positive, found {}.'.format(
+            str(max_batch_size)))
+    py_typecheck.check_type(send_computation_digests, bool)
     self._stub = executor_pb2_grpc.ExecutorStub(channel)
+    self._rpc_timeout = rpc_timeout
+    self._io_pool = futures.ThreadPoolExecutor(max_workers=max_in_flight)
+    self._dispose_batch_size = dispose_batch_size
+    # This lock must be reentrant, since `_dispose()` is invoked from
+    # `RemoteValue.__del__()`, which may be triggered by garbage collection
+    # while the lock is already held by the same thread.
+    self._dispose_lock = threading.RLock()
+    self._values_to_dispose = []
+    self._max_batch_size = max_batch_size
+    # Reentrant for the same reason as above, as disposals are batched, too.
+    self._batch_lock = threading.RLock()
+    self._pending_operations = []
+    self._pending_result_futures = []
+    # For each pending operation that creates a computation, a tuple of the
+    # digest of the computation and, if the operation only refers to it by
+    # digest, the operation that sends it in full instead, otherwise `None`.
+    self._pending_computations = []
+    self._flush_scheduled = False
+    # The futures of the batches that are still pending, by the ids of the
+    # values they create, and of the values they use. Guarded by the batch lock.
+    self._producer_batch_futures = {}
+    self._user_batch_futures = collections.defaultdict(set)
+    self._send_computation_digests = send_computation_digests
+    # The digests of the computations that the service has been confirmed to
+    # hold, by the success of a batch that created them. Guarded by the batch
+    # lock.
+    self._sent_digests = set()
+    self._computation_bytes_sent = 0
+
+  @property
+  def computation_bytes_sent(self):
+    """The serialized size of the computations sent to the service so far.
+
+    This includes the sizes of the digests the computations are referred to
+    by, as well as the sizes of the computations sent in full. Computations
+    are only accounted for if `send_computation_digests` is `True`.
+    """
+    return self._computation_bytes_sent
+
+  def __del__(self):
+    self._flush_disposals()
+    if self._max_batch_size is not None:
+      self._flush_operations()
+    self._io_pool.shutdown(wait=False)
+
+  def _dispose(self, value_ref):
+    """Schedules `value_ref` to be disposed of in the remote service."""
+    with self._dispose_lock:
+      self._values_to_dispose.append(value_ref)
+      if len(self._values_to_dispose) < self._dispose_batch_size:
+        return
+    self._flush_disposals()
+
+  def _flush_disposals(self):
+    """Asynchronously disposes of all values scheduled to be disposed of."""
+    with self._dispose_lock:
+      value_refs = self._values_to_dispose
+      self._values_to_dispose = []
+    if not value_refs:
+      return
+
+    def _log_failure(future):
+      if future.exception() is not None:
+        logging.warning('Failed to dispose of %d remote values: %s',
+                        len(value_refs), future.exception())
+
+    request = executor_pb2.DisposeRequest(value_ref=value_refs)
+    if self._max_batch_size is not None:
+      # The values may have been created by operations that are still queued
+      # up, so the disposal must be sent in order, as part of a later batch.
+      self._enqueue_operation(
+          executor_pb2.ExecuteRequest.Operation(dispose=request),
+          schedule_flush=False)
+      return
+    try:
+      self._io_pool.submit(
+          self._stub.Dispose, request,
+          timeout=self._rpc_timeout).add_done_callback(_log_failure)
+    except RuntimeError:
+      # The thread pool has already been shut down.
+      pass
+
+  def _enqueue_operation(self, operation, schedule_flush=True,
+                         computation=None):
+    """Queues up `operation` to be sent in the next `Execute` RPC.
+
+    Args:
+      operation: An instance of `executor_pb2.ExecuteRequest.Operation`.
+      schedule_flush: Whether to schedule the queued up operations to be sent
+        at the end of the current iteration of the event loop.
+      computation: For operations that create computations, a tuple of the
+        digest of the computation, and either the operation that sends it in
+        full if `operation` only refers to it by digest, or `None`.
+
+    Returns:
+      For `compute` operations, a `concurrent.futures.Future` that will hold
+      the computed `executor_pb2.Value`, otherwise `None`.
+    """
+    if operation.WhichOneof('operation') == 'compute':
+      result_future = futures.Future()
+    else:
+      result_future = None
+    with self._batch_lock:
+      self._pending_operations.append(operation)
+      self._pending_result_futures.append(result_future)
+      self._pending_computations.append(computation)
+      flush_now = len(self._pending_operations) >= self._max_batch_size
+      schedule_flush = (
+          schedule_flush and not flush_now and not self._flush_scheduled)
+      if schedule_flush:
+        self._flush_scheduled = True
+    if flush_now:
+      self._flush_operations()
+    elif schedule_flush:
+      asyncio.get_event_loop().call_soon(self._flush_operations)
+    return result_future
+
+  def _enqueue_value_operation(self, computation=None, **kwargs):
+    """Queues up an operation that creates a value, and returns its ref."""
+    value_ref = executor_pb2.ValueRef(id=str(uuid.uuid4()))
+    self._enqueue_operation(
+        executor_pb2.ExecuteRequest.Operation(result_ref=value_ref, **kwargs),
+        computation=computation)
+    return value_ref
+
+  def _flush_operations(self):
+    """Sends all queued up operations to the service in an `Execute` RPC.
+
+    The RPC is issued once the batches it depends on have completed, without
+    holding up a thread of the I/O pool in the meantime.
+    """
+    with self._batch_lock:
+      operations = self._pending_operations
+      result_futures = self._pending_result_futures
+      computations = self._pending_computations
+      self._pending_operations = []
+      self._pending_result_futures = []
+      self._pending_computations = []
+      self._flush_scheduled = False
+      if not operations:
+        return
+      # The operations that refer to computations by digest do not use any
+      # values, so they are moved to the front of the batch, so that if one of
+      # them fails, no other operations have taken effect yet.
+      order = sorted(
+          range(len(operations)),
+          key=lambda idx: not _refers_by_digest(computations[idx]))
+      operations = [operations[idx] for idx in order]
+      result_futures = [result_futures[idx] for idx in order]
+      computations = [computations[idx] for idx in order]
+      batch_future = futures.Future()
+      dependencies = set()
+      created_ids = set()
+      used_ids = set()
+      for operation in operations:
+        for value_id in _get_used_value_ids(operation):
+          if value_id in created_ids:
+            continue
+          used_ids.add(value_id)
+          producer = self._producer_batch_futures.get(value_id)
+          if producer is not None:
+            dependencies.add(producer)
+          if operation.WhichOneof('operation') == 'dispose':
+            dependencies.update(self._user_batch_futures.get(value_id, ()))
+        if operation.result_ref.id:
+          created_ids.add(operation.result_ref.id)
+      for value_id in created_ids:
+        self._producer_batch_futures[value_id] = batch_future
+      for value_id in used_ids:
+        self._user_batch_futures[value_id].add(batch_future)
+
+    def _release():
+      with self._batch_lock:
+        for value_id in created_ids:
+          if self._producer_batch_futures.get(value_id) is batch_future:
+            del self._producer_batch_futures[value_id]
+        for value_id in used_ids:
+          users = self._user_batch_futures.get(value_id)
+          if users is not None:
+            users.discard(batch_future)
+            if not users:
+              del self._user_batch_futures[value_id]
+      batch_future.set_result(None)
+
+    def _fail(err):
+      logging.warning('Failed to execute a batch of %d operations: %s',
+                      len(operations), err)
+      for result_future in result_futures:
+        if result_future is not None:
+          result_future.set_exception(err)
+      _release()
+
+    def _succeed(results):
+      with self._batch_lock:
+        self._sent_digests.update(c[0] for c in computations if c is not None)
+      for result_future, result in zip(result_futures, results):
+        if result_future is not None:
+          result_future.set_result(result.value)
+      _release()
+
+    def _complete_retry(failed_idx, rpc_future):
+      err = rpc_future.exception()
+      if err is not None:
+        _fail(err)
+        return
+      # The operations before `failed_idx` do not have any result futures.
+      _succeed([None] * failed_idx + list(rpc_future.result().result))
+
+    def _complete(rpc_future):
+      err = rpc_future.exception()
+      if err is None:
+        _succeed(rpc_future.result().result)
+        return
+      failed_idx = self._get_failed_digest_operation(err, computations)
+      if failed_idx is None:
+        _fail(err)
+        return
+      # The service does not hold the computation referred to by digest, so the
+      # rest of the batch is resent, with the computations in full. The
+      # operations that preceded the failed one only created computations, and
+      # those are kept.
+      retry_ops = []
+      for operation, computation in zip(operations[failed_idx:],
+                                        computations[failed_idx:]):
+        if _refers_by_digest(computation):
+          operation = computation[1]
+          self._computation_bytes_sent += operation.create_value.ByteSize()
+        retry_ops.append(operation)
+      try:
+        rpc_future = self._io_pool.submit(
+            self._execute, executor_pb2.ExecuteRequest(operation=retry_ops))
+      except RuntimeError:
+        _fail(err)
+        return
+      rpc_future.add_done_callback(
+          functools.partial(_complete_retry, failed_idx))
+
+    def _send():
+      try:
+        rpc_future = self._io_pool.submit(
+            self._execute, executor_pb2.ExecuteRequest(operation=operations))
+      except RuntimeError as err:
+        # The thread pool has already been shut down.
+        rpc_future = futures.Future()
+        rpc_future.set_exception(err)
+      rpc_future.add_done_callback(_complete)
+
+    _call_when_done(dependencies, _send)
+
+  def _get_failed_digest_operation(self, err, computations):
+    """Returns the index of the operation that failed due to a digest, if any.
+
+    Args:
+      err: The exception raised by an `Execute` RPC.
+      computations: The list of the computations created by the operations of
+        the RPC, as queued up by `_enqueue_operation`.
+
+    Returns:
+      The index of the failed operation if it referred to a computation by a
+      digest that the service does not hold or does not support, otherwise
+      `None`.
+    """
+    if not isinstance(err, grpc.RpcError) or err.code() not in (
+        grpc.StatusCode.NOT_FOUND, grpc.StatusCode.INVALID_ARGUMENT):
+      return None
+    failed_idx = None
+    for key, value in err.trailing_metadata() or ():
+      if key == executor_service_utils.FAILED_OPERATION_INDEX_METADATA_KEY:
+        failed_idx = int(value)
+    if failed_idx is None:
+      # Services that predate the metadata only report the index in the details.
+      match = re.match(r'Operation (\d+) failed', err.details() or '')
+      if match:
+        failed_idx = int(match.group(1))
+    if failed_idx is None:
+      if err.code() == grpc.StatusCode.NOT_FOUND:
+        # Some computation is no longer held, so all are sent in full again.
+        with self._batch_lock:
+          self._sent_digests.clear()
+      return None
+    if (failed_idx >= len(computations) or
+        not _refers_by_digest(computations[failed_idx])):
+      return None
+    with self._batch_lock:
+      self._sent_digests.discard(computations[failed_idx][0])
+    if err.code() == grpc.StatusCode.INVALID_ARGUMENT:
+      logging.warning(
+          'The service does not support computation digests, sending '
+          'computations in full from now on: %s', err)
+      self._send_computation_digests = False
+    return failed_idx
+
+  def _execute(self, request):
+    """Issues an `Execute` RPC. This runs in the I/O thread pool.
+
+    Args:
+      request: An instance of `executor_pb2.ExecuteRequest`.
+
+    Returns:
+      An instance of `executor_pb2.ExecuteResponse`.
+    """
+    response = self._stub.Execute(request, timeout=self._rpc_timeout)
+    py_typecheck.check_type(response, executor_pb2.ExecuteResponse)
+    return response
+
+  async def _call(self, method, request):
+    """Issues an RPC from the I/O thread pool, and awaits the response.
+
+    Args:
+      method: A method of the `executor_pb2_grpc.ExecutorStub`.
+      request: The request message to send.
+
+    Returns:
+      The response message.
+    """
+    return await asyncio.get_event_loop().run_in_executor(
+        self._io_pool,
+        functools.partial(method, request, timeout=self._rpc_timeout))
+
+  async def _create_computation_value(self, value_proto):
+    """Creates a computation in the service, sending it in full only if needed.
+
+    Args:
+      value_proto: An instance of `executor_pb2.Value` with a computation.
+
+    Returns:
+      An instance of `executor_pb2.ValueRef` of the created value.
+    """
+    digest = executor_service_utils.get_computation_digest(
+        value_proto.computation)
+    digest_request = executor_pb2.CreateValueRequest(
+        value=executor_pb2.Value(computation_digest=digest))
+    full_request = executor_pb2.CreateValueRequest(value=value_proto)
+    if self._max_batch_size is not None:
+      with self._batch_lock:
+        digest_sent = digest in self._sent_digests
+      if not digest_sent:
+        self._computation_bytes_sent += full_request.ByteSize()
+        return self._enqueue_value_operation(
+            create_value=full_request, computation=(digest, None))
+      value_ref = executor_pb2.ValueRef(id=str(uuid.uuid4()))
+      full_operation = executor_pb2.ExecuteRequest.Operation(
+          result_ref=value_ref, create_value=full_request)
+      self._computation_bytes_sent += digest_request.ByteSize()
+      self._enqueue_operation(
+          executor_pb2.ExecuteRequest.Operation(
+              result_ref=value_ref, create_value=digest_request),
+          computation=(digest, full_operation))
+      return value_ref
+    self._computation_bytes_sent += digest_request.ByteSize()
+    try:
+      response = await self._call(self._stub.CreateValue, digest_request)
+    except grpc.RpcError as err:
+      if err.code() == grpc.StatusCode.INVALID_ARGUMENT:
+        logging.warning(
+            'The service does not support computation digests, sending '
+            'computations in full from now on: %s', err)
+        self._send_computation_digests = False
+      elif err.code() != grpc.StatusCode.NOT_FOUND:
+        raise
+      self._computation_bytes_sent += full_request.ByteSize()
+      response = await self._call(self._stub.CreateValue, full_request)
+    py_typecheck.check_type(response, executor_pb2.CreateValueResponse)
+    return response.value_ref
 
   async def create_value(self, value, type_spec=None):
     value_proto, type_spec = (
         executor_service_utils.serialize_value(value, type_spec))
-    response = self._stub.CreateValue(
-        executor_pb2.CreateValueRequest(value=value_proto))
+    if (self._send_computation_digests and
+        value_proto.WhichOneof('value') == 'computation'):
+      return RemoteValue(await self._create_computation_value(value_proto),
+                         type_spec, self)
+    request = executor_pb2.CreateValueRequest(value=value_proto)
+    if self._max_batch_size is not None:
+      return RemoteValue(
+          self._enqueue_value_operation(create_value=request), type_spec, self)
+    response = await self._call(self._stub.CreateValue, request)
     py_typecheck.check_type(response, executor_pb2.CreateValueResponse)
     return RemoteValue(response.value_ref, type_spec, self)
 
@@ -89,10 +546,14 @@ class RemoteExecutor(executor_base.Executor):
     py_typecheck.check_type(comp.type_signature, computation_types.FunctionType)
     if arg is not None:
       py_typecheck.check_type(arg, RemoteValue)
-    response = self._stub.CreateCall(
-        executor_pb2.CreateCallRequest(
-            function_ref=comp.value_ref,
-            argument_ref=(arg.value_ref if arg is not None else None)))
+    request = executor_pb2.CreateCallRequest(
+        function_ref=comp.value_ref,
+        argument_ref=(arg.value_ref if arg is not None else None))
+    if self._max_batch_size is not None:
+      return RemoteValue(
+          self._enqueue_value_operation(create_call=request),
+          comp.type_signature.result, self)
+    response = await self._call(self._stub.CreateCall, request)
     py_typecheck.check_type(response, executor_pb2.CreateCallResponse)
     return RemoteValue(response.value_ref, comp.type_signature.result, self)
 
@@ -107,19 +568,134 @@ class RemoteExecutor(executor_base.Executor):
               name=(k if k else None), value_ref=v.value_ref))
       type_elem.append((k, v.type_signature) if k else v.type_signature)
     result_type = computation_types.NamedTupleType(type_elem)
-    response = self._stub.CreateTuple(
-        executor_pb2.CreateTupleRequest(element=proto_elem))
+    request = executor_pb2.CreateTupleRequest(element=proto_elem)
+    if self._max_batch_size is not None:
+      return RemoteValue(
+          self._enqueue_value_operation(create_tuple=request), result_type,
+          self)
+    response = await self._call(self._stub.CreateTuple, request)
     py_typecheck.check_type(response, executor_pb2.CreateTupleResponse)
     return RemoteValue(response.value_ref, result_type, self)
 
   async def create_selection(self, source, index=None, name=None):
-    # TODO(b/134543154): Implement this.
-    raise NotImplementedError
+    py_typecheck.check_type(source, RemoteValue)
+    py_typecheck.check_type(source.type_signature,
+                            computation_types.NamedTupleType)
+    if index is not None:
+      py_typecheck.check_type(index, int)
+      if name is not None:
+        raise ValueError(
+            'Cannot simultaneously specify name {} and index {}.'.format(
+                str(name), str(index)))
+      request = executor_pb2.CreateSelectionRequest(
+          source_ref=source.value_ref, index=index)
+      result_type = source.type_signature[index]
+    elif name is not None:
+      py_typecheck.check_type(name, str)
+      request = executor_pb2.CreateSelectionRequest(
+          source_ref=source.value_ref, name=name)
+      result_type = getattr(source.type_signature, name)
+    else:
+      raise ValueError('Must specify either name or index.')
+    if self._max_batch_size is not None:
+      return RemoteValue(
+          self._enqueue_value_operation(create_selection=request), result_type,
+          self)
+    response = await self._call(self._stub.CreateSelection, request)
+    py_typecheck.check_type(response, executor_pb2.CreateSelectionResponse)
+    return RemoteValue(response.value_ref, result_type, self)
 
   async def _compute(self, value_ref):
     py_typecheck.check_type(value_ref, executor_pb2.ValueRef)
     request = executor_pb2.ComputeRequest(value_ref=value_ref)
-    response = self._stub.Compute(request)
-    py_typecheck.check_type(response, executor_pb2.ComputeResponse)
-    value, _ = executor_service_utils.deserialize_value(response.value)
+    if self._max_batch_size is not None:
+      value_proto = await asyncio.wrap_future(
+          self._enqueue_operation(
+              executor_pb2.ExecuteRequest.Operation(compute=request)))
+      value, _ = executor_service_utils.deserialize_value(value_proto)
+    else:
+      value, _ = await asyncio.get_event_loop().run_in_executor(
+          self._io_pool, self._compute_stream, request)
     return value
+
+  def _compute_stream(self, request):
+    """Issues a `ComputeStream` RPC, and reassembles the value as it arrives.
+
+    This runs in the I/O thread pool. The chunks are consumed as they are
+    received, so the serialized value is never buffered in its entirety.
+
+    Args:
+      request: An instance of `executor_pb2.ComputeRequest`.
+
+    Returns:
+      A tuple `(value, type_spec)` with the deserialized value and its type.
+    """
+    responses = self._stub.ComputeStream(request, timeout=self._rpc_timeout)
+    return executor_service_utils.deserialize_value_from_chunks(responses)
+
+
+def _refers_by_digest(computation):
+  """Returns whether an operation refers to its computation by digest.
+
+  Args:
+    computation: The computation of the operation, as queued up by
+      `RemoteExecutor._enqueue_operation`, or `None`.
+
+  Returns:
+    A Boolean.
+  """
+  return computation is not None and computation[1] is not None
+
+
+def _get_used_value_ids(operation):
+  """Returns the ids of the values that `operation` uses.
+
+  Args:
+    operation: An instance of `executor_pb2.ExecuteRequest.Operation`.
+
+  Returns:
+    A list of string value ids.
+  """
+  which_op = operation.WhichOneof('operation')
+  if which_op == 'create_call':
+    value_refs = [operation.create_call.function_ref]
+    if operation.create_call.argument_ref.id:
+      value_refs.append(operation.create_call.argument_ref)
+  elif which_op == 'create_tuple':
+    value_refs = [e.value_ref for e in operation.create_tuple.element]
+  elif which_op == 'create_selection':
+    value_refs = [operation.create_selection.source_ref]
+  elif which_op == 'compute':
+    value_refs = [operation.compute.value_ref]
+  elif which_op == 'dispose':
+    value_refs = operation.dispose.value_ref
+  else:
+    value_refs = []
+  return [v.id for v in value_refs]
+
+
+def _call_when_done(fs, fn):
+  """Calls `fn` once all `concurrent.futures.Future`s in `fs` are done.
+
+  The call happens in the thread that completes the last of the futures, or in
+  the current thread if they are all done already.
+
+  Args:
+    fs: A collection of `concurrent.futures.Future`s.
+    fn: A no-argument callable.
+  """
+  if not fs:
+    fn()
+    return
+  lock = threading.Lock()
+  remaining = [len(fs)]
+
+  def _on_done(_):
+    with lock:
+      remaining[0] -= 1
+      if remaining[0]:
+        return
+    fn()
+
+  for f in fs:
+    f.add_done_callback(_on_done)
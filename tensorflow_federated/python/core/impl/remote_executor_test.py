@@ -14,7 +14,11 @@
 # limitations under the License.
 """Tests for remote_executor.py."""
 
+import asyncio
+import collections
 import contextlib
+import gc
+import time
 
 from absl.testing import absltest
 import grpc
@@ -25,24 +29,31 @@ import tensorflow as tf
 from tensorflow_federated.proto.v0 import executor_pb2_grpc
 from tensorflow_federated.python.core.api import computations
 from tensorflow_federated.python.core.impl import eager_executor
+from tensorflow_federated.python.core.impl import executor_base
 from tensorflow_federated.python.core.impl import executor_service
 from tensorflow_federated.python.core.impl import executor_test_utils
+from tensorflow_federated.python.core.impl import executor_value_base
 from tensorflow_federated.python.core.impl import remote_executor
 from tensorflow_federated.python.core.impl import set_default_executor
 
 
 @contextlib.contextmanager
-def test_context():
+def test_context(target_executor=None,
+                 num_server_workers=1,
+                 service=None,
+                 **kwargs):
   port = portpicker.pick_unused_port()
-  server_pool = logging_pool.pool(max_workers=1)
+  server_pool = logging_pool.pool(max_workers=num_server_workers)
   server = grpc.server(server_pool)
   server.add_insecure_port('[::]:{}'.format(port))
-  target_executor = eager_executor.EagerExecutor()
-  service = executor_service.ExecutorService(target_executor)
+  if service is None:
+    if target_executor is None:
+      target_executor = eager_executor.EagerExecutor()
+    service = executor_service.ExecutorService(target_executor)
   executor_pb2_grpc.add_ExecutorServicer_to_server(service, server)
   server.start()
   channel = grpc.insecure_channel('localhost:{}'.format(port))
-  executor = remote_executor.RemoteExecutor(channel)
+  executor = remote_executor.RemoteExecutor(channel, **kwargs)
   set_default_executor.set_default_executor(executor)
   yield executor
   set_default_executor.set_default_executor()
@@ -53,6 +64,63 @@ def test_context():
   server.stop(None)
 
 
+class SleepingExecutorValue(executor_value_base.ExecutorValue):
+
+  def __init__(self, value, type_spec, delay):
+    self._value = value
+    self._type_signature = type_spec
+    self._delay = delay
+
+  @property
+  def type_signature(self):
+    return self._type_signature
+
+  async def compute(self):
+    await asyncio.sleep(self._delay)
+    return self._value
+
+
+class SleepingExecutor(executor_base.Executor):
+  """An executor with values that take `delay` seconds to compute."""
+
+  def __init__(self, delay):
+    self._delay = delay
+
+  async def create_value(self, value, type_spec=None):
+    return SleepingExecutorValue(value, type_spec, self._delay)
+
+  async def create_call(self, comp, arg=None):
+    raise NotImplementedError
+
+  async def create_tuple(self, elements):
+    raise NotImplementedError
+
+  async def create_selection(self, source, index=None, name=None):
+    raise NotImplementedError
+
+
+class CountingExecutorService(executor_service.ExecutorService):
+  """An executor service that counts the `Execute` RPCs it receives."""
+
+  def __init__(self, *args, **kwargs):
+    super(CountingExecutorService, self).__init__(*args, **kwargs)
+    self.num_execute_calls = 0
+
+  def Execute(self, request, context):
+    self.num_execute_calls += 1
+    return super(CountingExecutorService, self).Execute(request, context)
+
+
+class NoDigestExecutorService(executor_service.ExecutorService):
+  """An executor service that rejects computations referred to by digest."""
+
+  def _create_value(self, request, value_id=None):
+    if request.value.WhichOneof('value') == 'computation_digest':
+      raise ValueError('Unable to deserialize a value of type None.')
+    return super(NoDigestExecutorService, self)._create_value(
+        request, value_id)
+
+
 class RemoteExecutorTest(absltest.TestCase):
 
   def test_no_arg_tf_computation(self):
@@ -82,6 +150,243 @@ class RemoteExecutorTest(absltest.TestCase):
 
       self.assertEqual(comp(10, 20), 30)
 
+  def test_concurrent_computes_overlap(self):
+    num_values = 8
+    with test_context(
+        SleepingExecutor(1.0),
+        num_server_workers=num_values,
+        max_in_flight=num_values) as executor:
+
+      async def compute(x):
+        return await (await executor.create_value(x, tf.int32)).compute()
+
+      start_time = time.time()
+      results = asyncio.get_event_loop().run_until_complete(
+          asyncio.gather(*[compute(x) for x in range(num_values)]))
+      elapsed_time = time.time() - start_time
+    self.assertEqual(list(results), list(range(num_values)))
+    self.assertLess(elapsed_time, num_values / 2)
+
+  def test_compute_fails_after_rpc_timeout(self):
+    with test_context(SleepingExecutor(5.0), rpc_timeout=0.5) as executor:
+      loop = asyncio.get_event_loop()
+      val = loop.run_until_complete(executor.create_value(10, tf.int32))
+      with self.assertRaises(grpc.RpcError) as context:
+        loop.run_until_complete(val.compute())
+      self.assertEqual(context.exception.code(),
+                       grpc.StatusCode.DEADLINE_EXCEEDED)
+
+  def test_disposes_of_garbage_collected_values(self):
+    service = executor_service.ExecutorService(eager_executor.EagerExecutor())
+    with test_context(service=service, dispose_batch_size=2) as executor:
+      loop = asyncio.get_event_loop()
+      vals = [
+          loop.run_until_complete(executor.create_value(x, tf.int32))
+          for x in range(5)
+      ]
+      self.assertEqual(service.live_value_count, 5)
+      del vals
+      gc.collect()
+      # The two batches of two values each are disposed of asynchronously.
+      for _ in range(50):
+        if service.live_value_count == 1:
+          break
+        time.sleep(0.1)
+      self.assertEqual(service.live_value_count, 1)
+
+  def test_create_selection(self):
+    with test_context() as executor:
+      loop = asyncio.get_event_loop()
+      source = loop.run_until_complete(
+          executor.create_value(
+              collections.OrderedDict([('a', 10), ('b', 20)]),
+              [('a', tf.int32), ('b', tf.int32)]))
+      for kwargs, expected_result in [({'name': 'a'}, 10), ({'index': 1}, 20)]:
+        val = loop.run_until_complete(
+            executor.create_selection(source, **kwargs))
+        self.assertEqual(str(val.type_signature), 'int32')
+        self.assertEqual(loop.run_until_complete(val.compute()),
+                         expected_result)
+
+  def test_compute_value_larger_than_grpc_message_limit(self):
+    with test_context():
+
+      # The result is 8 MB, over the default 4 MB limit on gRPC messages.
+      @computations.tf_computation
+      def comp():
+        return tf.ones([2000, 1000], dtype=tf.float32)
+
+      result = comp()
+      self.assertEqual(result.shape, (2000, 1000))
+      self.assertEqual(result.sum(), 2000000.0)
+
+  def test_batched_operations_are_sent_in_single_rpc(self):
+    service = CountingExecutorService(eager_executor.EagerExecutor())
+    with test_context(service=service, max_batch_size=100) as executor:
+
+      @computations.tf_computation(tf.int32, tf.int32)
+      def comp(x, y):
+        return x + y
+
+      async def compute():
+        fn = await executor.create_value(comp)
+        arg = await executor.create_tuple([
+            await executor.create_value(10, tf.int32), await
+            executor.create_value(20, tf.int32)
+        ])
+        result = await (await executor.create_call(fn, arg)).compute()
+        selection = await (await executor.create_selection(arg,
+                                                           index=1)).compute()
+        return result, selection
+
+      result, selection = asyncio.get_event_loop().run_until_complete(
+          compute())
+    self.assertEqual(result, 30)
+    self.assertEqual(selection, 20)
+    self.assertEqual(service.num_execute_calls, 2)
+
+  def test_batched_concurrent_computes_are_sent_in_single_rpc(self):
+    service = CountingExecutorService(eager_executor.EagerExecutor())
+    with test_context(service=service, max_batch_size=100) as executor:
+
+      async def compute(x):
+        return await (await executor.create_value(x, tf.int32)).compute()
+
+      results = asyncio.get_event_loop().run_until_complete(
+          asyncio.gather(*[compute(x) for x in range(10)]))
+    self.assertEqual(list(results), list(range(10)))
+    self.assertEqual(service.num_execute_calls, 1)
+
+  def test_batches_are_split_at_max_batch_size(self):
+    service = CountingExecutorService(eager_executor.EagerExecutor())
+    with test_context(service=service, max_batch_size=4) as executor:
+
+      async def compute(x):
+        return await (await executor.create_value(x, tf.int32)).compute()
+
+      results = asyncio.get_event_loop().run_until_complete(
+          asyncio.gather(*[compute(x) for x in range(10)]))
+    self.assertEqual(list(results), list(range(10)))
+    self.assertEqual(service.num_execute_calls, 5)
+
+  def test_independent_batches_are_executed_concurrently(self):
+    num_values = 4
+    with test_context(
+        SleepingExecutor(1.0),
+        num_server_workers=num_values,
+        max_in_flight=num_values,
+        max_batch_size=1) as executor:
+
+      async def compute(x):
+        return await (await executor.create_value(x, tf.int32)).compute()
+
+      start_time = time.time()
+      results = asyncio.get_event_loop().run_until_complete(
+          asyncio.gather(*[compute(x) for x in range(num_values)]))
+      elapsed_time = time.time() - start_time
+    self.assertEqual(list(results), list(range(num_values)))
+    # Each compute is in its own batch, which only depends on the batch that
+    # created its value, so the computes are not serialized.
+    self.assertLess(elapsed_time, num_values / 2)
+
+  def test_batched_with_mnist_training_example(self):
+    with test_context(max_batch_size=100) as executor:
+      executor_test_utils.test_mnist_training(self, executor)
+
+  def test_computations_are_sent_in_full_only_once(self):
+    service = executor_service.ExecutorService(eager_executor.EagerExecutor())
+    with test_context(
+        service=service, send_computation_digests=True) as executor:
+
+      @computations.tf_computation(tf.int32)
+      def comp(x):
+        return x + 1
+
+      self.assertEqual(comp(10), 11)
+      first_call_bytes = executor.computation_bytes_sent
+      self.assertEqual(comp(20), 21)
+      second_call_bytes = executor.computation_bytes_sent - first_call_bytes
+    self.assertEqual(service.cached_computation_count, 1)
+    # Only the digest is sent the second time.
+    self.assertLess(second_call_bytes, 100)
+    self.assertGreater(first_call_bytes, second_call_bytes + 100)
+
+  def test_batched_computations_are_sent_in_full_only_once(self):
+    service = executor_service.ExecutorService(eager_executor.EagerExecutor())
+    with test_context(
+        service=service, max_batch_size=100,
+        send_computation_digests=True) as executor:
+
+      @computations.tf_computation(tf.int32)
+      def comp(x):
+        return x + 1
+
+      self.assertEqual(comp(10), 11)
+      first_call_bytes = executor.computation_bytes_sent
+      self.assertEqual(comp(20), 21)
+      second_call_bytes = executor.computation_bytes_sent - first_call_bytes
+    self.assertEqual(service.cached_computation_count, 1)
+    self.assertLess(second_call_bytes, 100)
+    self.assertGreater(first_call_bytes, 100)
+
+  def test_batched_computations_are_resent_in_full_after_eviction(self):
+    service = executor_service.ExecutorService(
+        eager_executor.EagerExecutor(), max_cached_computations=1)
+    with test_context(
+        service=service, max_batch_size=100,
+        send_computation_digests=True) as executor:
+
+      @computations.tf_computation(tf.int32)
+      def add_one(x):
+        return x + 1
+
+      @computations.tf_computation(tf.int32)
+      def add_two(x):
+        return x + 2
+
+      self.assertEqual(add_one(10), 11)
+      self.assertEqual(add_two(10), 12)
+      # The digest of `add_one` is sent, but the service has evicted it.
+      bytes_before = executor.computation_bytes_sent
+      self.assertEqual(add_one(20), 21)
+      self.assertGreater(executor.computation_bytes_sent - bytes_before, 100)
+      # The computation is held again, and referred to by digest.
+      bytes_before = executor.computation_bytes_sent
+      self.assertEqual(add_one(30), 31)
+      self.assertLess(executor.computation_bytes_sent - bytes_before, 100)
+
+  def test_computation_digests_fall_back_without_service_support(self):
+    for max_batch_size in [None, 100]:
+      service = NoDigestExecutorService(eager_executor.EagerExecutor())
+      with test_context(
+          service=service,
+          max_batch_size=max_batch_size,
+          send_computation_digests=True):
+
+        @computations.tf_computation(tf.int32)
+        def comp(x):
+          return x + 1
+
+        for x in range(3):
+          self.assertEqual(comp(x), x + 1)
+
+  def test_without_computation_digests(self):
+    service = executor_service.ExecutorService(eager_executor.EagerExecutor())
+    with test_context(service=service) as executor:
+
+      @computations.tf_computation(tf.int32)
+      def comp(x):
+        return x + 1
+
+      self.assertEqual(comp(10), 11)
+      self.assertEqual(comp(20), 21)
+    self.assertEqual(executor.computation_bytes_sent, 0)
+
+  def test_constructor_fails_with_zero_max_in_flight(self):
+    channel = grpc.insecure_channel('localhost:0')
+    with self.assertRaises(ValueError):
+      remote_executor.RemoteExecutor(channel, max_in_flight=0)
+
   def test_with_mnist_training_example(self):
     with test_context() as executor:
       executor_test_utils.test_mnist_training(self, executor)
@@ -69,6 +69,76 @@ def finalize_binding(binding, tensor_info_map):
         py_typecheck.type_string(type(binding))))
 
 
+def _get_graph_def_from_function_graph(cc_fn):
+  """Returns the graph of the concrete function `cc_fn` and its tensor maps.
+
+  This path does not touch the filesystem, and is only applicable to functions
+  that do not capture any external tensors (e.g., variables).
+
+  Args:
+    cc_fn: A concrete function, as returned by `get_concrete_function()` of a
+      `tf.function` called with named `tf.TensorSpec`s, and returning a dict.
+
+  Returns:
+    A tuple `(graph_def, input_map, output_map)`, in which `graph_def` is the
+    `tf.compat.v1.GraphDef` of the function's graph, and `input_map` and
+    `output_map` map the names of the input `tf.TensorSpec`s and the keys of
+    the result dict, respectively, to the corresponding tensors in the graph.
+  """
+  input_specs = tf.nest.flatten(cc_fn.structured_input_signature)
+  input_map = {
+      spec.name: tensor for spec, tensor in zip(input_specs, cc_fn.inputs)
+  }
+  output_map = dict(cc_fn.structured_outputs)
+  return cc_fn.graph.as_graph_def(), input_map, output_map
+
+
+def _get_graph_def_via_saved_model(target_poly, cc_fn):
+  """Like `_get_graph_def_from_function_graph`, but via a saved model.
+
+  The function is saved along with the variables it captures, and the saved
+  model is loaded back into a new graph, which makes it possible to serialize
+  functions that capture external tensors, at the cost of a round-trip through
+  a temporary directory.
+
+  Args:
+    target_poly: The `tf.function` that `cc_fn` has been obtained from.
+    cc_fn: A concrete function, as in `_get_graph_def_from_function_graph`.
+
+  Returns:
+    A tuple `(graph_def, input_map, output_map)`, as in
+    `_get_graph_def_from_function_graph`, except that the maps contain
+    instances of `TensorInfo` from the signature of the saved model.
+  """
+  # Associate vars with unique names and explicitly attach to the Checkpoint:
+  var_dict = {
+      'var{:02d}'.format(i): v for i, v in enumerate(cc_fn.graph.variables)
+  }
+  saveable = tf.train.Checkpoint(fn=target_poly, **var_dict)
+
+  try:
+    outdir = tempfile.mkdtemp('savedmodel')
+    tf.saved_model.save(saveable, outdir, signatures=cc_fn)
+
+    graph = tf.Graph()
+    with tf.compat.v1.Session(graph=graph) as sess:
+      mgd = tf.saved_model.load(
+          sess, tags=[tf.saved_model.SERVING], export_dir=outdir)
+  finally:
+    shutil.rmtree(outdir)
+  sigs = mgd.signature_def
+
+  # TODO(b/123102455): Figure out how to support the init_op. The meta graph def
+  # contains sigs['__saved_model_init_op'].outputs['__saved_model_init_op']. It
+  # probably won't do what we want, because it will want to read from
+  # Checkpoints, not just run Variable initializerse (?). The right solution may
+  # be to grab the target_poly.get_initialization_function(), and save a sig for
+  # that.
+
+  return (mgd.graph_def, sigs['serving_default'].inputs,
+          sigs['serving_default'].outputs)
+
+
 def serialize_tf2_as_tf_computation(target, parameter_type, unpack=None):
   """Serializes the 'target' as a TF computation with a given parameter type.
 
@@ -119,8 +189,8 @@ def serialize_tf2_as_tf_computation(target, parameter_type, unpack=None):
   # tff.tf_computation must be able to handle structured inputs and outputs.
   # Thus, we intercept the result of calling the original target fn, introspect
   # its structure to create a result_type and bindings, and then return a
-  # flat dict output. It is this new "unpacked" tf.function that we will
-  # serialize using tf.saved_model.save.
+  # flat dict output. It is the graph of this new "unpacked" tf.function that
+  # we serialize.
   #
   # TODO(b/117428091): The return type limitation is primarily a limitation of
   # SignatureDefs  and therefore of the signatures argument to
@@ -148,46 +218,20 @@ def serialize_tf2_as_tf_computation(target, parameter_type, unpack=None):
   # unique names embedded in the TensorSpecs inside arg_typespecs and
   # kwarg_typespecs. The (preliminary) parameter_binding tracks the mapping
   # between these tensor names and the components of the (possibly nested) TFF
-  # input type. When cc_fn is serialized, concrete tensors for each input are
-  # introduced, and the call finalize_binding(parameter_binding,
-  # sigs['serving_default'].inputs) updates the bindings to reference these
-  # concrete tensors.
-
-  # Associate vars with unique names and explicitly attach to the Checkpoint:
-  var_dict = {
-      'var{:02d}'.format(i): v for i, v in enumerate(cc_fn.graph.variables)
-  }
-  saveable = tf.train.Checkpoint(fn=target_poly, **var_dict)
-
-  try:
-    # TODO(b/122081673): All we really need is the  meta graph def, we could
-    # probably just load that directly, e.g., using parse_saved_model from
-    # tensorflow/python/saved_model/loader_impl.py, but I'm not sure we want to
-    # depend on that presumably non-public symbol. Perhaps TF can expose a way
-    # to just get the MetaGraphDef directly without saving to a tempfile? This
-    # looks like a small change to v2.saved_model.save().
-    outdir = tempfile.mkdtemp('savedmodel')
-    tf.saved_model.save(saveable, outdir, signatures=cc_fn)
-
-    graph = tf.Graph()
-    with tf.compat.v1.Session(graph=graph) as sess:
-      mgd = tf.saved_model.load(
-          sess, tags=[tf.saved_model.SERVING], export_dir=outdir)
-  finally:
-    shutil.rmtree(outdir)
-  sigs = mgd.signature_def
-
-  # TODO(b/123102455): Figure out how to support the init_op. The meta graph def
-  # contains sigs['__saved_model_init_op'].outputs['__saved_model_init_op']. It
-  # probably won't do what we want, because it will want to read from
-  # Checkpoints, not just run Variable initializerse (?). The right solution may
-  # be to grab the target_poly.get_initialization_function(), and save a sig for
-  # that.
+  # input type, and the (preliminary) result_binding does the same for the keys
+  # of the result dict. The calls to finalize_binding() below update bindings
+  # to reference the concrete tensors in the serialized graph.
+  if cc_fn.captured_inputs:
+    # The function closes over variables or eager tensors, which the graph of
+    # the concrete function only refers to as external captures.
+    graph_def, input_map, output_map = _get_graph_def_via_saved_model(
+        target_poly, cc_fn)
+  else:
+    graph_def, input_map, output_map = _get_graph_def_from_function_graph(
+        cc_fn)
 
-  # Now, traverse the signature from the MetaGraphDef to find
-  # find the actual tensor names and write them into the bindings.
-  finalize_binding(parameter_binding, sigs['serving_default'].inputs)
-  finalize_binding(result_binding, sigs['serving_default'].outputs)
+  finalize_binding(parameter_binding, input_map)
+  finalize_binding(result_binding, output_map)
 
   annotated_type = computation_types.FunctionType(parameter_type, result_type)
 
@@ -197,7 +241,7 @@ def serialize_tf2_as_tf_computation(target, parameter_type, unpack=None):
               parameter=type_serialization.serialize_type(parameter_type),
               result=type_serialization.serialize_type(result_type))),
       tensorflow=pb.TensorFlow(
-          graph_def=serialization_utils.pack_graph_def(mgd.graph_def),
+          graph_def=serialization_utils.pack_graph_def(graph_def),
           parameter=parameter_binding,
           result=result_binding)), annotated_type
 
@@ -0,0 +1,92 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark for serializing TensorFlow 2 functions as TFF computations."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import numpy as np
+from six.moves import range
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import test
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.impl import tensorflow_serialization
+
+NUM_ITERS = 20
+
+PARAMETER_TYPE = computation_types.NamedTupleType([
+    ('x', computation_types.TensorType(tf.float32, [10])),
+    ('y', computation_types.TensorType(tf.float32, [10]))
+])
+
+
+def _small_computation(x, y):
+  return tf.reduce_sum(x * y) + tf.reduce_max(x)
+
+
+def _make_concrete_function():
+  """Returns a `tf.function` and its concrete function, like the serializer."""
+
+  @tf.function
+  def fn(x, y):
+    return {'result': _small_computation(x, y)}
+
+  return fn, fn.get_concrete_function(
+      tf.TensorSpec([10], tf.float32, name='x'),
+      tf.TensorSpec([10], tf.float32, name='y'))
+
+
+class TensorFlowSerializationBenchmark(tf.test.Benchmark):
+  """Measures the time spent serializing small TensorFlow 2 computations."""
+
+  def _report(self, name, times):
+    self.report_benchmark(
+        name=name,
+        wall_time=np.mean(times),
+        iters=len(times),
+        extras={'std_dev': np.std(times)})
+
+  def benchmark_serialize_tf2_as_tf_computation(self):
+    times = []
+    for _ in range(NUM_ITERS):
+      start = time.time()
+      tensorflow_serialization.serialize_tf2_as_tf_computation(
+          _small_computation, PARAMETER_TYPE)
+      times.append(time.time() - start)
+    self._report('Serialization time, small tf2 computation', times)
+
+  def benchmark_graph_extraction(self):
+    function_graph_times = []
+    saved_model_times = []
+    for _ in range(NUM_ITERS):
+      fn, cc_fn = _make_concrete_function()
+      start = time.time()
+      tensorflow_serialization._get_graph_def_from_function_graph(cc_fn)
+      function_graph_times.append(time.time() - start)
+      start = time.time()
+      tensorflow_serialization._get_graph_def_via_saved_model(fn, cc_fn)
+      saved_model_times.append(time.time() - start)
+    self._report('Graph extraction time, from function graph (after)',
+                 function_graph_times)
+    self._report('Graph extraction time, via saved model (before)',
+                 saved_model_times)
+
+
+if __name__ == '__main__':
+  test.main()
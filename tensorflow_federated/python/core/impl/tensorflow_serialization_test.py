@@ -112,6 +112,53 @@ class TensorFlowSerializationTest(test.TestCase):
             }, [comp.tensorflow.result.tensor.tensor_name]))
     self.assertEqual(results, [10])
 
+  def test_serialize_tf2_with_structured_parameter(self):
+
+    def _add(x, y):
+      return collections.OrderedDict([('sum', x + y), ('diff', x - y)])
+
+    comp, extra_type_spec = (
+        tensorflow_serialization.serialize_tf2_as_tf_computation(
+            _add,
+            computation_types.NamedTupleType([('x', tf.int32),
+                                              ('y', tf.int32)])))
+    self.assertEqual(
+        str(type_serialization.deserialize_type(comp.type)),
+        '(<x=int32,y=int32> -> <sum=int32,diff=int32>)')
+    self.assertEqual(str(extra_type_spec),
+                     '(<x=int32,y=int32> -> <sum=int32,diff=int32>)')
+    x_binding, y_binding = comp.tensorflow.parameter.tuple.element
+    sum_binding, diff_binding = comp.tensorflow.result.tuple.element
+    with tf.Graph().as_default() as graph:
+      results = tf.import_graph_def(
+          serialization_utils.unpack_graph_def(comp.tensorflow.graph_def), {
+              x_binding.tensor.tensor_name: tf.constant(10),
+              y_binding.tensor.tensor_name: tf.constant(3)
+          }, [
+              sum_binding.tensor.tensor_name,
+              diff_binding.tensor.tensor_name
+          ])
+    with tf.compat.v1.Session(graph=graph) as sess:
+      self.assertEqual(sess.run(results), [13, 7])
+
+  def test_function_graph_and_saved_model_tensor_maps_agree(self):
+
+    @tf.function
+    def fn(a, b):
+      return {'c': a * b, 'd': a + b}
+
+    cc_fn = fn.get_concrete_function(
+        tf.TensorSpec([2], tf.float32, name='a'),
+        tf.TensorSpec([2], tf.float32, name='b'))
+    _, function_inputs, function_outputs = (
+        tensorflow_serialization._get_graph_def_from_function_graph(cc_fn))
+    _, saved_model_inputs, saved_model_outputs = (
+        tensorflow_serialization._get_graph_def_via_saved_model(fn, cc_fn))
+    self.assertCountEqual(function_inputs.keys(), ['a', 'b'])
+    self.assertCountEqual(function_inputs.keys(), saved_model_inputs.keys())
+    self.assertCountEqual(function_outputs.keys(), ['c', 'd'])
+    self.assertCountEqual(function_outputs.keys(), saved_model_outputs.keys())
+
 
 if __name__ == '__main__':
   test.main()
@@ -0,0 +1,365 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""An executor that records where time is spent in the executor it wraps."""
+
+import collections
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_federated.proto.v0 import computation_pb2 as pb
+from tensorflow_federated.python.common_libs import anonymous_tuple
+from tensorflow_federated.python.common_libs import py_typecheck
+from tensorflow_federated.python.core.api import computation_types
+from tensorflow_federated.python.core.impl import computation_impl
+from tensorflow_federated.python.core.impl import executor_base
+from tensorflow_federated.python.core.impl import executor_value_base
+
+
+class Span(
+    collections.namedtuple('Span', [
+        'name', 'layer', 'start_time', 'wall_time', 'cpu_time', 'thread_id',
+        'intrinsic', 'placement', 'client_index', 'num_bytes'
+    ])):
+  """A record of a single operation on an executor.
+
+  Attributes:
+    name: The name of the operation, one of `create_value`, `create_call`,
+      `create_tuple`, `create_selection`, or `compute`.
+    layer: The name of the layer of the executor stack the span was recorded
+      at, as given to the `TracingExecutor`.
+    start_time: The start of the operation in seconds, relative to the creation
+      of the `ExecutionTracer`.
+    wall_time: The wall time of the operation in seconds.
+    cpu_time: The CPU time of the whole process during the operation, in
+      seconds. Since executors run concurrently, this includes the work done
+      by other operations in the meantime.
+    thread_id: The identifier of the thread the operation ran on.
+    intrinsic: The URI of the intrinsic involved, or `None`.
+    placement: The URI of the placement the operation is associated with, or
+      `None`.
+    client_index: The index of the client the operation ran on, or `None`.
+    num_bytes: The size of the tensors created or computed, or `None` if it
+      is unknown (e.g., for functions or data sets).
+  """
+  __slots__ = ()
+
+
+class ExecutionTracer(object):
+  """Collects the `Span`s recorded by a set of `TracingExecutor`s.
+
+  Recording a span only appends a tuple to a bounded buffer, so the overhead
+  of tracing is small enough to leave it on; the spans are only formatted when
+  they are exported with `write_chrome_trace` or `format_summary`. Once the
+  buffer is full, the oldest spans are dropped.
+
+  This class is thread-safe.
+
+  NOTE: This component is only available in Python 3.
+  """
+
+  def __init__(self, max_spans=100000):
+    """Creates a tracer.
+
+    Args:
+      max_spans: The maximum number of most recent spans to keep.
+
+    Raises:
+      ValueError: If `max_spans` is not positive.
+    """
+    py_typecheck.check_type(max_spans, int)
+    if max_spans < 1:
+      raise ValueError(
+          'The maximum number of spans must be positive, found {}.'.format(
+              str(max_spans)))
+    self._spans = collections.deque(maxlen=max_spans)
+    self._origin = time.perf_counter()
+
+  @property
+  def spans(self):
+    """A list of the recorded `Span`s, in the order they have completed."""
+    return list(self._spans)
+
+  def clear(self):
+    """Drops all the recorded spans."""
+    self._spans.clear()
+
+  def record(self, name, layer, start_time, start_cpu_time, intrinsic=None,
+             placement=None, client_index=None, num_bytes=None):
+    """Records a span that started at the given times and ends now.
+
+    Args:
+      name: The name of the operation.
+      layer: The name of the layer of the executor stack.
+      start_time: The value of `time.perf_counter()` at the start.
+      start_cpu_time: The value of `time.process_time()` at the start.
+      intrinsic: The optional URI of the intrinsic involved.
+      placement: The optional URI of the placement involved.
+      client_index: The optional index of the client the operation ran on.
+      num_bytes: The optional size of the tensors involved.
+    """
+    end_cpu_time = time.process_time()
+    end_time = time.perf_counter()
+    # Appending to a `deque` is atomic, so no lock is needed here.
+    self._spans.append(
+        Span(name, layer, start_time - self._origin, end_time - start_time,
+             end_cpu_time - start_cpu_time, threading.get_ident(), intrinsic,
+             placement, client_index, num_bytes))
+
+  def get_chrome_trace(self):
+    """Returns the spans in the Chrome trace event format, as a dict.
+
+    The result can be serialized as JSON and loaded into `chrome://tracing`,
+    or any other viewer that supports the format.
+    """
+    pid = os.getpid()
+    events = []
+    for span in self.spans:
+      args = {'cpu_time_us': span.cpu_time * 1e6}
+      for key in ['intrinsic', 'placement', 'client_index', 'num_bytes']:
+        value = getattr(span, key)
+        if value is not None:
+          args[key] = value
+      events.append({
+          'name': span.name,
+          'cat': span.layer,
+          'ph': 'X',
+          'ts': span.start_time * 1e6,
+          'dur': span.wall_time * 1e6,
+          'pid': pid,
+          'tid': span.thread_id,
+          'args': args,
+      })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+  def write_chrome_trace(self, path):
+    """Writes the spans to the file at `path` in the Chrome trace format.
+
+    Args:
+      path: The path of the JSON file to write.
+    """
+    py_typecheck.check_type(path, str)
+    with open(path, 'w') as f:
+      json.dump(self.get_chrome_trace(), f)
+
+  def get_summary(self):
+    """Returns the statistics of the spans grouped by intrinsic and operation.
+
+    Returns:
+      A list of `collections.OrderedDict`s, one per combination of intrinsic
+      and operation name (for spans that are associated with an intrinsic),
+      sorted by the decreasing total wall time, with keys `intrinsic`, `name`,
+      `count`, `wall_time`, `cpu_time`, and `num_bytes` (the totals).
+    """
+    rows = collections.OrderedDict()
+    for span in self.spans:
+      if span.intrinsic is None:
+        continue
+      key = (span.intrinsic, span.name)
+      row = rows.get(key)
+      if row is None:
+        row = collections.OrderedDict([('intrinsic', span.intrinsic),
+                                       ('name', span.name), ('count', 0),
+                                       ('wall_time', 0.0), ('cpu_time', 0.0),
+                                       ('num_bytes', 0)])
+        rows[key] = row
+      row['count'] += 1
+      row['wall_time'] += span.wall_time
+      row['cpu_time'] += span.cpu_time
+      row['num_bytes'] += span.num_bytes or 0
+    return sorted(rows.values(), key=lambda r: r['wall_time'], reverse=True)
+
+  def format_summary(self):
+    """Returns a human-readable table of the statistics per intrinsic."""
+    lines = [
+        '{:<32} {:<16} {:>8} {:>12} {:>12} {:>14}'.format(
+            'intrinsic', 'operation', 'count', 'wall (ms)', 'cpu (ms)',
+            'bytes')
+    ]
+    for row in self.get_summary():
+      lines.append('{:<32} {:<16} {:>8} {:>12.3f} {:>12.3f} {:>14}'.format(
+          row['intrinsic'], row['name'], row['count'],
+          row['wall_time'] * 1000.0, row['cpu_time'] * 1000.0,
+          row['num_bytes']))
+    return '\n'.join(lines)
+
+
+def _get_num_bytes(value):
+  """Returns the total size of the tensors in `value`, or `None` if unknown."""
+  if isinstance(value, (np.ndarray, np.generic)):
+    return value.nbytes
+  elif isinstance(value, tf.Tensor):
+    num_elements = value.shape.num_elements()
+    if num_elements is None:
+      return None
+    return num_elements * value.dtype.size
+  elif isinstance(value, anonymous_tuple.AnonymousTuple):
+    sizes = [_get_num_bytes(v) for _, v in anonymous_tuple.to_elements(value)]
+  elif isinstance(value, (list, tuple)):
+    sizes = [_get_num_bytes(v) for v in value]
+  elif isinstance(value, dict):
+    sizes = [_get_num_bytes(v) for v in value.values()]
+  else:
+    return None
+  known_sizes = [s for s in sizes if s is not None]
+  return sum(known_sizes) if known_sizes else None
+
+
+def _get_intrinsic_uri(value):
+  """Returns the URI of the intrinsic `value` represents, or `None`."""
+  if isinstance(value, computation_impl.ComputationImpl):
+    value = computation_impl.ComputationImpl.get_proto(value)
+  if (isinstance(value, pb.Computation) and
+      value.WhichOneof('computation') == 'intrinsic'):
+    return value.intrinsic.uri
+  return None
+
+
+def _unwrap(value):
+  if isinstance(value, TracingExecutorValue):
+    return value.internal_representation
+  return value
+
+
+class TracingExecutorValue(executor_value_base.ExecutorValue):
+  """A value embedded in the `TracingExecutor`, wrapping a target value."""
+
+  def __init__(self, value, executor, intrinsic=None):
+    """Creates a value.
+
+    Args:
+      value: The value embedded in the target executor.
+      executor: The `TracingExecutor` the value is embedded in.
+      intrinsic: The optional URI of the intrinsic the value originates from.
+    """
+    py_typecheck.check_type(value, executor_value_base.ExecutorValue)
+    py_typecheck.check_type(executor, TracingExecutor)
+    self._value = value
+    self._executor = executor
+    self._intrinsic = intrinsic
+
+  @property
+  def internal_representation(self):
+    return self._value
+
+  @property
+  def intrinsic(self):
+    return self._intrinsic
+
+  @property
+  def type_signature(self):
+    return self._value.type_signature
+
+  async def compute(self):
+    return await self._executor._compute(self)  # pylint: disable=protected-access
+
+
+class TracingExecutor(executor_base.Executor):
+  """An executor that records a `Span` for each operation it delegates.
+
+  This executor only records the time spent in the operations, and the sizes
+  of the values involved, in an `ExecutionTracer`. All execution is delegated
+  to the target executor. It can be inserted at any layer of an executor stack
+  (see `executor_stacks.create_local_executor`), with one instance per target
+  executor, and any number of instances sharing a single tracer.
+
+  NOTE: This component is only available in Python 3.
+  """
+
+  def __init__(self,
+               target_executor,
+               tracer,
+               layer='',
+               placement=None,
+               client_index=None):
+    """Creates a tracing executor backed by a target executor.
+
+    Args:
+      target_executor: The executor to delegate all the work to.
+      tracer: The `ExecutionTracer` to record the spans in.
+      layer: The name of the layer of the executor stack, for the reports.
+      placement: The optional placement literal of the values embedded in the
+        target executor, if it is a child of a federated executor.
+      client_index: The optional index of the client the target executor
+        runs the work of, if it is a child of a federated executor.
+    """
+    py_typecheck.check_type(target_executor, executor_base.Executor)
+    py_typecheck.check_type(tracer, ExecutionTracer)
+    py_typecheck.check_type(layer, str)
+    if client_index is not None:
+      py_typecheck.check_type(client_index, int)
+    self._target_executor = target_executor
+    self._tracer = tracer
+    self._layer = layer
+    self._placement = placement.uri if placement is not None else None
+    self._client_index = client_index
+
+  def _record(self, name, start_time, start_cpu_time, type_spec,
+              intrinsic=None, num_bytes=None):
+    placement = self._placement
+    if (placement is None and
+        isinstance(type_spec, computation_types.FederatedType)):
+      placement = type_spec.placement.uri
+    self._tracer.record(name, self._layer, start_time, start_cpu_time,
+                        intrinsic, placement, self._client_index, num_bytes)
+
+  async def create_value(self, value, type_spec=None):
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    target_value = await self._target_executor.create_value(value, type_spec)
+    intrinsic = _get_intrinsic_uri(value)
+    self._record('create_value', start_time, start_cpu_time,
+                 target_value.type_signature, intrinsic,
+                 _get_num_bytes(value))
+    return TracingExecutorValue(target_value, self, intrinsic)
+
+  async def create_call(self, comp, arg=None):
+    py_typecheck.check_type(comp, TracingExecutorValue)
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    target_value = await self._target_executor.create_call(
+        comp.internal_representation, _unwrap(arg))
+    self._record('create_call', start_time, start_cpu_time,
+                 target_value.type_signature, comp.intrinsic)
+    return TracingExecutorValue(target_value, self, comp.intrinsic)
+
+  async def create_tuple(self, elements):
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    elements = anonymous_tuple.AnonymousTuple([
+        (k, _unwrap(v)) for k, v in anonymous_tuple.to_elements(
+            anonymous_tuple.from_container(elements))
+    ])
+    target_value = await self._target_executor.create_tuple(elements)
+    self._record('create_tuple', start_time, start_cpu_time,
+                 target_value.type_signature)
+    return TracingExecutorValue(target_value, self)
+
+  async def create_selection(self, source, index=None, name=None):
+    py_typecheck.check_type(source, TracingExecutorValue)
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    target_value = await self._target_executor.create_selection(
+        source.internal_representation, index=index, name=name)
+    self._record('create_selection', start_time, start_cpu_time,
+                 target_value.type_signature, source.intrinsic)
+    return TracingExecutorValue(target_value, self, source.intrinsic)
+
+  async def _compute(self, value):
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    result = await value.internal_representation.compute()
+    self._record('compute', start_time, start_cpu_time, value.type_signature,
+                 value.intrinsic, _get_num_bytes(result))
+    return result
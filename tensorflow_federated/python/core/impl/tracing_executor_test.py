@@ -0,0 +1,140 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tracing_executor.py."""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+
+from absl.testing import absltest
+import tensorflow as tf
+
+from tensorflow_federated.python.core.api import computations
+from tensorflow_federated.python.core.api import intrinsics
+from tensorflow_federated.python.core.impl import eager_executor
+from tensorflow_federated.python.core.impl import executor_stacks
+from tensorflow_federated.python.core.impl import executor_test_utils
+from tensorflow_federated.python.core.impl import intrinsic_defs
+from tensorflow_federated.python.core.impl import set_default_executor
+from tensorflow_federated.python.core.impl import tracing_executor
+from tensorflow_federated.python.core.impl import type_constructors
+
+
+class TracingExecutorTest(absltest.TestCase):
+
+  def test_records_spans_for_each_operation(self):
+    tracer = tracing_executor.ExecutionTracer()
+    ex = tracing_executor.TracingExecutor(
+        eager_executor.EagerExecutor(), tracer, layer='eager')
+    loop = asyncio.get_event_loop()
+
+    @computations.tf_computation(tf.int32, tf.int32)
+    def add(x, y):
+      return x + y
+
+    async def _compute():
+      fn = await ex.create_value(add)
+      arg = await ex.create_tuple([
+          await ex.create_value(10, tf.int32), await
+          ex.create_value(20, tf.int32)
+      ])
+      selection = await ex.create_selection(arg, index=0)
+      result = await ex.create_call(fn, arg)
+      return await selection.compute(), await result.compute()
+
+    selection, result = loop.run_until_complete(_compute())
+    self.assertEqual(selection.numpy(), 10)
+    self.assertEqual(result.numpy(), 30)
+    spans = tracer.spans
+    self.assertEqual([s.name for s in spans], [
+        'create_value', 'create_value', 'create_value', 'create_tuple',
+        'create_selection', 'create_call', 'compute', 'compute'
+    ])
+    for span in spans:
+      self.assertEqual(span.layer, 'eager')
+      self.assertGreaterEqual(span.wall_time, 0.0)
+    self.assertEqual(spans[-1].num_bytes, 4)
+
+  def test_bounds_number_of_spans(self):
+    tracer = tracing_executor.ExecutionTracer(max_spans=2)
+    ex = tracing_executor.TracingExecutor(eager_executor.EagerExecutor(),
+                                          tracer)
+    loop = asyncio.get_event_loop()
+    for x in range(5):
+      loop.run_until_complete(ex.create_value(x, tf.int32))
+    self.assertLen(tracer.spans, 2)
+    tracer.clear()
+    self.assertEmpty(tracer.spans)
+
+  def test_constructor_fails_with_nonpositive_max_spans(self):
+    with self.assertRaises(ValueError):
+      tracing_executor.ExecutionTracer(max_spans=0)
+
+  def test_local_executor_with_tracer_records_intrinsics(self):
+
+    @computations.federated_computation(type_constructors.at_clients(tf.int32))
+    def comp(x):
+      return intrinsics.federated_sum(x)
+
+    tracer = tracing_executor.ExecutionTracer()
+    set_default_executor.set_default_executor(
+        executor_stacks.create_local_executor(3, tracer=tracer))
+    self.assertEqual(comp([1, 2, 3]), 6)
+    set_default_executor.set_default_executor()
+
+    layers = set(s.layer for s in tracer.spans)
+    self.assertEqual(layers, set(['lambda', 'federated', 'concurrent',
+                                  'eager']))
+    client_indices = set(
+        s.client_index for s in tracer.spans if s.client_index is not None)
+    self.assertEqual(client_indices, set([0, 1, 2]))
+    intrinsics_in_summary = set(r['intrinsic'] for r in tracer.get_summary())
+    self.assertIn(intrinsic_defs.FEDERATED_SUM.uri, intrinsics_in_summary)
+    self.assertIn(intrinsic_defs.FEDERATED_SUM.uri, tracer.format_summary())
+
+  def test_writes_chrome_trace(self):
+    tracer = tracing_executor.ExecutionTracer()
+    ex = tracing_executor.TracingExecutor(
+        eager_executor.EagerExecutor(), tracer, layer='eager')
+    loop = asyncio.get_event_loop()
+    val = loop.run_until_complete(ex.create_value(10, tf.int32))
+    loop.run_until_complete(val.compute())
+
+    temp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, temp_dir)
+    path = os.path.join(temp_dir, 'trace.json')
+    tracer.write_chrome_trace(path)
+    with open(path) as f:
+      trace = json.load(f)
+    events = trace['traceEvents']
+    self.assertEqual([e['name'] for e in events], ['create_value', 'compute'])
+    for event in events:
+      self.assertEqual(event['ph'], 'X')
+      self.assertEqual(event['cat'], 'eager')
+      self.assertGreaterEqual(event['dur'], 0.0)
+    self.assertEqual(events[1]['args']['num_bytes'], 4)
+
+  def test_with_mnist_training_example(self):
+    executor_test_utils.test_mnist_training(
+        self,
+        executor_stacks.create_local_executor(
+            1, tracer=tracing_executor.ExecutionTracer()))
+
+
+if __name__ == '__main__':
+  tf.compat.v1.enable_v2_behavior()
+  absltest.main()
@@ -22,6 +22,7 @@ import abc
 import collections
 import itertools
 
+from absl import logging
 import six
 from six.moves import zip
 
@@ -32,7 +33,7 @@ from tensorflow_federated.python.core.impl import type_utils
 
 
 def transform_postorder(comp, transform):
-  """Traverses `comp` recursively postorder and replaces its constituents.
+  """Traverses `comp` postorder and replaces its constituents.
 
   For each element of `comp` viewed as an expression tree, the transformation
   `transform` is applied first to building blocks it is parameterized by, then
@@ -71,60 +72,102 @@ def transform_postorder(comp, transform):
   """
   py_typecheck.check_type(comp,
                           computation_building_blocks.ComputationBuildingBlock)
-  if isinstance(
-      comp,
-      (computation_building_blocks.CompiledComputation,
-       computation_building_blocks.Data, computation_building_blocks.Intrinsic,
-       computation_building_blocks.Placement,
-       computation_building_blocks.Reference)):
-    return transform(comp)
-  elif isinstance(comp, computation_building_blocks.Selection):
-    source, source_modified = transform_postorder(comp.source, transform)
-    if source_modified:
-      comp = computation_building_blocks.Selection(source, comp.name,
-                                                   comp.index)
+  # The traversal uses an explicit stack rather than Python recursion, so that
+  # arbitrarily deep computations (e.g., long chains of blocks or calls) do not
+  # exceed the recursion limit. Each entry on the stack holds a building block,
+  # and the number of its children if these have already been visited, or
+  # `None` otherwise; the results for the visited children are kept in order on
+  # `results`.
+  stack = [(comp, None)]
+  results = []
+  while stack:
+    comp, num_children = stack.pop()
+    if num_children is None:
+      children = _get_children(comp)
+      stack.append((comp, len(children)))
+      stack.extend((child, None) for child in reversed(children))
+      continue
+    children_modified = False
+    if num_children:
+      children = [child for child, _ in results[-num_children:]]
+      children_modified = any(
+          modified for _, modified in results[-num_children:])
+      del results[-num_children:]
+      if children_modified:
+        comp = _rebuild_with_children(comp, children)
     comp, comp_modified = transform(comp)
-    return comp, comp_modified or source_modified
+    results.append((comp, comp_modified or children_modified))
+  return results[0]
+
+
+def _get_children(comp):
+  """Returns the list of building blocks `comp` is parameterized by.
+
+  The children are listed in the order in which they are passed to the
+  constructor of `comp` (e.g., the function before the argument of a `Call`,
+  and the locals before the result of a `Block`).
+
+  Args:
+    comp: The `computation_building_blocks.ComputationBuildingBlock` whose
+      children to return.
+
+  Returns:
+    A list of `computation_building_blocks.ComputationBuildingBlock`s.
+
+  Raises:
+    NotImplementedError: If `comp` is a kind of computation building block that
+      is currently not recognized.
+  """
+  if isinstance(comp, (computation_building_blocks.CompiledComputation,
+                       computation_building_blocks.Data,
+                       computation_building_blocks.Intrinsic,
+                       computation_building_blocks.Placement,
+                       computation_building_blocks.Reference)):
+    return []
+  elif isinstance(comp, computation_building_blocks.Selection):
+    return [comp.source]
   elif isinstance(comp, computation_building_blocks.Tuple):
-    elements = []
-    elements_modified = False
-    for key, value in anonymous_tuple.to_elements(comp):
-      value, value_modified = transform_postorder(value, transform)
-      elements.append((key, value))
-      elements_modified = elements_modified or value_modified
-    if elements_modified:
-      comp = computation_building_blocks.Tuple(elements)
-    comp, comp_modified = transform(comp)
-    return comp, comp_modified or elements_modified
+    return [value for _, value in anonymous_tuple.to_elements(comp)]
   elif isinstance(comp, computation_building_blocks.Call):
-    fn, fn_modified = transform_postorder(comp.function, transform)
     if comp.argument is not None:
-      arg, arg_modified = transform_postorder(comp.argument, transform)
-    else:
-      arg, arg_modified = (None, False)
-    if fn_modified or arg_modified:
-      comp = computation_building_blocks.Call(fn, arg)
-    comp, comp_modified = transform(comp)
-    return comp, comp_modified or fn_modified or arg_modified
+      return [comp.function, comp.argument]
+    return [comp.function]
   elif isinstance(comp, computation_building_blocks.Lambda):
-    result, result_modified = transform_postorder(comp.result, transform)
-    if result_modified:
-      comp = computation_building_blocks.Lambda(comp.parameter_name,
-                                                comp.parameter_type, result)
-    comp, comp_modified = transform(comp)
-    return comp, comp_modified or result_modified
+    return [comp.result]
   elif isinstance(comp, computation_building_blocks.Block):
-    variables = []
-    variables_modified = False
-    for key, value in comp.locals:
-      value, value_modified = transform_postorder(value, transform)
-      variables.append((key, value))
-      variables_modified = variables_modified or value_modified
-    result, result_modified = transform_postorder(comp.result, transform)
-    if variables_modified or result_modified:
-      comp = computation_building_blocks.Block(variables, result)
-    comp, comp_modified = transform(comp)
-    return comp, comp_modified or variables_modified or result_modified
+    return [value for _, value in comp.locals] + [comp.result]
+  else:
+    raise NotImplementedError(
+        'Unrecognized computation building block: {}'.format(str(comp)))
+
+
+def _rebuild_with_children(comp, children):
+  """Returns a copy of `comp` with its children replaced by `children`.
+
+  Args:
+    comp: The `computation_building_blocks.ComputationBuildingBlock` to copy.
+    children: A list of the new children, in the order returned by
+      `_get_children`.
+
+  Returns:
+    A new `computation_building_blocks.ComputationBuildingBlock`.
+  """
+  if isinstance(comp, computation_building_blocks.Selection):
+    return computation_building_blocks.Selection(children[0], comp.name,
+                                                 comp.index)
+  elif isinstance(comp, computation_building_blocks.Tuple):
+    names = [name for name, _ in anonymous_tuple.to_elements(comp)]
+    return computation_building_blocks.Tuple(list(zip(names, children)))
+  elif isinstance(comp, computation_building_blocks.Call):
+    arg = children[1] if len(children) > 1 else None
+    return computation_building_blocks.Call(children[0], arg)
+  elif isinstance(comp, computation_building_blocks.Lambda):
+    return computation_building_blocks.Lambda(comp.parameter_name,
+                                              comp.parameter_type, children[0])
+  elif isinstance(comp, computation_building_blocks.Block):
+    names = [name for name, _ in comp.locals]
+    return computation_building_blocks.Block(
+        list(zip(names, children[:-1])), children[-1])
   else:
     raise NotImplementedError(
         'Unrecognized computation building block: {}'.format(str(comp)))
@@ -188,116 +231,55 @@ def transform_postorder_with_symbol_bindings(comp, transform, symbol_tree):
                     '`transform_postorder_with_symbol_bindings` must '
                     'be callable.')
   identifier_seq = itertools.count(start=1)
-
-  def _transform_postorder_with_symbol_bindings_switch(comp, transform_fn,
-                                                       ctxt_tree,
-                                                       identifier_sequence):
-    """Recursive helper function delegated to after binding comp_id sequence."""
-    if isinstance(comp, (computation_building_blocks.CompiledComputation,
-                         computation_building_blocks.Data,
-                         computation_building_blocks.Intrinsic,
-                         computation_building_blocks.Placement,
-                         computation_building_blocks.Reference)):
-      return _traverse_leaf(comp, transform_fn, ctxt_tree, identifier_sequence)
-    elif isinstance(comp, computation_building_blocks.Selection):
-      return _traverse_selection(comp, transform, ctxt_tree,
-                                 identifier_sequence)
-    elif isinstance(comp, computation_building_blocks.Tuple):
-      return _traverse_tuple(comp, transform, ctxt_tree, identifier_sequence)
-    elif isinstance(comp, computation_building_blocks.Call):
-      return _traverse_call(comp, transform, ctxt_tree, identifier_sequence)
-    elif isinstance(comp, computation_building_blocks.Lambda):
-      return _traverse_lambda(comp, transform, ctxt_tree, identifier_sequence)
-    elif isinstance(comp, computation_building_blocks.Block):
-      return _traverse_block(comp, transform, ctxt_tree, identifier_sequence)
-    else:
-      raise NotImplementedError(
-          'Unrecognized computation building block: {}'.format(str(comp)))
-
-  def _traverse_leaf(comp, transform, context_tree, identifier_seq):
-    """Helper function holding traversal logic for leaf nodes."""
-    _ = six.next(identifier_seq)
-    return transform(comp, context_tree)
-
-  def _traverse_selection(comp, transform, context_tree, identifier_seq):
-    """Helper function holding traversal logic for selection nodes."""
-    _ = six.next(identifier_seq)
-    source, source_modified = _transform_postorder_with_symbol_bindings_switch(
-        comp.source, transform, context_tree, identifier_seq)
-    if source_modified:
-      comp = computation_building_blocks.Selection(source, comp.name,
-                                                   comp.index)
-    comp, comp_modified = transform(comp, context_tree)
-    return comp, comp_modified or source_modified
-
-  def _traverse_tuple(comp, transform, context_tree, identifier_seq):
-    """Helper function holding traversal logic for tuple nodes."""
-    _ = six.next(identifier_seq)
-    elements = []
-    elements_modified = False
-    for key, value in anonymous_tuple.to_elements(comp):
-      value, value_modified = _transform_postorder_with_symbol_bindings_switch(
-          value, transform, context_tree, identifier_seq)
-      elements.append((key, value))
-      elements_modified = elements_modified or value_modified
-    if elements_modified:
-      comp = computation_building_blocks.Tuple(elements)
-    comp, comp_modified = transform(comp, context_tree)
-    return comp, comp_modified or elements_modified
-
-  def _traverse_call(comp, transform, context_tree, identifier_seq):
-    """Helper function holding traversal logic for call nodes."""
-    _ = six.next(identifier_seq)
-    fn, fn_modified = _transform_postorder_with_symbol_bindings_switch(
-        comp.function, transform, context_tree, identifier_seq)
-    if comp.argument is not None:
-      arg, arg_modified = _transform_postorder_with_symbol_bindings_switch(
-          comp.argument, transform, context_tree, identifier_seq)
+  # As in `transform_postorder`, the traversal uses an explicit stack rather
+  # than Python recursion. The stack holds actions: visiting a building block,
+  # ingesting the binding of a block local once its value has been visited,
+  # and finishing a building block once all of its children have been visited.
+  # The results for the visited building blocks are kept in order on `results`.
+  visit, bind, finish = range(3)
+  stack = [(visit, comp, None)]
+  results = []
+  while stack:
+    action, comp, arg = stack.pop()
+    if action == visit:
+      comp_id = six.next(identifier_seq)
+      children = _get_children(comp)
+      if isinstance(comp, computation_building_blocks.Lambda):
+        symbol_tree.drop_scope_down(comp_id)
+        symbol_tree.ingest_variable_binding(
+            name=comp.parameter_name, value=None)
+      elif isinstance(comp, computation_building_blocks.Block):
+        symbol_tree.drop_scope_down(comp_id)
+      stack.append((finish, comp, len(children)))
+      if isinstance(comp, computation_building_blocks.Block):
+        stack.append((visit, comp.result, None))
+        for name, value in reversed(comp.locals):
+          stack.append((bind, None, name))
+          stack.append((visit, value, None))
+      else:
+        stack.extend((visit, child, None) for child in reversed(children))
+    elif action == bind:
+      symbol_tree.ingest_variable_binding(name=arg, value=results[-1][0])
     else:
-      arg, arg_modified = (None, False)
-    if fn_modified or arg_modified:
-      comp = computation_building_blocks.Call(fn, arg)
-    comp, comp_modified = transform(comp, context_tree)
-    return comp, comp_modified or fn_modified or arg_modified
-
-  def _traverse_lambda(comp, transform, context_tree, identifier_seq):
-    """Helper function holding traversal logic for lambda nodes."""
-    comp_id = six.next(identifier_seq)
-    context_tree.drop_scope_down(comp_id)
-    context_tree.ingest_variable_binding(name=comp.parameter_name, value=None)
-    result, result_modified = _transform_postorder_with_symbol_bindings_switch(
-        comp.result, transform, context_tree, identifier_seq)
-    context_tree.walk_to_scope_beginning()
-    if result_modified:
-      comp = computation_building_blocks.Lambda(comp.parameter_name,
-                                                comp.parameter_type, result)
-    comp, comp_modified = transform(comp, context_tree)
-    context_tree.pop_scope_up()
-    return comp, comp_modified or result_modified
-
-  def _traverse_block(comp, transform, context_tree, identifier_seq):
-    """Helper function holding traversal logic for block nodes."""
-    comp_id = six.next(identifier_seq)
-    context_tree.drop_scope_down(comp_id)
-    variables = []
-    variables_modified = False
-    for key, value in comp.locals:
-      value, value_modified = _transform_postorder_with_symbol_bindings_switch(
-          value, transform, context_tree, identifier_seq)
-      context_tree.ingest_variable_binding(name=key, value=value)
-      variables.append((key, value))
-      variables_modified = variables_modified or value_modified
-    result, result_modified = _transform_postorder_with_symbol_bindings_switch(
-        comp.result, transform, context_tree, identifier_seq)
-    context_tree.walk_to_scope_beginning()
-    if variables_modified or result_modified:
-      comp = computation_building_blocks.Block(variables, result)
-    comp, comp_modified = transform(comp, context_tree)
-    context_tree.pop_scope_up()
-    return comp, comp_modified or variables_modified or result_modified
-
-  return _transform_postorder_with_symbol_bindings_switch(
-      comp, transform, symbol_tree, identifier_seq)
+      num_children = arg
+      introduces_scope = isinstance(comp,
+                                    (computation_building_blocks.Lambda,
+                                     computation_building_blocks.Block))
+      if introduces_scope:
+        symbol_tree.walk_to_scope_beginning()
+      children_modified = False
+      if num_children:
+        children = [child for child, _ in results[-num_children:]]
+        children_modified = any(
+            modified for _, modified in results[-num_children:])
+        del results[-num_children:]
+        if children_modified:
+          comp = _rebuild_with_children(comp, children)
+      comp, comp_modified = transform(comp, symbol_tree)
+      if introduces_scope:
+        symbol_tree.pop_scope_up()
+      results.append((comp, comp_modified or children_modified))
+  return results[0]
 
 
 class SymbolTree(object):
@@ -1027,3 +1009,146 @@ class TransformSpec(object):
   @abc.abstractmethod
   def transform(self, comp):
     pass
+
+
+class RewriteEngine(object):
+  """Applies a set of `TransformSpec`s to a computation in a single sweep.
+
+  Unlike applying each of the specs with a separate call to
+  `transform_postorder`, which walks (and possibly rebuilds) the entire tree
+  once per spec, the engine visits the tree once, postorder, and at each node
+  applies the first spec (in the order given) that transforms it. Whenever a
+  node is rewritten, the result is visited again, so that the specs can fire
+  on it as well, but the subtrees that have already been visited and are known
+  not to match any of the specs are not descended into again. Parents whose
+  children have not changed are not rebuilt.
+
+  The engine counts how many times each of the specs has fired, across all
+  calls to `rewrite`.
+  """
+
+  def __init__(self, specs, max_rewrites_per_node=100):
+    """Constructs an engine that applies the given specs.
+
+    Args:
+      specs: A list of `TransformSpec`s, in the order of priority.
+      max_rewrites_per_node: The maximum number of times a single node (and
+        the nodes it is rewritten into) can be rewritten, to guard against
+        specs that undo each other's work. When it is reached, a warning that
+        names the last spec that fired is logged, and the node is left as is,
+        but its children are still rewritten.
+
+    Raises:
+      ValueError: If `max_rewrites_per_node` is not positive.
+    """
+    py_typecheck.check_type(specs, list)
+    for spec in specs:
+      py_typecheck.check_type(spec, TransformSpec)
+    py_typecheck.check_type(max_rewrites_per_node, int)
+    if max_rewrites_per_node < 1:
+      raise ValueError(
+          'The maximum number of rewrites must be positive, found {}.'.format(
+              str(max_rewrites_per_node)))
+    self._specs = specs
+    self._max_rewrites_per_node = max_rewrites_per_node
+    self._hit_counts = [0] * len(specs)
+    # Maps `id()`s of visited nodes that no spec applies to, to the nodes.
+    self._normal_forms = None
+
+  @property
+  def specs(self):
+    return list(self._specs)
+
+  @property
+  def hit_counts(self):
+    """A list of the numbers of times each of the `specs` has fired."""
+    return list(self._hit_counts)
+
+  def rewrite(self, comp):
+    """Applies the specs to `comp` until none of them applies anywhere.
+
+    Args:
+      comp: The `computation_building_blocks.ComputationBuildingBlock` to
+        transform.
+
+    Returns:
+      A tuple of the transformed computation, and a Boolean that indicates
+      whether it has been modified, following the conventions of
+      `transform_postorder`.
+
+    Raises:
+      NotImplementedError: If `comp` contains a kind of building block that
+        is currently not recognized.
+    """
+    py_typecheck.check_type(
+        comp, computation_building_blocks.ComputationBuildingBlock)
+    self._normal_forms = {}
+    try:
+      result = self._rewrite(comp)
+    finally:
+      self._normal_forms = None
+    return result, result is not comp
+
+  def _is_normal_form(self, comp):
+    return self._normal_forms.get(id(comp)) is comp
+
+  def _rewrite(self, comp):
+    """Returns `comp` rewritten until none of the specs applies to it."""
+    # As in `transform_postorder`, an explicit stack is used rather than Python
+    # recursion. Each entry holds a building block, the number of times it (or
+    # the building blocks it has been rewritten from) has been rewritten, and
+    # the number of its children if these have already been visited, or `None`
+    # otherwise. Building blocks that have been rewritten the maximum number of
+    # times are still visited, so that their children are rewritten, but the
+    # specs are not applied to them again.
+    stack = [(comp, 0, None)]
+    results = []
+    while stack:
+      comp, num_rewrites, num_children = stack.pop()
+      if num_children is None:
+        if self._is_normal_form(comp):
+          results.append(comp)
+          continue
+        children = _get_children(comp)
+        stack.append((comp, num_rewrites, len(children)))
+        stack.extend((child, 0, None) for child in reversed(children))
+        continue
+      if num_children:
+        children = results[-num_children:]
+        del results[-num_children:]
+        if any(new is not old for new, old in zip(children,
+                                                    _get_children(comp))):
+          comp = _rebuild_with_children(comp, children)
+      if num_rewrites >= self._max_rewrites_per_node:
+        results.append(comp)
+        continue
+      rewritten_comp, spec = self._apply_first_matching_spec(comp)
+      if rewritten_comp is None:
+        self._normal_forms[id(comp)] = comp
+        results.append(comp)
+        continue
+      if num_rewrites + 1 >= self._max_rewrites_per_node:
+        logging.warning(
+            'Stopped rewriting a node after %d rewrites, the last one by the '
+            'spec %s, which may keep applying: %s', num_rewrites + 1,
+            type(spec).__name__, rewritten_comp.compact_representation())
+      stack.append((rewritten_comp, num_rewrites + 1, None))
+    return results[0]
+
+  def _apply_first_matching_spec(self, comp):
+    """Returns `comp` transformed by the first applicable spec, and the spec.
+
+    Args:
+      comp: The building block to transform.
+
+    Returns:
+      A tuple of the transformed building block and the spec that has
+      transformed it, or `(None, None)` if none of the specs applies.
+    """
+    for index, spec in enumerate(self._specs):
+      if spec.should_transform(comp):
+        rewritten_comp, modified = spec.transform(comp)
+        if modified:
+          self._hit_counts[index] += 1
+          return rewritten_comp, spec
+    return None, None
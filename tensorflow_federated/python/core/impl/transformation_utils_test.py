@@ -177,6 +177,37 @@ def _get_number_of_nodes_via_transform_postorder_with_symbol_bindings(
   return count[0]
 
 
+class RenameData(transformation_utils.TransformSpec):
+  """Renames the `Data` building blocks with URI `old_uri` to `new_uri`."""
+
+  def __init__(self, old_uri, new_uri):
+    self._old_uri = old_uri
+    self._new_uri = new_uri
+
+  def should_transform(self, comp):
+    return (isinstance(comp, computation_building_blocks.Data) and
+            comp.uri == self._old_uri)
+
+  def transform(self, comp):
+    if not self.should_transform(comp):
+      return comp, False
+    return computation_building_blocks.Data(self._new_uri,
+                                            comp.type_signature), True
+
+
+class ResetTuple(transformation_utils.TransformSpec):
+  """Replaces the elements of every `Tuple` with a new `Data` building block."""
+
+  def should_transform(self, comp):
+    return isinstance(comp, computation_building_blocks.Tuple)
+
+  def transform(self, comp):
+    if not self.should_transform(comp):
+      return comp, False
+    return computation_building_blocks.Tuple(
+        [computation_building_blocks.Data('a', tf.int32)]), True
+
+
 class TransformationUtilsTest(parameterized.TestCase):
 
   def test_transform_postorder_fails_on_none_comp(self):
@@ -323,6 +354,108 @@ class TransformationUtilsTest(parameterized.TestCase):
 
     self.assertEqual(leaf_name_order, list(postorder_nodes))
 
+  def test_transform_postorder_handles_deep_computation(self):
+    data = computation_building_blocks.Data('a', tf.int32)
+    comp = computation_test_utils.create_deep_computation(data, 10000)
+
+    self.assertEqual(_get_number_of_nodes_via_transform_postorder(comp), 25001)
+    transformed_comp, modified = transformation_utils.transform_postorder(
+        comp, RenameData('a', 'b').transform)
+
+    self.assertTrue(modified)
+    self.assertEqual(transformed_comp.type_signature, comp.type_signature)
+
+  def test_transform_postorder_with_symbol_bindings_handles_deep_computation(
+      self):
+    data = computation_building_blocks.Data('a', tf.int32)
+    comp = computation_test_utils.create_deep_computation(data, 10000)
+
+    self.assertEqual(
+        _get_number_of_nodes_via_transform_postorder_with_symbol_bindings(comp),
+        25001)
+
+  def test_rewrite_engine_applies_chained_specs_in_single_sweep(self):
+    complex_ast = computation_test_utils.create_nested_syntax_tree()
+    engine = transformation_utils.RewriteEngine(
+        [RenameData('b', 'c'), RenameData('a', 'b')])
+
+    transformed_comp, modified = engine.rewrite(complex_ast)
+
+    self.assertTrue(modified)
+    self.assertEqual(engine.hit_counts, [2, 1])
+
+    def has_uri(uri):
+      return lambda x: (isinstance(x, computation_building_blocks.Data) and
+                        x.uri == uri)
+
+    for uri, expected_count in [('a', 0), ('b', 0), ('c', 3)]:
+      self.assertEqual(
+          _get_number_of_nodes_via_transform_postorder(
+              transformed_comp, predicate=has_uri(uri)), expected_count)
+
+  def test_rewrite_engine_returns_untransformed_comp_identically(self):
+    complex_ast = computation_test_utils.create_nested_syntax_tree()
+    engine = transformation_utils.RewriteEngine([RenameData('zz', 'a')])
+
+    transformed_comp, modified = engine.rewrite(complex_ast)
+
+    self.assertIs(transformed_comp, complex_ast)
+    self.assertFalse(modified)
+    self.assertEqual(engine.hit_counts, [0])
+
+  def test_rewrite_engine_does_not_rebuild_unchanged_subtrees(self):
+    unchanged = computation_building_blocks.Tuple(
+        [computation_building_blocks.Data('x', tf.int32)])
+    comp = computation_building_blocks.Tuple(
+        [computation_building_blocks.Data('a', tf.int32), unchanged])
+    engine = transformation_utils.RewriteEngine([RenameData('a', 'b')])
+
+    transformed_comp, modified = engine.rewrite(comp)
+
+    self.assertTrue(modified)
+    self.assertEqual(transformed_comp[0].uri, 'b')
+    self.assertIs(transformed_comp[1], unchanged)
+
+  def test_rewrite_engine_bounds_rewrites_of_single_node(self):
+    comp = computation_building_blocks.Data('a', tf.int32)
+    engine = transformation_utils.RewriteEngine(
+        [RenameData('a', 'b'), RenameData('b', 'a')], max_rewrites_per_node=3)
+
+    transformed_comp, modified = engine.rewrite(comp)
+
+    self.assertTrue(modified)
+    self.assertEqual(transformed_comp.uri, 'b')
+    self.assertEqual(engine.hit_counts, [2, 1])
+
+  def test_rewrite_engine_rewrites_children_of_node_at_max_rewrites(self):
+    comp = computation_building_blocks.Tuple(
+        [computation_building_blocks.Data('b', tf.int32)])
+    engine = transformation_utils.RewriteEngine(
+        [ResetTuple(), RenameData('a', 'b')], max_rewrites_per_node=3)
+
+    with self.assertLogs(level='WARNING') as logs:
+      transformed_comp, modified = engine.rewrite(comp)
+
+    self.assertIn('ResetTuple', ''.join(logs.output))
+    self.assertTrue(modified)
+    self.assertEqual(transformed_comp.compact_representation(), '<b>')
+    self.assertEqual(engine.hit_counts, [3, 3])
+
+  def test_rewrite_engine_handles_deep_computation(self):
+    data = computation_building_blocks.Data('a', tf.int32)
+    comp = computation_test_utils.create_deep_computation(data, 10000)
+    engine = transformation_utils.RewriteEngine([RenameData('a', 'b')])
+
+    _, modified = engine.rewrite(comp)
+
+    self.assertTrue(modified)
+    self.assertEqual(engine.hit_counts, [1])
+
+  def test_rewrite_engine_fails_on_nonpositive_max_rewrites(self):
+    with self.assertRaises(ValueError):
+      transformation_utils.RewriteEngine([RenameData('a', 'b')],
+                                         max_rewrites_per_node=0)
+
   # TODO(b/113123410): Add more tests for corner cases of `transform_preorder`.
 
   def test_transform_postorder_with_symbol_bindings_fails_on_none_comp(self):
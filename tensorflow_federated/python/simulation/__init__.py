@@ -20,17 +20,25 @@ from __future__ import print_function
 
 from tensorflow_federated.python.simulation import datasets
 from tensorflow_federated.python.simulation.client_data import ClientData
+from tensorflow_federated.python.simulation.columnar_client_data import ColumnarClientData
+from tensorflow_federated.python.simulation.columnar_client_data import write_columnar_client_data
 from tensorflow_federated.python.simulation.file_per_user_client_data import FilePerUserClientData
 from tensorflow_federated.python.simulation.from_tensor_slices_client_data import FromTensorSlicesClientData
 from tensorflow_federated.python.simulation.hdf5_client_data import HDF5ClientData
+from tensorflow_federated.python.simulation.round_sampler import compute_client_sizes
+from tensorflow_federated.python.simulation.round_sampler import RoundSampler
 from tensorflow_federated.python.simulation.transforming_client_data import TransformingClientData
 
 # Used by doc generation script.
 _allowed_symbols = [
     "ClientData",
+    "ColumnarClientData",
     "FilePerUserClientData",
     "FromTensorSlicesClientData",
     "HDF5ClientData",
+    "RoundSampler",
     "TransformingClientData",
+    "compute_client_sizes",
     "datasets",
+    "write_columnar_client_data",
 ]
@@ -26,11 +26,12 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
-import numpy as np
 
 import six
 import tensorflow as tf
 
+from tensorflow_federated.python.common_libs import py_typecheck
+
 
 @six.add_metaclass(abc.ABCMeta)
 class ClientData(object):
@@ -53,36 +54,92 @@ class ClientData(object):
     """
     pass
 
-  def create_tf_dataset_from_all_clients(self, seed=None):
+  def create_tf_dataset_from_all_clients(self,
+                                         seed=None,
+                                         cycle_length=1,
+                                         num_parallel_calls=None,
+                                         max_examples_per_client=None):
     """Creates a new `tf.data.Dataset` containing _all_ client examples.
 
-    NOTE: the returned `tf.data.Dataset` is not serializable and runnable on
-    other devices, as it uses `tf.py_func` internally.
+    The clients are processed in a random order, which is reshuffled each time
+    the dataset is iterated over (e.g., in each epoch after `repeat()`), and
+    the examples of `cycle_length` clients at a time are interleaved. With the
+    default `cycle_length` of 1, the dataset contains all examples from a
+    single client in order, and so generally additional shuffling should be
+    performed.
 
-    Currently, the implementation produces a dataset that contains
-    all examples from a single client in order, and so generally additional
-    shuffling should be performed.
+    NOTE: Whether the returned `tf.data.Dataset` is serializable and runnable
+    on other devices depends on the subclass. By default, the examples of each
+    client are read with `tf.data.Dataset.from_generator`, which uses
+    `tf.py_func` internally, and thus also holds the Python GIL.
 
     Args:
       seed: Optional, a seed to determine the order in which clients are
         processed in the joined dataset.
+      cycle_length: The number of clients whose examples are interleaved, as
+        in `tf.data.Dataset.interleave`.
+      num_parallel_calls: Optional, the number of client datasets to read from
+        in parallel, as in `tf.data.Dataset.interleave`, or
+        `tf.data.experimental.AUTOTUNE`. If `None`, they are read sequentially.
+      max_examples_per_client: Optional, the maximum number of examples to
+        take from the start of the dataset of each client.
 
     Returns:
       A `tf.data.Dataset` object.
     """
-
+    py_typecheck.check_type(cycle_length, int)
+    if max_examples_per_client is not None:
+      py_typecheck.check_type(max_examples_per_client, int)
+      if max_examples_per_client < 1:
+        raise ValueError(
+            'The maximum number of examples per client must be positive, '
+            'found {}.'.format(max_examples_per_client))
     # NOTE: simply calling Dataset.concatenate() will result in too deep
     # recursion depth.
     # NOTE: Tests are via the simple concrete from_tensor_slices_client_data.
-    def _generator():
-      client_ids = list(self.client_ids)
-      np.random.RandomState(seed=seed).shuffle(client_ids)
-      for client_id in client_ids:
-        for example in self.create_tf_dataset_for_client(client_id):
-          yield example
-
-    return tf.data.Dataset.from_generator(_generator, self.output_types,
-                                          self.output_shapes)
+    num_clients = len(self.client_ids)
+    client_indices = tf.data.Dataset.range(num_clients).shuffle(
+        max(num_clients, 1), seed=seed, reshuffle_each_iteration=True)
+    create_dataset_fn = self._get_create_tf_dataset_for_client_index_fn()
+
+    def _create_dataset(client_index):
+      dataset = create_dataset_fn(client_index)
+      if max_examples_per_client is not None:
+        dataset = dataset.take(max_examples_per_client)
+      return dataset
+
+    return client_indices.interleave(
+        _create_dataset,
+        cycle_length=cycle_length,
+        block_length=1,
+        num_parallel_calls=num_parallel_calls)
+
+  def _get_create_tf_dataset_for_client_index_fn(self):
+    """Returns a function that creates the dataset of a client by its index.
+
+    The returned function accepts a scalar `tf.int64` tensor with the position
+    of a client in `client_ids`, and returns a `tf.data.Dataset` with the same
+    examples as `create_tf_dataset_for_client`. It is invoked while tracing a
+    `tf.data.Dataset.interleave` function, so subclasses that can create the
+    datasets with TensorFlow ops alone should override this method to make
+    `create_tf_dataset_from_all_clients` serializable, and free of the GIL.
+
+    Returns:
+      A one-argument callable.
+    """
+    client_ids = self.client_ids
+
+    def _generator(client_index):
+      for example in self.create_tf_dataset_for_client(
+          client_ids[client_index]):
+        yield example
+
+    def _create_dataset(client_index):
+      return tf.data.Dataset.from_generator(
+          _generator, self.output_types, self.output_shapes,
+          args=(client_index,))
+
+    return _create_dataset
 
   @abc.abstractproperty
   def output_types(self):
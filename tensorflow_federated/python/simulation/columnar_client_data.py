@@ -0,0 +1,444 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Implementation of a ClientData backed by memory-mapped columnar files."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import os
+
+import numpy as np
+import six
+from six.moves import range
+from six.moves import zip
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import py_typecheck
+from tensorflow_federated.python.simulation import client_data
+
+_FORMAT_VERSION = 2
+_METADATA_FILENAME = 'metadata.json'
+_CLIENT_IDS_FILENAME = 'client_ids.bin'
+_OFFSETS_FILENAME = 'offsets.bin'
+
+# The number of examples read from the source `ClientData` at a time when
+# converting it to the columnar format.
+_WRITE_BATCH_SIZE = 10000
+
+# The numeric dtypes, which are stored as raw little-endian arrays.
+_SUPPORTED_DTYPES = [
+    tf.bool, tf.int8, tf.int16, tf.int32, tf.int64, tf.uint8, tf.uint16,
+    tf.float16, tf.float32, tf.float64, tf.complex64, tf.complex128
+]
+
+# The dtype of string features in the metadata.
+_STRING_DTYPE = 'string'
+
+
+def _feature_filename(index):
+  return 'feature_{}.bin'.format(index)
+
+
+def _string_offsets_filename(index):
+  return 'feature_{}_offsets.bin'.format(index)
+
+
+def _memmap(path, dtype, shape):
+  """Memory-maps the array of `dtype` and `shape` stored at `path`."""
+  if not np.prod(shape):
+    # Empty files cannot be memory-mapped.
+    return np.zeros(shape, dtype=dtype)
+  return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+
+
+class _Feature(object):
+  """A single feature stored in the columnar format."""
+
+  def __init__(self, name, dtype, shape):
+    """Constructs the feature, before its values are memory-mapped.
+
+    Args:
+      name: The string name of the feature, or `None` if the examples are
+        single tensors, rather than dictionaries.
+      dtype: The little-endian `np.dtype` of the stored values, or `None` for
+        strings.
+      shape: The list of dimensions of the value of the feature in an example.
+    """
+    self.name = name
+    self.dtype = dtype
+    self.shape = shape
+    if dtype is None:
+      self.tf_dtype = tf.string
+    else:
+      self.tf_dtype = tf.as_dtype(dtype)
+    self._values = None
+    self._string_offsets = None
+
+  def open(self, dirpath, index, num_examples):
+    """Memory-maps the stored values of the feature.
+
+    Numeric values are stored as a single array of all examples. Strings are
+    stored as the concatenation of their bytes, along with the array of the
+    offsets at which each of them starts, followed by the total length.
+
+    Args:
+      dirpath: The directory of the data.
+      index: The index of the feature.
+      num_examples: The total number of examples.
+    """
+    path = os.path.join(dirpath, _feature_filename(index))
+    if self.dtype is None:
+      self._string_offsets = _memmap(
+          os.path.join(dirpath, _string_offsets_filename(index)), '<i8',
+          [num_examples + 1])
+      self._values = _memmap(path, np.uint8,
+                             [int(self._string_offsets[num_examples])])
+    else:
+      self._values = _memmap(path, self.dtype, [num_examples] + self.shape)
+
+  def read(self, start, end):
+    """Reads the values of the examples from `start` up to `end` into memory.
+
+    Only the bytes of the requested examples are read from the files.
+
+    Args:
+      start: The index of the first example.
+      end: The index past the last example.
+
+    Returns:
+      A Numpy array of the values, with an object dtype for strings.
+    """
+    if self.dtype is None:
+      offsets = self._string_offsets[start:end + 1]
+      data = self._values[offsets[0]:offsets[-1]].tobytes()
+      offsets = offsets - offsets[0]
+      return np.array(
+          [data[i:j] for i, j in zip(offsets[:-1], offsets[1:])],
+          dtype=object).reshape([end - start])
+    return np.asarray(
+        self._values[start:end], dtype=self.tf_dtype.as_numpy_dtype)
+
+
+class _ClientIds(collections.Sequence):
+  """A read-only view of the sorted client ids, stored as UTF-8 bytes.
+
+  The ids are decoded on access, and looked up by binary search, so the view
+  does not hold the ids in memory.
+  """
+
+  def __init__(self, array):
+    self._array = array
+
+  def __len__(self):
+    return len(self._array)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    return tf.compat.as_str(self._array[index])
+
+  def __contains__(self, client_id):
+    return self._find(client_id) is not None
+
+  def __eq__(self, other):
+    if isinstance(other, (list, tuple, _ClientIds)):
+      return len(self) == len(other) and all(
+          x == y for x, y in zip(self, other))
+    return NotImplemented
+
+  def __ne__(self, other):
+    result = self.__eq__(other)
+    return result if result is NotImplemented else not result
+
+  def _find(self, client_id):
+    key = tf.compat.as_bytes(client_id)
+    if len(key) > self._array.dtype.itemsize:
+      return None
+    index = int(np.searchsorted(self._array, key))
+    if index < len(self._array) and self._array[index] == key:
+      return index
+    return None
+
+  def index(self, client_id):  # pylint: disable=arguments-differ
+    """Returns the position of `client_id` in the sorted client ids.
+
+    Args:
+      client_id: The string client_id.
+
+    Raises:
+      ValueError: If there is no such client.
+    """
+    index = self._find(client_id)
+    if index is None:
+      raise ValueError('No client with id {}.'.format(client_id))
+    return index
+
+
+class ColumnarClientData(client_data.ClientData):
+  """A `tff.simulation.ClientData` backed by memory-mapped columnar files.
+
+  The data is stored in a directory, with one file per feature, which holds the
+  values of the feature for the examples of all clients as a single contiguous
+  array, in which the examples of each client form a contiguous range. The
+  ranges are given by an index of offsets, in the order of the sorted client
+  ids. Strings are stored along with the offsets at which each of them starts,
+  so that arbitrary bytes are preserved. All files are memory-mapped, rather
+  than read into memory.
+
+  Creating the dataset of a client only takes a binary search over the client
+  ids, and nothing is read until the dataset is iterated over. Then, the
+  examples of the client, and only those, are read by slicing the memory-mapped
+  files through `tf.numpy_function`, which holds the GIL while copying them.
+  Thus, neither the cost of creating a dataset nor the resident memory depends
+  on the size of the data, and the cost of reading a client does not depend on
+  its position in the files.
+
+  Use `write_columnar_client_data` to convert another `ClientData`, e.g., an
+  `HDF5ClientData` or a `FromTensorSlicesClientData`, into this format.
+  """
+
+  def __init__(self, dirpath):
+    """Constructs a `tff.simulation.ClientData` object.
+
+    Args:
+      dirpath: String path to a directory written by
+        `write_columnar_client_data`.
+
+    Raises:
+      ValueError: If the directory is in an unsupported format.
+    """
+    py_typecheck.check_type(dirpath, six.string_types)
+    with open(os.path.join(dirpath, _METADATA_FILENAME)) as f:
+      metadata = json.load(f)
+    if metadata['version'] != _FORMAT_VERSION:
+      raise ValueError('Unsupported format version {} in {}.'.format(
+          metadata['version'], dirpath))
+    self._dirpath = dirpath
+    num_clients = metadata['num_clients']
+    self._client_ids = _ClientIds(
+        np.memmap(
+            os.path.join(dirpath, _CLIENT_IDS_FILENAME),
+            dtype='S{}'.format(metadata['client_id_width']),
+            mode='r',
+            shape=(num_clients,)))
+    self._offsets = np.memmap(
+        os.path.join(dirpath, _OFFSETS_FILENAME),
+        dtype='<i8',
+        mode='r',
+        shape=(num_clients + 1,))
+    self._features = []
+    for index, f in enumerate(metadata['features']):
+      if f['dtype'] == _STRING_DTYPE:
+        dtype = None
+      else:
+        dtype = np.dtype(str(f['dtype']))
+      feature = _Feature(f['name'], dtype, f['shape'])
+      feature.open(dirpath, index, metadata['num_examples'])
+      self._features.append(feature)
+    if metadata['structure'] == 'dict':
+      self._output_types = collections.OrderedDict(
+          (f.name, f.tf_dtype) for f in self._features)
+      self._output_shapes = collections.OrderedDict(
+          (f.name, tf.TensorShape(f.shape)) for f in self._features)
+    else:
+      self._output_types = self._features[0].tf_dtype
+      self._output_shapes = tf.TensorShape(self._features[0].shape)
+
+  @property
+  def client_ids(self):
+    return self._client_ids
+
+  def _read(self, start, end):
+    """Reads the examples from `start` up to `end` into a list of arrays."""
+    return [feature.read(start, end) for feature in self._features]
+
+  def _create_dataset(self, start, end):
+    """Creates a dataset of the examples from `start` up to `end`.
+
+    Args:
+      start: The index of the first example, a scalar `tf.int64` tensor.
+      end: The index past the last example, a scalar `tf.int64` tensor.
+
+    Returns:
+      A `tf.data.Dataset` object.
+    """
+    arrays = tf.numpy_function(self._read, [start, end],
+                               [f.tf_dtype for f in self._features])
+    for feature, array in zip(self._features, arrays):
+      array.set_shape([None] + feature.shape)
+    if not isinstance(self._output_types, collections.OrderedDict):
+      return tf.data.Dataset.from_tensor_slices(arrays[0])
+    return tf.data.Dataset.from_tensor_slices(
+        collections.OrderedDict(
+            (f.name, a) for f, a in zip(self._features, arrays)))
+
+  def create_tf_dataset_for_client(self, client_id):
+    index = self._client_ids.index(client_id)
+    # The examples are read when the dataset is iterated over, rather than
+    # when it is created.
+    bounds = np.asarray(self._offsets[index:index + 2], dtype=np.int64)
+    return tf.data.Dataset.from_tensors((bounds[0], bounds[1])).flat_map(
+        self._create_dataset)
+
+  def _get_create_tf_dataset_for_client_index_fn(self):
+    offsets = tf.constant(np.asarray(self._offsets))
+
+    def _create_dataset(client_index):
+      return self._create_dataset(offsets[client_index],
+                                  offsets[client_index + 1])
+
+    return _create_dataset
+
+  @property
+  def output_types(self):
+    return self._output_types
+
+  @property
+  def output_shapes(self):
+    return self._output_shapes
+
+
+def write_columnar_client_data(source, dirpath):
+  """Writes all examples of `source` to `dirpath` for `ColumnarClientData`.
+
+  The examples are read from the datasets of the clients in batches, so the
+  data is never held in memory in its entirety.
+
+  NOTE: This function requires eager execution.
+
+  Args:
+    source: The `tff.simulation.ClientData` to convert. Its examples must be
+      either tensors, or flat dictionaries of tensors, of fully defined shapes.
+    dirpath: String path to the directory to write the data to. It is created if
+      it does not exist.
+
+  Raises:
+    TypeError: If the arguments are of the wrong types, or the structure of the
+      examples is not supported.
+    ValueError: If `source` has no clients, or its examples are of unsupported
+      shapes or dtypes (string features must be scalars).
+  """
+  py_typecheck.check_type(source, client_data.ClientData)
+  py_typecheck.check_type(dirpath, six.string_types)
+  output_types = source.output_types
+  output_shapes = source.output_shapes
+  if isinstance(output_types, tf.DType):
+    structure = 'tensor'
+    names = [None]
+    dtypes = [output_types]
+    shapes = [tf.TensorShape(output_shapes)]
+  elif isinstance(output_types, collections.Mapping):
+    structure = 'dict'
+    names = list(output_types.keys())
+    dtypes = [output_types[name] for name in names]
+    shapes = [tf.TensorShape(output_shapes[name]) for name in names]
+  else:
+    raise TypeError(
+        'Only examples that are tensors or flat dictionaries of tensors are '
+        'supported, found examples of types {}.'.format(output_types))
+  for dtype, shape in zip(dtypes, shapes):
+    py_typecheck.check_type(dtype, tf.DType)
+    if dtype != tf.string and dtype not in _SUPPORTED_DTYPES:
+      raise ValueError('Unsupported dtype {}.'.format(dtype))
+    if dtype == tf.string and shape.ndims != 0:
+      raise ValueError(
+          'Only scalar string features are supported, found shape {}.'.format(
+              shape))
+    if not shape.is_fully_defined() or shape.num_elements() == 0:
+      raise ValueError(
+          'The shapes of the features must be fully defined and nonempty, '
+          'found {}.'.format(shape))
+  client_ids = sorted(source.client_ids, key=tf.compat.as_bytes)
+  if not client_ids:
+    raise ValueError('The source must have at least one client.')
+
+  def _read_batches(client_id):
+    dataset = source.create_tf_dataset_for_client(client_id)
+    for batch in dataset.batch(_WRITE_BATCH_SIZE):
+      if structure == 'dict':
+        yield [batch[name].numpy() for name in names]
+      else:
+        yield [batch.numpy()]
+
+  np_dtypes = []
+  for dtype in dtypes:
+    if dtype == tf.string:
+      np_dtypes.append(None)
+    else:
+      np_dtypes.append(np.dtype(dtype.as_numpy_dtype).newbyteorder('<'))
+
+  if not os.path.isdir(dirpath):
+    os.makedirs(dirpath)
+  offsets = np.zeros([len(client_ids) + 1], dtype='<i8')
+  num_examples = 0
+  files = []
+  string_offsets_files = []
+  # The total number of bytes of each string feature written so far.
+  string_sizes = [0] * len(dtypes)
+  try:
+    for index, np_dtype in enumerate(np_dtypes):
+      files.append(open(os.path.join(dirpath, _feature_filename(index)), 'wb'))
+      if np_dtype is None:
+        f = open(os.path.join(dirpath, _string_offsets_filename(index)), 'wb')
+        string_offsets_files.append(f)
+        np.zeros([1], dtype='<i8').tofile(f)
+      else:
+        string_offsets_files.append(None)
+    for client_index, client_id in enumerate(client_ids):
+      for batch in _read_batches(client_id):
+        for index, values in enumerate(batch):
+          if np_dtypes[index] is None:
+            strings = list(values.flat)
+            files[index].write(b''.join(strings))
+            ends = string_sizes[index] + np.cumsum(
+                [len(v) for v in strings], dtype='<i8')
+            ends.tofile(string_offsets_files[index])
+            if strings:
+              string_sizes[index] = int(ends[-1])
+          else:
+            np.ascontiguousarray(
+                values, dtype=np_dtypes[index]).tofile(files[index])
+        num_examples += len(batch[0])
+      offsets[client_index + 1] = num_examples
+  finally:
+    for f in files + string_offsets_files:
+      if f is not None:
+        f.close()
+  offsets.tofile(os.path.join(dirpath, _OFFSETS_FILENAME))
+  encoded_ids = [tf.compat.as_bytes(c) for c in client_ids]
+  client_id_width = max(1, max(len(c) for c in encoded_ids))
+  np.asarray(
+      encoded_ids, dtype='S{}'.format(client_id_width)).tofile(
+          os.path.join(dirpath, _CLIENT_IDS_FILENAME))
+
+  # The metadata is written last, so that a directory with metadata is always
+  # complete.
+  metadata = {
+      'version': _FORMAT_VERSION,
+      'num_clients': len(client_ids),
+      'num_examples': num_examples,
+      'client_id_width': client_id_width,
+      'structure': structure,
+      'features': [{
+          'name': name,
+          'dtype': _STRING_DTYPE if np_dtype is None else np_dtype.str,
+          'shape': shape.as_list()
+      } for name, np_dtype, shape in zip(names, np_dtypes, shapes)],
+  }
+  with open(os.path.join(dirpath, _METADATA_FILENAME), 'w') as f:
+    json.dump(metadata, f)
@@ -0,0 +1,169 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tensorflow_federated.python.simulation.columnar_client_data."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import six
+from six.moves import zip
+import tensorflow as tf
+
+from tensorflow_federated.python.simulation import columnar_client_data
+from tensorflow_federated.python.simulation import from_tensor_slices_client_data
+
+TEST_DATA = {
+    'CLIENT A':
+        collections.OrderedDict([
+            ('x', np.asarray([[1, 2], [3, 4], [5, 6]], dtype=np.int32)),
+            ('y', np.asarray([4.0, 5.0, 6.0], dtype=np.float32)),
+            ('z', np.asarray([b'a', b'bb', b'ccc'], dtype=object)),
+        ]),
+    'CLIENT B':
+        collections.OrderedDict([
+            ('x', np.asarray([[10, 11]], dtype=np.int32)),
+            ('y', np.asarray([7.0], dtype=np.float32)),
+            # Binary strings keep their leading and trailing null bytes.
+            ('z', np.asarray([b'd\x00'], dtype=object)),
+        ]),
+    'CLIENT C':
+        collections.OrderedDict([
+            ('x', np.asarray([[100, 101], [200, 201]], dtype=np.int32)),
+            ('y', np.asarray([8.0, 9.0], dtype=np.float32)),
+            ('z', np.asarray([b'\x00e', b''], dtype=object)),
+        ]),
+}
+
+
+class ColumnarClientDataTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ColumnarClientDataTest, self).setUp()
+    self.dirpath = os.path.join(tempfile.mkdtemp(), 'columnar')
+    self.addCleanup(shutil.rmtree, os.path.dirname(self.dirpath))
+    source = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        TEST_DATA)
+    columnar_client_data.write_columnar_client_data(source, self.dirpath)
+    self.client_data = columnar_client_data.ColumnarClientData(self.dirpath)
+
+  def test_client_ids_property(self):
+    client_ids = self.client_data.client_ids
+    self.assertLen(client_ids, 3)
+    self.assertEqual(list(client_ids), sorted(TEST_DATA.keys()))
+    self.assertEqual(client_ids[1], 'CLIENT B')
+    self.assertIn('CLIENT C', client_ids)
+    self.assertNotIn('CLIENT D', client_ids)
+
+  def test_output_types_and_shapes_properties(self):
+    self.assertEqual(
+        dict(self.client_data.output_types), {
+            'x': tf.int32,
+            'y': tf.float32,
+            'z': tf.string
+        })
+    self.assertEqual(
+        dict(self.client_data.output_shapes), {
+            'x': tf.TensorShape([2]),
+            'y': tf.TensorShape([]),
+            'z': tf.TensorShape([])
+        })
+
+  def test_create_tf_dataset_for_client(self):
+    for client_id, expected_data in six.iteritems(TEST_DATA):
+      tf_dataset = self.client_data.create_tf_dataset_for_client(client_id)
+      self.assertIsInstance(tf_dataset, tf.data.Dataset)
+      examples = [self.evaluate(x) for x in tf_dataset]
+      self.assertLen(examples, len(expected_data['x']))
+      for i, example in enumerate(examples):
+        self.assertAllEqual(example['x'], expected_data['x'][i])
+        self.assertEqual(example['y'], expected_data['y'][i])
+        self.assertEqual(example['z'], expected_data['z'][i])
+
+  def test_create_tf_dataset_for_client_reads_lazily(self):
+
+    class _CountingColumnarClientData(columnar_client_data.ColumnarClientData):
+
+      def __init__(self, dirpath):
+        super(_CountingColumnarClientData, self).__init__(dirpath)
+        self.num_reads = 0
+
+      def _read(self, start, end):
+        self.num_reads += 1
+        return super(_CountingColumnarClientData, self)._read(start, end)
+
+    client_data = _CountingColumnarClientData(self.dirpath)
+    tf_dataset = client_data.create_tf_dataset_for_client('CLIENT A')
+    self.assertEqual(client_data.num_reads, 0)
+    examples = [self.evaluate(x) for x in tf_dataset]
+    self.assertLen(examples, 3)
+    self.assertEqual(client_data.num_reads, 1)
+
+  def test_create_tf_dataset_for_client_fails_with_unknown_client(self):
+    with self.assertRaises(ValueError):
+      self.client_data.create_tf_dataset_for_client('CLIENT D')
+
+  def test_create_tf_dataset_from_all_clients(self):
+    tf_dataset = self.client_data.create_tf_dataset_from_all_clients(
+        seed=1, cycle_length=3, num_parallel_calls=3)
+    actual_examples = [
+        (self.evaluate(x['y']), self.evaluate(x['z'])) for x in tf_dataset
+    ]
+    expected_examples = []
+    for expected_data in six.itervalues(TEST_DATA):
+      expected_examples.extend(zip(expected_data['y'], expected_data['z']))
+    self.assertCountEqual(actual_examples, expected_examples)
+
+  def test_write_and_read_tensor_examples(self):
+    dirpath = os.path.join(os.path.dirname(self.dirpath), 'tensors')
+    source = from_tensor_slices_client_data.FromTensorSlicesClientData({
+        'a': [1, 2, 3],
+        'b': [4, 5]
+    })
+    columnar_client_data.write_columnar_client_data(source, dirpath)
+    client_data = columnar_client_data.ColumnarClientData(dirpath)
+    self.assertEqual(client_data.output_types, tf.int32)
+    self.assertEqual(client_data.output_shapes, tf.TensorShape([]))
+
+    def as_list(dataset):
+      return [self.evaluate(x) for x in dataset]
+
+    self.assertEqual(
+        as_list(client_data.create_tf_dataset_for_client('a')), [1, 2, 3])
+    self.assertEqual(
+        as_list(client_data.create_tf_dataset_for_client('b')), [4, 5])
+
+  def test_write_fails_with_nested_structure(self):
+    source = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        {'a': {
+            'x': {
+                'y': [1, 2]
+            }
+        }})
+    with self.assertRaises(TypeError):
+      columnar_client_data.write_columnar_client_data(
+          source, os.path.join(os.path.dirname(self.dirpath), 'nested'))
+
+
+if __name__ == '__main__':
+  # Need eager_mode to iterate over tf.data.Dataset.
+  tf.compat.v1.enable_v2_behavior()
+  tf.test.main()
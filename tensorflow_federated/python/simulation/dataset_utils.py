@@ -0,0 +1,71 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Utilities for the datasets of the clients of simulations."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import py_typecheck
+
+
+def read_all_examples(dataset):
+  """Reads all examples of a finite `dataset` into memory.
+
+  The examples are stacked along a new leading dimension, which normalizes
+  their structure into tensors, as in `tf.data.Dataset.from_tensor_slices`.
+  Empty datasets yield tensors with a leading dimension of size zero.
+
+  NOTE: This function requires eager execution.
+
+  Args:
+    dataset: A finite `tf.data.Dataset`.
+
+  Returns:
+    A structure of eager tensors, matching the structure of the examples of
+    `dataset`, whose slices along the leading dimension are the examples.
+  """
+  py_typecheck.check_type(dataset, tf.data.Dataset)
+  for tensors in dataset.batch(np.iinfo(np.int64).max):
+    return tensors
+
+  def _empty(dtype, shape):
+    shape = tf.TensorShape(shape)
+    if shape.ndims is None:
+      dims = []
+    else:
+      dims = [0 if d is None else d for d in shape.as_list()]
+    return tf.zeros([0] + dims, dtype=dtype)
+
+  return tf.nest.map_structure(_empty, dataset.output_types,
+                               dataset.output_shapes)
+
+
+def materialize(dataset):
+  """Returns a `tf.data.Dataset` of the examples of `dataset` held in memory.
+
+  NOTE: This function requires eager execution.
+
+  Args:
+    dataset: A finite `tf.data.Dataset`.
+
+  Returns:
+    A `tf.data.Dataset` of the same examples, created with
+    `tf.data.Dataset.from_tensor_slices` from `read_all_examples(dataset)`.
+  """
+  return tf.data.Dataset.from_tensor_slices(read_all_examples(dataset))
@@ -0,0 +1,62 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tensorflow_federated.python.simulation.dataset_utils."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import tensorflow as tf
+
+from tensorflow_federated.python.simulation import dataset_utils
+
+
+class DatasetUtilsTest(tf.test.TestCase):
+
+  def test_read_all_examples(self):
+    dataset = tf.data.Dataset.from_tensor_slices(
+        collections.OrderedDict([('x', [[1, 2], [3, 4], [5, 6]]),
+                                 ('y', [b'a', b'b', b'c'])]))
+    tensors = dataset_utils.read_all_examples(dataset)
+    self.assertAllEqual(tensors['x'], [[1, 2], [3, 4], [5, 6]])
+    self.assertAllEqual(tensors['y'], [b'a', b'b', b'c'])
+
+  def test_read_all_examples_of_empty_dataset(self):
+    dataset = tf.data.Dataset.from_tensor_slices(
+        collections.OrderedDict([('x', [[1, 2]]),
+                                 ('y', [b'a'])])).take(0)
+    tensors = dataset_utils.read_all_examples(dataset)
+    self.assertEqual(tensors['x'].dtype, tf.int32)
+    self.assertEqual(tensors['x'].shape, tf.TensorShape([0, 2]))
+    self.assertEqual(tensors['y'].dtype, tf.string)
+    self.assertEqual(tensors['y'].shape, tf.TensorShape([0]))
+
+  def test_materialize(self):
+    dataset = tf.data.Dataset.range(5).map(lambda x: x * 2)
+    self.assertEqual(
+        self.evaluate(list(dataset_utils.materialize(dataset))),
+        [0, 2, 4, 6, 8])
+
+  def test_materialize_empty_dataset(self):
+    dataset = tf.data.Dataset.range(5).filter(lambda x: x > 10)
+    self.assertEmpty(list(dataset_utils.materialize(dataset)))
+
+
+if __name__ == '__main__':
+  # Need eager_mode to iterate over tf.data.Dataset.
+  tf.compat.v1.enable_v2_behavior()
+  tf.test.main()
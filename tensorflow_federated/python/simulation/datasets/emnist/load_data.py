@@ -18,12 +18,21 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import hashlib
 import math
-import os.path
+import os
+import struct
+import tempfile
+import threading
 
 import numpy as np
+from six.moves import range
 import tensorflow as tf
 
+from tensorflow_federated.python.common_libs import py_typecheck
+from tensorflow_federated.python.simulation import client_data
+from tensorflow_federated.python.simulation import dataset_utils
 from tensorflow_federated.python.simulation.datasets.emnist import synthetic
 from tensorflow_federated.python.simulation.from_tensor_slices_client_data import FromTensorSlicesClientData
 from tensorflow_federated.python.simulation.hdf5_client_data import HDF5ClientData
@@ -31,6 +40,20 @@ from tensorflow_federated.python.simulation.transforming_client_data import Tran
 
 img = tf.contrib.image
 
+_IMAGE_SIZE = 28
+
+# The increment of the SplitMix64 generator, derived from the golden ratio.
+_GOLDEN_GAMMA = np.uint64(0x9e3779b97f4a7c15)
+
+# The number of examples of a pseudo-client that are transformed at once.
+_TRANSFORM_BATCH_SIZE = 64
+
+_CACHE_FILE_SUFFIX = '.npz'
+
+# The number of raw clients whose transforms of all pseudo-clients are kept in
+# memory.
+_MAX_CACHED_TRANSFORM_TABLES = 100
+
 
 def load_data(only_digits=True, cache_dir=None):
   """Loads the Federated EMNIST dataset.
@@ -141,84 +164,162 @@ def get_synthetic(num_clients=2):
       num_pseudo_clients=num_clients)
 
 
-def _compile_transform(angle=0,
-                       shear=0,
-                       scale_x=1,
-                       scale_y=1,
-                       translation_x=0,
-                       translation_y=0):
-  """Compiles affine transform parameters into single projective transform.
+def _get_client_key(raw_client_id):
+  """Returns a 64-bit hash of `raw_client_id` that is stable across processes.
+
+  Unlike the builtin `hash`, whose value for strings is salted per process, this
+  only depends on the UTF-8 encoding of the id.
+
+  Args:
+    raw_client_id: The raw client_id.
+
+  Returns:
+    A Python integer in `[0, 2**64)`.
+  """
+  digest = hashlib.sha256(tf.compat.as_bytes(raw_client_id)).digest()
+  return struct.unpack('<Q', digest[:8])[0]
+
+
+def _mix(x):
+  """Applies the SplitMix64 finalizer elementwise to a `np.uint64` array."""
+  x = (x ^ (x >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+  x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+  return x ^ (x >> np.uint64(31))
+
+
+def _get_uniform_samples(raw_client_ids, indices, num_samples):
+  """Returns uniform samples in `[0, 1)` for a batch of pseudo-clients.
+
+  The samples of each pseudo-client are computed with a counter-based generator
+  keyed by a stable hash of its raw client id and its index, so they do not
+  depend on the process, on the global NumPy random state, or on the other
+  pseudo-clients in the batch.
+
+  Args:
+    raw_client_ids: A list of raw client ids, one per pseudo-client.
+    indices: A list of the integer indices of the pseudo-clients.
+    num_samples: The number of samples to return per pseudo-client.
+
+  Returns:
+    A `np.float64` array of shape `[len(indices), num_samples]`.
+  """
+  client_keys = {c: _get_client_key(c) for c in set(raw_client_ids)}
+  keys = np.array([client_keys[c] for c in raw_client_ids], dtype=np.uint64)
+  indices = np.array(indices, dtype=np.uint64)
+  counters = np.arange(1, num_samples + 1, dtype=np.uint64)
+  with np.errstate(over='ignore'):
+    seeds = _mix(keys + indices * _GOLDEN_GAMMA)
+    bits = _mix(seeds[:, np.newaxis] + counters * _GOLDEN_GAMMA)
+  # The top 53 bits make a uniformly distributed double.
+  return (bits >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+def _compile_transforms(angles, shears, scales_x, scales_y, translations_x,
+                        translations_y):
+  """Compiles affine transform parameters into projective transforms.
 
   The transformations are performed in the following order: rotation, shearing,
-  scaling, and translation.
+  scaling, and translation. All arguments are arrays of the same length, or
+  scalars, and the transforms are composed in a single batch of NumPy matrix
+  products, with the same result as `tf.contrib.image.compose_transforms`.
 
   Args:
-    angle: The angle of counter-clockwise rotation, in degrees.
-    shear: The amount of shear. Precisely, shear*x is added to the y coordinate
-      after centering.
-    scale_x: The amount to scale in the x-axis.
-    scale_y: The amount to scale in the y-axis.
-    translation_x: The number of pixels to translate in the x-axis.
-    translation_y: The number of pixels to translate in the y-axis.
+    angles: The angles of counter-clockwise rotation, in radians.
+    shears: The amounts of shear. Precisely, shear*x is added to the y
+      coordinate after centering.
+    scales_x: The amounts to scale in the x-axis.
+    scales_y: The amounts to scale in the y-axis.
+    translations_x: The numbers of pixels to translate in the x-axis.
+    translations_y: The numbers of pixels to translate in the y-axis.
 
   Returns:
-    A length 8 tensor representing the composed transform.
+    A `np.float32` array of shape `[num_transforms, 8]`, representing the
+    composed transforms, as accepted by `tf.contrib.image.transform`.
   """
-  angle = math.radians(angle)
-  size = 28
 
-  # angles_to_projective_transforms performs rotations around center of image.
-  rotation = img.angles_to_projective_transforms(angle, size, size)
+  def to_matrices(*flat_transform):
+    # Projective transforms have an implicit last entry of 1.
+    flat_transform = np.broadcast_arrays(*(flat_transform + (1.0,)))
+    return np.stack(flat_transform, axis=-1).reshape([-1, 3, 3])
+
+  cos = np.cos(angles)
+  sin = np.sin(angles)
+  extent = _IMAGE_SIZE - 1.0
+  half = extent / 2.0
 
-  # shearing and scaling require centering and decentering.
-  half = (size - 1) / 2.0
-  center = img.translations_to_projective_transforms([-half, -half])
-  shear = [1., 0., 0., -shear, 1., 0., 0., 0.]
-  scaling = [1. / scale_x, 0., 0., 0., 1. / scale_y, 0., 0., 0.]
-  decenter = img.translations_to_projective_transforms([half, half])
+  # As in `tf.contrib.image.angles_to_projective_transforms`, rotations are
+  # performed around the center of the image.
+  rotation = to_matrices(cos, -sin, (extent - (cos - sin) * extent) / 2.0, sin,
+                         cos, (extent - (sin + cos) * extent) / 2.0, 0., 0.)
 
-  translation = img.translations_to_projective_transforms(
-      [translation_x, translation_y])
-  return img.compose_transforms(rotation, center, shear, scaling, decenter,
-                                translation)
+  # Shearing and scaling require centering and decentering.
+  center = to_matrices(1., 0., half, 0., 1., half, 0., 0.)
+  shear = to_matrices(1., 0., 0., -shears, 1., 0., 0., 0.)
+  scaling = to_matrices(1. / scales_x, 0., 0., 0., 1. / scales_y, 0., 0., 0.)
+  decenter = to_matrices(1., 0., -half, 0., 1., -half, 0., 0.)
 
+  translation = to_matrices(1., 0., -translations_x, 0., 1., -translations_y,
+                            0., 0.)
 
-def _make_transform_fn(raw_client_id, index):
-  """Generates a random affine transform based on the client_id and index.
+  composed = rotation
+  for matrices in [center, shear, scaling, decenter, translation]:
+    composed = np.matmul(composed, matrices)
+  composed /= composed[:, 2:, 2:]
+  return composed.reshape([-1, 9])[:, :8].astype(np.float32)
 
-  If the index is 0, `None` is returned so no transform is applied by the
-  transforming_client_data.
+
+def _get_transforms(raw_client_ids, indices):
+  """Generates the random affine transforms of a batch of pseudo-clients.
+
+  The parameters of the transforms of all pseudo-clients are drawn in a few
+  vectorized NumPy operations, from a stable hash of the raw client id and
+  index of each pseudo-client.
 
   Args:
-    raw_client_id: The raw client_id.
-    index: The index of the pseudo-client.
+    raw_client_ids: A list of raw client ids, one per pseudo-client.
+    indices: A list of the integer indices of the pseudo-clients.
 
   Returns:
-    The transformed data.
+    A `np.float32` array of shape `[len(indices), 8]`, with the projective
+    transform of each pseudo-client.
   """
-  if index == 0:
-    return None
+  u = _get_uniform_samples(raw_client_ids, indices, 6)
 
-  np.random.seed((hash(raw_client_id) + index) % (2**32))
+  def uniform(low, high, samples):
+    return low + (high - low) * samples
 
-  def random_scale(min_val):
-    b = math.log(min_val)
-    return math.exp(np.random.uniform(b, -b))
+  # Scales are sampled log uniformly.
+  b = math.log(0.8)
+  return _compile_transforms(
+      angles=np.radians(uniform(-20.0, 20.0, u[:, 0])),
+      shears=uniform(-0.2, 0.2, u[:, 1]),
+      scales_x=np.exp(uniform(b, -b, u[:, 2])),
+      scales_y=np.exp(uniform(b, -b, u[:, 3])),
+      translations_x=uniform(-5.0, 5.0, u[:, 4]),
+      translations_y=uniform(-5.0, 5.0, u[:, 5]))
 
-  transform = _compile_transform(
-      angle=np.random.uniform(-20, 20),
-      shear=np.random.uniform(-0.2, 0.2),
-      scale_x=random_scale(0.8),
-      scale_y=random_scale(0.8),
-      translation_x=np.random.uniform(-5, 5),
-      translation_y=np.random.uniform(-5, 5))
+
+def _make_transform_fn(transform):
+  """Returns a function that applies the projective `transform` to the pixels.
+
+  Args:
+    transform: A `np.float32` array of shape `[8]`, as returned by
+      `_get_transforms`.
+
+  Returns:
+    A function that transforms the pixels of an example, or of a batch of
+    examples.
+  """
 
   def _transform_fn(data):
     """Applies a random transform to the pixels."""
     # EMNIST background is 1.0 but img.transform assumes 0.0, so invert.
     pixels = 1.0 - data['pixels']
 
-    pixels = img.transform(pixels, transform, 'BILINEAR')
+    # A trailing channel dimension makes both an example of shape [28, 28],
+    # and a batch of examples of shape [batch_size, 28, 28] valid images.
+    pixels = img.transform(
+        tf.expand_dims(pixels, -1), transform, 'BILINEAR')[..., 0]
 
     # num_bits=9 actually yields 256 unique values.
     pixels = tf.quantization.quantize_and_dequantize(
@@ -230,7 +331,161 @@ def _make_transform_fn(raw_client_id, index):
   return _transform_fn
 
 
-def get_infinite(emnist_client_data, num_pseudo_clients):
+class _TransformFnMaker(object):
+  """Makes the random affine transforms of pseudo-clients.
+
+  Instances are used as the `make_transform_fn` of a `TransformingClientData`.
+  The transforms of all pseudo-clients of a raw client are generated at once,
+  with a single call to `_get_transforms`, the first time that one of them is
+  needed. Those of the most recently used raw clients are kept in memory.
+  """
+
+  def __init__(self, num_pseudo_clients):
+    self._num_pseudo_clients = num_pseudo_clients
+    self._lock = threading.Lock()
+    self._transform_tables = collections.OrderedDict()
+
+  def _get_transform(self, raw_client_id, index):
+    """Returns the projective transform of a pseudo-client."""
+    if index >= self._num_pseudo_clients:
+      return _get_transforms([raw_client_id], [index])[0]
+    with self._lock:
+      transforms = self._transform_tables.pop(raw_client_id, None)
+      if transforms is None:
+        transforms = _get_transforms([raw_client_id] * self._num_pseudo_clients,
+                                     list(range(self._num_pseudo_clients)))
+      # Marks the raw client as the most recently used one.
+      self._transform_tables[raw_client_id] = transforms
+      while len(self._transform_tables) > _MAX_CACHED_TRANSFORM_TABLES:
+        self._transform_tables.popitem(last=False)
+    return transforms[index]
+
+  def __call__(self, raw_client_id, index):
+    """Generates a random affine transform based on the client_id and index.
+
+    If the index is 0, `None` is returned so no transform is applied by the
+    transforming_client_data.
+
+    Args:
+      raw_client_id: The raw client_id.
+      index: The index of the pseudo-client.
+
+    Returns:
+      A function that transforms the pixels of an example, or of a batch of
+      examples.
+    """
+    if index == 0:
+      return None
+    return _make_transform_fn(self._get_transform(raw_client_id, index))
+
+
+class _DiskCachingClientData(client_data.ClientData):
+  """Caches the examples of recently used clients of a ClientData on disk.
+
+  The examples of a client are written to a NumPy `.npz` file in `cache_dir`
+  the first time its dataset is created, and read from that file afterwards,
+  instead of being recomputed. At most `max_cached_clients` files are kept, and
+  those of the least recently used clients are deleted first. Files written to
+  the same directory by previous processes are reused. Since the examples are
+  read into memory eagerly, caching only happens in eager mode, and the
+  datasets are created uncached otherwise.
+  """
+
+  def __init__(self, wrapped_client_data, cache_dir, max_cached_clients):
+    py_typecheck.check_type(wrapped_client_data, client_data.ClientData)
+    py_typecheck.check_type(cache_dir, str)
+    py_typecheck.check_type(max_cached_clients, int)
+    if max_cached_clients <= 0:
+      raise ValueError('max_cached_clients must be positive.')
+    self._client_data = wrapped_client_data
+    self._cache_dir = cache_dir
+    self._max_cached_clients = max_cached_clients
+    self._lock = threading.Lock()
+    if not os.path.isdir(cache_dir):
+      os.makedirs(cache_dir)
+    paths = [
+        os.path.join(cache_dir, filename)
+        for filename in os.listdir(cache_dir)
+        if filename.endswith(_CACHE_FILE_SUFFIX)
+    ]
+    paths.sort(key=os.path.getmtime)
+    # The keys are the cached paths, from the least to the most recently used.
+    self._cached_paths = collections.OrderedDict((p, None) for p in paths)
+    with self._lock:
+      self._evict()
+
+  @property
+  def client_ids(self):
+    return self._client_data.client_ids
+
+  def create_tf_dataset_for_client(self, client_id):
+    if not tf.executing_eagerly():
+      return self._client_data.create_tf_dataset_for_client(client_id)
+    path = os.path.join(
+        self._cache_dir,
+        hashlib.sha256(tf.compat.as_bytes(client_id)).hexdigest() +
+        _CACHE_FILE_SUFFIX)
+    with self._lock:
+      is_cached = path in self._cached_paths
+      if is_cached:
+        # Marks the client as the most recently used one.
+        del self._cached_paths[path]
+        self._cached_paths[path] = None
+    arrays = None
+    if is_cached:
+      try:
+        with np.load(path) as f:
+          arrays = [f['arr_{}'.format(i)] for i in range(len(f.files))]
+      except (IOError, OSError, ValueError):
+        # The file was evicted by another process, or is corrupt.
+        arrays = None
+    if arrays is None:
+      dataset = self._client_data.create_tf_dataset_for_client(client_id)
+      tensors = dataset_utils.read_all_examples(dataset)
+      arrays = [t.numpy() for t in tf.nest.flatten(tensors)]
+      self._write(path, arrays)
+    return tf.data.Dataset.from_tensor_slices(
+        tf.nest.pack_sequence_as(self.output_types, arrays))
+
+  def _write(self, path, arrays):
+    """Atomically writes `arrays` to `path`, and evicts old files if needed."""
+    fd, temp_path = tempfile.mkstemp(dir=self._cache_dir, suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        np.savez(f, *arrays)
+      os.rename(temp_path, path)
+    except (IOError, OSError):
+      if os.path.exists(temp_path):
+        os.remove(temp_path)
+      raise
+    with self._lock:
+      self._cached_paths.pop(path, None)
+      self._cached_paths[path] = None
+      self._evict()
+
+  def _evict(self):
+    """Deletes the least recently used files beyond the capacity."""
+    while len(self._cached_paths) > self._max_cached_clients:
+      path, _ = self._cached_paths.popitem(last=False)
+      try:
+        os.remove(path)
+      except OSError:
+        # Another process may have deleted the file already.
+        pass
+
+  @property
+  def output_types(self):
+    return self._client_data.output_types
+
+  @property
+  def output_shapes(self):
+    return self._client_data.output_shapes
+
+
+def get_infinite(emnist_client_data,
+                 num_pseudo_clients,
+                 cache_dir=None,
+                 max_cached_clients=1000):
   """Converts a Federated EMNIST dataset into an Infinite Federated EMNIST set.
 
   Infinite Federated EMNIST expands each writer from the EMNIST dataset into
@@ -253,13 +508,25 @@ def get_infinite(emnist_client_data, num_pseudo_clients):
       transformation to the characters written by a given real user. The first
       pseudo-client for a given user applies the identity transformation, so the
       original users are always included.
+    cache_dir: (Optional) directory in which to cache the transformed examples
+      of recently used pseudo-clients, in eager mode. The directory must not be
+      shared with datasets converted from a different `emnist_client_data`. If
+      `None`, the examples are transformed every time a dataset is iterated.
+    max_cached_clients: (Optional) the maximum number of pseudo-clients whose
+      examples are kept in `cache_dir`. The examples of the least recently used
+      pseudo-clients are deleted first.
 
   Returns:
     An expanded `tff.simulation.ClientData`.
   """
   num_client_ids = len(emnist_client_data.client_ids)
 
-  return TransformingClientData(
+  transformed_client_data = TransformingClientData(
       raw_client_data=emnist_client_data,
-      make_transform_fn=_make_transform_fn,
-      num_transformed_clients=(num_client_ids * num_pseudo_clients))
+      make_transform_fn=_TransformFnMaker(num_pseudo_clients),
+      num_transformed_clients=(num_client_ids * num_pseudo_clients),
+      transform_batch_size=_TRANSFORM_BATCH_SIZE)
+  if cache_dir is None:
+    return transformed_client_data
+  return _DiskCachingClientData(transformed_client_data, cache_dir,
+                                max_cached_clients)
@@ -0,0 +1,135 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark for the throughput of Infinite Federated EMNIST.
+
+The pseudo-clients are derived from synthetic raw clients, so that the benchmark
+does not need to download the dataset. The throughput is reported in examples
+per second through `tf.test.Benchmark.report_benchmark`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from six.moves import range
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import test
+from tensorflow_federated.python.simulation import from_tensor_slices_client_data
+from tensorflow_federated.python.simulation import transforming_client_data
+from tensorflow_federated.python.simulation.datasets.emnist import load_data
+from tensorflow_federated.python.simulation.datasets.emnist import synthetic
+
+NUM_RAW_CLIENTS = 10
+
+# The synthetic data has 10 examples, which are repeated to make raw clients of
+# roughly the average size of the writers in Federated EMNIST.
+NUM_REPEATS = 20
+
+NUM_PSEUDO_CLIENTS = 10
+
+NUM_TRANSFORMS = 100000
+
+# pylint: disable=protected-access
+
+
+def _get_raw_client_data():
+  data = synthetic.get_data()
+  client_data = collections.OrderedDict([
+      ('pixels', np.tile(data['pixels'], [NUM_REPEATS, 1, 1])),
+      ('label', np.tile(np.array(data['label'], np.int32), [NUM_REPEATS])),
+  ])
+  return from_tensor_slices_client_data.FromTensorSlicesClientData({
+      'client_{}'.format(i): client_data for i in range(NUM_RAW_CLIENTS)
+  })
+
+
+def _iterate_all_clients(client_data):
+  """Iterates over the examples of all clients, and returns their number."""
+  num_examples = 0
+  for client_id in client_data.client_ids:
+    for _ in client_data.create_tf_dataset_for_client(client_id):
+      num_examples += 1
+  return num_examples
+
+
+class LoadDataBenchmark(tf.test.Benchmark):
+  """Measures the throughput of the pseudo-clients of Infinite EMNIST."""
+
+  def _report_throughput(self, name, client_data):
+    start = time.time()
+    num_examples = _iterate_all_clients(client_data)
+    wall_time = time.time() - start
+    self.report_benchmark(
+        name=name,
+        wall_time=wall_time,
+        iters=1,
+        extras={
+            'num_examples': num_examples,
+            'examples_per_sec': num_examples / wall_time,
+        })
+
+  def benchmark_transform_per_example(self):
+    client_data = transforming_client_data.TransformingClientData(
+        _get_raw_client_data(),
+        load_data._TransformFnMaker(NUM_PSEUDO_CLIENTS),
+        NUM_RAW_CLIENTS * NUM_PSEUDO_CLIENTS)
+    self._report_throughput('transform_per_example', client_data)
+
+  def benchmark_transform_per_batch(self):
+    client_data = transforming_client_data.TransformingClientData(
+        _get_raw_client_data(),
+        load_data._TransformFnMaker(NUM_PSEUDO_CLIENTS),
+        NUM_RAW_CLIENTS * NUM_PSEUDO_CLIENTS,
+        transform_batch_size=load_data._TRANSFORM_BATCH_SIZE)
+    self._report_throughput('transform_per_batch', client_data)
+
+  def benchmark_cached(self):
+    cache_dir = tempfile.mkdtemp()
+    try:
+      client_data = load_data.get_infinite(
+          _get_raw_client_data(),
+          NUM_PSEUDO_CLIENTS,
+          cache_dir=cache_dir,
+          max_cached_clients=NUM_RAW_CLIENTS * NUM_PSEUDO_CLIENTS)
+      # The first pass fills the cache.
+      _iterate_all_clients(client_data)
+      self._report_throughput('cached', client_data)
+    finally:
+      shutil.rmtree(cache_dir)
+
+  def benchmark_get_transforms(self):
+    raw_client_ids = [
+        'client_{}'.format(i % NUM_RAW_CLIENTS) for i in range(NUM_TRANSFORMS)
+    ]
+    indices = list(range(NUM_TRANSFORMS))
+    start = time.time()
+    load_data._get_transforms(raw_client_ids, indices)
+    wall_time = time.time() - start
+    self.report_benchmark(
+        name='get_transforms',
+        wall_time=wall_time,
+        iters=1,
+        extras={'transforms_per_sec': NUM_TRANSFORMS / wall_time})
+
+
+if __name__ == '__main__':
+  test.main()
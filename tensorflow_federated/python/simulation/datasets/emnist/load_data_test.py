@@ -19,12 +19,26 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import os
+import shutil
+import tempfile
 
 from absl.testing import absltest
+import numpy as np
 from six.moves import range
 import tensorflow as tf
 
+from tensorflow_federated.python.simulation import from_tensor_slices_client_data
+from tensorflow_federated.python.simulation import transforming_client_data
 from tensorflow_federated.python.simulation.datasets.emnist import load_data
+from tensorflow_federated.python.simulation.datasets.emnist import synthetic
+
+# pylint: disable=protected-access
+
+
+def _get_synthetic_client_data():
+  return from_tensor_slices_client_data.FromTensorSlicesClientData(
+      {'synthetic': synthetic.get_data()})
 
 
 class LoadDataTest(tf.test.TestCase, absltest.TestCase):
@@ -51,6 +65,88 @@ class LoadDataTest(tf.test.TestCase, absltest.TestCase):
       self.assertEqual(images[0].shape, (28, 28))
       self.assertEqual(images[-1].shape, (28, 28))
 
+  def test_client_key_is_stable(self):
+    # The key must not depend on the process, unlike the builtin `hash`.
+    self.assertEqual(
+        load_data._get_client_key('synthetic'), 190691305750580403)
+
+  def test_get_transforms_is_deterministic_and_vectorized(self):
+    transforms = load_data._get_transforms(['a', 'b', 'a', 'a'], [1, 1, 1, 2])
+    self.assertEqual(transforms.shape, (4, 8))
+    self.assertEqual(transforms.dtype, np.float32)
+    self.assertAllEqual(transforms[0], transforms[2])
+    self.assertNotAllClose(transforms[0], transforms[1])
+    self.assertNotAllClose(transforms[0], transforms[3])
+    self.assertAllEqual(load_data._get_transforms(['b'], [1])[0], transforms[1])
+
+  def test_transform_fn_maker_generates_transforms_of_raw_client_at_once(self):
+    make_transform_fn = load_data._TransformFnMaker(4)
+    self.assertIsNone(make_transform_fn('a', 0))
+    self.assertIsNotNone(make_transform_fn('a', 3))
+    self.assertAllEqual(
+        make_transform_fn._transform_tables['a'],
+        load_data._get_transforms(['a'] * 4, [0, 1, 2, 3]))
+    self.assertAllEqual(
+        make_transform_fn._get_transform('a', 2),
+        load_data._get_transforms(['a'], [2])[0])
+
+  def test_compile_transforms_matches_compose_transforms(self):
+    angle, shear, scale_x, scale_y, dx, dy = 0.3, 0.1, 0.9, 1.2, 2.0, -3.0
+    img = tf.contrib.image
+    half = 27 / 2.0
+    expected = img.compose_transforms(
+        img.angles_to_projective_transforms(angle, 28, 28),
+        img.translations_to_projective_transforms([-half, -half]),
+        [1., 0., 0., -shear, 1., 0., 0., 0.],
+        [1. / scale_x, 0., 0., 0., 1. / scale_y, 0., 0., 0.],
+        img.translations_to_projective_transforms([half, half]),
+        img.translations_to_projective_transforms([dx, dy]))
+    actual = load_data._compile_transforms(
+        np.array([angle]), np.array([shear]), np.array([scale_x]),
+        np.array([scale_y]), np.array([dx]), np.array([dy]))
+    self.assertAllClose(actual, self.evaluate(expected), atol=1e-5)
+
+  def test_batched_transform_matches_per_example_transform(self):
+    raw_client_data = _get_synthetic_client_data()
+
+    def get_pixels(transform_batch_size):
+      client_data = transforming_client_data.TransformingClientData(
+          raw_client_data,
+          load_data._TransformFnMaker(3),
+          3,
+          transform_batch_size=transform_batch_size)
+      return [
+          self.evaluate([x['pixels'] for x in
+                         client_data.create_tf_dataset_for_client(client_id)])
+          for client_id in client_data.client_ids
+      ]
+
+    for expected, actual in zip(get_pixels(None), get_pixels(4)):
+      self.assertAllClose(expected, actual)
+
+  def test_get_infinite_with_cache(self):
+    cache_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cache_dir)
+    raw_client_data = _get_synthetic_client_data()
+    client_data = load_data.get_infinite(raw_client_data, 4)
+    cached_client_data = load_data.get_infinite(
+        raw_client_data, 4, cache_dir=cache_dir, max_cached_clients=2)
+    self.assertEqual(cached_client_data.output_types, client_data.output_types)
+    self.assertEqual(cached_client_data.output_shapes,
+                     client_data.output_shapes)
+
+    for _ in range(2):
+      for client_id in client_data.client_ids:
+        expected = self.evaluate(
+            list(client_data.create_tf_dataset_for_client(client_id)))
+        actual = self.evaluate(
+            list(cached_client_data.create_tf_dataset_for_client(client_id)))
+        self.assertLen(actual, len(expected))
+        for x, y in zip(expected, actual):
+          self.assertAllClose(x['pixels'], y['pixels'])
+          self.assertEqual(x['label'], y['label'])
+        self.assertLessEqual(len(os.listdir(cache_dir)), 2)
+
 
 if __name__ == '__main__':
   tf.compat.v1.enable_v2_behavior()
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import tensorflow as tf
 
 from tensorflow_federated.python.common_libs import py_typecheck
@@ -56,6 +57,39 @@ class FromTensorSlicesClientData(client_data.ClientData):
     else:
       raise ValueError('No data found for client {}'.format(client_id))
 
+  def _get_create_tf_dataset_for_client_index_fn(self):
+    """Returns a function that slices the dataset of a client out of all data.
+
+    The examples of all clients are concatenated into a single structure of
+    arrays, so that the dataset of each client can be created with TensorFlow
+    ops alone, by slicing its examples out of these arrays. The arrays are
+    built directly from the tensor slices of the clients, so clients without
+    examples are supported.
+
+    Returns:
+      A one-argument callable that accepts a scalar `tf.int64` client index.
+    """
+    client_arrays = [
+        _to_arrays(self._tensor_slices_dict[client_id], self.output_types,
+                   self.output_shapes) for client_id in self.client_ids
+    ]
+    all_arrays = tf.nest.map_structure(
+        lambda *a: np.concatenate(a, axis=0), *client_arrays)
+    lengths = np.array(
+        [len(tf.nest.flatten(a)[0]) for a in client_arrays], dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    # The arrays are converted to tensors once, and captured by the function,
+    # rather than embedded as constants in the graph of each call.
+    all_tensors = tf.nest.map_structure(tf.convert_to_tensor, all_arrays)
+
+    def _create_dataset(client_index):
+      start = tf.gather(offsets, client_index)
+      end = start + tf.gather(lengths, client_index)
+      return tf.data.Dataset.from_tensor_slices(
+          tf.nest.map_structure(lambda t: t[start:end], all_tensors))
+
+    return _create_dataset
+
   @property
   def output_types(self):
     return self._output_types
@@ -63,3 +97,36 @@ class FromTensorSlicesClientData(client_data.ClientData):
   @property
   def output_shapes(self):
     return self._output_shapes
+
+
+def _to_arrays(tensor_slices, output_types, output_shapes):
+  """Converts `tensor_slices` into a structure of arrays of `output_types`.
+
+  As in `tf.data.Dataset.from_tensor_slices`, dictionaries and tuples are
+  structures, and everything else (including lists) is converted into arrays.
+
+  Args:
+    tensor_slices: The tensor slices of a client.
+    output_types: The matching structure of `tf.DType`s of the examples.
+    output_shapes: The matching structure of `tf.TensorShape`s of the examples.
+
+  Returns:
+    A structure of Numpy arrays like `output_types`.
+  """
+  if isinstance(output_types, tf.DType):
+    array = np.asarray(tensor_slices, dtype=output_types.as_numpy_dtype)
+    if not array.size and output_shapes.is_fully_defined():
+      # Empty lists do not convey the shape of the examples.
+      array = array.reshape([0] + output_shapes.as_list())
+    return array
+  if isinstance(output_types, dict):
+    return type(output_types)(
+        (k, _to_arrays(tensor_slices[k], v, output_shapes[k]))
+        for k, v in output_types.items())
+  arrays = [
+      _to_arrays(x, t, s)
+      for x, t, s in zip(tensor_slices, output_types, output_shapes)
+  ]
+  if hasattr(output_types, '_fields'):
+    return type(output_types)(*arrays)
+  return type(output_types)(arrays)
@@ -18,6 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 from six.moves import range
 import tensorflow as tf
 
@@ -72,6 +73,74 @@ class FromTensorSlicesClientDataTest(tf.test.TestCase):
         break
     self.assertTrue(found_not_equal)
 
+  def test_create_tf_dataset_from_all_clients_reshuffles_clients(self):
+    tensor_slices_dict = {str(i): [i] for i in range(20)}
+    client_data = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        tensor_slices_dict)
+    ds = client_data.create_tf_dataset_from_all_clients(seed=1).repeat(2)
+    examples = [x.numpy() for x in ds]
+    first_epoch, second_epoch = examples[:20], examples[20:]
+    self.assertCountEqual(first_epoch, range(20))
+    self.assertCountEqual(second_epoch, range(20))
+    self.assertNotEqual(first_epoch, second_epoch)
+
+  def test_create_tf_dataset_from_all_clients_with_empty_client(self):
+    tensor_slices_dict = {
+        'a': {'x': [1, 2]},
+        'b': {'x': np.zeros([0], dtype=np.int32)},
+        'c': {'x': [3]},
+    }
+    client_data = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        tensor_slices_dict)
+    ds = client_data.create_tf_dataset_from_all_clients(seed=1)
+    self.assertCountEqual([x['x'].numpy() for x in ds], [1, 2, 3])
+
+  def test_create_tf_dataset_from_all_clients_interleaved(self):
+    tensor_slices_dict = {'a': [1, 1], 'b': [2, 2, 2], 'c': [3], 'd': [4, 4]}
+    client_data = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        tensor_slices_dict)
+
+    def get_flat_dataset():
+      ds = client_data.create_tf_dataset_from_all_clients(
+          seed=123, cycle_length=4, num_parallel_calls=2)
+      return [x.numpy() for x in ds]
+
+    d1 = get_flat_dataset()
+    self.assertCountEqual(d1, [1, 1, 2, 2, 2, 3, 4, 4])
+    # The first examples are taken from each of the clients in the cycle.
+    self.assertCountEqual(d1[:4], [1, 2, 3, 4])
+    self.assertEqual(d1, get_flat_dataset())
+
+  def test_create_tf_dataset_from_all_clients_with_max_examples(self):
+    tensor_slices_dict = {'a': [1, 1], 'b': [2, 2, 2], 'c': [3], 'd': [4, 4]}
+    client_data = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        tensor_slices_dict)
+    ds = client_data.create_tf_dataset_from_all_clients(
+        max_examples_per_client=2)
+    self.assertCountEqual([x.numpy() for x in ds], [1, 1, 2, 2, 3, 4, 4])
+
+  def test_create_tf_dataset_from_all_clients_with_structure(self):
+    tensor_slices_dict = {
+        'a': {
+            'x': [[1.0, 2.0], [3.0, 4.0]],
+            'y': [1, 2]
+        },
+        'b': {
+            'x': [[5.0, 6.0]],
+            'y': [3]
+        },
+    }
+    client_data = from_tensor_slices_client_data.FromTensorSlicesClientData(
+        tensor_slices_dict)
+    ds = client_data.create_tf_dataset_from_all_clients(seed=1)
+    self.assertEqual(ds.output_types, client_data.output_types)
+    examples = {x['y'].numpy(): x['x'].numpy().tolist() for x in ds}
+    self.assertEqual(examples, {
+        1: [1.0, 2.0],
+        2: [3.0, 4.0],
+        3: [5.0, 6.0]
+    })
+
 
 if __name__ == '__main__':
   tf.compat.v1.enable_v2_behavior()
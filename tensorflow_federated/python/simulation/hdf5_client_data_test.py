@@ -132,6 +132,17 @@ class HDF5ClientDataTest(tf.test.TestCase, absltest.TestCase):
       self.assertCountEqual(actual, expected)
     self.assertEmpty(expected_examples)
 
+  def test_create_tf_dataset_from_all_clients_in_parallel(self):
+    client_data = hdf5_client_data.HDF5ClientData(
+        HDF5ClientDataTest.test_data_filepath)
+    tf_dataset = client_data.create_tf_dataset_from_all_clients(
+        seed=1, cycle_length=3, num_parallel_calls=3)
+    actual_ys = [self.evaluate(x['y']) for x in tf_dataset]
+    expected_ys = []
+    for expected_data in six.itervalues(TEST_DATA):
+      expected_ys.extend(expected_data['y'])
+    self.assertCountEqual(actual_ys, expected_ys)
+
 
 if __name__ == '__main__':
   # Need eager_mode to iterate over tf.data.Dataset.
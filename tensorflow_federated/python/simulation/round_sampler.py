@@ -0,0 +1,244 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Samples the clients of simulation rounds ahead of time, in the background."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import random
+import sys
+import threading
+
+import numpy as np
+import six
+from six.moves import queue
+from six.moves import range
+import tensorflow as tf
+
+from tensorflow_federated.python.common_libs import py_typecheck
+from tensorflow_federated.python.simulation import client_data as client_data_lib
+from tensorflow_federated.python.simulation import dataset_utils
+
+# How long the background thread waits for room in the queue before checking
+# whether the sampler was closed, in seconds.
+_PUT_TIMEOUT = 0.1
+
+
+def compute_client_sizes(client_data):
+  """Counts the examples of every client of a `ClientData`.
+
+  The result can be saved with `np.save`, and reused as the `client_weights` of
+  a `RoundSampler` for the same `client_data`, to sample clients in proportion
+  to their number of examples without iterating over their datasets again.
+
+  NOTE: This function requires eager execution.
+
+  Args:
+    client_data: A `tff.simulation.ClientData`.
+
+  Returns:
+    A `np.int64` array with the number of examples of each client, in the order
+    of `client_data.client_ids`.
+  """
+  py_typecheck.check_type(client_data, client_data_lib.ClientData)
+  sizes = np.zeros([len(client_data.client_ids)], dtype=np.int64)
+  for i, client_id in enumerate(client_data.client_ids):
+    dataset = client_data.create_tf_dataset_for_client(client_id)
+    sizes[i] = dataset.reduce(np.int64(0), lambda n, _: n + 1).numpy()
+  return sizes
+
+
+class RoundSampler(object):
+  """Samples clients and prepares their datasets for the rounds of a simulation.
+
+  While the driver of a simulation runs one round, a background thread samples
+  the clients of the following rounds, and creates their datasets, so that the
+  input of the next round is ready as soon as the current one completes. At
+  most `prefetch_depth` rounds are prepared ahead of the one being consumed.
+
+  For example:
+
+  ```python
+  with tff.simulation.RoundSampler(
+      train_data, clients_per_round=10, preprocess_fn=preprocess) as sampler:
+    for _ in range(num_rounds):
+      _, datasets = sampler.get_next_round()
+      state, metrics = iterative_process.next(state, datasets)
+  ```
+
+  The clients of each round are distinct. They are sampled uniformly, in time
+  proportional to `clients_per_round` only, so that they can be sampled from
+  arbitrarily large populations, or in proportion to `client_weights`, e.g. the
+  numbers of examples from `compute_client_sizes`.
+
+  NOTE: The datasets are created in another thread, and thus this class
+  requires eager execution.
+  """
+
+  def __init__(self,
+               client_data,
+               clients_per_round,
+               preprocess_fn=None,
+               client_weights=None,
+               prefetch_depth=1,
+               materialize=True,
+               seed=None):
+    """Constructs a `RoundSampler`, and starts preparing the first rounds.
+
+    Args:
+      client_data: The `tff.simulation.ClientData` to sample clients from.
+      clients_per_round: The number of clients to sample in each round.
+      preprocess_fn: Optional, a function that accepts the `tf.data.Dataset` of
+        a client, and returns a preprocessed `tf.data.Dataset`, e.g. shuffled
+        and batched. If `materialize` is `True`, it is applied to the
+        materialized dataset.
+      client_weights: Optional, a sequence of nonnegative numbers, one per
+        client in the order of `client_data.client_ids`, to which the
+        probability of sampling each client is proportional. If `None`, the
+        clients are sampled uniformly.
+      prefetch_depth: The maximum number of rounds that are prepared in
+        advance.
+      materialize: Whether to read the examples of the sampled clients into
+        memory in the background, rather than only creating their datasets.
+        This makes the next round independent of the cost of reading and
+        transforming the raw examples, and requires the datasets to be finite.
+      seed: Optional, a seed for sampling the clients.
+
+    Raises:
+      ValueError: If `clients_per_round` or `prefetch_depth` is not positive,
+        or if there are too few clients, or clients with nonzero weights.
+      RuntimeError: If not executing eagerly.
+    """
+    py_typecheck.check_type(client_data, client_data_lib.ClientData)
+    py_typecheck.check_type(clients_per_round, int)
+    py_typecheck.check_type(prefetch_depth, int)
+    if preprocess_fn is not None:
+      py_typecheck.check_callable(preprocess_fn)
+    if clients_per_round <= 0:
+      raise ValueError('clients_per_round must be positive.')
+    if prefetch_depth <= 0:
+      raise ValueError('prefetch_depth must be positive.')
+    if not tf.executing_eagerly():
+      raise RuntimeError('The round sampler may only be used in eager mode.')
+    num_clients = len(client_data.client_ids)
+    if client_weights is None:
+      probabilities = None
+      num_candidates = num_clients
+    else:
+      weights = np.asarray(client_weights, dtype=np.float64)
+      if weights.shape != (num_clients,):
+        raise ValueError(
+            'Expected one weight for each of the {} clients, found an array of '
+            'shape {}.'.format(num_clients, weights.shape))
+      if np.any(weights < 0.0) or not np.all(np.isfinite(weights)):
+        raise ValueError('The client weights must be nonnegative and finite.')
+      probabilities = weights / np.sum(weights)
+      num_candidates = np.count_nonzero(weights)
+    if clients_per_round > num_candidates:
+      raise ValueError(
+          'Cannot sample {} distinct clients out of {} candidates.'.format(
+              clients_per_round, num_candidates))
+
+    self._client_data = client_data
+    self._clients_per_round = clients_per_round
+    self._preprocess_fn = preprocess_fn
+    self._probabilities = probabilities
+    self._materialize = materialize
+    self._random = random.Random(seed)
+    self._random_state = np.random.RandomState(seed)
+    self._queue = queue.Queue(maxsize=prefetch_depth)
+    self._closed = threading.Event()
+    self._thread = threading.Thread(target=self._run)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def _sample_client_ids(self):
+    num_clients = len(self._client_data.client_ids)
+    if self._probabilities is None:
+      # Selects without enumerating the population.
+      indices = self._random.sample(range(num_clients), self._clients_per_round)
+    else:
+      indices = self._random_state.choice(
+          num_clients,
+          self._clients_per_round,
+          replace=False,
+          p=self._probabilities)
+    return [self._client_data.client_ids[i] for i in indices]
+
+  def _create_dataset(self, client_id):
+    dataset = self._client_data.create_tf_dataset_for_client(client_id)
+    if self._materialize:
+      dataset = dataset_utils.materialize(dataset)
+    if self._preprocess_fn is not None:
+      dataset = self._preprocess_fn(dataset)
+    return dataset
+
+  def _put(self, item):
+    """Puts `item` in the queue, and returns `False` if closed meanwhile."""
+    while not self._closed.is_set():
+      try:
+        self._queue.put(item, timeout=_PUT_TIMEOUT)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def _run(self):
+    """Prepares rounds until the sampler is closed."""
+    while not self._closed.is_set():
+      try:
+        client_ids = self._sample_client_ids()
+        item = (client_ids, [self._create_dataset(c) for c in client_ids], None)
+      except Exception:  # pylint: disable=broad-except
+        # The error is raised in the thread that consumes the round, and the
+        # following rounds are still prepared.
+        item = (None, None, sys.exc_info())
+      if not self._put(item):
+        return
+
+  def get_next_round(self):
+    """Returns the clients and datasets of the next round.
+
+    This blocks until the round is prepared, unless it was prepared in advance.
+
+    Returns:
+      A tuple `(client_ids, datasets)` of the list of the string ids of the
+      sampled clients, and the list of their `tf.data.Dataset`s.
+
+    Raises:
+      RuntimeError: If the sampler is closed.
+      Exception: Any error that occurred while preparing the round. The
+        sampler remains usable, and subsequent calls return the next rounds.
+    """
+    if self._closed.is_set():
+      raise RuntimeError('The round sampler is closed.')
+    client_ids, datasets, exc_info = self._queue.get()
+    if exc_info is not None:
+      six.reraise(*exc_info)
+    return client_ids, datasets
+
+  def close(self):
+    """Stops preparing rounds, and discards the rounds prepared in advance."""
+    self._closed.set()
+    self._thread.join()
+    while not self._queue.empty():
+      self._queue.get_nowait()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
@@ -0,0 +1,197 @@
+# Lint as: python3
+# Copyright 2019, The TensorFlow Federated Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for tensorflow_federated.python.simulation.round_sampler."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import time
+
+import numpy as np
+from six.moves import range
+import tensorflow as tf
+
+from tensorflow_federated.python.simulation import from_tensor_slices_client_data
+from tensorflow_federated.python.simulation import round_sampler
+
+TEST_DATA = {
+    'CLIENT A': [1, 2, 3],
+    'CLIENT B': [4, 5],
+    'CLIENT C': [6],
+    'CLIENT D': [7, 8, 9, 10],
+    'CLIENT E': [11, 12],
+}
+
+
+class _CountingClientData(
+    from_tensor_slices_client_data.FromTensorSlicesClientData):
+  """Counts the datasets that are created."""
+
+  def __init__(self, tensor_slices_dict):
+    self._lock = threading.Lock()
+    self.num_datasets_created = 0
+    super(_CountingClientData, self).__init__(tensor_slices_dict)
+    self.num_datasets_created = 0
+
+  def create_tf_dataset_for_client(self, client_id):
+    with self._lock:
+      self.num_datasets_created += 1
+    return super(_CountingClientData,
+                 self).create_tf_dataset_for_client(client_id)
+
+
+class RoundSamplerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(RoundSamplerTest, self).setUp()
+    self.client_data = (
+        from_tensor_slices_client_data.FromTensorSlicesClientData(TEST_DATA))
+
+  def test_samples_distinct_clients_with_their_datasets(self):
+    with round_sampler.RoundSampler(self.client_data, 3) as sampler:
+      for _ in range(5):
+        client_ids, datasets = sampler.get_next_round()
+        self.assertLen(client_ids, 3)
+        self.assertLen(set(client_ids), 3)
+        self.assertLen(datasets, 3)
+        for client_id, dataset in zip(client_ids, datasets):
+          self.assertIn(client_id, TEST_DATA)
+          self.assertEqual(
+              self.evaluate(list(dataset)), TEST_DATA[client_id])
+
+  def test_samples_same_clients_with_same_seed(self):
+
+    def sample_rounds(seed):
+      with round_sampler.RoundSampler(
+          self.client_data, 2, seed=seed) as sampler:
+        return [sampler.get_next_round()[0] for _ in range(10)]
+
+    self.assertEqual(sample_rounds(1), sample_rounds(1))
+
+  def test_samples_by_client_weights(self):
+    client_weights = [0, 3, 0, 1, 0]
+    with round_sampler.RoundSampler(
+        self.client_data, 2, client_weights=client_weights) as sampler:
+      for _ in range(5):
+        client_ids, _ = sampler.get_next_round()
+        self.assertCountEqual(client_ids, ['CLIENT B', 'CLIENT D'])
+
+  def test_compute_client_sizes(self):
+    sizes = round_sampler.compute_client_sizes(self.client_data)
+    expected_sizes = [
+        len(TEST_DATA[client_id]) for client_id in self.client_data.client_ids
+    ]
+    self.assertEqual(list(sizes), expected_sizes)
+
+  def test_applies_preprocess_fn(self):
+    with round_sampler.RoundSampler(
+        self.client_data,
+        5,
+        preprocess_fn=lambda dataset: dataset.batch(2)) as sampler:
+      client_ids, datasets = sampler.get_next_round()
+    for client_id, dataset in zip(client_ids, datasets):
+      batches = self.evaluate(list(dataset))
+      self.assertLen(batches, (len(TEST_DATA[client_id]) + 1) // 2)
+      self.assertEqual(
+          [x for batch in batches for x in batch], TEST_DATA[client_id])
+
+  def test_without_materialization(self):
+    with round_sampler.RoundSampler(
+        self.client_data, 1, materialize=False) as sampler:
+      client_ids, datasets = sampler.get_next_round()
+    self.assertEqual(
+        self.evaluate(list(datasets[0])), TEST_DATA[client_ids[0]])
+
+  def test_bounds_number_of_rounds_prepared_in_advance(self):
+    client_data = _CountingClientData(TEST_DATA)
+    sampler = round_sampler.RoundSampler(client_data, 2, prefetch_depth=2)
+    self.addCleanup(sampler.close)
+    sampler.get_next_round()
+    prefetched_rounds = sampler._queue  # pylint: disable=protected-access
+    deadline = time.time() + 10.0
+    while not prefetched_rounds.full() and time.time() < deadline:
+      time.sleep(0.01)
+    time.sleep(0.1)
+    # Two rounds in the queue, and one more that waits for room in the queue.
+    self.assertLessEqual(client_data.num_datasets_created, 2 * (1 + 2 + 1))
+
+  def test_materializes_empty_clients(self):
+    # A dictionary of empty arrays, since clients without any tensor slices are
+    # rejected.
+    client_data = from_tensor_slices_client_data.FromTensorSlicesClientData({
+        'CLIENT A': {
+            'x': np.array([1, 2], dtype=np.int32)
+        },
+        'CLIENT B': {
+            'x': np.zeros([0], dtype=np.int32)
+        },
+    })
+    with round_sampler.RoundSampler(
+        client_data, 1, client_weights=[0, 1]) as sampler:
+      for _ in range(3):
+        client_ids, datasets = sampler.get_next_round()
+        self.assertEqual(client_ids, ['CLIENT B'])
+        self.assertEmpty(list(datasets[0]))
+
+  def test_raises_errors_in_get_next_round(self):
+    num_calls = [0]
+
+    def preprocess_fn(dataset):
+      num_calls[0] += 1
+      if num_calls[0] <= 2:
+        raise ValueError('Bad dataset.')
+      return dataset
+
+    with round_sampler.RoundSampler(
+        self.client_data, 1, preprocess_fn=preprocess_fn) as sampler:
+      for _ in range(2):
+        with self.assertRaisesRegex(ValueError, 'Bad dataset.'):
+          sampler.get_next_round()
+      # The rounds after the errors are still prepared.
+      client_ids, datasets = sampler.get_next_round()
+      self.assertEqual(
+          self.evaluate(list(datasets[0])), TEST_DATA[client_ids[0]])
+
+  def test_get_next_round_fails_after_close(self):
+    sampler = round_sampler.RoundSampler(self.client_data, 1)
+    sampler.close()
+    with self.assertRaises(RuntimeError):
+      sampler.get_next_round()
+
+  def test_constructor_fails_with_too_few_clients(self):
+    with self.assertRaises(ValueError):
+      round_sampler.RoundSampler(self.client_data, 6)
+    with self.assertRaises(ValueError):
+      round_sampler.RoundSampler(
+          self.client_data, 3, client_weights=[1, 1, 0, 0, 0])
+
+  def test_constructor_fails_with_bad_client_weights(self):
+    with self.assertRaises(ValueError):
+      round_sampler.RoundSampler(self.client_data, 1, client_weights=[1, 1])
+    with self.assertRaises(ValueError):
+      round_sampler.RoundSampler(
+          self.client_data, 1, client_weights=[1, -1, 1, 1, 1])
+
+  def test_constructor_fails_with_nonpositive_prefetch_depth(self):
+    with self.assertRaises(ValueError):
+      round_sampler.RoundSampler(self.client_data, 1, prefetch_depth=0)
+
+
+if __name__ == '__main__':
+  # Need eager_mode to iterate over tf.data.Dataset.
+  tf.compat.v1.enable_v2_behavior()
+  tf.test.main()
@@ -18,7 +18,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import bisect
+import collections
 import re
 
 from six.moves import range
@@ -50,6 +50,115 @@ def split_client_id(client_id):
   return raw_client_id, index
 
 
+class _PseudoClientIds(collections.Sequence):
+  """A read-only view of the ids of the pseudo-clients.
+
+  The raw client with position `j` in the raw client ids is expanded into the
+  pseudo-clients with indices `0...k`, if `j` is smaller than the remainder
+  `g`, or `0...k-1` otherwise, where `k` and `g` are the quotient and remainder
+  of the number of pseudo-clients by the number of raw clients. The ids are
+  ordered by the raw client, then by the index, and both the id at a position
+  and the position of an id are computed arithmetically, so the view takes
+  constant memory in the number of pseudo-clients, and random samples can be
+  drawn from it in constant time per sample, e.g. with `random.choice` or
+  `random.sample`.
+  """
+
+  def __init__(self, raw_client_ids, num_transformed_clients):
+    self._raw_client_ids = raw_client_ids
+    self._raw_client_positions = {
+        raw_client_id: j for j, raw_client_id in enumerate(raw_client_ids)
+    }
+    self._num_clients = num_transformed_clients
+    self._k, self._g = divmod(num_transformed_clients, len(raw_client_ids))
+    num_digits = len(str(num_transformed_clients - 1))
+    self._format_str = '{}_{:0' + str(num_digits) + '}'
+
+  def __len__(self):
+    return self._num_clients
+
+  def __getitem__(self, position):
+    if isinstance(position, slice):
+      return [self[p] for p in range(*position.indices(len(self)))]
+    if position < 0:
+      position += self._num_clients
+    if not 0 <= position < self._num_clients:
+      raise IndexError('Pseudo-client position out of range.')
+    num_extended_positions = self._g * (self._k + 1)
+    if position < num_extended_positions:
+      j, index = divmod(position, self._k + 1)
+    else:
+      j, index = divmod(position - num_extended_positions, self._k)
+      j += self._g
+    return self._format_str.format(self._raw_client_ids[j], index)
+
+  def __contains__(self, client_id):
+    return self._find(client_id) is not None
+
+  def __eq__(self, other):
+    if isinstance(other, (list, tuple, _PseudoClientIds)):
+      return len(self) == len(other) and all(
+          x == y for x, y in zip(self, other))
+    return NotImplemented
+
+  def __ne__(self, other):
+    result = self.__eq__(other)
+    return result if result is NotImplemented else not result
+
+  def _find(self, client_id):
+    """Returns the raw client id, index and position of `client_id`, or `None`.
+
+    Args:
+      client_id: The pseudo-client id.
+    """
+    if not isinstance(client_id, str):
+      return None
+    raw_client_id, _, index_str = client_id.rpartition('_')
+    if not index_str.isdigit():
+      return None
+    j = self._raw_client_positions.get(raw_client_id)
+    if j is None:
+      return None
+    index = int(index_str)
+    if j < self._g:
+      if index > self._k:
+        return None
+      position = j * (self._k + 1) + index
+    else:
+      if index >= self._k:
+        return None
+      position = self._g * (self._k + 1) + (j - self._g) * self._k + index
+    # Rejects ids whose index is not padded as in the formatted ids.
+    if self._format_str.format(raw_client_id, index) != client_id:
+      return None
+    return raw_client_id, index, position
+
+  def index(self, client_id):  # pylint: disable=arguments-differ
+    """Returns the position of `client_id` in the pseudo-client ids.
+
+    Args:
+      client_id: The pseudo-client id.
+
+    Raises:
+      ValueError: If there is no such pseudo-client.
+    """
+    return self.parse(client_id)[2]
+
+  def parse(self, client_id):
+    """Returns the raw client id, index and position of `client_id`.
+
+    Args:
+      client_id: The pseudo-client id.
+
+    Raises:
+      ValueError: If there is no such pseudo-client.
+    """
+    result = self._find(client_id)
+    if result is None:
+      raise ValueError('client_id must be a valid string from client_ids.')
+    return result
+
+
 class TransformingClientData(client_data.ClientData):
   """Transforms client data, potentially expanding by adding pseudo-clients.
 
@@ -64,10 +173,19 @@ class TransformingClientData(client_data.ClientData):
   random rotation of the image with the angle determined by a hash of "client_a"
   and "1". Typically by convention the index 0 corresponds to the identity
   function if the identity is supported.
+
+  The pseudo-client ids are not materialized: `client_ids` is a read-only
+  sequence that computes them on access, so the number of pseudo-clients may be
+  arbitrarily large, and clients can be sampled from it in constant time with
+  `random.choice` or `random.sample`. The ids are ordered by raw client, in the
+  order of `raw_client_data.client_ids`, and then by index.
   """
 
-  def __init__(self, raw_client_data, make_transform_fn,
-               num_transformed_clients):
+  def __init__(self,
+               raw_client_data,
+               make_transform_fn,
+               num_transformed_clients,
+               transform_batch_size=None):
     """Initializes the TransformingClientData.
 
     Args:
@@ -87,6 +205,11 @@ class TransformingClientData(client_data.ClientData):
         there will be exactly k pseudo-clients per real client, with indices
         0...k-1. Any remainder g will be generated from the first g real clients
         and will be given index k.
+      transform_batch_size: Optional, the number of examples to transform at
+        once. If not `None`, the examples of each client are batched before the
+        transformation and unbatched after it, and the functions returned by
+        make_transform_fn must accept batches of datapoints, with a leading
+        batch dimension. If `None`, the datapoints are transformed one by one.
     """
     py_typecheck.check_type(raw_client_data, client_data.ClientData)
     py_typecheck.check_callable(make_transform_fn)
@@ -94,24 +217,16 @@ class TransformingClientData(client_data.ClientData):
 
     if num_transformed_clients <= 0:
       raise ValueError('num_transformed_clients must be positive and finite.')
+    if transform_batch_size is not None:
+      py_typecheck.check_type(transform_batch_size, int)
+      if transform_batch_size <= 0:
+        raise ValueError('transform_batch_size must be positive.')
     self._raw_client_data = raw_client_data
     self._make_transform_fn = make_transform_fn
+    self._transform_batch_size = transform_batch_size
 
-    num_digits = len(str(num_transformed_clients - 1))
-    format_str = '{}_{:0' + str(num_digits) + '}'
-
-    raw_client_ids = raw_client_data.client_ids
-    k = num_transformed_clients // len(raw_client_ids)
-    self._client_ids = []
-    for raw_client_id in raw_client_ids:
-      for i in range(k):
-        self._client_ids.append(format_str.format(raw_client_id, i))
-    num_extra_client_ids = num_transformed_clients - k * len(raw_client_ids)
-    for c in range(num_extra_client_ids):
-      self._client_ids.append(format_str.format(raw_client_ids[c], k))
-
-    # Already sorted if raw_client_data.client_ids are, but just to be sure...
-    self._client_ids = sorted(self._client_ids)
+    self._client_ids = _PseudoClientIds(raw_client_data.client_ids,
+                                        num_transformed_clients)
 
   @property
   def client_ids(self):
@@ -119,20 +234,19 @@ class TransformingClientData(client_data.ClientData):
 
   def create_tf_dataset_for_client(self, client_id):
     py_typecheck.check_type(client_id, str)
-    i = bisect.bisect_left(self._client_ids, client_id)
-    if i == len(self._client_ids) or self._client_ids[i] != client_id:
-      raise ValueError('client_id must be a valid string from client_ids.')
-
-    raw_client_id, index = split_client_id(client_id)
+    raw_client_id, index, _ = self._client_ids.parse(client_id)
     raw_dataset = self._raw_client_data.create_tf_dataset_for_client(
         raw_client_id)
 
     transform_fn = self._make_transform_fn(raw_client_id, index)
     if not transform_fn:
       return raw_dataset
-    else:
-      py_typecheck.check_callable(transform_fn)
+    py_typecheck.check_callable(transform_fn)
+    if self._transform_batch_size is None:
       return raw_dataset.map(transform_fn, tf.data.experimental.AUTOTUNE)
+    return raw_dataset.batch(self._transform_batch_size).map(
+        transform_fn, tf.data.experimental.AUTOTUNE).apply(
+            tf.data.experimental.unbatch())
 
   @property
   def output_types(self):
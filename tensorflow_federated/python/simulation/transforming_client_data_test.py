@@ -18,6 +18,7 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import random
 import re
 import tempfile
 
@@ -101,7 +102,48 @@ class TransformingClientDataTest(tf.test.TestCase, absltest.TestCase):
       self.assertIsInstance(client_id, str)
 
     # Check ids are sorted.
-    self.assertListEqual(client_ids, sorted(client_ids))
+    self.assertListEqual(list(client_ids), sorted(client_ids))
+
+    # Check random access and membership.
+    self.assertEqual(client_ids[0], 'CLIENT A_0')
+    self.assertEqual(client_ids[-1], 'CLIENT C_1')
+    self.assertEqual(client_ids[1:3], ['CLIENT A_1', 'CLIENT A_2'])
+    for i, client_id in enumerate(client_ids):
+      self.assertIn(client_id, client_ids)
+      self.assertEqual(client_ids.index(client_id), i)
+    for client_id in ['CLIENT A_3', 'CLIENT B_2', 'CLIENT D_0', 'CLIENT A_00',
+                      'CLIENT A', 'CLIENT A_-1']:
+      self.assertNotIn(client_id, client_ids)
+    with self.assertRaises(IndexError):
+      client_ids[7]  # pylint: disable=pointless-statement
+
+  def test_client_ids_with_fewer_clients_than_raw_clients(self):
+    client_data = hdf5_client_data.HDF5ClientData(
+        TransformingClientDataTest.test_data_filepath)
+    transformed_client_data = transforming_client_data.TransformingClientData(
+        client_data, _test_transform_cons, 2)
+    self.assertListEqual(
+        list(transformed_client_data.client_ids), ['CLIENT A_0', 'CLIENT B_0'])
+    self.assertNotIn('CLIENT C_0', transformed_client_data.client_ids)
+
+  def test_client_ids_are_not_materialized(self):
+    client_data = hdf5_client_data.HDF5ClientData(
+        TransformingClientDataTest.test_data_filepath)
+    num_transformed_clients = 3 * 10**12 + 1
+    transformed_client_data = transforming_client_data.TransformingClientData(
+        client_data, _test_transform_cons, num_transformed_clients)
+    client_ids = transformed_client_data.client_ids
+    self.assertLen(client_ids, num_transformed_clients)
+    self.assertEqual(client_ids[-1], 'CLIENT C_0999999999999')
+    self.assertEqual(client_ids.index('CLIENT B_0000000000005'), 10**12 + 6)
+
+    sample = random.Random(0).sample(client_ids, 10)
+    self.assertLen(set(sample), 10)
+    for client_id in sample:
+      self.assertIn(client_id, client_ids)
+    tf_dataset = transformed_client_data.create_tf_dataset_for_client(
+        random.Random(1).choice(client_ids))
+    self.assertIsInstance(tf_dataset, tf.data.Dataset)
 
   def test_fail_on_bad_client_id(self):
     client_data = hdf5_client_data.HDF5ClientData(
@@ -148,6 +190,31 @@ class TransformingClientDataTest(tf.test.TestCase, absltest.TestCase):
         for k, v in six.iteritems(actual):
           self.assertAllEqual(v, expected[k])
 
+  def test_create_tf_dataset_for_client_with_transform_batch_size(self):
+    client_data = hdf5_client_data.HDF5ClientData(
+        TransformingClientDataTest.test_data_filepath)
+
+    transformed_client_data = transforming_client_data.TransformingClientData(
+        client_data, _test_transform_cons, 9, transform_batch_size=2)
+
+    for client_id in transformed_client_data.client_ids:
+      tf_dataset = transformed_client_data.create_tf_dataset_for_client(
+          client_id)
+      client, index = transforming_client_data.split_client_id(client_id)
+      actual = self.evaluate(list(tf_dataset))
+      self.assertLen(actual, len(TEST_DATA[client]['x']))
+      for i, example in enumerate(actual):
+        self.assertAllEqual(example['x'],
+                            TEST_DATA[client]['x'][i] + 10 * index)
+        self.assertAllEqual(example['z'], TEST_DATA[client]['z'][i])
+
+  def test_fail_on_bad_transform_batch_size(self):
+    client_data = hdf5_client_data.HDF5ClientData(
+        TransformingClientDataTest.test_data_filepath)
+    with self.assertRaises(ValueError):
+      transforming_client_data.TransformingClientData(
+          client_data, _test_transform_cons, 9, transform_batch_size=0)
+
   def test_create_tf_dataset_from_all_clients(self):
     client_data = hdf5_client_data.HDF5ClientData(
         TransformingClientDataTest.test_data_filepath)
@@ -33,6 +33,9 @@ flags.DEFINE_string('endpoint', '[::]:10000', 'endpoint to listen on')
 flags.DEFINE_integer('threads', '10', 'number of worker threads in thread pool')
 flags.DEFINE_string('private_key', '', 'the private key for SSL/TLS setup')
 flags.DEFINE_string('certificate_chain', '', 'the cert for SSL/TLS setup')
+flags.DEFINE_float(
+    'value_ttl', 0.0,
+    'seconds after which unreferenced values are evicted (0 to disable)')
 
 _ONE_DAY_IN_SECONDS = 60 * 60 * 24
 
@@ -49,7 +52,8 @@ def main(argv):
   # TODO(b/134543154): Replace this with the complete local executor stack.
   executor = tff.framework.EagerExecutor()
 
-  service = tff.framework.ExecutorService(executor)
+  service = tff.framework.ExecutorService(
+      executor, value_ttl=(FLAGS.value_ttl if FLAGS.value_ttl > 0 else None))
   server = grpc.server(
       concurrent.futures.ThreadPoolExecutor(max_workers=FLAGS.threads))
 